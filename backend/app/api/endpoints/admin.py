@@ -0,0 +1,40 @@
+from typing import Literal
+
+from fastapi import APIRouter, HTTPException, Query, Response, status
+
+from app.config import settings
+from app.core.profiling import ProfilerBusyError, profiler
+
+router = APIRouter()
+
+
+@router.get("/admin/profile")
+async def get_profile(
+    seconds: float = Query(5.0, gt=0, description="プロファイルを取得する秒数"),
+    mode: Literal["cprofile", "sampling"] = Query("sampling", description="cprofile / sampling"),
+    sort: str = Query("cumulative", description="cprofile の並べ替えキー（cumulative / tottime / ncalls など）"),
+    limit: int = Query(50, ge=1, description="cprofile で出力する関数の数"),
+    interval_ms: float = Query(5.0, gt=0, description="sampling の間隔（ミリ秒）"),
+) -> Response:
+    """実行中のイベントループのプロファイルを指定した秒数だけ取得
+
+    PROFILING_ENABLED が有効な場合のみ使用できる。sampling は collapsed 形式
+    （flamegraph.pl などで描画できる）、cprofile は pstats のテキストで返す。
+    """
+    if not settings.PROFILING_ENABLED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="プロファイリングは無効です")
+    if seconds > settings.PROFILING_MAX_SECONDS:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"seconds は {settings.PROFILING_MAX_SECONDS} 以下にしてください",
+        )
+    try:
+        if mode == "cprofile":
+            content = await profiler.cprofile(seconds, sort=sort, limit=limit)
+        else:
+            content = await profiler.sample(seconds, interval=interval_ms / 1000)
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    return Response(content=content, media_type="text/plain; charset=utf-8")
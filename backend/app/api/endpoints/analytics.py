@@ -0,0 +1,87 @@
+from fastapi import APIRouter, HTTPException, Query, Response, status
+from typing import Optional
+
+from app.config import settings
+from app.core.serialization import dumps
+from app.services.analytics import WindowAnalytics, trajectory_analytics
+
+router = APIRouter()
+
+
+def _get_window(
+    robot_id: str,
+    since: Optional[int],
+    until: Optional[int],
+    bins_x: Optional[int] = None,
+    bins_y: Optional[int] = None,
+) -> WindowAnalytics:
+    """集計結果を取得（ロボットの履歴がない場合は404）"""
+    bins = None
+    if bins_x is not None or bins_y is not None:
+        default = settings.ANALYTICS_HEATMAP_BINS
+        bins = (bins_x or default, bins_y or default)
+    window = trajectory_analytics.window(robot_id, since, until, bins)
+    if window is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"ロボット {robot_id} の履歴がありません",
+        )
+    return window
+
+
+@router.get("/robots/{robot_id}/analytics/summary")
+async def get_summary(
+    robot_id: str,
+    since: Optional[int] = Query(None, description="開始タイムスタンプ（この値を含む）"),
+    until: Optional[int] = Query(None, description="終了タイムスタンプ（この値を含む）"),
+) -> Response:
+    """走行距離、バウンディングボックス、速度の統計を取得"""
+    window = _get_window(robot_id, since, until)
+    content = {"robot_id": robot_id, "since": since, "until": until, **window.summary()}
+    return Response(content=dumps(content), media_type="application/json")
+
+
+@router.get("/robots/{robot_id}/analytics/speed")
+async def get_speed(
+    robot_id: str,
+    since: Optional[int] = Query(None, description="開始タイムスタンプ（この値を含む）"),
+    until: Optional[int] = Query(None, description="終了タイムスタンプ（この値を含む）"),
+) -> Response:
+    """速度と加速度の時系列を取得"""
+    window = _get_window(robot_id, since, until)
+    content = {
+        "robot_id": robot_id,
+        "speed": {
+            "timestamp": window.speed_timestamps.tolist(),
+            "value": window.speeds.tolist(),
+        },
+        "acceleration": {
+            "timestamp": window.accel_timestamps.tolist(),
+            "value": window.accelerations.tolist(),
+        },
+    }
+    return Response(content=dumps(content), media_type="application/json")
+
+
+@router.get("/robots/{robot_id}/analytics/heatmap")
+async def get_heatmap(
+    robot_id: str,
+    since: Optional[int] = Query(None, description="開始タイムスタンプ（この値を含む）"),
+    until: Optional[int] = Query(None, description="終了タイムスタンプ（この値を含む）"),
+    bins_x: Optional[int] = Query(None, ge=1, le=500, description="x方向のビン数"),
+    bins_y: Optional[int] = Query(None, ge=1, le=500, description="y方向のビン数"),
+) -> Response:
+    """アリーナ内の滞在頻度のヒートマップを取得（counts[i][j] は x方向i番目、y方向j番目のビン）"""
+    window = _get_window(robot_id, since, until, bins_x, bins_y)
+    content = {
+        "robot_id": robot_id,
+        "arena": {
+            "min_x": settings.ARENA_MIN_X,
+            "max_x": settings.ARENA_MAX_X,
+            "min_y": settings.ARENA_MIN_Y,
+            "max_y": settings.ARENA_MAX_Y,
+        },
+        "bins": list(window.bins),
+        "counts": window.heatmap.tolist(),
+    }
+    return Response(content=dumps(content), media_type="application/json")
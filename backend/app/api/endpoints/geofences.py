@@ -0,0 +1,38 @@
+from typing import Any, Dict, List
+
+from fastapi import APIRouter, Body, HTTPException, status
+
+from app.services.spatial import Region, geofences
+
+router = APIRouter()
+
+
+@router.get("/geofences")
+async def list_geofences() -> List[Dict[str, Any]]:
+    """登録されているジオフェンスの一覧を取得"""
+    return geofences.list()
+
+
+@router.put("/geofences/{fence_id}")
+async def put_geofence(fence_id: str, region: Dict[str, Any] = Body(..., description="領域（rect / polygon）")):
+    """ジオフェンスを追加または置き換え
+
+    複数ワーカー構成では、このリクエストを受けたワーカーにのみ登録される
+    （全ワーカーで使うジオフェンスは GEOFENCES 設定で登録する）。
+    """
+    try:
+        parsed = Region.from_dict(region)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    geofences.add(fence_id, parsed)
+    return {"id": fence_id, "region": parsed.to_dict()}
+
+
+@router.delete("/geofences/{fence_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_geofence(fence_id: str):
+    """ジオフェンスを削除"""
+    if not geofences.remove(fence_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"ジオフェンス {fence_id} は存在しません",
+        )
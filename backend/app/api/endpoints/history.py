@@ -0,0 +1,88 @@
+from fastapi import APIRouter, HTTPException, Query, Response, status
+from fastapi.concurrency import run_in_threadpool
+from typing import Any, Dict, Optional, Sequence
+
+from app.config import settings
+from app.core.serialization import dumps
+from app.services.downsampling import DownsampleMethod, downsample
+from app.services.history import position_history
+from app.services.trajectory_store import trajectory_store
+
+router = APIRouter()
+
+
+def _points_content(
+    robot_id: str,
+    xs: Sequence[float],
+    ys: Sequence[float],
+    timestamps: Sequence[int],
+    max_points: Optional[int],
+    method: Optional[DownsampleMethod],
+) -> Dict[str, Any]:
+    """列ごとの配列のレスポンス（max_points を指定した場合は間引いてから返す）"""
+    if max_points is not None and len(timestamps) > max_points:
+        xs, ys, timestamps = downsample(
+            xs, ys, timestamps, max_points, method or DownsampleMethod(settings.DOWNSAMPLE_METHOD)
+        )
+    return {
+        "robot_id": robot_id,
+        "count": len(timestamps),
+        "x": xs.tolist(),
+        "y": ys.tolist(),
+        "timestamp": timestamps.tolist(),
+    }
+
+
+@router.get("/robots")
+async def list_robots() -> Response:
+    """履歴を保持しているロボットの一覧を取得"""
+    content = {"robot_ids": position_history.robot_ids, **position_history.stats()}
+    return Response(content=dumps(content), media_type="application/json")
+
+
+@router.get("/robots/{robot_id}/history")
+async def get_history(
+    robot_id: str,
+    since: Optional[int] = Query(None, description="開始タイムスタンプ（この値を含む）"),
+    until: Optional[int] = Query(None, description="終了タイムスタンプ（この値を含む）"),
+    limit: Optional[int] = Query(None, ge=1, description="最大件数（新しい方から）"),
+    max_points: Optional[int] = Query(None, ge=3, description="この件数以下に間引いて返す"),
+    method: Optional[DownsampleMethod] = Query(None, description="間引き方法（lttb / minmax）"),
+) -> Response:
+    """ロボットの位置履歴を時間範囲で取得
+
+    大量の点を返すため、レスポンスは x / y / timestamp の列ごとの配列で返す。
+    max_points を指定した場合は描画に必要な点数まで間引く（最初と最後の点は常に含む）。
+    """
+    history = position_history.get(robot_id)
+    if history is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"ロボット {robot_id} の履歴がありません",
+        )
+
+    xs, ys, timestamps = history.query(since, until, limit)
+    content = _points_content(robot_id, xs, ys, timestamps, max_points, method)
+    return Response(content=dumps(content), media_type="application/json")
+
+
+@router.get("/robots/{robot_id}/trajectory")
+async def get_trajectory(
+    robot_id: str,
+    since: Optional[int] = Query(None, description="開始タイムスタンプ（この値を含む）"),
+    until: Optional[int] = Query(None, description="終了タイムスタンプ（この値を含む）"),
+    limit: Optional[int] = Query(None, ge=1, description="最大件数（古い方から）"),
+    max_points: Optional[int] = Query(None, ge=3, description="この件数以下に間引いて返す"),
+    method: Optional[DownsampleMethod] = Query(None, description="間引き方法（lttb / minmax）"),
+) -> Response:
+    """軌跡ストアに永続化されたロボットの軌跡を時間範囲で取得"""
+    if not settings.TRAJECTORY_STORE_ENABLED:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="軌跡ストアが無効です",
+        )
+
+    # mmapの読み出しはページフォルトでブロックし得るため、スレッドプールで実行
+    xs, ys, timestamps = await run_in_threadpool(trajectory_store.query, robot_id, since, until, limit)
+    content = _points_content(robot_id, xs, ys, timestamps, max_points, method)
+    return Response(content=dumps(content), media_type="application/json")
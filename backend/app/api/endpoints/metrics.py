@@ -0,0 +1,11 @@
+from fastapi import APIRouter, Response
+
+from app.core.metrics import registry
+
+router = APIRouter()
+
+
+@router.get("/metrics")
+async def get_metrics() -> Response:
+    """Prometheusのテキスト形式でメトリクスを取得"""
+    return Response(content=registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,114 @@
+import asyncio
+from typing import AsyncIterator, Optional, Set
+
+from fastapi import APIRouter, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+
+from app.config import settings
+from app.schemas.frames import iter_positions
+from app.services.position_bus import position_bus
+from app.services.snapshot import position_snapshots
+
+router = APIRouter()
+
+# 最新位置は更新のたびに変わるため、キャッシュする場合も毎回 ETag で確認させる
+_CACHE_HEADERS = {"Cache-Control": "no-cache"}
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match のいずれかの ETag が一致するか（弱い比較）"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+@router.get("/robots/{robot_id}/position")
+async def get_position(
+    robot_id: str,
+    request: Request,
+    wait: float = Query(
+        0, ge=0, le=settings.POSITION_LONG_POLL_MAX_S, description="次の更新まで待機する最大秒数（ロングポーリング）"
+    ),
+) -> Response:
+    """ロボットの最新位置を取得
+
+    If-None-Match が現在の ETag と一致する場合は 304 を返す。wait を指定した場合は、
+    If-None-Match が一致するか指定されていなければ次の更新まで最大 wait 秒待機してから返す
+    （更新がなければ 304、If-None-Match がなければ現在の位置）。
+    """
+    snapshot = position_snapshots.get(robot_id)
+    if snapshot is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"ロボット {robot_id} の位置はまだ受信していません",
+        )
+
+    if_none_match = request.headers.get("if-none-match")
+    if wait > 0 and (if_none_match is None or _etag_matches(if_none_match, snapshot.etag)):
+        await snapshot.wait_for_update(wait)
+        # 待機中に上限を超えて破棄され、その後再び受信した場合は新しい最新位置を返す
+        snapshot = position_snapshots.get(robot_id) or snapshot
+
+    etag = snapshot.etag
+    headers = {"ETag": etag, **_CACHE_HEADERS}
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=snapshot.body, media_type="application/json", headers=headers)
+
+
+async def _event_stream(name: str, robot_ids: Optional[Set[str]]) -> AsyncIterator[str]:
+    """位置更新を Server-Sent Events の形式で送信
+
+    data には WebSocket の JSON 形式と同じ position_update フレームをそのまま使い、
+    位置ごとのエンコードはすべてのクライアントで共有する。位置バスの購読はジェネレーターの中で
+    開始するため、レスポンスの送信が始まる前に切断された場合も購読は残らない。
+    """
+    subscription = position_bus.subscribe(name)
+    try:
+        # 接続直後に現在の最新位置を送信
+        initial = [
+            snapshot.position
+            for robot_id in position_snapshots.robot_ids
+            if robot_ids is None or robot_id in robot_ids
+            if (snapshot := position_snapshots.get(robot_id)) is not None
+        ]
+        if initial:
+            yield "".join(f"data: {position.json_frame}\n\n" for position in initial)
+
+        while not subscription.closed:
+            try:
+                positions = await asyncio.wait_for(subscription.get(), settings.SSE_KEEPALIVE_S)
+            except asyncio.TimeoutError:
+                # プロキシに切断されないよう、更新がない間もコメント行を送る
+                yield ": keepalive\n\n"
+                continue
+            # 購読していないロボットの位置は位置フレームに展開しない
+            chunk = "".join(
+                f"data: {position.json_frame}\n\n"
+                for position in iter_positions(
+                    item for item in positions if robot_ids is None or item.robot_id in robot_ids
+                )
+            )
+            if chunk:
+                yield chunk
+    finally:
+        subscription.close()
+
+
+@router.get("/positions/stream")
+async def stream_positions(
+    request: Request,
+    robots: Optional[str] = Query(None, description="受信するロボットID（カンマ区切り、省略時はすべて）"),
+) -> StreamingResponse:
+    """位置更新を Server-Sent Events で受信（WebSocketを使えないクライアント向け）"""
+    robot_ids = {robot_id for robot_id in robots.split(",") if robot_id} if robots else None
+    peer = request.client
+    return StreamingResponse(
+        _event_stream(f"sse:{peer.host}:{peer.port}" if peer else "sse", robot_ids),
+        media_type="text/event-stream",
+        headers={**_CACHE_HEADERS, "X-Accel-Buffering": "no"},
+    )
@@ -1,6 +1,9 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, HTTPException, status
 from typing import Dict, Any
 
+from app.grpc_client.robot_client import client as robot_client
+from app.services.fanout import fanout_coordinator
+from app.sources.factory import position_source
 from app.websockets.manager import manager
 from app.schemas.robot import RobotPosition
 
@@ -10,20 +13,32 @@ router = APIRouter()
 @router.websocket("/ws/robot")
 async def websocket_endpoint(websocket: WebSocket):
     """ロボット位置更新を受信するためのWebSocketエンドポイント"""
-    await manager.connect(websocket)
+    if not await manager.connect(websocket):
+        return
     try:
         while True:
-            # クライアントからのメッセージを待機（主にクライアントへの送信が目的）
+            # クライアントからのメッセージ（購読するロボットの変更など）を処理
             data = await websocket.receive_text()
-            # クライアントから送信されたメッセージを処理可能だが、この例では無視
+            await manager.handle_message(websocket, data)
     except WebSocketDisconnect:
+        pass
+    finally:
         manager.disconnect(websocket)
 
 
 @router.get("/status")
 async def get_status() -> Dict[str, Any]:
-    """サービスの状態を取得"""
-    return {
-        "status": "running",
-        "connections": len(manager.active_connections)
-    }
\ No newline at end of file
+    """サービスの状態を取得
+
+    connections / subscriptions はこのワーカーの値。複数ワーカー構成では cluster に
+    全ワーカーの状態と接続数の合計を含める。source は位置の受信元の状態で、robot-trackerから
+    受信しているワーカーでは trackers に接続先ごとの接続状態を含める。
+    """
+    content: Dict[str, Any] = {"status": "running", **manager.stats()}
+    content["source"] = position_source.status()
+    if robot_client.endpoints:
+        content["trackers"] = robot_client.endpoint_status()
+    if fanout_coordinator is not None:
+        content["worker"] = {"id": fanout_coordinator.worker_id, "role": fanout_coordinator.role}
+        content["cluster"] = fanout_coordinator.cluster_status()
+    return content
\ No newline at end of file
@@ -1,6 +1,6 @@
 from pydantic_settings import BaseSettings
 
-from typing import Optional
+from typing import Any, Dict, List, Literal, Optional
 
 
 class Settings(BaseSettings):
@@ -10,9 +10,153 @@ class Settings(BaseSettings):
     DEBUG: bool = True
     API_PREFIX: str = "/api"
     
+    # ログ設定
+    LOG_LEVEL: str = "INFO"
+    LOG_LEVELS: Dict[str, str] = {}  # ロガーごとのレベル（例: {"app.grpc_client": "DEBUG"}）
+    LOG_FORMAT: Literal["text", "json"] = "text"  # json は1行1レコードの構造化ログ
+    LOG_RATE_LIMIT: float = 10.0  # 同じログを1秒あたりに出力する最大数（0 は制限しない、WARNING 以上は対象外）
+    LOG_RATE_BURST: int = 20  # 同じログを連続して出力できる最大数
+    
+    # プロファイリング設定（/api/admin/profile で実行中のイベントループのプロファイルを取得）
+    PROFILING_ENABLED: bool = False
+    PROFILING_MAX_SECONDS: float = 60.0  # 1回に取得できる最大秒数
+    
     # ClassVarを使用してモデル外のフィールドをマーク、または型アノテーションを追加
     ROBOT_TRACKER_HOST: str = "localhost"  # または実際のIPアドレス
     ROBOT_TRACKER_PORT: str = "50051"
+    # 複数のrobot-trackerの接続先 "host:port" の一覧（空の場合は ROBOT_TRACKER_HOST:ROBOT_TRACKER_PORT のみ）
+    ROBOT_TRACKER_ENDPOINTS: List[str] = []
+    # 複数の接続先の使い方: failover（先頭の接続先を優先し、接続できない場合は次の接続先へ）/
+    # round_robin（ロボットごとに接続先を分散し、接続できない場合は次の接続先へ）
+    ROBOT_TRACKER_LB_POLICY: Literal["failover", "round_robin"] = "failover"
+    # gRPC接続設定
+    GRPC_KEEPALIVE_TIME_MS: int = 5000  # keepaliveのpingを送る間隔（robot-trackerの KeepaliveMinTime 以上にする）
+    GRPC_KEEPALIVE_TIMEOUT_MS: int = 1000  # pingの応答がこの時間なければ切断とみなす
+    GRPC_CONNECT_TIMEOUT_S: float = 5.0  # 起動時に接続を待つ最大時間（秒）
+    GRPC_STREAM_IDLE_TIMEOUT_S: float = 10.0  # 位置を受信しない状態がこの時間続いたら接続状態を確認（秒）
+    GRPC_RECONNECT_INITIAL_DELAY_S: float = 0.1  # 再接続の初期遅延（秒）
+    GRPC_RECONNECT_MAX_DELAY_S: float = 5.0  # 再接続の最大遅延（秒）
+    # TrackRobotBatch で位置をまとめて受信する（高頻度の更新でメッセージごとの読み取りとデコードを減らす）
+    GRPC_BATCH_ENABLED: bool = False
+    GRPC_BATCH_WINDOW_MS: int = 0  # 位置をまとめる期間（ミリ秒、0 はトラッカーのデフォルト）
+    GRPC_BATCH_MAX_POSITIONS: int = 0  # 1メッセージの最大件数（0 はトラッカーのデフォルト）
+    # 追跡するロボットIDの一覧（ロボットごとにTrackRobotストリームを開く）
+    ROBOT_IDS: List[str] = ["robot-1"]
+    
+    # 位置の受信元: grpc（robot-tracker）/ replay（記録した軌跡の再生）/ synthetic（ランダムな位置の生成）
+    POSITION_SOURCE: Literal["grpc", "replay", "synthetic"] = "grpc"
+    # 再生する軌跡: 軌跡ストアのディレクトリ、または1行に1つの位置のJSON（robot_id, x, y, timestamp）のファイル
+    REPLAY_PATH: str = ""
+    REPLAY_SPEED: float = 1.0  # 再生速度の倍率（0 は待機せずに可能な限り速く再生）
+    REPLAY_LOOP: bool = False  # 最後まで再生したら最初から繰り返す
+    REPLAY_REBASE_TIMESTAMPS: bool = True  # タイムスタンプを再生開始時刻からの時刻にずらす（繰り返しても増加し続ける）
+    # ランダムな位置の生成（robot-trackerの RandomGenerator と同じく範囲内の一様乱数）
+    SYNTHETIC_ROBOT_COUNT: int = 0  # 生成するロボット数（robot-1, robot-2, ...、0 は ROBOT_IDS）
+    SYNTHETIC_RATE_HZ: float = 1.0  # ロボットごとの1秒あたりの生成数（robot-trackerの既定は1秒ごと）
+    SYNTHETIC_MIN_X: float = 0.0
+    SYNTHETIC_MAX_X: float = 100.0
+    SYNTHETIC_MIN_Y: float = 0.0
+    SYNTHETIC_MAX_Y: float = 100.0
+    SYNTHETIC_SEED: Optional[int] = None  # 乱数のシード（None は毎回異なる位置）
+    
+    # 位置バス設定
+    POSITION_BUS_CAPACITY: int = 1024  # リングバッファに保持する位置データ数
+    
+    # スケールアウト設定（複数ワーカー構成）
+    # ワーカー間の位置更新の配布方法: none（単一ワーカー）/ unix（同一ホストのUnixソケット）/
+    # shm（同一ホストの共有メモリのリングバッファ）
+    # none 以外の場合、選出された1つのワーカーだけがgRPCを受信して他のワーカーに配布する
+    FANOUT_TRANSPORT: Literal["none", "unix", "shm"] = "none"
+    FANOUT_UNIX_SOCKET: str = "/tmp/robot-backend-fanout.sock"
+    FANOUT_ELECTION_INTERVAL_S: float = 1.0  # followerがリーダーの引き継ぎを試みる間隔（秒）
+    FANOUT_RECONNECT_DELAY_S: float = 0.5  # リーダーへの再接続間隔（秒）
+    FANOUT_STATS_INTERVAL_S: float = 2.0  # ワーカーの状態を共有する間隔（秒）
+    FANOUT_MAX_BUFFER_BYTES: int = 1024 * 1024  # これを超えて送信が滞ったワーカーは切断
+    FANOUT_SHM_NAME: str = "robot-backend-fanout"  # 共有メモリの名前
+    FANOUT_SHM_CAPACITY: int = 65536  # リングバッファに保持する位置レコード数（1件64バイト）
+    FANOUT_SHM_WORKER_SLOTS: int = 64  # 状態を共有できるワーカーの最大数
+    FANOUT_SHM_POLL_INTERVAL_S: float = 0.005  # followerがリングバッファを読み出す間隔（秒）
+    
+    # 位置データ設定
+    TIMESTAMP_UNITS_PER_SECOND: int = 1  # タイムスタンプの1秒あたりの値（robot-trackerはUnix秒を送信）
+    # アリーナの範囲（robot-trackerの PositionMinX..MaxX / MinY..MaxY と同じ値）
+    ARENA_MIN_X: float = 0.0
+    ARENA_MAX_X: float = 100.0
+    ARENA_MIN_Y: float = 0.0
+    ARENA_MAX_Y: float = 100.0
+    
+    # 位置履歴設定
+    HISTORY_CAPACITY: int = 3600  # ロボットごとに保持する位置の最大数
+    HISTORY_MAX_ROBOTS: int = 1000  # 履歴を保持するロボットの最大数
+    
+    # 最新位置（HTTPでの取得）設定
+    SNAPSHOT_MAX_ROBOTS: int = 10000  # 最新位置を保持するロボットの最大数
+    POSITION_LONG_POLL_MAX_S: float = 30.0  # ロングポーリングで待機できる最大秒数
+    SSE_KEEPALIVE_S: float = 15.0  # Server-Sent Events で更新がない間にコメント行を送る間隔（秒）
+    
+    # 軌跡ストア設定（追記専用のセグメントファイルによる永続化）
+    TRAJECTORY_STORE_ENABLED: bool = False
+    TRAJECTORY_DIR: str = "data/trajectories"
+    TRAJECTORY_SEGMENT_MAX_BYTES: int = 64 * 1024 * 1024  # セグメントをローテーションするサイズ
+    TRAJECTORY_SEGMENT_MAX_AGE_S: float = 3600.0  # セグメントをローテーションする経過時間（秒）
+    TRAJECTORY_FSYNC_INTERVAL_S: float = 1.0  # fsyncの最大間隔（秒）
+    TRAJECTORY_FSYNC_BATCH: int = 1000  # この件数を書き込むごとにfsync
+    TRAJECTORY_QUEUE_SIZE: int = 10000  # 書き込みキューの上限（ディスクが遅い場合はこれを超えた位置を破棄）
+    TRAJECTORY_INDEX_INTERVAL: int = 256  # 疎インデックスに登録するレコードの間隔
+    
+    # 軌跡分析設定
+    ANALYTICS_CACHE_SIZE: int = 256  # キャッシュする (ロボット, 時間範囲) の最大数
+    ANALYTICS_HEATMAP_BINS: int = 20  # ヒートマップの1辺あたりのビン数（デフォルト）
+    
+    # 空間フィルター・ジオフェンス設定
+    SPATIAL_GRID_CELL_SIZE: float = 10.0  # 空間インデックスのセルの大きさ（アリーナの座標単位）
+    # 起動時に登録するジオフェンス（例: [{"id": "dock", "region": {"type": "rect", "min_x": 0, ...}}]）
+    GEOFENCES: List[Dict[str, Any]] = []
+    GEOFENCE_MAX_ROBOTS: int = 1000  # ジオフェンスの内側にいるロボットを保持する最大数（超えた場合は新たな enter を通知しない）
+    
+    # 間引き設定
+    # 履歴APIで max_points を指定した場合の間引き方法: lttb / minmax
+    DOWNSAMPLE_METHOD: Literal["lttb", "minmax"] = "lttb"
+    
+    # シリアライズ設定
+    # JSONエンコーダー: auto（orjson → msgspec → json の順で利用可能なもの）/ orjson / msgspec / json
+    JSON_BACKEND: Literal["auto", "orjson", "msgspec", "json"] = "auto"
+    
+    # WebSocket送信設定
+    WS_SEND_QUEUE_SIZE: int = 64  # クライアントごとの送信キューの最大長
+    # 送信キューが満杯の時の方針: drop_oldest / latest_only / disconnect
+    WS_OVERFLOW_POLICY: Literal["drop_oldest", "latest_only", "disconnect"] = "drop_oldest"
+    # クライアントが mode を指定しない場合の配信モード: stream / batch / latest
+    WS_DELIVERY_MODE: Literal["stream", "batch", "latest"] = "stream"
+    WS_BATCH_INTERVAL_MS: int = 100  # batch / latest モードでまとめる期間（ミリ秒）
+    WS_BATCH_MAX_SIZE: int = 100  # batch モードで1フレームにまとめる最大件数
+    WS_REPLAY_POINTS: int = 20  # 接続時にロボットごとに再送する履歴の件数（replay クエリで変更可能）
+    # ライブ配信の間引き（クエリ min_distance / min_interval_ms で変更可能、0 は間引かない）
+    WS_MIN_DISTANCE: float = 0.0  # 前回送信した位置からこの距離未満の更新は送信しない
+    WS_MIN_INTERVAL_MS: int = 0  # ロボットごとにこの間隔未満の更新は送信しない（ミリ秒）
+    # delta 形式（座標の固定小数点化と差分エンコード）
+    WS_DELTA_PRECISION: int = 2  # 座標の小数点以下の桁数（クエリ precision で変更可能）
+    WS_DELTA_KEYFRAME_INTERVAL: int = 100  # ロボットごとにこの件数ごとに差分ではなく絶対値を送信
+    # permessage-deflate 圧縮（uvicorn を直接起動する場合に使用。圧縮は接続ごとに行われCPUを使うため、
+    # binary / delta 形式が中心の場合は無効にする。uvicorn コマンドでは --ws-per-message-deflate で指定）
+    WS_PER_MESSAGE_DEFLATE: bool = True
+    # 接続数の上限（0 は上限なし）。上限を超えた接続は 1013 (Try Again Later) で拒否する
+    WS_MAX_CONNECTIONS: int = 10000  # このワーカーの最大接続数
+    WS_MAX_CONNECTIONS_PER_IP: int = 0  # 接続元のIPアドレスごとの最大接続数
+    # ハートビート: この間隔で ping イベントを送信し、応答のないクライアントと送信が止まったクライアントを切断（0 は無効）
+    WS_HEARTBEAT_INTERVAL_S: float = 15.0
+    WS_HEARTBEAT_TIMEOUT_S: float = 45.0  # pong を返すクライアントがこの時間メッセージを送らなければ切断
+    WS_SEND_TIMEOUT_S: float = 30.0  # 1つのメッセージの送信がこの時間終わらなければ切断
+    # WebSocketプロトコルの ping（uvicorn を直接起動する場合に使用。uvicorn コマンドでは --ws-ping-interval / --ws-ping-timeout）
+    WS_PING_INTERVAL_S: float = 20.0
+    WS_PING_TIMEOUT_S: float = 20.0
+    # デッドレコニング: ロボットごとの運動モデルで速度を推定し、クライアントの予測位置から外れた更新のみ送信
+    # 運動モデル: none（無効）/ constant_velocity（等速度）
+    WS_MOTION_MODEL: Literal["none", "constant_velocity"] = "none"
+    WS_MOTION_SMOOTHING: float = 0.5  # 速度の推定で新しい観測に与える重み（1 は直前の2点の速度）
+    WS_MOTION_MAX_ROBOTS: int = 10000  # 運動モデルを保持するロボットの最大数（超えた場合は最も古いロボットから破棄）
+    WS_DR_TOLERANCE: float = 0.0  # 予測位置との誤差がこの距離以下の更新は送信しない（クエリ dr_tolerance で変更可能、0 は無効）
+    WS_DR_MAX_INTERVAL_MS: int = 1000  # 予測どおりに動いていてもこの間隔（タイムスタンプ）ごとに送信（クエリ dr_max_interval_ms）
     
     class Config:
         env_file = ".env"
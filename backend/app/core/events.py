@@ -1,12 +1,47 @@
 import logging
-from typing import Callable
+from typing import Any, Callable, Dict
 from fastapi import FastAPI
-from app.grpc_client.robot_client import client as robot_client
+from app.config import settings
+from app.services.fanout import fanout_coordinator
+from app.services.history import position_history
+from app.services.position_bus import position_bus
+from app.services.snapshot import position_snapshots
+from app.services.spatial import geofences
+from app.services.trajectory_store import trajectory_store
+from app.sources.factory import position_source
 from app.websockets.manager import manager
 
 logger = logging.getLogger(__name__)
 
 
+def broadcast_stream_event(robot_id: str, event: str, data: Dict[str, Any]) -> None:
+    """ストリームの欠落・再同期をこのワーカーのクライアントに通知し、他のワーカーにも中継"""
+    if fanout_coordinator is not None:
+        fanout_coordinator.publish_event(robot_id, event, data)
+    manager.broadcast_event(robot_id, event, data)
+
+
+async def start_ingest() -> None:
+    """位置の受信を開始（複数ワーカー構成ではingesterに選出されたワーカーのみ）
+
+    受信元は POSITION_SOURCE で選択し（既定はrobot-trackerのgRPC）、以降の処理は受信元によらず同じ。
+    """
+    # 受信元に接続（robot-tracker gRPCサービスの場合はチャネルの準備完了を待つ）
+    await position_source.connect()
+    
+    # 軌跡ストアへの書き込みも受信するワーカーだけが行う
+    if settings.TRAJECTORY_STORE_ENABLED:
+        trajectory_store.start(position_bus)
+    
+    # 受信した位置は位置バスに発行するだけにし、gRPCの読み取りを待たせない
+    position_source.set_position_callback(position_bus.publish)
+    # ストリームの欠落・再同期は全ワーカーのWebSocketクライアントに通知
+    position_source.set_event_callback(broadcast_stream_event)
+    
+    # ロボット位置の受信を開始
+    await position_source.start_tracking()
+
+
 def create_start_app_handler(app: FastAPI) -> Callable:
     """アプリケーション起動時の処理ハンドラーを作成"""
     
@@ -14,14 +49,21 @@ def create_start_app_handler(app: FastAPI) -> Callable:
         """アプリケーション起動時に実行される処理"""
         logger.info("アプリケーションを起動中...")
         
-        # robot-tracker gRPCサービスに接続 (awaitを使用)
-        await robot_client.connect()
-        
-        # 位置更新のコールバック関数を設定
-        robot_client.set_position_callback(manager.broadcast_position)
+        # 位置履歴・最新位置・WebSocketブロードキャストは位置バスを介してそれぞれ独立したタスクで行う
+        position_history.start(position_bus)
+        position_snapshots.start(position_bus)
+        # ジオフェンスは各ワーカーがそれぞれ判定し、自分のクライアントに通知する
+        geofences.load(settings.GEOFENCES)
+        manager.start(position_bus, history=position_history, geofences=geofences)
         
-        # ロボット位置の受信を開始
-        await robot_client.start_tracking()
+        if fanout_coordinator is None:
+            await start_ingest()
+        else:
+            # 選出されたワーカーだけがgRPCを受信し、他のワーカーはその配布を位置バスに流す
+            # （ingesterから中継されたイベントは自分のクライアントに通知する）
+            await fanout_coordinator.start(
+                start_ingest, stats_provider=manager.stats, event_handler=manager.broadcast_event
+            )
         
         logger.info("アプリケーションの起動が完了しました")
     
@@ -36,7 +78,16 @@ def create_stop_app_handler(app: FastAPI) -> Callable:
         logger.info("アプリケーションを終了中...")
         
         # ロボット位置の受信を停止
-        await robot_client.stop_tracking()
+        await position_source.stop_tracking()
+        
+        if fanout_coordinator is not None:
+            await fanout_coordinator.stop()
+        
+        # ブロードキャストと履歴の記録を停止
+        await manager.stop()
+        await position_history.stop()
+        await position_snapshots.stop()
+        await trajectory_store.stop()
         
         logger.info("アプリケーションの終了が完了しました")
     
@@ -0,0 +1,157 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from app.config import settings
+from app.core.metrics import registry
+
+# ログレコードの標準属性（extra で渡された項目を構造化ログに含める際に除外する）
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "sample_every"}
+
+log_suppressed = registry.counter(
+    "robot_log_suppressed_total", "レート制限またはサンプリングで出力しなかったログの数", ("logger",)
+)
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class RateLimitFilter(logging.Filter):
+    """同じログ（ロガー名とフォーマット前のメッセージ）の出力数を制限するフィルター
+
+    - ログごとにトークンバケットで1秒あたり rate 件（最大 burst 件まで連続）に制限する
+    - extra={"sample_every": n} を指定したログは n 件に1件だけ出力する
+    制限したログの件数は次に出力するログに suppressed として付け加える。
+    WARNING 以上のログは制限しない。
+    """
+
+    def __init__(self, rate: float, burst: int, max_keys: int = 1024):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        # キー→[トークン数, 最終更新時刻, 抑制した件数, サンプリングのカウンタ]
+        self._buckets: "OrderedDict[Tuple[str, Any], list]" = OrderedDict()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        sample_every = getattr(record, "sample_every", None)
+        if record.levelno >= logging.WARNING and sample_every is None:
+            return True
+        if self.rate <= 0 and sample_every is None:
+            return True
+
+        key = (record.name, record.msg if isinstance(record.msg, str) else type(record.msg))
+        bucket = self._buckets.get(key)
+        now = time.monotonic()
+        if bucket is None:
+            bucket = [float(self.burst), now, 0, 0]
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+
+        allowed = True
+        if sample_every:
+            bucket[3] += 1
+            allowed = bucket[3] % sample_every == 1 or sample_every == 1
+        if allowed and self.rate > 0 and record.levelno < logging.WARNING:
+            tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if tokens < 1:
+                bucket[0] = tokens
+                allowed = False
+            else:
+                bucket[0] = tokens - 1
+
+        if not allowed:
+            bucket[2] += 1
+            log_suppressed.labels(record.name).inc()
+            return False
+        if bucket[2]:
+            record.suppressed = bucket[2]
+            bucket[2] = 0
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """1行1レコードのJSON形式で出力するフォーマッター（extra で渡した項目も含める）"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for name, value in vars(record).items():
+            if name not in _RECORD_ATTRIBUTES:
+                entry[name] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """テキスト形式のフォーマッター（抑制した件数があれば末尾に付ける）"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        suppressed = getattr(record, "suppressed", None)
+        if suppressed:
+            text += f" (同じログを {suppressed} 件抑制)"
+        return text
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """メッセージのフォーマットを出力スレッドで行う QueueHandler
+
+    標準の QueueHandler は別プロセスへの送信に備えて呼び出し元のスレッドでフォーマットするが、
+    キューはプロセス内でのみ使用するため、レコードをそのまま渡す。
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def setup_logging():
+    """ログ出力を設定
+
+    ログはキューに積むだけで呼び出し元をブロックせず、フォーマットと出力は
+    QueueListener のスレッドで行う。レベルは LOG_LEVEL（全体）と LOG_LEVELS（ロガーごと）で設定する。
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler()
+    if settings.LOG_FORMAT == "json":
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(TextFormatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = _DeferredQueueHandler(log_queue)
+    queue_handler.addFilter(RateLimitFilter(settings.LOG_RATE_LIMIT, settings.LOG_RATE_BURST))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(settings.LOG_LEVEL.upper())
+    for name, level in settings.LOG_LEVELS.items():
+        logging.getLogger(name).setLevel(level.upper())
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """キューに残っているログを出力して出力スレッドを停止"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
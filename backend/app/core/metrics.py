@@ -0,0 +1,287 @@
+import bisect
+import math
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# レイテンシ用のデフォルトのバケット（秒）
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+# シリアライズなどの短い処理用のバケット（秒）
+FAST_BUCKETS = (0.000001, 0.0000025, 0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    """Prometheusのラベル値をエスケープ"""
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    """{name="value",...} 形式のラベルを作成"""
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """ラベルごとの子メトリクスを持つメトリクスの基底クラス
+
+    子メトリクスはラベル値の組み合わせごとに最初の1回だけ作成し、以後の記録では
+    オブジェクトを作成しない。ラベルがない場合は自分自身に記録する。
+    """
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[LabelValues, "_Metric"] = {}
+
+    def labels(self, *values: str) -> "_Metric":
+        """ラベル値に対応する子メトリクスを取得"""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} のラベルは {self.labelnames} です")
+            child = self._new_child()
+            self._children[values] = child
+        return child
+
+    def remove(self, *values: str):
+        """ラベル値に対応する子メトリクスを削除"""
+        self._children.pop(values, None)
+
+    def _new_child(self) -> "_Metric":
+        return type(self)(self.name, self.documentation)
+
+    def _series(self) -> Iterable[Tuple[LabelValues, "_Metric"]]:
+        if self.labelnames:
+            return list(self._children.items())
+        return [((), self)]
+
+    def render(self) -> List[str]:
+        """Prometheusのテキスト形式で出力"""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        for labels, child in self._series():
+            lines.extend(child._samples_with(self.labelnames, labels))
+        return lines
+
+    def _samples_with(self, labelnames: Sequence[str], labels: LabelValues) -> Iterable[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """単調増加するカウンター"""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.value = 0
+
+    def inc(self, amount: int = 1):
+        self.value += amount
+
+    def _samples_with(self, labelnames: Sequence[str], labels: LabelValues) -> Iterable[str]:
+        yield f"{self.name}{_format_labels(labelnames, labels)} {_format_value(self.value)}"
+
+
+class Gauge(_Metric):
+    """増減する値"""
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.value = 0
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+    def dec(self, amount: float = 1):
+        self.value -= amount
+
+    def _samples_with(self, labelnames: Sequence[str], labels: LabelValues) -> Iterable[str]:
+        yield f"{self.name}{_format_labels(labelnames, labels)} {_format_value(self.value)}"
+
+
+class Histogram(_Metric):
+    """固定バケットのヒストグラム
+
+    バケットごとのカウントは作成時に確保したリストに加算し、記録時にオブジェクトを作成しない。
+    累積値への変換は出力時に行う。
+    """
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # 最後の要素は +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def _new_child(self) -> "Histogram":
+        return Histogram(self.name, self.documentation, buckets=self.buckets)
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def _samples_with(self, labelnames: Sequence[str], labels: LabelValues) -> Iterable[str]:
+        cumulative = 0
+        for bound, count in zip(self.buckets + (math.inf,), self.counts):
+            cumulative += count
+            le = 'le="' + _format_value(bound) + '"'
+            yield f"{self.name}_bucket{_format_labels(labelnames, labels, le)} {cumulative}"
+        yield f"{self.name}_sum{_format_labels(labelnames, labels)} {_format_value(self.sum)}"
+        yield f"{self.name}_count{_format_labels(labelnames, labels)} {self.count}"
+
+
+class GaugeCallback(_Metric):
+    """出力時に関数を呼び出して値を取得するゲージ（クライアントごとのキュー長など）"""
+
+    type_name = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str],
+        collect: Callable[[], Iterable[Tuple[LabelValues, float]]],
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.collect = collect
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        for labels, value in self.collect():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class MetricsRegistry:
+    """メトリクスを登録し、Prometheusのテキスト形式でまとめて出力するクラス"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        """メトリクスを登録（同じ名前のメトリクスは置き換える）"""
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge_callback(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str],
+        collect: Callable[[], Iterable[Tuple[LabelValues, float]]],
+    ) -> GaugeCallback:
+        return self.register(GaugeCallback(name, documentation, labelnames, collect))
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """すべてのメトリクスをPrometheusのテキスト形式で出力"""
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# グローバルメトリクスレジストリ
+registry = MetricsRegistry()
+
+# 受信
+positions_received = registry.counter(
+    "robot_positions_received_total", "robot-trackerから受信した位置の数", ("robot_id",)
+)
+grpc_read_seconds = registry.histogram(
+    "robot_grpc_read_seconds", "TrackRobotストリームの1メッセージの読み取り待ち時間"
+)
+grpc_reconnects = registry.counter(
+    "robot_grpc_reconnects_total", "TrackRobotストリームの再接続回数", ("robot_id",)
+)
+grpc_failovers = registry.counter(
+    "robot_grpc_failovers_total", "TrackRobotストリームの接続先を切り替えた回数", ("robot_id",)
+)
+stream_gaps = registry.counter(
+    "robot_stream_gap_positions_total", "再接続後も再送されず欠落した位置の数", ("robot_id",)
+)
+stream_resyncs = registry.counter(
+    "robot_stream_resyncs_total", "トラッカーの再起動でシーケンス番号が戻った回数", ("robot_id",)
+)
+
+# 配信
+broadcast_seconds = registry.histogram(
+    "robot_broadcast_seconds", "1件の位置更新を購読クライアントの送信キューに積むまでの時間", buckets=FAST_BUCKETS
+)
+# トラッカーのタイムスタンプの精度は1/TIMESTAMP_UNITS_PER_SECOND秒（robot-trackerはUnix秒を送信するため1秒）で、
+# 観測値には精度分の誤差が含まれる。1秒未満のバケットは TIMESTAMP_UNITS_PER_SECOND を大きくした場合のみ意味を持つため、
+# バックエンド内の遅延は robot_server_latency_seconds で確認する
+end_to_end_seconds = registry.histogram(
+    "robot_end_to_end_latency_seconds",
+    "トラッカーのタイムスタンプからWebSocketで送信するまでの時間（タイムスタンプの精度以下の値は意味を持たない）",
+)
+server_latency_seconds = registry.histogram(
+    "robot_server_latency_seconds", "バックエンドで位置を受信してからWebSocketで送信するまでの時間"
+)
+ws_dropped_frames = registry.counter(
+    "robot_ws_dropped_frames_total", "送信キューが溢れて破棄したフレームの数"
+)
+ws_slow_disconnects = registry.counter(
+    "robot_ws_slow_disconnects_total", "送信キューが溢れて切断したクライアントの数"
+)
+ws_evictions = registry.counter(
+    "robot_ws_evictions_total", "送信の失敗・停滞やハートビートの応答がないため切断したクライアントの数", ("reason",)
+)
+ws_rejected_connections = registry.counter(
+    "robot_ws_rejected_connections_total", "接続数の上限により受け付けなかった接続の数", ("reason",)
+)
+serialization_seconds = registry.histogram(
+    "robot_serialization_seconds", "フレームのエンコード時間", ("format",), buckets=FAST_BUCKETS
+)
+geofence_suppressed_transitions = registry.counter(
+    "robot_geofence_suppressed_transitions_total", "保持するロボット数の上限により通知しなかったジオフェンスの enter の数"
+)
+
+# 永続化
+trajectory_dropped = registry.counter(
+    "robot_trajectory_dropped_positions_total", "軌跡ストアの書き込みキューが溢れて書き込まなかった位置の数"
+)
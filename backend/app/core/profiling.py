@@ -0,0 +1,88 @@
+import asyncio
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from typing import List
+
+
+class ProfilerBusyError(Exception):
+    """既に別のプロファイルを取得中"""
+
+
+class EventLoopProfiler:
+    """実行中のイベントループのプロファイルを指定した秒数だけ取得するクラス
+
+    - cprofile: cProfile でイベントループのスレッドの関数ごとの呼び出し回数と時間を計測する
+      （計測中はすべての関数呼び出しにオーバーヘッドがかかる）
+    - sampling: 別スレッドから一定間隔でイベントループのスレッドのスタックを記録する
+      （オーバーヘッドが小さく、結果は flamegraph.pl などで使える collapsed 形式）
+    同時に取得できるプロファイルは1つだけ。
+    """
+
+    def __init__(self):
+        self._busy = False
+
+    @property
+    def busy(self) -> bool:
+        return self._busy
+
+    def _acquire(self):
+        if self._busy:
+            raise ProfilerBusyError("既にプロファイルを取得中です")
+        self._busy = True
+
+    async def cprofile(self, seconds: float, sort: str = "cumulative", limit: int = 50) -> str:
+        """cProfile の結果を pstats のテキスト形式で返す"""
+        if sort not in pstats.Stats.sort_arg_dict_default:
+            raise ValueError(f"不正な並べ替えキー: {sort}")
+        self._acquire()
+        try:
+            profile = cProfile.Profile()
+            profile.enable()
+            try:
+                await asyncio.sleep(seconds)
+            finally:
+                profile.disable()
+            output = io.StringIO()
+            stats = pstats.Stats(profile, stream=output)
+            stats.sort_stats(sort).print_stats(limit)
+            return output.getvalue()
+        finally:
+            self._busy = False
+
+    async def sample(self, seconds: float, interval: float = 0.005) -> str:
+        """スタックのサンプリング結果を collapsed 形式（1行1スタック、末尾にサンプル数）で返す"""
+        self._acquire()
+        try:
+            thread_id = threading.get_ident()
+            stacks = await asyncio.to_thread(self._sample_thread, thread_id, seconds, interval)
+            lines = [f"{stack} {count}" for stack, count in stacks.most_common()]
+            return "\n".join(lines) + "\n"
+        finally:
+            self._busy = False
+
+    @staticmethod
+    def _sample_thread(thread_id: int, seconds: float, interval: float) -> Counter:
+        """指定したスレッドのスタックを interval 秒ごとに記録"""
+        stacks: Counter = Counter()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            frame = sys._current_frames().get(thread_id)
+            if frame is not None:
+                names: List[str] = []
+                while frame is not None:
+                    code = frame.f_code
+                    names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                stacks[";".join(reversed(names))] += 1
+            time.sleep(interval)
+        return stacks
+
+
+# グローバルプロファイラーインスタンス
+profiler = EventLoopProfiler()
@@ -0,0 +1,49 @@
+import json
+import logging
+from typing import Any, Callable
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 高速JSONエンコーダーはオプション依存（インストールされていない場合は標準ライブラリを使用）
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover
+    msgspec = None
+
+
+def _stdlib_dumps(obj: Any) -> str:
+    """標準ライブラリのjsonでエンコード"""
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def _create_dumps(backend: str) -> Callable[[Any], str]:
+    """設定されたバックエンドに対応するエンコード関数を作成"""
+    if backend in ("auto", "orjson") and orjson is not None:
+        orjson_dumps = orjson.dumps
+        return lambda obj: orjson_dumps(obj).decode()
+
+    if backend in ("auto", "msgspec") and msgspec is not None:
+        encoder = msgspec.json.Encoder()
+        return lambda obj: encoder.encode(obj).decode()
+
+    if backend not in ("auto", "json"):
+        logger.warning(f"JSONバックエンド {backend} が利用できないため、標準ライブラリのjsonを使用します")
+    return _stdlib_dumps
+
+
+# JSON文字列へのエンコード関数
+dumps = _create_dumps(settings.JSON_BACKEND)
+
+
+def encode_event(event: str, data: Any = None) -> str:
+    """WebSocketイベントをJSONテキストフレームにエンコード"""
+    if hasattr(data, "model_dump"):
+        data = data.model_dump()
+    return dumps({"event": event, "data": data})
@@ -0,0 +1,99 @@
+from typing import Dict, List
+
+import numpy as np
+
+from app.schemas.frames import PositionArrays, decode_varint
+
+# PositionBatch のフィールド番号
+_FIELD_ROBOT_ID = 1
+_FIELD_FIRST_SEQUENCE = 2
+_FIELD_X = 3
+_FIELD_Y = 4
+_FIELD_TIMESTAMP = 5
+
+# ワイヤータイプ
+_WIRE_VARINT = 0
+_WIRE_FIXED64 = 1
+_WIRE_LENGTH_DELIMITED = 2
+_WIRE_FIXED32 = 5
+
+# packed の配列フィールドの要素の型（リトルエンディアンの固定長）
+_ARRAY_DTYPES = {
+    _FIELD_X: np.dtype("<f4"),
+    _FIELD_Y: np.dtype("<f4"),
+    _FIELD_TIMESTAMP: np.dtype("<i8"),
+}
+
+
+def _skip(data: bytes, offset: int, wire_type: int) -> int:
+    """未知のフィールドを読み飛ばす"""
+    if wire_type == _WIRE_VARINT:
+        return decode_varint(data, offset)[1]
+    if wire_type == _WIRE_FIXED64:
+        return offset + 8
+    if wire_type == _WIRE_FIXED32:
+        return offset + 4
+    if wire_type == _WIRE_LENGTH_DELIMITED:
+        length, offset = decode_varint(data, offset)
+        return offset + length
+    raise ValueError(f"未対応のワイヤータイプです: {wire_type}")
+
+
+def _from_message(data: bytes) -> PositionArrays:
+    """protobufのメッセージとしてデコード（packed でない配列を含む場合）"""
+    from app.protos.robot import robot_pb2
+
+    message = robot_pb2.PositionBatch.FromString(data)
+    return PositionArrays(
+        message.robot_id,
+        message.first_sequence,
+        np.array(message.x, dtype=np.float32),
+        np.array(message.y, dtype=np.float32),
+        np.array(message.timestamp, dtype=np.int64),
+    )
+
+
+def decode_position_batch(data: bytes) -> PositionArrays:
+    """シリアライズされた PositionBatch メッセージを配列にデコード（gRPCのデシリアライザーとして使用）
+
+    packed の配列フィールドは np.frombuffer でバイト列をそのまま参照し、要素ごとに
+    デコードしない。送信側は常に packed でエンコードするが、packed でない配列を含む
+    場合はprotobufのメッセージとしてデコードする。
+    """
+    robot_id = ""
+    first_sequence = 0
+    chunks: Dict[int, List[np.ndarray]] = {_FIELD_X: [], _FIELD_Y: [], _FIELD_TIMESTAMP: []}
+    offset = 0
+    end = len(data)
+    while offset < end:
+        key, offset = decode_varint(data, offset)
+        field, wire_type = key >> 3, key & 0x07
+        if field in _ARRAY_DTYPES:
+            if wire_type != _WIRE_LENGTH_DELIMITED:
+                return _from_message(data)
+            length, offset = decode_varint(data, offset)
+            dtype = _ARRAY_DTYPES[field]
+            chunks[field].append(np.frombuffer(data, dtype, length // dtype.itemsize, offset))
+            offset += length
+        elif field == _FIELD_ROBOT_ID and wire_type == _WIRE_LENGTH_DELIMITED:
+            length, offset = decode_varint(data, offset)
+            robot_id = data[offset:offset + length].decode()
+            offset += length
+        elif field == _FIELD_FIRST_SEQUENCE and wire_type == _WIRE_VARINT:
+            first_sequence, offset = decode_varint(data, offset)
+        else:
+            offset = _skip(data, offset, wire_type)
+
+    arrays: List[np.ndarray] = []
+    for field, dtype in _ARRAY_DTYPES.items():
+        parts = chunks[field]
+        if not parts:
+            arrays.append(np.empty(0, dtype))
+        elif len(parts) == 1:
+            arrays.append(parts[0])
+        else:
+            arrays.append(np.concatenate(parts))
+    x, y, timestamp = arrays
+    if not len(x) == len(y) == len(timestamp):
+        raise ValueError("PositionBatch の配列の要素数が一致しません")
+    return PositionArrays(robot_id, first_sequence, x, y, timestamp)
@@ -1,9 +1,23 @@
 import asyncio
 import logging
-from typing import Optional, Callable, Any
+import random
+import time
+import zlib
+from typing import Dict, List, Optional, Any
 import grpc.aio  # gRPCの非同期IOバージョンを使用
 from app.config import settings
-from app.schemas.robot import RobotPosition
+from app.core.metrics import (
+    grpc_failovers,
+    grpc_read_seconds,
+    grpc_reconnects,
+    registry,
+    positions_received,
+    stream_gaps,
+    stream_resyncs,
+)
+from app.grpc_client.batch import decode_position_batch
+from app.schemas.frames import PositionArrays, PositionFrame
+from app.sources.base import PositionSource
 
 # これらのインポートはprotoをコンパイル後に有効になります
 from app.protos.robot import robot_pb2
@@ -12,218 +26,491 @@ from app.protos.robot import robot_pb2_grpc
 
 logger = logging.getLogger(__name__)
 
+# 接続できていないとみなすチャネル状態
+_UNHEALTHY_STATES = (grpc.ChannelConnectivity.TRANSIENT_FAILURE, grpc.ChannelConnectivity.SHUTDOWN)
 
-class RobotTrackerClient:
-    """ロボット位置追跡用gRPCクライアント - 非ブロッキング実装"""
-    
-    def __init__(self):
-        self.host = settings.ROBOT_TRACKER_HOST
-        self.port = settings.ROBOT_TRACKER_PORT
+
+class TrackerEndpoint:
+    """robot-trackerの接続先1つ分のチャネルと接続状態
+
+    チャネルの状態は wait_for_state_change で変化を待って更新し、ポーリングはしない。
+    接続が切れた場合も try_to_connect で再接続させ続けるため、待機中の接続先の状態も常に分かる。
+    """
+
+    def __init__(self, target: str):
+        self.target = target
         self.channel: Optional[grpc.aio.Channel] = None
         self.stub: Optional[robot_pb2_grpc.RobotTrackerStub] = None
-        self.position_callback: Optional[Callable[[RobotPosition], Any]] = None
+        # TrackRobotBatch はメッセージを配列のままデコードするため、生成されたスタブを使わずに呼び出す
+        self.track_batch: Optional[grpc.aio.UnaryStreamMultiCallable] = None
+        self.state: Optional[grpc.ChannelConnectivity] = None
+        self.ready = asyncio.Event()  # READY の間だけセット
+        self._watch_task: Optional[asyncio.Task] = None
+
+    @property
+    def healthy(self) -> bool:
+        """接続できている、または接続を試みている途中か"""
+        return self.state not in _UNHEALTHY_STATES
+
+    def open(self, options: List[tuple]):
+        """チャネルを作成し、状態の監視を開始"""
+        self.channel = grpc.aio.insecure_channel(self.target, options=options)
+        self.stub = robot_pb2_grpc.RobotTrackerStub(self.channel)
+        self.track_batch = self.channel.unary_stream(
+            "/robot.RobotTracker/TrackRobotBatch",
+            request_serializer=robot_pb2.TrackBatchRequest.SerializeToString,
+            response_deserializer=decode_position_batch,
+        )
+        self._watch_task = asyncio.create_task(self._watch(self.channel))
+
+    async def close(self):
+        """状態の監視を停止してチャネルを閉じる"""
+        if self._watch_task:
+            self._watch_task.cancel()
+            try:
+                await self._watch_task
+            except asyncio.CancelledError:
+                pass
+            self._watch_task = None
+        if self.channel:
+            await self.channel.close()
+            self.channel = None
+            self.stub = None
+        self.state = None
+        self.ready.clear()
+
+    async def _watch(self, channel: grpc.aio.Channel):
+        """チャネルの状態の変化を待って記録する"""
+        state = channel.get_state(try_to_connect=True)
+        while True:
+            self._set_state(state)
+            await channel.wait_for_state_change(state)
+            state = channel.get_state(try_to_connect=True)
+
+    def _set_state(self, state: grpc.ChannelConnectivity):
+        previous = self.state
+        self.state = state
+        if state == grpc.ChannelConnectivity.READY:
+            self.ready.set()
+        else:
+            self.ready.clear()
+        if state in _UNHEALTHY_STATES and previous not in _UNHEALTHY_STATES:
+            logger.warning("robot-trackerに接続できません: %s (%s)", self.target, state.name)
+        elif state == grpc.ChannelConnectivity.READY:
+            logger.info("robot-trackerに接続しました: %s", self.target)
+        else:
+            logger.debug("チャネルの状態が変化: %s %s", self.target, state.name)
+
+
+class _SequenceGap(Exception):
+    """ストリームの途中で位置が欠落した（再送を要求するためにストリームを開き直す）"""
+
+
+class RobotTrackerClient(PositionSource):
+    """ロボット位置追跡用gRPCクライアント - 非ブロッキング実装
+
+    ROBOT_TRACKER_ENDPOINTS に複数の接続先を指定した場合、接続先ごとにチャネルを持ち、
+    ストリームが切れた時は接続状態を見て正常な接続先にすぐ切り替える。
+    """
+    
+    name = "grpc"
+    
+    def __init__(self):
+        super().__init__()
+        self.targets: List[str] = list(settings.ROBOT_TRACKER_ENDPOINTS) or [
+            f"{settings.ROBOT_TRACKER_HOST}:{settings.ROBOT_TRACKER_PORT}"
+        ]
+        self.lb_policy = settings.ROBOT_TRACKER_LB_POLICY
+        self.endpoints: List[TrackerEndpoint] = []
+        self.robot_ids: List[str] = list(settings.ROBOT_IDS)
         self._running = False
-        self._task: Optional[asyncio.Task] = None
-        self._monitor_task: Optional[asyncio.Task] = None
-        self._reconnect_delay = 1  # 初期再接続遅延（秒）
-        self._max_reconnect_delay = 30  # 最大再接続遅延（秒）
+        self._tasks: Dict[str, asyncio.Task] = {}  # ロボットID→追跡タスク
+        self._robot_endpoints: Dict[str, str] = {}  # ロボットID→ストリームを開いている接続先
+        self._reconnect_delay = settings.GRPC_RECONNECT_INITIAL_DELAY_S  # 初期再接続遅延（秒）
+        self._max_reconnect_delay = settings.GRPC_RECONNECT_MAX_DELAY_S  # 最大再接続遅延（秒）
+        # ロボットID→受信済みの最後のシーケンス番号（再接続時に続きから受信するために使用）
+        self._last_sequence: Dict[str, int] = {}
+        # TrackRobotBatch で位置をまとめて受信するか（トラッカーが未対応の場合は TrackRobot に戻す）
+        self.batch_enabled = settings.GRPC_BATCH_ENABLED
     
-    async def connect(self):
-        """非ブロッキングでgRPCサーバーに接続"""
-        if self.channel is not None:
-            return
-            
-        target = f"{self.host}:{self.port}"
-        logger.info(f"Robot Tracker gRPCサービスに接続: {target}")
-        
-        # 接続オプションを追加
-        options = [
+    @staticmethod
+    def _channel_options() -> List[tuple]:
+        """チャネルのオプション（keepaliveで切断を素早く検知し、gRPC自身の再接続も短い間隔で行う）"""
+        return [
             ('grpc.enable_http_proxy', 0),
-            ('grpc.keepalive_time_ms', 10000),
-            ('grpc.keepalive_timeout_ms', 5000),
-            ('grpc.http2.min_time_between_pings_ms', 10000),
+            ('grpc.keepalive_time_ms', settings.GRPC_KEEPALIVE_TIME_MS),
+            ('grpc.keepalive_timeout_ms', settings.GRPC_KEEPALIVE_TIMEOUT_MS),
+            ('grpc.keepalive_permit_without_calls', 1),  # 待機中の接続先の切断も検知する
+            ('grpc.http2.min_time_between_pings_ms', settings.GRPC_KEEPALIVE_TIME_MS),
             ('grpc.http2.max_pings_without_data', 0),
+            ('grpc.initial_reconnect_backoff_ms', int(settings.GRPC_RECONNECT_INITIAL_DELAY_S * 1000)),
+            ('grpc.min_reconnect_backoff_ms', int(settings.GRPC_RECONNECT_INITIAL_DELAY_S * 1000)),
+            ('grpc.max_reconnect_backoff_ms', int(settings.GRPC_RECONNECT_MAX_DELAY_S * 1000)),
             ('grpc.max_receive_message_length', 10 * 1024 * 1024),  # 10MB
             ('grpc.max_send_message_length', 10 * 1024 * 1024),     # 10MB
         ]
+    
+    async def connect(self):
+        """非ブロッキングでgRPCサーバーに接続（いずれかの接続先が準備完了になるまで待機）"""
+        if self.endpoints:
+            return
+            
+        logger.info(f"Robot Tracker gRPCサービスに接続: {', '.join(self.targets)} ({self.lb_policy})")
+        options = self._channel_options()
+        for target in self.targets:
+            endpoint = TrackerEndpoint(target)
+            endpoint.open(options)
+            self.endpoints.append(endpoint)
         
-        # 非同期チャネルとオプションを使用
-        self.channel = grpc.aio.insecure_channel(target, options=options)
-        self.stub = robot_pb2_grpc.RobotTrackerStub(self.channel)
-        
-        # チャネル接続状態を確認
-        state = self.channel.get_state()
-        logger.info(f"初期チャネル状態: {state}")
-        
-        # チャネルが準備完了になるまで待機、またはタイムアウト
-        try:
-            await asyncio.wait_for(
-                self.channel.channel_ready(), 
-                timeout=5.0  # 5秒タイムアウト
-            )
+        if await self._wait_for_any_ready(settings.GRPC_CONNECT_TIMEOUT_S):
             logger.info("チャネルが準備完了")
-        except asyncio.TimeoutError:
+        else:
             logger.error("チャネル準備完了の待機中にタイムアウト")
     
-    def set_position_callback(self, callback: Callable[[RobotPosition], Any]):
-        """位置更新のコールバック関数を設定"""
-        self.position_callback = callback
+    async def _wait_for_any_ready(self, timeout: float) -> bool:
+        """いずれかの接続先が READY になるまで待機（タイムアウトした場合は False）"""
+        if any(endpoint.ready.is_set() for endpoint in self.endpoints):
+            return True
+        waiters = [asyncio.ensure_future(endpoint.ready.wait()) for endpoint in self.endpoints]
+        try:
+            done, _ = await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            return bool(done)
+        finally:
+            for waiter in waiters:
+                waiter.cancel()
+    
+    def _select_endpoint(self, robot_id: str, failed: Optional[TrackerEndpoint] = None) -> TrackerEndpoint:
+        """ロボットのストリームを開く接続先を選択
+
+        failover は先頭の接続先を、round_robin はロボットIDのハッシュで決めた接続先を優先し、
+        READY の接続先 → 接続を試みている接続先の順に選ぶ。直前に失敗した接続先は他に候補がない場合のみ選ぶ。
+        """
+        count = len(self.endpoints)
+        start = 0 if self.lb_policy == "failover" else zlib.crc32(robot_id.encode()) % count
+        ordered = [self.endpoints[(start + i) % count] for i in range(count)]
+        for candidates in (
+            [e for e in ordered if e.state == grpc.ChannelConnectivity.READY and e is not failed],
+            [e for e in ordered if e.healthy and e is not failed],
+            [e for e in ordered if e.healthy],
+        ):
+            if candidates:
+                return candidates[0]
+        return ordered[0]
+    
+    async def _wait_before_retry(self, failed: Optional[TrackerEndpoint], delays: Dict[str, float]):
+        """再接続までの待機
+
+        接続先ごとの上限付き指数バックオフ（delays: 接続先→再接続遅延）にばらつきを加えた時間は常に待機し、
+        多数のストリームが同時に再接続しないようにする。
+        - 他に正常な接続先がある場合は、その接続先の再接続遅延まで待機時間を短くする
+        - すべての接続先に接続できない場合は、いずれかが READY になった時点でばらつき分だけ待機して終える
+        """
+        initial = self._reconnect_delay
+        delay = delays.get(failed.target, initial) if failed is not None else initial
+        alternates = [delays.get(e.target, initial) for e in self.endpoints if e.healthy and e is not failed]
+        if alternates:
+            delay = min(delay, *alternates)
+        wait = self._backoff(delay)
+        if not alternates and not (failed is not None and failed.healthy):
+            jitter = min(wait, self._backoff(initial))
+            await self._wait_for_any_ready(wait - jitter)
+            wait = jitter
+        await asyncio.sleep(wait)
+    
+    def endpoint_status(self) -> List[Dict[str, Any]]:
+        """接続先ごとの接続状態とストリームを開いているロボット"""
+        return [
+            {
+                "target": endpoint.target,
+                "state": endpoint.state.name if endpoint.state is not None else None,
+                "robots": sorted(r for r, target in self._robot_endpoints.items() if target == endpoint.target),
+            }
+            for endpoint in self.endpoints
+        ]
+    
+    def endpoint_health(self) -> List[tuple]:
+        """接続先ごとの接続状態（メトリクス用、READY の場合は1）"""
+        return [
+            ((endpoint.target,), 1 if endpoint.state == grpc.ChannelConnectivity.READY else 0)
+            for endpoint in self.endpoints
+        ]
+    
+    def _backoff(self, delay: float) -> float:
+        """再接続までの待機時間（複数のストリームが同時に再接続しないようにばらつきを加える）"""
+        return random.uniform(delay / 2, delay)
+    
+    async def _check_sequence(self, robot_id: str, sequence: int, first: bool) -> bool:
+        """受信した位置のシーケンス番号を確認し、配信する場合は True を返す
+
+        - シーケンス番号が0の位置（旧バージョンのトラッカー）は確認せずに配信する
+        - 再接続直後の最初の位置が受信済みの番号以下の場合はトラッカーが再起動したとみなし、resync を通知する
+        - それ以外で受信済みの番号以下の場合は重複として破棄する
+        - ストリームの途中で番号が飛んだ場合（トラッカーが送信しきれずに破棄した場合など）は
+          _SequenceGap を送出し、受信済みの番号の続きからストリームを開き直して再送してもらう
+        - 開き直した直後にも番号が飛んでいる場合は、再送されなかった範囲を gap として通知する
+        """
+        if sequence == 0:
+            return True
+        last = self._last_sequence.get(robot_id, 0)
+        if sequence <= last:
+            if not first:
+                return False
+            stream_resyncs.labels(robot_id).inc()
+            logger.warning("トラッカーのシーケンス番号が戻りました。再同期します: %s", robot_id)
+            await self._notify_event(robot_id, "resync", {"robot_id": robot_id, "sequence": sequence})
+        elif last and sequence > last + 1:
+            if not first:
+                raise _SequenceGap()
+            missed = sequence - last - 1
+            stream_gaps.labels(robot_id).inc(missed)
+            logger.warning("位置が %s 件欠落しました: %s", missed, robot_id)
+            await self._notify_event(
+                robot_id,
+                "gap",
+                {"robot_id": robot_id, "from": last + 1, "to": sequence - 1, "missed": missed},
+            )
+        self._last_sequence[robot_id] = sequence
+        return True
+    
+    async def _deliver_batch(self, robot_id: str, batch: PositionArrays, first: bool):
+        """まとめて受信した位置のシーケンス番号を確認して配信
+
+        バッチ内の位置は連続した番号のため、確認はバッチの先頭に対して1回だけ行い、
+        受信済みの位置を含む場合はその分を除いて配信する。位置フレームには展開せず、
+        配列のまま1件として位置バスに発行する。
+        """
+        if not len(batch):
+            return
+        if not batch.robot_id:
+            batch.robot_id = robot_id
+        start = 0
+        if batch.first_sequence:
+            last = self._last_sequence.get(robot_id, 0)
+            if not first and batch.first_sequence <= last:
+                start = last - batch.first_sequence + 1
+                if start >= len(batch):
+                    return
+            else:
+                await self._check_sequence(robot_id, batch.first_sequence, first)
+            self._last_sequence[robot_id] = batch.last_sequence
+        await self._deliver(robot_id, batch.tail(start))
+    
+    def _fall_back_from_batch(self, error: Exception) -> bool:
+        """トラッカーが TrackRobotBatch に対応していない（旧バージョン）場合は TrackRobot に切り替える"""
+        if not (
+            self.batch_enabled
+            and isinstance(error, grpc.aio.AioRpcError)
+            and error.code() == grpc.StatusCode.UNIMPLEMENTED
+        ):
+            return False
+        logger.warning("トラッカーが TrackRobotBatch に対応していないため TrackRobot で受信します")
+        self.batch_enabled = False
+        return True
+    
+    def _open_stream(self, endpoint: TrackerEndpoint, robot_id: str):
+        """位置ストリームを開く（受信済みの最後の位置の続きから送信してもらう）"""
+        resume_after = self._last_sequence.get(robot_id, 0)
+        if self.batch_enabled:
+            logger.info("TrackRobotBatch gRPCメソッドを呼び出し開始。ターゲット: %s, ロボット: %s", endpoint.target, robot_id)
+            return endpoint.track_batch(robot_pb2.TrackBatchRequest(
+                robot_id=robot_id,
+                resume_after=resume_after,
+                window_ms=settings.GRPC_BATCH_WINDOW_MS,
+                max_positions=settings.GRPC_BATCH_MAX_POSITIONS,
+            ))
+        logger.info("TrackRobot gRPCメソッドを呼び出し開始。ターゲット: %s, ロボット: %s", endpoint.target, robot_id)
+        # トラッカーが保持している範囲で再送される
+        return endpoint.stub.TrackRobot(robot_pb2.TrackRequest(robot_id=robot_id, resume_after=resume_after))
     
     async def start_tracking(self):
         """ロボット位置の追跡を開始"""
         if self._running:
             return
             
-        if self.stub is None:
+        if not self.endpoints:
             await self.connect()
             
         self._running = True
-        # 追跡タスクを作成（待機しない）
-        self._task = asyncio.create_task(self._track_robot())
-        # チャネル監視タスクを追加
-        self._monitor_task = asyncio.create_task(self.monitor_channel_state())
-        logger.info("位置追跡タスクが開始されました")
-    
-    async def monitor_channel_state(self):
-        """gRPCチャネルの状態を監視"""
-        while self._running and self.channel:
-            state = self.channel.get_state()
-            logger.info(f"gRPCチャネルの現在の状態: {state}")
-            
-            # READY状態への遷移を試みる
-            changed = await self.channel.channel_ready()
-            if changed:
-                logger.info(f"チャネル状態が変更されました。新しい状態: {self.channel.get_state()}")
-            
-            await asyncio.sleep(2)
+        # ロボットごとに追跡タスクを作成（待機しない）
+        for robot_id in self.robot_ids:
+            self._start_robot_task(robot_id)
+        logger.info(f"位置追跡タスクが開始されました: {self.robot_ids}")
+    
+    def _start_robot_task(self, robot_id: str):
+        """指定したロボットの追跡タスクを作成"""
+        if robot_id not in self._tasks:
+            self._tasks[robot_id] = asyncio.create_task(self._track_robot(robot_id))
+    
+    async def add_robot(self, robot_id: str):
+        """追跡するロボットを追加"""
+        if robot_id not in self.robot_ids:
+            self.robot_ids.append(robot_id)
+        if self._running:
+            self._start_robot_task(robot_id)
+    
+    async def remove_robot(self, robot_id: str):
+        """ロボットの追跡を停止"""
+        if robot_id in self.robot_ids:
+            self.robot_ids.remove(robot_id)
+        self._last_sequence.pop(robot_id, None)
+        self._robot_endpoints.pop(robot_id, None)
+        task = self._tasks.pop(robot_id, None)
+        if task:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
     
     async def stop_tracking(self):
         """ロボット位置の追跡を停止"""
         self._running = False
-        if self._task:
-            self._task.cancel()
+        tasks = list(self._tasks.values())
+        self._tasks = {}
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
             try:
-                await self._task
+                await task
             except asyncio.CancelledError:
                 pass
-            self._task = None
+        self._robot_endpoints.clear()
         
-        if self._monitor_task:
-            self._monitor_task.cancel()
-            try:
-                await self._monitor_task
-            except asyncio.CancelledError:
-                pass
-            self._monitor_task = None
-            
-        if self.channel:
-            await self.channel.close()  # 非同期でチャネルを閉じる
-            self.channel = None
-            self.stub = None
+        for endpoint in self.endpoints:
+            await endpoint.close()  # 非同期でチャネルを閉じる
+        self.endpoints = []
         logger.info("位置追跡タスクが停止しました")
     
-    async def _track_robot(self):
+    async def _track_robot(self, robot_id: str):
         """ロボット位置ストリームを処理 - 非ブロッキング実装"""
-        reconnect_delay = self._reconnect_delay
-        logger.info("ロボット位置ストリームの追跡を開始")
+        reconnect_delays: Dict[str, float] = {}  # 接続先→再接続遅延（受信に成功した接続先は初期値に戻す）
+        logger.info("ロボット位置ストリームの追跡を開始: %s", robot_id)
+        endpoint: Optional[TrackerEndpoint] = None
+        resume = False  # 欠落した位置の再送を受けるため、同じ接続先でストリームを開き直すか
+        received = positions_received.labels(robot_id)
+        reconnects = grpc_reconnects.labels(robot_id)
+        failovers = grpc_failovers.labels(robot_id)
         
         while self._running:
             try:
-                if self.stub is None:
-                    logger.info("Stubが存在しません。接続を試みます...")
+                if not self.endpoints:
+                    logger.info("チャネルが存在しません。接続を試みます...")
                     await self.connect()
+                if not resume:
+                    previous = endpoint
+                    endpoint = self._select_endpoint(robot_id, failed=previous)
+                    if previous is not None and endpoint is not previous:
+                        failovers.inc()
+                        logger.warning(
+                            "接続先を切り替えます: %s -> %s", previous.target, endpoint.target, extra={"robot_id": robot_id}
+                        )
+                    self._robot_endpoints[robot_id] = endpoint.target
+                resume = False
                     
-                logger.info(f"TrackRobot gRPCメソッドを呼び出し開始。ターゲット: {self.host}:{self.port}")
-                request = robot_pb2.TrackRequest()
-                
-                logger.debug("TrackRobotリクエストを送信中...")
                 # ストリームを取得（非同期イテレータ構文は使用しない）
-                stream_call = self.stub.TrackRobot(request)
+                stream_call = self._open_stream(endpoint, robot_id)
+                first = True
                 
-                while self._running:
-                    try:
-                        # より基本的なread()メソッドを使用して次のメッセージを取得
-                        response = await asyncio.wait_for(
-                            stream_call.read(), 
-                            timeout=10.0
-                        )
+                try:
+                    while self._running:
+                        try:
+                            # より基本的なread()メソッドを使用して次のメッセージを取得
+                            read_start = time.perf_counter()
+                            response = await asyncio.wait_for(
+                                stream_call.read(), 
+                                timeout=settings.GRPC_STREAM_IDLE_TIMEOUT_S
+                            )
+                            grpc_read_seconds.observe(time.perf_counter() - read_start)
                         
-                        # responseがNoneの場合、ストリームが終了したことを示す
-                        if response is None:
-                            logger.info("位置データストリームが終了しました")
-                            break
+                            # responseがEOF（またはNone）の場合、ストリームが終了したことを示す
+                            if response is None or response is grpc.aio.EOF:
+                                logger.info("位置データストリームが終了しました: %s", robot_id)
+                                break
+                        
+                            if isinstance(response, PositionArrays):
+                                # まとめて受信した位置は配列のまま確認し、そのまま位置バスに発行する
+                                received.inc(len(response))
+                                reconnect_delays.pop(endpoint.target, None)
+                                await self._deliver_batch(robot_id, response, first)
+                                first = False
+                                continue
                             
-                        logger.info(f"位置データを受信: x={response.x}, y={response.y}, ts={response.timestamp}")
+                            # 受信ごとのログは出力せず、メトリクスのカウンターで件数を記録
+                            received.inc()
+                            # 受信に成功したら再接続遅延を初期値に戻す
+                            reconnect_delays.pop(endpoint.target, None)
                         
-                        # gRPCレスポンスをPydanticモデルに変換
-                        position = RobotPosition(
-                            x=response.x,
-                            y=response.y,
-                            timestamp=response.timestamp
-                        )
+                            # 旧バージョンのトラッカーはロボットIDを返さないため、要求したIDを補う
+                            if not response.robot_id:
+                                response.robot_id = robot_id
+                        
+                            # 重複を破棄し、欠落・再同期をクライアントに通知
+                            deliver = await self._check_sequence(robot_id, response.sequence, first)
+                            first = False
+                            if not deliver:
+                                continue
                         
-                        # コールバック関数が設定されている場合、それを呼び出す
-                        if self.position_callback:
-                            try:
-                                # コールバックがコルーチンまたは呼び出し可能オブジェクトであることを確認
-                                if asyncio.iscoroutinefunction(self.position_callback):
-                                    await self.position_callback(position)
-                                else:
-                                    self.position_callback(position)
-                            except Exception as e:
-                                logger.error(f"位置更新コールバックエラー: {e}")
+                            # gRPCレスポンスを位置フレームに変換（Pydanticの検証は行わない）
+                            position = PositionFrame.from_proto(response)
+                        
+                            # コールバック関数が設定されている場合、それを呼び出す
+                            await self._deliver(robot_id, position)
                                 
-                    except asyncio.TimeoutError:
-                        logger.error("データストリームの読み取りがタイムアウト")
-                        # 接続状態を確認
-                        if self.channel and self.channel.get_state() != grpc.ChannelConnectivity.READY:
-                            logger.info("チャネルが準備完了ではなくなりました。現在のストリームを中断します")
+                        except asyncio.TimeoutError:
+                            logger.error("データストリームの読み取りがタイムアウト", extra={"robot_id": robot_id})
+                            # 接続状態を確認
+                            if endpoint.state != grpc.ChannelConnectivity.READY:
+                                logger.info("チャネルが準備完了ではなくなりました。現在のストリームを中断します")
+                                break
+                            # 読み取りを続行
+                            continue
+                        except _SequenceGap:
+                            logger.warning(
+                                "位置が欠落したため、受信済みの位置の続きから再送を要求します: %s (sequence=%s)",
+                                robot_id,
+                                self._last_sequence.get(robot_id, 0),
+                            )
+                            resume = True
+                            break
+                        except Exception as e:
+                            if self._fall_back_from_batch(e):
+                                break
+                            logger.error("ストリームデータの読み取り中にエラーが発生: %s", e, extra={"robot_id": robot_id})
                             break
-                        # 読み取りを続行
-                        continue
-                    except Exception as e:
-                        logger.error(f"ストリームデータの読み取り中にエラーが発生: {e}")
-                        break
+                finally:
+                    # タイムアウト・エラー・TrackRobotへの切り替えのどの場合もストリームを閉じる
+                    stream_call.cancel()
                 
+                if resume:
+                    # 接続先は正常なため、待機せずに resume_after=受信済みの最後の番号 で開き直す
+                    continue
                 # ここに到達した場合、ストリームが終了したことを意味しますが、追跡を続行したい
-                if self._running:
-                    logger.info("位置ストリームが終了またはエラーが発生。再接続を試みます...")
-                    # 現在の接続を閉じる
-                    if self.channel:
-                        await self.channel.close()
-                        self.channel = None
-                        self.stub = None
-                    await asyncio.sleep(reconnect_delay)  # 一定時間待機後に再接続
-                    reconnect_delay = min(reconnect_delay * 2, self._max_reconnect_delay)
+                logger.info("位置ストリームが終了またはエラーが発生。再接続を試みます: %s", robot_id)
                 
             except grpc.aio.AioRpcError as e:
-                if self._running:
-                    logger.error(f"gRPCエラー: {e.code()}: {e.details()}")
-                    
-                    # チャネルを閉じて再接続の準備
-                    if self.channel:
-                        await self.channel.close()
-                        self.channel = None
-                        self.stub = None
-                    
-                    # 指数バックオフ戦略を使用して再接続
-                    logger.info(f"{reconnect_delay}秒後に再接続を試みます...")
-                    await asyncio.sleep(reconnect_delay)
-                    
-                    # 再接続遅延を増加（最大値を超えないようにする）
-                    reconnect_delay = min(reconnect_delay * 2, self._max_reconnect_delay)
-                else:
-                    break
+                if self._running and not self._fall_back_from_batch(e):
+                    logger.error("gRPCエラー: %s: %s", e.code(), e.details(), extra={"robot_id": robot_id})
             except Exception as e:
-                logger.error(f"ロボット追跡中に未知のエラーが発生: {e}")
-                if self._running:
-                    await asyncio.sleep(reconnect_delay)
-                    reconnect_delay = min(reconnect_delay * 2, self._max_reconnect_delay)
-                else:
-                    break
+                logger.error("ロボット追跡中に未知のエラーが発生: %s", e, extra={"robot_id": robot_id})
+            
+            if not self._running:
+                break
+            # 指数バックオフで待機してから再接続（他に正常な接続先があれば待機時間を短くして切り替える）
+            reconnects.inc()
+            await self._wait_before_retry(endpoint, reconnect_delays)
+            if endpoint is not None:
+                # 失敗した接続先の再接続遅延を増加（最大値を超えないようにする）
+                delay = reconnect_delays.get(endpoint.target, self._reconnect_delay)
+                reconnect_delays[endpoint.target] = min(delay * 2, self._max_reconnect_delay)
         
-        logger.info("位置追跡タスクが終了しました")
+        self._robot_endpoints.pop(robot_id, None)
+        logger.info("位置追跡タスクが終了しました: %s", robot_id)
 
 
 # グローバルクライアントインスタンス
-client = RobotTrackerClient()
\ No newline at end of file
+client = RobotTrackerClient()
+
+registry.gauge_callback(
+    "robot_grpc_endpoint_up", "robot-trackerの接続先に接続できているか（READY の場合は1）", ("target",),
+    client.endpoint_health,
+)
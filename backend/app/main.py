@@ -2,16 +2,14 @@ import logging
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.api.endpoints import robot
+from app.api.endpoints import admin, analytics, geofences, history, metrics, positions, robot
 from app.config import settings
 from app.core.events import create_start_app_handler, create_stop_app_handler
 from app.core.errors import setup_error_handlers
+from app.core.logging_config import setup_logging
 
-# ログを設定
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-)
+# ログを設定（出力は別スレッドで行い、呼び出し元をブロックしない）
+setup_logging()
 
 logger = logging.getLogger(__name__)
 
@@ -49,6 +47,12 @@ def create_application() -> FastAPI:
     
     # ルーターを登録
     application.include_router(robot.router, prefix=settings.API_PREFIX)
+    application.include_router(history.router, prefix=settings.API_PREFIX)
+    application.include_router(positions.router, prefix=settings.API_PREFIX)
+    application.include_router(analytics.router, prefix=settings.API_PREFIX)
+    application.include_router(geofences.router, prefix=settings.API_PREFIX)
+    application.include_router(metrics.router, prefix=settings.API_PREFIX)
+    application.include_router(admin.router, prefix=settings.API_PREFIX)
     
     return application
 
@@ -65,4 +69,7 @@ if __name__ == "__main__":
         host="0.0.0.0",
         port=8000,
         reload=settings.DEBUG,
+        ws_per_message_deflate=settings.WS_PER_MESSAGE_DEFLATE,
+        ws_ping_interval=settings.WS_PING_INTERVAL_S,
+        ws_ping_timeout=settings.WS_PING_TIMEOUT_S,
     )
\ No newline at end of file
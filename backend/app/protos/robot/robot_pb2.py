@@ -24,7 +24,7 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0brobot.proto\x12\x05robot\"\x0e\n\x0cTrackRequest\"3\n\x08Position\x12\t\n\x01x\x18\x01 \x01(\x02\x12\t\n\x01y\x18\x02 \x01(\x02\x12\x11\n\ttimestamp\x18\x03 \x01(\x03\x32\x46\n\x0cRobotTracker\x12\x36\n\nTrackRobot\x12\x13.robot.TrackRequest\x1a\x0f.robot.Position\"\x00\x30\x01\x42;Z9github.com/tetsufromtw/practice-robot/robot-tracker/protob\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0brobot.proto\x12\x05robot\"6\n\x0cTrackRequest\x12\x10\n\x08robot_id\x18\x01 \x01(\t\x12\x14\n\x0cresume_after\x18\x02 \x01(\x04\"W\n\x08Position\x12\t\n\x01x\x18\x01 \x01(\x02\x12\t\n\x01y\x18\x02 \x01(\x02\x12\x11\n\ttimestamp\x18\x03 \x01(\x03\x12\x10\n\x08robot_id\x18\x04 \x01(\t\x12\x10\n\x08sequence\x18\x05 \x01(\x04\"e\n\x11TrackBatchRequest\x12\x10\n\x08robot_id\x18\x01 \x01(\t\x12\x14\n\x0cresume_after\x18\x02 \x01(\x04\x12\x11\n\twindow_ms\x18\x03 \x01(\r\x12\x15\n\rmax_positions\x18\x04 \x01(\r\"b\n\rPositionBatch\x12\x10\n\x08robot_id\x18\x01 \x01(\t\x12\x16\n\x0e\x66irst_sequence\x18\x02 \x01(\x04\x12\t\n\x01x\x18\x03 \x03(\x02\x12\t\n\x01y\x18\x04 \x03(\x02\x12\x11\n\ttimestamp\x18\x05 \x03(\x10\x32\x8d\x01\n\x0cRobotTracker\x12\x36\n\nTrackRobot\x12\x13.robot.TrackRequest\x1a\x0f.robot.Position\"\x00\x30\x01\x12\x45\n\x0fTrackRobotBatch\x12\x18.robot.TrackBatchRequest\x1a\x14.robot.PositionBatch\"\x00\x30\x01\x42;Z9github.com/tetsufromtw/practice-robot/robot-tracker/protob\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
@@ -33,9 +33,13 @@ if not _descriptor._USE_C_DESCRIPTORS:
   _globals['DESCRIPTOR']._loaded_options = None
   _globals['DESCRIPTOR']._serialized_options = b'Z9github.com/tetsufromtw/practice-robot/robot-tracker/proto'
   _globals['_TRACKREQUEST']._serialized_start=22
-  _globals['_TRACKREQUEST']._serialized_end=36
-  _globals['_POSITION']._serialized_start=38
-  _globals['_POSITION']._serialized_end=89
-  _globals['_ROBOTTRACKER']._serialized_start=91
-  _globals['_ROBOTTRACKER']._serialized_end=161
+  _globals['_TRACKREQUEST']._serialized_end=76
+  _globals['_POSITION']._serialized_start=78
+  _globals['_POSITION']._serialized_end=165
+  _globals['_TRACKBATCHREQUEST']._serialized_start=167
+  _globals['_TRACKBATCHREQUEST']._serialized_end=268
+  _globals['_POSITIONBATCH']._serialized_start=270
+  _globals['_POSITIONBATCH']._serialized_end=368
+  _globals['_ROBOTTRACKER']._serialized_start=371
+  _globals['_ROBOTTRACKER']._serialized_end=512
 # @@protoc_insertion_point(module_scope)
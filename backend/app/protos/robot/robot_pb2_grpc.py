@@ -40,13 +40,25 @@ class RobotTrackerStub(object):
                 request_serializer=robot__pb2.TrackRequest.SerializeToString,
                 response_deserializer=robot__pb2.Position.FromString,
                 _registered_method=True)
+        self.TrackRobotBatch = channel.unary_stream(
+                '/robot.RobotTracker/TrackRobotBatch',
+                request_serializer=robot__pb2.TrackBatchRequest.SerializeToString,
+                response_deserializer=robot__pb2.PositionBatch.FromString,
+                _registered_method=True)
 
 
 class RobotTrackerServicer(object):
     """Missing associated documentation comment in .proto file."""
 
     def TrackRobot(self, request, context):
-        """用於發送機器人位置的流式 RPC
+        """ロボットの位置を送信するためのストリーミングRPC
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def TrackRobotBatch(self, request, context):
+        """位置を一定期間ごとにまとめて送信するストリーミングRPC（高頻度の更新向け）
         """
         context.set_code(grpc.StatusCode.UNIMPLEMENTED)
         context.set_details('Method not implemented!')
@@ -60,6 +72,11 @@ def add_RobotTrackerServicer_to_server(servicer, server):
                     request_deserializer=robot__pb2.TrackRequest.FromString,
                     response_serializer=robot__pb2.Position.SerializeToString,
             ),
+            'TrackRobotBatch': grpc.unary_stream_rpc_method_handler(
+                    servicer.TrackRobotBatch,
+                    request_deserializer=robot__pb2.TrackBatchRequest.FromString,
+                    response_serializer=robot__pb2.PositionBatch.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'robot.RobotTracker', rpc_method_handlers)
@@ -97,3 +114,30 @@ class RobotTracker(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def TrackRobotBatch(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/robot.RobotTracker/TrackRobotBatch',
+            robot__pb2.TrackBatchRequest.SerializeToString,
+            robot__pb2.PositionBatch.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
@@ -0,0 +1,123 @@
+import logging
+import time
+from typing import Dict, List, Sequence, Tuple
+
+from app.core.metrics import serialization_seconds
+from app.schemas.frames import MAX_ROBOT_ID_BYTES, PositionFrame, decode_varint, write_varint
+
+logger = logging.getLogger(__name__)
+
+# デルタ形式のフレーム種別（バイナリ形式の 0x01〜0x03 と重ならない値）
+FRAME_TYPE_DELTA = 0x04  # 位置更新（stream / batch / latest）
+FRAME_TYPE_DELTA_HISTORY = 0x05  # 接続時の履歴の再送
+
+_delta_seconds = serialization_seconds.labels("delta")
+
+
+def _zigzag(value: int) -> int:
+    """符号付き整数を符号なし整数に変換（絶対値の小さい負の値も短くなるように）"""
+    return value << 1 if value >= 0 else (-value << 1) - 1
+
+
+def _unzigzag(value: int) -> int:
+    return (value >> 1) ^ -(value & 1)
+
+
+class DeltaEncoder:
+    """クライアントごとに、直前に送信した位置との差分で位置をエンコードするクラス
+
+    フレーム: 種別(uint8) + 件数(varint) の後にレコードが続く。
+    レコードの先頭は varint(ロボット番号 << 1 | キーフレームなら1)。
+    - キーフレーム: ロボットIDの長さ(uint8) + ロボットID(UTF-8) + x, y（zigzag varint）
+      + timestamp（varint）。ロボット番号とロボットIDの対応もここで通知する
+    - 差分: x, y, timestamp の直前のレコードとの差（zigzag varint）
+    x, y は 10^precision 倍して整数に丸めた値（固定小数点）で、差分は丸めた値同士で計算するため
+    誤差は蓄積しない。ロボットごとに keyframe_interval 件ごとにキーフレームを送信する。
+    送信する順にエンコードする必要があるため、送信タスクで送信直前に呼び出す。
+    ロボットIDが MAX_ROBOT_ID_BYTES を超える位置はエンコードできないため、フレームに含めない。
+    """
+
+    def __init__(self, precision: int, keyframe_interval: int):
+        self.scale = 10 ** precision
+        self.keyframe_interval = max(1, keyframe_interval)
+        # ロボットID → [ロボット番号, 直前のx, 直前のy, 直前のtimestamp, 直前のキーフレームからの件数]
+        self._robots: Dict[str, List[int]] = {}
+
+    def encode(self, positions: Sequence[PositionFrame], frame_type: int = FRAME_TYPE_DELTA) -> bytes:
+        start = time.perf_counter()
+        # 件数はエンコードできた位置の数のため、レコードを書き終えてからヘッダーを付ける
+        out = bytearray()
+        count = 0
+        scale = self.scale
+        for position in positions:
+            qx = round(position.x * scale)
+            qy = round(position.y * scale)
+            timestamp = position.timestamp
+            state = self._robots.get(position.robot_id)
+            if state is None or state[4] >= self.keyframe_interval:
+                robot_id = position.robot_id.encode()
+                if len(robot_id) > MAX_ROBOT_ID_BYTES:
+                    logger.warning("ロボットIDが長すぎるためデルタ形式でエンコードできません: %s", position.robot_id[:64])
+                    continue
+                if state is None:
+                    state = [len(self._robots), 0, 0, 0, 0]
+                    self._robots[position.robot_id] = state
+                write_varint(out, state[0] << 1 | 1)
+                out.append(len(robot_id))
+                out += robot_id
+                write_varint(out, _zigzag(qx))
+                write_varint(out, _zigzag(qy))
+                write_varint(out, _zigzag(timestamp))
+                state[4] = 1
+            else:
+                write_varint(out, state[0] << 1)
+                write_varint(out, _zigzag(qx - state[1]))
+                write_varint(out, _zigzag(qy - state[2]))
+                write_varint(out, _zigzag(timestamp - state[3]))
+                state[4] += 1
+            state[1] = qx
+            state[2] = qy
+            state[3] = timestamp
+            count += 1
+        header = bytearray((frame_type,))
+        write_varint(header, count)
+        frame = bytes(header + out)
+        _delta_seconds.observe(time.perf_counter() - start)
+        return frame
+
+
+class DeltaDecoder:
+    """DeltaEncoder のフレームをデコードするクラス（クライアント実装の参考と負荷試験用）"""
+
+    def __init__(self, precision: int):
+        self.scale = 10 ** precision
+        # ロボット番号 → [ロボットID, 直前のx, 直前のy, 直前のtimestamp]
+        self._robots: Dict[int, list] = {}
+
+    def decode(self, data: bytes) -> Tuple[int, List[Tuple[str, float, float, int]]]:
+        """(フレーム種別, [(ロボットID, x, y, timestamp), ...]) を返す"""
+        frame_type = data[0]
+        count, offset = decode_varint(data, 1)
+        positions = []
+        for _ in range(count):
+            header, offset = decode_varint(data, offset)
+            number = header >> 1
+            if header & 1:
+                length = data[offset]
+                robot_id = bytes(data[offset + 1:offset + 1 + length]).decode()
+                offset += 1 + length
+                qx, offset = decode_varint(data, offset)
+                qy, offset = decode_varint(data, offset)
+                timestamp, offset = decode_varint(data, offset)
+                state = [robot_id, _unzigzag(qx), _unzigzag(qy), _unzigzag(timestamp)]
+                self._robots[number] = state
+            else:
+                state = self._robots[number]
+                dx, offset = decode_varint(data, offset)
+                dy, offset = decode_varint(data, offset)
+                dt, offset = decode_varint(data, offset)
+                state[1] += _unzigzag(dx)
+                state[2] += _unzigzag(dy)
+                state[3] += _unzigzag(dt)
+            positions.append((state[0], state[1] / self.scale, state[2] / self.scale, state[3]))
+        return frame_type, positions
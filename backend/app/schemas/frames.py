@@ -0,0 +1,327 @@
+import struct
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+from app.core.metrics import serialization_seconds
+from app.core.serialization import dumps
+from app.schemas.robot import RobotPosition
+
+# バイナリフレームの種別
+FRAME_TYPE_POSITION = 0x01
+FRAME_TYPE_BATCH = 0x02
+FRAME_TYPE_HISTORY = 0x03
+
+# バッチ系イベント名とバイナリフレーム種別の対応
+_BATCH_FRAME_TYPES = {
+    "position_batch": FRAME_TYPE_BATCH,
+    "position_history": FRAME_TYPE_HISTORY,
+}
+
+# 位置レコード: ロボットIDの長さ(uint8) + ロボットID(UTF-8) + x(float32) + y(float32) + timestamp(int64)
+_ROBOT_ID_LENGTH_STRUCT = struct.Struct("<B")
+_POSITION_STRUCT = struct.Struct("<ffq")
+# 位置フレーム: 種別(uint8) + 位置レコード
+_FRAME_TYPE_STRUCT = struct.Struct("<B")
+# バッチフレーム: 種別(uint8) + 件数(uint16) の後に位置レコードが続く
+_BATCH_HEADER_STRUCT = struct.Struct("<BH")
+
+MAX_ROBOT_ID_BYTES = 0xFF  # 位置レコードに格納できるロボットIDの最大長（UTF-8のバイト数、長さはuint8）
+MAX_BATCH_POSITIONS = 0xFFFF  # 1つのバッチフレームに格納できる位置の最大数（件数はuint16）
+
+
+# 形式ごとのエンコード時間（ラベルの検索を記録のたびに行わないよう事前に取得）
+_json_seconds = serialization_seconds.labels("json")
+_binary_seconds = serialization_seconds.labels("binary")
+_protobuf_seconds = serialization_seconds.labels("protobuf")
+
+
+def robot_id_encodable(robot_id: str) -> bool:
+    """ロボットIDをバイナリ形式の位置レコードに格納できるか"""
+    # UTF-8は1文字最大4バイトのため、短いIDはエンコードせずに判定する
+    return len(robot_id) <= MAX_ROBOT_ID_BYTES // 4 or len(robot_id.encode()) <= MAX_ROBOT_ID_BYTES
+
+
+def write_varint(out: bytearray, value: int):
+    """符号なし整数をprotobufのvarint形式で out に追加"""
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def encode_varint(value: int) -> bytes:
+    """符号なし整数をprotobufのvarint形式にエンコード"""
+    out = bytearray()
+    write_varint(out, value)
+    return bytes(out)
+
+
+def decode_varint(data: bytes, offset: int = 0) -> Tuple[int, int]:
+    """protobufのvarint形式の符号なし整数をデコードし、次の位置も返す"""
+    result = 0
+    shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, offset
+        shift += 7
+
+
+class PositionFrame:
+    """1回の位置更新とそのエンコード済みフレームを保持するクラス
+
+    受信経路ではPydanticモデルを作成せず、エンコードは形式ごとに最初に必要に
+    なった時に1回だけ行い、その結果をすべてのクライアントで共有する。
+    """
+
+    __slots__ = (
+        "robot_id", "x", "y", "timestamp", "received_at", "vx", "vy",
+        "_message", "_record", "_json", "_motion_json", "_binary", "_protobuf",
+    )
+
+    def __init__(self, x: float, y: float, timestamp: int, robot_id: str = "", message: Any = None):
+        self.robot_id = robot_id
+        self.x = x
+        self.y = y
+        self.timestamp = timestamp
+        self.received_at = time.perf_counter()  # このプロセスで受信した時刻（レイテンシの計測用）
+        self.vx: Optional[float] = None  # 運動モデルで推定した速度（1秒あたり、デッドレコニング用）
+        self.vy: Optional[float] = None
+        self._message = message  # 受信したgRPCメッセージ（protobuf形式の転送用）
+        self._record: Optional[bytes] = None
+        self._json: Optional[str] = None
+        self._motion_json: Optional[str] = None
+        self._binary: Optional[bytes] = None
+        self._protobuf: Optional[bytes] = None
+
+    @classmethod
+    def from_proto(cls, message: Any) -> "PositionFrame":
+        """gRPCのPositionメッセージから作成"""
+        return cls(message.x, message.y, message.timestamp, message.robot_id, message)
+
+    @classmethod
+    def from_binary_record(cls, data: bytes, offset: int = 0) -> Tuple["PositionFrame", int]:
+        """バイナリ形式の位置レコードから作成し、次のレコードの位置も返す
+
+        受信したレコードはそのまま保持し、再送時に再エンコードしない。
+        """
+        (length,) = _ROBOT_ID_LENGTH_STRUCT.unpack_from(data, offset)
+        start = offset + _ROBOT_ID_LENGTH_STRUCT.size
+        robot_id = bytes(data[start:start + length]).decode()
+        x, y, timestamp = _POSITION_STRUCT.unpack_from(data, start + length)
+        end = start + length + _POSITION_STRUCT.size
+        frame = cls(x, y, timestamp, robot_id)
+        frame._record = bytes(data[offset:end])
+        return frame, end
+
+    def to_dict(self) -> Dict[str, Any]:
+        """位置データを辞書に変換"""
+        return {"robot_id": self.robot_id, "x": self.x, "y": self.y, "timestamp": self.timestamp}
+
+    def to_model(self) -> RobotPosition:
+        """Pydanticモデルに変換（検証は行わない）"""
+        return RobotPosition.model_construct(
+            robot_id=self.robot_id, x=self.x, y=self.y, timestamp=self.timestamp
+        )
+
+    @property
+    def json_frame(self) -> str:
+        """position_updateイベントのJSONテキストフレーム"""
+        if self._json is None:
+            start = time.perf_counter()
+            self._json = dumps({"event": "position_update", "data": self.to_dict()})
+            _json_seconds.observe(time.perf_counter() - start)
+        return self._json
+
+    @property
+    def motion_json_frame(self) -> str:
+        """推定した速度（vx, vy）を含む position_updateイベントのJSONテキストフレーム（デッドレコニング用）"""
+        if self._motion_json is None:
+            data = self.to_dict()
+            data["vx"] = self.vx or 0.0
+            data["vy"] = self.vy or 0.0
+            self._motion_json = dumps({"event": "position_update", "data": data})
+        return self._motion_json
+
+    @property
+    def binary_record(self) -> bytes:
+        """バイナリ形式の位置レコード（フレームとバッチで共通）
+
+        ロボットIDが MAX_ROBOT_ID_BYTES を超える場合は ValueError（受信時に破棄するため通常は発生しない）。
+        """
+        if self._record is None:
+            robot_id = self.robot_id.encode()
+            if len(robot_id) > MAX_ROBOT_ID_BYTES:
+                raise ValueError(f"ロボットIDが{MAX_ROBOT_ID_BYTES}バイトを超えています: {self.robot_id[:32]}...")
+            self._record = (
+                _ROBOT_ID_LENGTH_STRUCT.pack(len(robot_id))
+                + robot_id
+                + _POSITION_STRUCT.pack(self.x, self.y, self.timestamp)
+            )
+        return self._record
+
+    @property
+    def binary_frame(self) -> bytes:
+        """種別と位置レコードからなるバイナリフレーム"""
+        if self._binary is None:
+            start = time.perf_counter()
+            self._binary = _FRAME_TYPE_STRUCT.pack(FRAME_TYPE_POSITION) + self.binary_record
+            _binary_seconds.observe(time.perf_counter() - start)
+        return self._binary
+
+    @property
+    def protobuf_frame(self) -> bytes:
+        """robot.Positionメッセージのシリアライズ結果"""
+        if self._protobuf is None:
+            start = time.perf_counter()
+            if self._message is None:
+                # 遅延インポート（protoの生成コードはgRPC受信時以外には不要）
+                from app.protos.robot import robot_pb2
+                self._message = robot_pb2.Position(
+                    x=self.x, y=self.y, timestamp=self.timestamp, robot_id=self.robot_id
+                )
+            self._protobuf = self._message.SerializeToString()
+            _protobuf_seconds.observe(time.perf_counter() - start)
+        return self._protobuf
+
+    def encode(self, frame_format: str) -> Union[str, bytes]:
+        """指定された形式のフレームを取得"""
+        if frame_format == "binary":
+            return self.binary_frame
+        if frame_format == "protobuf":
+            return self.protobuf_frame
+        return self.json_frame
+
+
+class BatchFrame:
+    """複数の位置更新をまとめたイベントとそのエンコード済みフレームを保持するクラス
+
+    event は position_batch（一定期間の位置更新）または position_history（接続時の履歴再送）。
+    """
+
+    __slots__ = ("positions", "event", "_json", "_binary", "_protobuf")
+
+    def __init__(self, positions: List[PositionFrame], event: str = "position_batch"):
+        self.positions = positions
+        self.event = event
+        self._json: Optional[str] = None
+        self._binary: Optional[bytes] = None
+        self._protobuf: Optional[bytes] = None
+
+    @property
+    def json_frame(self) -> str:
+        """position_batch / position_historyイベントのJSONテキストフレーム"""
+        if self._json is None:
+            start = time.perf_counter()
+            data = [position.to_dict() for position in self.positions]
+            self._json = dumps({"event": self.event, "data": data})
+            _json_seconds.observe(time.perf_counter() - start)
+        return self._json
+
+    @property
+    def binary_frame(self) -> bytes:
+        """ヘッダーと位置レコードを連結したバイナリフレーム
+
+        件数が MAX_BATCH_POSITIONS を超える場合は ValueError（作成する側で分割すること）。
+        """
+        if self._binary is None:
+            if len(self.positions) > MAX_BATCH_POSITIONS:
+                raise ValueError(f"バッチフレームの件数が{MAX_BATCH_POSITIONS}件を超えています: {len(self.positions)}")
+            start = time.perf_counter()
+            frame_type = _BATCH_FRAME_TYPES[self.event]
+            parts = [_BATCH_HEADER_STRUCT.pack(frame_type, len(self.positions))]
+            parts.extend(position.binary_record for position in self.positions)
+            self._binary = b"".join(parts)
+            _binary_seconds.observe(time.perf_counter() - start)
+        return self._binary
+
+    @property
+    def protobuf_frame(self) -> bytes:
+        """長さプレフィックス（varint）付きのrobot.Positionメッセージを連結したフレーム"""
+        if self._protobuf is None:
+            start = time.perf_counter()
+            parts = []
+            for position in self.positions:
+                payload = position.protobuf_frame
+                parts.append(encode_varint(len(payload)))
+                parts.append(payload)
+            self._protobuf = b"".join(parts)
+            _protobuf_seconds.observe(time.perf_counter() - start)
+        return self._protobuf
+
+    def encode(self, frame_format: str) -> Union[str, bytes]:
+        """指定された形式のフレームを取得"""
+        if frame_format == "binary":
+            return self.binary_frame
+        if frame_format == "protobuf":
+            return self.protobuf_frame
+        return self.json_frame
+
+
+class PositionArrays:
+    """TrackRobotBatch で受信した1ロボット分の位置を配列のまま保持するクラス
+
+    x / y / timestamp は受信したメッセージのバイト列を参照するNumPy配列で、
+    位置ごとのPythonオブジェクトは作成しない。位置バスにはこのまま1件として発行し、
+    位置ごとの処理が必要な購読者（WebSocket配信など）だけが frames() で位置フレームにする。
+    """
+
+    __slots__ = ("robot_id", "first_sequence", "x", "y", "timestamp", "received_at")
+
+    def __init__(self, robot_id: str, first_sequence: int, x: np.ndarray, y: np.ndarray, timestamp: np.ndarray):
+        self.robot_id = robot_id
+        self.first_sequence = first_sequence  # x[0] のシーケンス番号（以降は連続した番号）
+        self.x = x
+        self.y = y
+        self.timestamp = timestamp
+        self.received_at = time.perf_counter()  # このプロセスで受信した時刻（レイテンシの計測用）
+
+    def __len__(self) -> int:
+        return len(self.timestamp)
+
+    @property
+    def last_sequence(self) -> int:
+        """最後の位置のシーケンス番号"""
+        return self.first_sequence + len(self) - 1
+
+    def tail(self, start: int) -> "PositionArrays":
+        """start 番目以降の位置（配列はコピーせずに参照する）"""
+        if start <= 0:
+            return self
+        arrays = PositionArrays(
+            self.robot_id, self.first_sequence + start, self.x[start:], self.y[start:], self.timestamp[start:]
+        )
+        arrays.received_at = self.received_at
+        return arrays
+
+    def frames(self, start: int = 0) -> Iterator[PositionFrame]:
+        """start 番目以降の位置を位置フレームとして取得"""
+        robot_id = self.robot_id
+        received_at = self.received_at
+        for x, y, timestamp in zip(
+            self.x[start:].tolist(), self.y[start:].tolist(), self.timestamp[start:].tolist()
+        ):
+            frame = PositionFrame(x, y, timestamp, robot_id)
+            frame.received_at = received_at
+            yield frame
+
+    def last_frame(self) -> PositionFrame:
+        """最後の位置の位置フレーム"""
+        return next(self.frames(len(self) - 1))
+
+
+# 位置バスに発行するデータ（1件の位置、または1ロボット分の位置の配列）
+BusItem = Union[PositionFrame, PositionArrays]
+
+
+def iter_positions(items: Iterable[BusItem]) -> Iterator[PositionFrame]:
+    """位置バスから読み出したデータを位置フレームとして順に列挙（PositionArrays はここで展開する）"""
+    for item in items:
+        if isinstance(item, PositionArrays):
+            yield from item.frames()
+        else:
+            yield item
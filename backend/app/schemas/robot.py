@@ -4,6 +4,7 @@ from typing import Optional, Union, Dict
 
 class RobotPosition(BaseModel):
     """ロボットの位置モデル"""
+    robot_id: str = ""
     x: float
     y: float
     timestamp: int
@@ -14,16 +15,26 @@ class ConnectionMessage(BaseModel):
     message: str
 
 
+class GeofenceEvent(BaseModel):
+    """ジオフェンスの出入り（enter / exit イベント）モデル"""
+    fence_id: str
+    robot_id: str
+    x: float
+    y: float
+    timestamp: int
+
+
 class WebSocketMessage(BaseModel):
     """WebSocketメッセージモデル"""
     event: str
-    data: Optional[Union[RobotPosition, ConnectionMessage, Dict[str, str]]] = None
+    data: Optional[Union[RobotPosition, GeofenceEvent, ConnectionMessage, Dict[str, str]]] = None
     
     class Config:
-        schema_extra = {
+        json_schema_extra = {
             "example": {
                 "event": "position_update",
                 "data": {
+                    "robot_id": "robot-1",
                     "x": 123.45,
                     "y": 678.90,
                     "timestamp": 1617979797000
@@ -0,0 +1,245 @@
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.services.history import PositionHistory, RobotHistory, position_history
+
+
+class WindowAnalytics:
+    """1つの (ロボット, 時間範囲) に対する集計結果
+
+    新しい点が追加された場合は追加分のみを計算して結果に加算し、集計済みの点が
+    リングバッファから押し出された場合はその点の分だけを結果から差し引く。差し引くために
+    集計済みの点（1点16バイト）を保持する。
+    """
+
+    def __init__(self, since: Optional[int], until: Optional[int], bins: Tuple[int, int]):
+        self.since = since
+        self.until = until
+        self.bins = bins
+        self.version = 0  # 集計済みの履歴バージョン（追加された点の累計数）
+        self.generation: Optional[int] = None  # 集計した履歴の generation
+        self._reset()
+
+    def _reset(self):
+        """集計結果を空にする（時間範囲・ビン数・バージョンは変更しない）"""
+        self.first_abs: Optional[int] = None  # 範囲内で最初の点の通し番号
+        self.count = 0
+        self.distance = 0.0
+        self.min_x = self.max_x = self.min_y = self.max_y = None
+        self.first_timestamp: Optional[int] = None
+        self.last_timestamp: Optional[int] = None
+        self.last_point: Optional[Tuple[float, float, int]] = None
+        # 速度は連続する2点の中間時刻の値、加速度は連続する速度の差分から求める
+        # （速度は距離/秒、加速度は距離/秒^2、時刻は位置データのタイムスタンプの単位）
+        self.speed_timestamps = np.empty(0, dtype=np.float64)
+        self.speeds = np.empty(0, dtype=np.float64)
+        self.accel_timestamps = np.empty(0, dtype=np.float64)
+        self.accelerations = np.empty(0, dtype=np.float64)
+        self.heatmap = np.zeros(self.bins, dtype=np.int64)
+        # 集計済みの点（古い順、押し出された点を差し引くために保持）
+        self._xs = np.empty(0, dtype=np.float32)
+        self._ys = np.empty(0, dtype=np.float32)
+        self._timestamps = np.empty(0, dtype=np.int64)
+
+    def _histogram(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        """アリーナをビンに分割した点の数"""
+        counts, _, _ = np.histogram2d(
+            xs,
+            ys,
+            bins=self.bins,
+            range=[
+                [settings.ARENA_MIN_X, settings.ARENA_MAX_X],
+                [settings.ARENA_MIN_Y, settings.ARENA_MAX_Y],
+            ],
+        )
+        return counts.astype(np.int64)
+
+    def update(self, xs: np.ndarray, ys: np.ndarray, timestamps: np.ndarray, first_abs: int):
+        """範囲内の新しい点（古い順）を集計に加える"""
+        if len(timestamps) == 0:
+            return
+        if self.first_abs is None:
+            self.first_abs = first_abs
+            self.first_timestamp = int(timestamps[0])
+        self._xs = np.concatenate((self._xs, xs))
+        self._ys = np.concatenate((self._ys, ys))
+        self._timestamps = np.concatenate((self._timestamps, timestamps))
+
+        xs = xs.astype(np.float64)
+        ys = ys.astype(np.float64)
+        timestamps = timestamps.astype(np.float64)
+        scale = settings.TIMESTAMP_UNITS_PER_SECOND
+
+        # 前回の最後の点と連結して差分を計算
+        if self.last_point is not None:
+            last_x, last_y, last_ts = self.last_point
+            path_x = np.concatenate(([last_x], xs))
+            path_y = np.concatenate(([last_y], ys))
+            path_t = np.concatenate(([last_ts], timestamps))
+        else:
+            path_x, path_y, path_t = xs, ys, timestamps
+
+        steps = np.hypot(np.diff(path_x), np.diff(path_y))
+        self.distance += float(steps.sum())
+
+        # 時間差が0の区間（同じタイムスタンプの点）は速度を定義できないため除外
+        dt = np.diff(path_t) / scale
+        valid = dt > 0
+        speeds = steps[valid] / dt[valid]
+        speed_timestamps = (path_t[:-1][valid] + path_t[1:][valid]) / 2
+        if len(speeds):
+            all_speed_t = np.concatenate((self.speed_timestamps[-1:], speed_timestamps))
+            all_speeds = np.concatenate((self.speeds[-1:], speeds))
+            accel_dt = np.diff(all_speed_t) / scale
+            accel_valid = accel_dt > 0
+            self.accelerations = np.concatenate(
+                (self.accelerations, np.diff(all_speeds)[accel_valid] / accel_dt[accel_valid])
+            )
+            self.accel_timestamps = np.concatenate(
+                (self.accel_timestamps, ((all_speed_t[:-1] + all_speed_t[1:]) / 2)[accel_valid])
+            )
+            self.speeds = np.concatenate((self.speeds, speeds))
+            self.speed_timestamps = np.concatenate((self.speed_timestamps, speed_timestamps))
+
+        min_x, max_x = float(xs.min()), float(xs.max())
+        min_y, max_y = float(ys.min()), float(ys.max())
+        self.min_x = min_x if self.min_x is None else min(self.min_x, min_x)
+        self.max_x = max_x if self.max_x is None else max(self.max_x, max_x)
+        self.min_y = min_y if self.min_y is None else min(self.min_y, min_y)
+        self.max_y = max_y if self.max_y is None else max(self.max_y, max_y)
+
+        self.heatmap += self._histogram(xs, ys)
+
+        self.count += len(timestamps)
+        self.last_timestamp = int(timestamps[-1])
+        self.last_point = (float(xs[-1]), float(ys[-1]), float(timestamps[-1]))
+
+    def evict(self, count: int):
+        """集計済みの古い方から count 点を結果から差し引く（リングバッファから押し出された点）"""
+        if count <= 0:
+            return
+        if count >= self.count:
+            self._reset()
+            return
+        scale = settings.TIMESTAMP_UNITS_PER_SECOND
+        # 押し出される点と、残る最初の点までの区間を差し引く
+        xs = self._xs[:count + 1].astype(np.float64)
+        ys = self._ys[:count + 1].astype(np.float64)
+        timestamps = self._timestamps[:count + 1].astype(np.float64)
+        self.distance -= float(np.hypot(np.diff(xs), np.diff(ys)).sum())
+
+        # 速度は時間差が正の区間ごとに1つ、加速度は時間差が正の連続する速度の組ごとに1つ
+        speeds = int(np.count_nonzero(np.diff(timestamps) / scale > 0))
+        accelerations = int(np.count_nonzero(np.diff(self.speed_timestamps[:speeds + 1]) / scale > 0))
+        self.speeds = self.speeds[speeds:]
+        self.speed_timestamps = self.speed_timestamps[speeds:]
+        self.accelerations = self.accelerations[accelerations:]
+        self.accel_timestamps = self.accel_timestamps[accelerations:]
+
+        self.heatmap -= self._histogram(xs[:count], ys[:count])
+
+        evicted_xs, evicted_ys = xs[:count], ys[:count]
+        self._xs = self._xs[count:]
+        self._ys = self._ys[count:]
+        self._timestamps = self._timestamps[count:]
+        # 最小値・最大値は押し出された点がその値だった場合のみ残りの点から求め直す
+        if evicted_xs.min() <= self.min_x or evicted_xs.max() >= self.max_x:
+            self.min_x, self.max_x = float(self._xs.min()), float(self._xs.max())
+        if evicted_ys.min() <= self.min_y or evicted_ys.max() >= self.max_y:
+            self.min_y, self.max_y = float(self._ys.min()), float(self._ys.max())
+
+        self.count -= count
+        self.first_abs += count
+        self.first_timestamp = int(self._timestamps[0])
+
+    def summary(self) -> Dict[str, Any]:
+        """距離、バウンディングボックス、速度の統計"""
+        has_speeds = len(self.speeds) > 0
+        return {
+            "count": self.count,
+            "first_timestamp": self.first_timestamp,
+            "last_timestamp": self.last_timestamp,
+            "distance": self.distance,
+            "bounding_box": None if self.count == 0 else {
+                "min_x": self.min_x,
+                "max_x": self.max_x,
+                "min_y": self.min_y,
+                "max_y": self.max_y,
+            },
+            "mean_speed": float(self.speeds.mean()) if has_speeds else None,
+            "max_speed": float(self.speeds.max()) if has_speeds else None,
+        }
+
+
+class TrajectoryAnalytics:
+    """位置履歴に対するベクトル化された集計と、その結果のキャッシュ
+
+    結果は (ロボット, since, until, ビン数) ごとにキャッシュし、履歴に点が追加されると
+    追加分のみを計算して更新する。集計済みの点がリングバッファから押し出された場合は
+    その点の分だけを差し引く。ロボットの履歴が作り直された場合のみ全体を計算し直す。
+    """
+
+    def __init__(self, history: PositionHistory, cache_size: Optional[int] = None):
+        self.history = history
+        self.cache_size = cache_size or settings.ANALYTICS_CACHE_SIZE
+        self._cache: "OrderedDict[Hashable, WindowAnalytics]" = OrderedDict()
+
+    def window(
+        self,
+        robot_id: str,
+        since: Optional[int] = None,
+        until: Optional[int] = None,
+        bins: Optional[Tuple[int, int]] = None,
+    ) -> Optional[WindowAnalytics]:
+        """時間範囲の集計結果を取得（ロボットの履歴がない場合は None）"""
+        history = self.history.get(robot_id)
+        if history is None:
+            return None
+        bins = bins or (settings.ANALYTICS_HEATMAP_BINS, settings.ANALYTICS_HEATMAP_BINS)
+
+        key = (robot_id, since, until, bins)
+        entry = self._cache.get(key)
+        if entry is not None:
+            self._cache.move_to_end(key)
+        if entry is None or self._is_stale(entry, history):
+            entry = WindowAnalytics(since, until, bins)
+            entry.generation = history.generation
+            self._cache[key] = entry
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+        if entry.version < history.version:
+            if entry.first_abs is not None:
+                # 押し出された点の数（通し番号がこれより小さい点はリングバッファにない）
+                entry.evict(history.version - history.size - entry.first_abs)
+            self._update(entry, history)
+        return entry
+
+    @staticmethod
+    def _is_stale(entry: WindowAnalytics, history: RobotHistory) -> bool:
+        """ロボットの履歴が破棄されて作り直されたか（作り直した履歴のバージョンは古い履歴を超えうる）"""
+        return entry.generation is not None and entry.generation != history.generation
+
+    @staticmethod
+    def _update(entry: WindowAnalytics, history: RobotHistory):
+        """前回の集計以降に追加された点のうち、時間範囲内のものを集計に加える"""
+        base = history.version - history.size  # 論理インデックス0の通し番号
+        start = max(0, entry.version - base)
+        lo, hi = history.index_range(entry.since, entry.until)
+        lo = max(lo, start)
+        if lo < hi:
+            xs, ys, timestamps = history.slice(lo, hi)
+            entry.update(
+                np.frombuffer(xs, dtype=np.float32),
+                np.frombuffer(ys, dtype=np.float32),
+                np.frombuffer(timestamps, dtype=np.int64),
+                base + lo,
+            )
+        entry.version = history.version
+
+
+# グローバル軌跡分析インスタンス
+trajectory_analytics = TrajectoryAnalytics(position_history)
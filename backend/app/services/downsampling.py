@@ -0,0 +1,132 @@
+import math
+import time
+from enum import Enum
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.schemas.frames import PositionFrame
+
+
+class DownsampleMethod(str, Enum):
+    """履歴の間引き方法
+
+    - lttb: Largest-Triangle-Three-Buckets。バケットごとに前後の点と作る三角形の面積が
+      最大になる点を1つ選び、軌跡の形を保つ
+    - minmax: バケットごとに x / y の最小・最大となる点を残し、外れ値や折り返しを保つ
+    """
+    LTTB = "lttb"
+    MINMAX = "minmax"
+
+
+def lttb_indices(xs: np.ndarray, ys: np.ndarray, max_points: int) -> np.ndarray:
+    """LTTBで残す点のインデックス（最初と最後の点は常に残す）
+
+    地図上の軌跡を描くための間引きなので、三角形の面積は (x, y) 平面で評価する。
+    バケット間の依存があるためループはバケット数だけ回し、バケット内はベクトル演算で行う。
+    """
+    n = len(xs)
+    if max_points >= n:
+        return np.arange(n)
+    if max_points < 3:
+        # バケットを作れないため最初と最後の点のみ（max_points 件まで）
+        return np.array([0, n - 1][:max(max_points, 0)], dtype=np.int64)
+
+    # 最初と最後を除いた点を max_points - 2 個のバケットに分割
+    edges = np.linspace(1, n - 1, max_points - 1).astype(np.int64)
+    selected = np.empty(max_points, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    a = 0
+    buckets = max_points - 2
+    for i in range(buckets):
+        lo, hi = edges[i], edges[i + 1]
+        if i == buckets - 1:
+            avg_x, avg_y = xs[n - 1], ys[n - 1]
+        else:
+            avg_x = xs[hi:edges[i + 2]].mean()
+            avg_y = ys[hi:edges[i + 2]].mean()
+        ax, ay = xs[a], ys[a]
+        area = np.abs((ax - avg_x) * (ys[lo:hi] - ay) - (ax - xs[lo:hi]) * (avg_y - ay))
+        a = lo + int(area.argmax())
+        selected[i + 1] = a
+    return selected
+
+
+def minmax_indices(xs: np.ndarray, ys: np.ndarray, max_points: int) -> np.ndarray:
+    """バケットごとに x / y の最小・最大となる点のインデックス（最初と最後の点は常に残す）
+
+    1バケットで最大4点を残すため、max_points が6未満でバケットを作れない場合はLTTBで間引く。
+    """
+    n = len(xs)
+    if max_points >= n:
+        return np.arange(n)
+    buckets = (max_points - 2) // 4
+    if buckets < 1:
+        return lttb_indices(xs, ys, max_points)
+
+    # 同じ大きさのバケットに揃えるため末尾の値で埋める（argmin / argmax は最初の一致を返すため、
+    # 埋めた要素が実際の点より優先されることはない）
+    size = math.ceil(n / buckets)
+    pad = buckets * size - n
+    offsets = np.arange(buckets) * size
+    indices = [np.array([0, n - 1])]
+    for values in (xs, ys):
+        grid = np.pad(values, (0, pad), mode="edge").reshape(buckets, size)
+        indices.append(offsets + grid.argmin(axis=1))
+        indices.append(offsets + grid.argmax(axis=1))
+    return np.unique(np.minimum(np.concatenate(indices), n - 1))
+
+
+def downsample(
+    xs: Sequence[float],
+    ys: Sequence[float],
+    timestamps: Sequence[int],
+    max_points: int,
+    method: DownsampleMethod = DownsampleMethod.LTTB,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """軌跡を max_points 件以下に間引く（点の順序は保つ）"""
+    xs = np.asarray(xs, dtype=np.float64)
+    ys = np.asarray(ys, dtype=np.float64)
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    if method == DownsampleMethod.MINMAX:
+        indices = minmax_indices(xs, ys, max_points)
+    else:
+        indices = lttb_indices(xs, ys, max_points)
+    return xs[indices], ys[indices], timestamps[indices]
+
+
+class DeadBandFilter:
+    """ライブ配信の位置更新をクライアントごとに間引くフィルター
+
+    ロボットごとに最後に送信した位置と時刻を保持し、前回の送信から min_interval 秒以上
+    経過し、かつ min_distance 以上移動した更新のみを通す。
+    """
+
+    __slots__ = ("min_distance", "min_interval", "_last_sent")
+
+    def __init__(self, min_distance: float = 0.0, min_interval: float = 0.0):
+        self.min_distance = min_distance
+        self.min_interval = min_interval
+        self._last_sent: Dict[str, Tuple[float, float, float]] = {}
+
+    @classmethod
+    def create(cls, min_distance: float, min_interval: float) -> Optional["DeadBandFilter"]:
+        """しきい値がどちらも0の場合はフィルター不要のため None を返す"""
+        if min_distance <= 0 and min_interval <= 0:
+            return None
+        return cls(min_distance, min_interval)
+
+    def accept(self, position: PositionFrame) -> bool:
+        """位置更新を送信するか判定し、送信する場合は最後に送信した位置として記録"""
+        now = time.monotonic()
+        last = self._last_sent.get(position.robot_id)
+        if last is not None:
+            last_x, last_y, last_time = last
+            if now - last_time < self.min_interval:
+                return False
+            if math.hypot(position.x - last_x, position.y - last_y) < self.min_distance:
+                return False
+        self._last_sent[position.robot_id] = (position.x, position.y, now)
+        return True
@@ -0,0 +1,618 @@
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import socket
+import struct
+import tempfile
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from app.config import settings
+from app.schemas.frames import PositionFrame, iter_positions
+from app.services.position_bus import PositionBus, Subscription, position_bus
+from app.services.shm_ring import PositionRing
+
+logger = logging.getLogger(__name__)
+
+# ワーカー間メッセージ: 種別(uint8) + ペイロード長(uint32) の後にペイロードが続く
+MESSAGE_TYPE_POSITION = 0x01  # ペイロードはバイナリ形式の位置レコード
+MESSAGE_TYPE_STATS = 0x02  # ペイロードはワーカーの状態のJSON
+MESSAGE_TYPE_EVENT = 0x03  # ペイロードはロボットに関するイベント（gap / resync など）のJSON
+_MESSAGE_HEADER_STRUCT = struct.Struct("<BI")
+
+StatsHandler = Callable[[Dict[str, Any]], None]
+PositionHandler = Callable[[PositionFrame], Any]
+# (ロボットID, イベント名, データ)
+EventHandler = Callable[[str, str, Dict[str, Any]], Any]
+
+
+def encode_message(message_type: int, payload: bytes) -> bytes:
+    """ワーカー間メッセージをエンコード"""
+    return _MESSAGE_HEADER_STRUCT.pack(message_type, len(payload)) + payload
+
+
+def encode_event(robot_id: str, event: str, data: Dict[str, Any]) -> bytes:
+    """ワーカー間で中継するイベントのペイロードをエンコード"""
+    return json.dumps({"robot_id": robot_id, "event": event, "data": data}).encode()
+
+
+def decode_event(payload: bytes) -> Tuple[str, str, Dict[str, Any]]:
+    """ワーカー間で中継したイベントのペイロードをデコード"""
+    message = json.loads(payload)
+    return message["robot_id"], message["event"], message["data"]
+
+
+class _FileLock:
+    """flockによるプロセス間の排他ロック（プロセスが終了すると自動的に解放される）"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd: Optional[int] = None
+
+    @property
+    def held(self) -> bool:
+        return self._fd is not None
+
+    def try_acquire(self) -> bool:
+        """ロックの獲得を試みる（待機しない）"""
+        if self._fd is not None:
+            return True
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        return True
+
+    def release(self):
+        """ロックを解放"""
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+
+class FanoutTransport(ABC):
+    """ワーカー間で位置更新を配布するトランスポート
+
+    リーダー（gRPCを受信するワーカー）は位置更新を publish し、フォロワーは受信した
+    位置更新を on_position に渡す。ストリームの欠落・再同期などロボットに関するイベントも
+    同様に publish_event で送信し、フォロワーは on_event に渡す。ワーカーの状態は send_stats で
+    全ワーカーに届き、on_stats に渡される。リーダー選出もトランスポートが担う（同一ホストならファイルロック、
+    外部ブローカーならブローカーのロックなど、配布方法に合った方法で行うため）。
+    """
+
+    def __init__(self):
+        self.on_position: Optional[PositionHandler] = None
+        self.on_stats: Optional[StatsHandler] = None
+        self.on_event: Optional[EventHandler] = None
+
+    @abstractmethod
+    def try_acquire_leadership(self) -> bool:
+        """リーダーの獲得を試みる（待機しない）"""
+
+    @abstractmethod
+    async def start(self):
+        """フォロワーとして受信を開始"""
+
+    @abstractmethod
+    async def promote(self):
+        """リーダーとして配布を開始（フォロワーとしての受信は停止する）"""
+
+    @abstractmethod
+    def publish(self, position: PositionFrame):
+        """位置更新をすべてのフォロワーに送信（リーダーのみ、待機しない）"""
+
+    @abstractmethod
+    def publish_event(self, robot_id: str, event: str, data: Dict[str, Any]):
+        """ロボットに関するイベントをすべてのフォロワーに送信（リーダーのみ、待機しない）"""
+
+    @abstractmethod
+    def send_stats(self, stats: Dict[str, Any]):
+        """ワーカーの状態を自分を含むすべてのワーカーに送信（待機しない）"""
+
+    @abstractmethod
+    async def stop(self):
+        """送受信を停止し、リーダーの場合はリーダーを手放す"""
+
+    def _deliver_position(self, position: PositionFrame):
+        if self.on_position is not None:
+            self.on_position(position)
+
+    def _deliver_stats(self, stats: Dict[str, Any]):
+        if self.on_stats is not None:
+            self.on_stats(stats)
+
+    def _deliver_event(self, robot_id: str, event: str, data: Dict[str, Any]):
+        if self.on_event is not None:
+            self.on_event(robot_id, event, data)
+
+
+class LocalHub:
+    """LocalTransport を相互に接続するプロセス内のハブ"""
+
+    def __init__(self):
+        self.transports: List["LocalTransport"] = []
+        self.leader: Optional["LocalTransport"] = None
+
+
+class LocalTransport(FanoutTransport):
+    """同じ LocalHub に接続したトランスポート間で配布するプロセス内の実装（テスト用）"""
+
+    def __init__(self, hub: LocalHub):
+        super().__init__()
+        self.hub = hub
+
+    def try_acquire_leadership(self) -> bool:
+        if self.hub.leader is None:
+            self.hub.leader = self
+        return self.hub.leader is self
+
+    async def start(self):
+        if self not in self.hub.transports:
+            self.hub.transports.append(self)
+
+    async def promote(self):
+        await self.start()
+
+    def publish(self, position: PositionFrame):
+        for transport in list(self.hub.transports):
+            if transport is not self:
+                transport._deliver_position(position)
+
+    def publish_event(self, robot_id: str, event: str, data: Dict[str, Any]):
+        for transport in list(self.hub.transports):
+            if transport is not self:
+                transport._deliver_event(robot_id, event, data)
+
+    def send_stats(self, stats: Dict[str, Any]):
+        for transport in list(self.hub.transports):
+            transport._deliver_stats(stats)
+
+    async def stop(self):
+        if self in self.hub.transports:
+            self.hub.transports.remove(self)
+        if self.hub.leader is self:
+            self.hub.leader = None
+
+
+class UnixSocketTransport(FanoutTransport):
+    """同一ホストのワーカー間でUnixドメインソケットを使って配布する実装
+
+    リーダーはソケットのパス + ".lock" のファイルロック（flock）を保持したワーカーで、
+    プロセスが終了するとロックは自動的に解放されるため、別のワーカーが引き継げる。
+    リーダーはソケットで待ち受け、各フォロワーが接続して位置更新を受信する。
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        super().__init__()
+        self.path = path or settings.FANOUT_UNIX_SOCKET
+        self.reconnect_delay = settings.FANOUT_RECONNECT_DELAY_S
+        self.max_buffer = settings.FANOUT_MAX_BUFFER_BYTES
+        self._leader_lock = _FileLock(self.path + ".lock")
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._peers: Set[asyncio.StreamWriter] = set()
+        self._upstream: Optional[asyncio.StreamWriter] = None
+        self._follower_task: Optional[asyncio.Task] = None
+        self._rejected: Set[str] = set()  # 位置レコードにエンコードできなかったロボットID
+
+    def try_acquire_leadership(self) -> bool:
+        return self._leader_lock.try_acquire()
+
+    async def start(self):
+        if self._follower_task is None and self._server is None:
+            self._follower_task = asyncio.create_task(self._follow())
+
+    async def promote(self):
+        if self._follower_task is not None:
+            self._follower_task.cancel()
+            try:
+                await self._follower_task
+            except asyncio.CancelledError:
+                pass
+            self._follower_task = None
+        # ロックを保持しているため、残っているソケットファイルは終了したリーダーのもの
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._server = await asyncio.start_unix_server(self._serve, path=self.path)
+        logger.info(f"ワーカー間配布のソケットで待ち受けを開始: {self.path}")
+
+    def publish(self, position: PositionFrame):
+        if not self._peers:
+            return
+        try:
+            record = position.binary_record
+        except ValueError:
+            if position.robot_id not in self._rejected:
+                self._rejected.add(position.robot_id)
+                logger.warning(f"ロボットIDが長すぎるためワーカー間で配布できません: {position.robot_id}")
+            return
+        self._broadcast(encode_message(MESSAGE_TYPE_POSITION, record))
+
+    def publish_event(self, robot_id: str, event: str, data: Dict[str, Any]):
+        if self._peers:
+            self._broadcast(encode_message(MESSAGE_TYPE_EVENT, encode_event(robot_id, event, data)))
+
+    def send_stats(self, stats: Dict[str, Any]):
+        message = encode_message(MESSAGE_TYPE_STATS, json.dumps(stats).encode())
+        if self._server is not None:
+            self._deliver_stats(stats)
+            self._broadcast(message)
+        elif self._upstream is not None:
+            self._upstream.write(message)
+
+    async def stop(self):
+        if self._follower_task is not None:
+            self._follower_task.cancel()
+            try:
+                await self._follower_task
+            except asyncio.CancelledError:
+                pass
+            self._follower_task = None
+        if self._server is not None:
+            self._server.close()
+            for writer in list(self._peers):
+                writer.close()
+            self._peers.clear()
+            await self._server.wait_closed()
+            self._server = None
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+        self._leader_lock.release()
+
+    def _broadcast(self, message: bytes):
+        """すべてのフォロワーに送信（送信バッファが溢れたフォロワーは切断し、再接続させる）"""
+        for writer in list(self._peers):
+            if writer.transport.get_write_buffer_size() > self.max_buffer:
+                logger.warning("送信バッファが溢れたため、遅いワーカーを切断します")
+                self._peers.discard(writer)
+                writer.transport.abort()
+                continue
+            writer.write(message)
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """フォロワーの接続を登録し、フォロワーから届いた状態を全ワーカーに中継"""
+        self._peers.add(writer)
+        try:
+            while True:
+                message_type, payload = await self._read_message(reader)
+                if message_type == MESSAGE_TYPE_STATS:
+                    self._deliver_stats(json.loads(payload))
+                    self._broadcast(encode_message(message_type, payload))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._peers.discard(writer)
+            writer.close()
+
+    async def _follow(self):
+        """リーダーに接続して受信（切断された場合はリーダーが替わるまで再接続を繰り返す）"""
+        while True:
+            try:
+                reader, writer = await asyncio.open_unix_connection(self.path)
+            except (FileNotFoundError, ConnectionError):
+                await asyncio.sleep(self.reconnect_delay)
+                continue
+
+            self._upstream = writer
+            try:
+                while True:
+                    message_type, payload = await self._read_message(reader)
+                    if message_type == MESSAGE_TYPE_POSITION:
+                        position, _ = PositionFrame.from_binary_record(payload)
+                        self._deliver_position(position)
+                    elif message_type == MESSAGE_TYPE_EVENT:
+                        self._deliver_event(*decode_event(payload))
+                    elif message_type == MESSAGE_TYPE_STATS:
+                        self._deliver_stats(json.loads(payload))
+            except (asyncio.IncompleteReadError, ConnectionError):
+                logger.info("リーダーとの接続が切断されました。再接続します")
+            finally:
+                self._upstream = None
+                writer.close()
+            await asyncio.sleep(self.reconnect_delay)
+
+    @staticmethod
+    async def _read_message(reader: asyncio.StreamReader):
+        """ワーカー間メッセージを1つ読み出す"""
+        header = await reader.readexactly(_MESSAGE_HEADER_STRUCT.size)
+        message_type, length = _MESSAGE_HEADER_STRUCT.unpack(header)
+        return message_type, await reader.readexactly(length)
+
+
+class SharedMemoryTransport(FanoutTransport):
+    """同一ホストのワーカー間で共有メモリのリングバッファを使って配布する実装
+
+    リーダーがリングバッファに固定長の位置レコードを書き込み、各フォロワーは自分の
+    カーソルで定期的に読み出す。ソケットやシリアライズを介さないため、ワーカー数が
+    増えてもリーダーの負荷は変わらない。ワーカーの状態はワーカーごとのスロットに書き込み、
+    更新されたスロットを読み出して共有する。ロボットに関するイベントは位置とは別のイベント用の
+    リングバッファに書き込み、フォロワーは位置と同じく自分のカーソルで読み出す。リーダー選出は UnixSocketTransport と同じく
+    ファイルロックで行う。
+    """
+
+    def __init__(self, name: Optional[str] = None):
+        super().__init__()
+        self.name = name or settings.FANOUT_SHM_NAME
+        self.capacity = settings.FANOUT_SHM_CAPACITY
+        self.worker_slots = settings.FANOUT_SHM_WORKER_SLOTS
+        self.poll_interval = settings.FANOUT_SHM_POLL_INTERVAL_S
+        self.ring: Optional[PositionRing] = None
+        self.cursor = 0  # 次に読み出すレコードのシーケンス番号
+        self.event_cursor = 0  # 次に読み出すイベントのシーケンス番号
+        self.missed = 0  # 読み遅れによって上書きされたレコード数
+        lock_dir = tempfile.gettempdir()
+        self._leader_lock = _FileLock(os.path.join(lock_dir, self.name + ".lock"))
+        self._slots_lock = os.path.join(lock_dir, self.name + ".slots.lock")
+        self._slot: Optional[int] = None
+        self._stats_seen: Dict[int, int] = {}  # ワーカースロット→最後に読み出したシーケンス番号
+        self._rejected: Set[str] = set()  # リングバッファに書き込めなかったロボットID
+        self._reader_task: Optional[asyncio.Task] = None
+
+    def try_acquire_leadership(self) -> bool:
+        return self._leader_lock.try_acquire()
+
+    async def start(self):
+        if self._reader_task is None and not self._leader_lock.held:
+            self._reader_task = asyncio.create_task(self._follow())
+
+    async def promote(self):
+        await self._stop_reader()
+        if self.ring is not None:
+            self.ring.close()
+        # 既存のリングバッファはシーケンス番号を引き継ぐため、フォロワーのカーソルはそのまま使える
+        self.ring = PositionRing.create(self.name, self.capacity, self.worker_slots)
+        self._slot = None
+        logger.info(f"共有メモリのリングバッファへの書き込みを開始: {self.name}")
+
+    def publish(self, position: PositionFrame):
+        if self.ring is None:
+            return
+        if not self.ring.write(position) and position.robot_id not in self._rejected:
+            self._rejected.add(position.robot_id)
+            logger.warning(f"ロボットIDが長すぎるため共有メモリに書き込めません: {position.robot_id}")
+
+    def publish_event(self, robot_id: str, event: str, data: Dict[str, Any]):
+        if self.ring is None:
+            return
+        if not self.ring.write_event(encode_event(robot_id, event, data)):
+            logger.warning("イベントが大きすぎるため共有メモリに書き込めません: %s (%s)", event, robot_id)
+
+    def send_stats(self, stats: Dict[str, Any]):
+        ring = self.ring
+        if ring is None:
+            return
+        if self._slot is None:
+            self._slot = self._claim_slot()
+            if self._slot is None:
+                logger.warning("ワーカースロットに空きがないため、状態を共有できません")
+                return
+        ring.write_stats(self._slot, os.getpid(), json.dumps(stats).encode())
+
+        # 前回から更新されたスロット（自分を含む）の状態を受け取る
+        for slot in range(ring.worker_slots):
+            entry = ring.read_stats(slot)
+            if entry is None:
+                continue
+            sequence, payload = entry
+            if self._stats_seen.get(slot) != sequence:
+                self._stats_seen[slot] = sequence
+                self._deliver_stats(json.loads(payload))
+
+    async def stop(self):
+        await self._stop_reader()
+        if self.ring is not None:
+            if self._slot is not None:
+                self.ring.release_worker_slot(self._slot)
+                self._slot = None
+            self.ring.close()
+            self.ring = None
+        self._leader_lock.release()
+
+    async def _stop_reader(self):
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            try:
+                await self._reader_task
+            except asyncio.CancelledError:
+                pass
+            self._reader_task = None
+
+    def _claim_slot(self) -> Optional[int]:
+        """ワーカースロットを確保（確保の間は他のワーカーと排他する）"""
+        fd = os.open(self._slots_lock, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            return self.ring.claim_worker_slot(os.getpid())
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    async def _follow(self):
+        """リングバッファに接続し、新しいレコードを定期的に読み出す"""
+        while self.ring is None:
+            try:
+                self.ring = PositionRing.attach(self.name)
+            except (FileNotFoundError, ValueError):
+                await asyncio.sleep(self.poll_interval)
+        # 接続した時点以降のレコードとイベントのみ受信
+        self.cursor = self.ring.sequence
+        self.event_cursor = self.ring.event_sequence
+
+        while True:
+            positions, self.cursor, missed = self.ring.read(self.cursor)
+            if missed:
+                self.missed += missed
+                logger.warning("共有メモリの読み遅れにより %d 件のレコードを読み飛ばしました", missed)
+            for position in positions:
+                self._deliver_position(position)
+            events, self.event_cursor, missed = self.ring.read_events(self.event_cursor)
+            if missed:
+                logger.warning("共有メモリの読み遅れにより %d 件のイベントを読み飛ばしました", missed)
+            for payload in events:
+                self._deliver_event(*decode_event(payload))
+            await asyncio.sleep(self.poll_interval)
+
+
+def create_transport(name: str) -> Optional[FanoutTransport]:
+    """設定に対応するトランスポートを作成（none の場合は None）"""
+    if name == "unix":
+        return UnixSocketTransport()
+    if name == "shm":
+        return SharedMemoryTransport()
+    return None
+
+
+class FanoutCoordinator:
+    """複数ワーカー構成での役割（ingester / follower）と位置更新の流れを管理するクラス
+
+    リーダーに選ばれたワーカー（ingester）だけがgRPCを受信して位置バスに発行し、
+    位置バスの内容をトランスポートで他のワーカーに配布する。それ以外のワーカー（follower）は
+    トランスポートから受信した位置を自分の位置バスに発行する。どちらの場合も
+    WebSocketへの配信は各ワーカーが自分の接続に対して行う。
+    """
+
+    def __init__(
+        self,
+        transport: FanoutTransport,
+        bus: PositionBus,
+        worker_id: Optional[str] = None,
+    ):
+        self.transport = transport
+        self.bus = bus
+        self.stats_provider: Optional[Callable[[], Dict[str, Any]]] = None
+        self.event_handler: Optional[EventHandler] = None
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.role = "follower"
+        self.election_interval = settings.FANOUT_ELECTION_INTERVAL_S
+        self.stats_interval = settings.FANOUT_STATS_INTERVAL_S
+        # ワーカーID→(最後に受信した状態, 受信時刻)
+        self._workers: Dict[str, Any] = {}
+        self._on_elected: Optional[Callable[[], Awaitable[None]]] = None
+        self._subscription: Optional[Subscription] = None
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def is_ingester(self) -> bool:
+        return self.role == "ingester"
+
+    async def start(
+        self,
+        on_elected: Callable[[], Awaitable[None]],
+        stats_provider: Optional[Callable[[], Dict[str, Any]]] = None,
+        event_handler: Optional[EventHandler] = None,
+    ):
+        """役割を決めて配布を開始
+
+        リーダーになった時に on_elected を呼び出す。stats_provider を指定した場合は
+        その結果（接続数など）を定期的に全ワーカーに共有する。event_handler を指定した場合は
+        ingesterが publish_event で中継したイベントを受け取る（followerのみ）。
+        """
+        self._on_elected = on_elected
+        self.stats_provider = stats_provider
+        self.event_handler = event_handler
+        self.transport.on_position = self.bus.publish
+        self.transport.on_stats = self._record_stats
+        self.transport.on_event = self._receive_event
+        if self.transport.try_acquire_leadership():
+            await self._become_ingester()
+        else:
+            await self.transport.start()
+            logger.info(f"followerとして起動しました: {self.worker_id}")
+            self._tasks.append(asyncio.create_task(self._elect()))
+        if self.stats_provider is not None:
+            self._tasks.append(asyncio.create_task(self._report_stats()))
+
+    async def stop(self):
+        """配布を停止"""
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        if self._subscription:
+            self._subscription.close()
+            self._subscription = None
+        await self.transport.stop()
+        self.role = "follower"
+
+    async def _elect(self):
+        """リーダーが不在になるまで待機し、リーダーを引き継ぐ"""
+        while not self.transport.try_acquire_leadership():
+            await asyncio.sleep(self.election_interval)
+        await self._become_ingester()
+
+    async def _become_ingester(self):
+        """リーダーとして配布を開始し、gRPCの受信を始める"""
+        await self.transport.promote()
+        self.role = "ingester"
+        self._subscription = self.bus.subscribe("fanout")
+        self._tasks.append(asyncio.create_task(self._forward()))
+        logger.info(f"ingesterに選出されました: {self.worker_id}")
+        if self._on_elected is not None:
+            await self._on_elected()
+
+    async def _forward(self):
+        """位置バスの内容を他のワーカーに配布"""
+        subscription = self._subscription
+        while subscription and not subscription.closed:
+            # ワーカー間は位置ごとのレコードで配布するため、まとめて受信した位置はここで展開する
+            for position in iter_positions(await subscription.get()):
+                try:
+                    self.transport.publish(position)
+                except Exception as e:
+                    # 1件の配布に失敗しても、以降の位置はfollowerに配布し続ける
+                    logger.error("位置のワーカー間配布中にエラーが発生: %s", e)
+
+    def publish_event(self, robot_id: str, event: str, data: Dict[str, Any]):
+        """ingesterで発生したロボットに関するイベントを他のワーカーに中継"""
+        if self.is_ingester:
+            self.transport.publish_event(robot_id, event, data)
+
+    def _receive_event(self, robot_id: str, event: str, data: Dict[str, Any]):
+        """ingesterから中継されたイベントを自分のクライアントに通知"""
+        if self.event_handler is None:
+            return
+        try:
+            self.event_handler(robot_id, event, data)
+        except Exception as e:
+            logger.error("中継されたイベントの処理中にエラーが発生: %s", e)
+
+    async def _report_stats(self):
+        """自分の状態を定期的に全ワーカーに送信"""
+        while True:
+            stats = {"worker": self.worker_id, "role": self.role, **self.stats_provider()}
+            self.transport.send_stats(stats)
+            await asyncio.sleep(self.stats_interval)
+
+    def _record_stats(self, stats: Dict[str, Any]):
+        """他のワーカー（と自分）の状態を記録"""
+        worker = stats.get("worker")
+        if worker:
+            self._workers[worker] = (stats, time.monotonic())
+
+    def cluster_status(self) -> Dict[str, Any]:
+        """直近に状態を報告したワーカーの一覧と接続数の合計"""
+        deadline = time.monotonic() - 3 * self.stats_interval
+        # 報告が途絶えたワーカーは終了したものとして破棄
+        for worker, (_, received) in list(self._workers.items()):
+            if received < deadline:
+                del self._workers[worker]
+        workers = [stats for stats, _ in self._workers.values()]
+        return {
+            "workers": sorted(workers, key=lambda stats: stats["worker"]),
+            "connections": sum(stats.get("connections", 0) for stats in workers),
+        }
+
+
+# グローバル配布コーディネーター（FANOUT_TRANSPORT が none の場合は None）
+_transport = create_transport(settings.FANOUT_TRANSPORT)
+fanout_coordinator = FanoutCoordinator(_transport, position_bus) if _transport else None
@@ -0,0 +1,251 @@
+import asyncio
+import bisect
+import itertools
+import logging
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.schemas.frames import PositionArrays, PositionFrame
+from app.services.position_bus import PositionBus, Subscription
+
+logger = logging.getLogger(__name__)
+
+# RobotHistory の作成ごとに割り当てる通し番号（破棄されて作り直された履歴を区別するため）
+_generations = itertools.count(1)
+
+
+class _TimestampView:
+    """リングバッファのタイムスタンプを古い順のシーケンスとして見せるビュー（bisect用）"""
+
+    __slots__ = ("_history",)
+
+    def __init__(self, history: "RobotHistory"):
+        self._history = history
+
+    def __len__(self) -> int:
+        return self._history.size
+
+    def __getitem__(self, index: int) -> int:
+        history = self._history
+        return history.timestamps[(history.start + index) % history.capacity]
+
+
+class RobotHistory:
+    """1台のロボットの位置履歴を保持するリングバッファ
+
+    x / y は float32、timestamp は int64 の配列で保持し、1点あたり16バイトに収める。
+    タイムスタンプは単調増加を前提とし、範囲検索は二分探索で行う。
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.xs = array("f", bytes(4 * capacity))
+        self.ys = array("f", bytes(4 * capacity))
+        self.timestamps = array("q", bytes(8 * capacity))
+        self.start = 0  # 最も古いデータの位置
+        self.size = 0
+        self.version = 0  # 追加されたデータの累計数（キャッシュの無効化に使用）
+        self.generation = next(_generations)  # 履歴ごとに一意な番号（作り直しの検出に使用）
+        self._view = _TimestampView(self)
+        # まとめて追加する際に書き込むための配列のビュー（バッファを共有し、コピーしない）
+        self._columns = (
+            np.frombuffer(self.xs, dtype=np.float32),
+            np.frombuffer(self.ys, dtype=np.float32),
+            np.frombuffer(self.timestamps, dtype=np.int64),
+        )
+
+    @property
+    def last_timestamp(self) -> Optional[int]:
+        """最新データのタイムスタンプ"""
+        if self.size == 0:
+            return None
+        return self.timestamps[(self.start + self.size - 1) % self.capacity]
+
+    def append(self, x: float, y: float, timestamp: int) -> bool:
+        """位置を追加（満杯の場合は最も古いデータを上書き）"""
+        last = self.last_timestamp
+        if last is not None and timestamp < last:
+            # 順序が逆転したデータは二分探索の前提を崩すため保存しない
+            return False
+
+        if self.size < self.capacity:
+            index = (self.start + self.size) % self.capacity
+            self.size += 1
+        else:
+            index = self.start
+            self.start = (self.start + 1) % self.capacity
+
+        self.xs[index] = x
+        self.ys[index] = y
+        self.timestamps[index] = timestamp
+        self.version += 1
+        return True
+
+    def extend(self, xs: np.ndarray, ys: np.ndarray, timestamps: np.ndarray) -> int:
+        """位置をまとめて追加し、追加した件数を返す（append を順に呼び出した場合と同じ結果になる）"""
+        if not len(timestamps):
+            return 0
+        # それまでに追加した最大のタイムスタンプより小さいデータは append と同じく保存しない
+        floor = np.empty_like(timestamps, dtype=np.int64)
+        floor[0] = timestamps[0]
+        np.maximum.accumulate(timestamps[:-1], out=floor[1:])
+        last = self.last_timestamp
+        if last is not None:
+            np.maximum(floor, last, out=floor)
+        keep = timestamps >= floor
+        if not keep.all():
+            xs, ys, timestamps = xs[keep], ys[keep], timestamps[keep]
+        count = len(timestamps)
+        if not count:
+            return 0
+
+        # 容量を超える分は上書きされるため、最後の capacity 件だけを書き込む
+        capacity = self.capacity
+        written = min(count, capacity)
+        first = (self.start + self.size + count - written) % capacity
+        head = min(written, capacity - first)
+        for column, values in zip(self._columns, (xs, ys, timestamps)):
+            values = values[count - written:]
+            column[first:first + head] = values[:head]
+            column[:written - head] = values[head:]
+        size = min(capacity, self.size + count)
+        self.start = (self.start + self.size + count - size) % capacity
+        self.size = size
+        self.version += count
+        return count
+
+    def index_range(self, since: Optional[int] = None, until: Optional[int] = None) -> Tuple[int, int]:
+        """since <= timestamp <= until を満たすデータの論理インデックス範囲 [lo, hi)"""
+        lo = 0 if since is None else bisect.bisect_left(self._view, since)
+        hi = self.size if until is None else bisect.bisect_right(self._view, until)
+        return lo, max(lo, hi)
+
+    def slice(self, lo: int, hi: int) -> Tuple[array, array, array]:
+        """論理インデックス範囲 [lo, hi) のデータを配列のコピーで取得"""
+        first = (self.start + lo) % self.capacity
+        last = first + (hi - lo)
+        if last <= self.capacity:
+            return self.xs[first:last], self.ys[first:last], self.timestamps[first:last]
+        wrap = last - self.capacity
+        return (
+            self.xs[first:] + self.xs[:wrap],
+            self.ys[first:] + self.ys[:wrap],
+            self.timestamps[first:] + self.timestamps[:wrap],
+        )
+
+    def query(
+        self,
+        since: Optional[int] = None,
+        until: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> Tuple[array, array, array]:
+        """時間範囲内のデータを取得（limit を指定した場合は新しい方から limit 件）"""
+        lo, hi = self.index_range(since, until)
+        if limit is not None:
+            lo = max(lo, hi - limit)
+        return self.slice(lo, hi)
+
+    def frames(self, lo: int, hi: int, robot_id: str = "") -> List[PositionFrame]:
+        """論理インデックス範囲 [lo, hi) のデータを位置フレームとして取得"""
+        xs, ys, timestamps = self.slice(lo, hi)
+        return [PositionFrame(x, y, ts, robot_id) for x, y, ts in zip(xs, ys, timestamps)]
+
+
+class PositionHistory:
+    """ロボットごとの位置履歴を管理するクラス
+
+    ロボットごとの保持件数（HISTORY_CAPACITY）と保持するロボット数（HISTORY_MAX_ROBOTS）の
+    両方に上限を設け、フリート規模でもメモリ使用量が一定以下に収まるようにする。
+    上限を超えた場合は最も長く更新されていないロボットの履歴を破棄する。
+    """
+
+    def __init__(self, capacity: Optional[int] = None, max_robots: Optional[int] = None):
+        self.capacity = capacity or settings.HISTORY_CAPACITY
+        self.max_robots = max_robots or settings.HISTORY_MAX_ROBOTS
+        self._robots: "OrderedDict[str, RobotHistory]" = OrderedDict()
+        self._subscription: Optional[Subscription] = None
+        self._consumer_task: Optional[asyncio.Task] = None
+
+    def start(self, bus: PositionBus):
+        """位置バスの購読を開始し、受信した位置を履歴に追加する"""
+        if self._consumer_task is not None:
+            return
+        self._subscription = bus.subscribe("history")
+        self._consumer_task = asyncio.create_task(self._consume())
+
+    async def stop(self):
+        """位置バスの購読を停止"""
+        if self._subscription:
+            self._subscription.close()
+            self._subscription = None
+        if self._consumer_task:
+            self._consumer_task.cancel()
+            try:
+                await self._consumer_task
+            except asyncio.CancelledError:
+                pass
+            self._consumer_task = None
+
+    async def _consume(self):
+        """位置バスから読み出した位置を履歴に追加（まとめて受信した位置は配列のまま追加）"""
+        subscription = self._subscription
+        while subscription and not subscription.closed:
+            for item in await subscription.get():
+                if isinstance(item, PositionArrays):
+                    self.add_arrays(item)
+                else:
+                    self.add(item)
+
+    def _history_for(self, robot_id: str) -> RobotHistory:
+        """ロボットの履歴を取得（なければ作成し、上限を超えた場合は最も古いロボットの履歴を破棄）"""
+        history = self._robots.get(robot_id)
+        if history is None:
+            history = RobotHistory(self.capacity)
+            self._robots[robot_id] = history
+            if len(self._robots) > self.max_robots:
+                evicted, _ = self._robots.popitem(last=False)
+                logger.warning("保持するロボット数が上限に達したため履歴を破棄しました: %s", evicted)
+        else:
+            self._robots.move_to_end(robot_id)
+        return history
+
+    def add(self, position: PositionFrame):
+        """位置を履歴に追加"""
+        self._history_for(position.robot_id).append(position.x, position.y, position.timestamp)
+
+    def add_arrays(self, arrays: PositionArrays):
+        """まとめて受信した1ロボット分の位置を履歴に追加"""
+        if len(arrays):
+            self._history_for(arrays.robot_id).extend(arrays.x, arrays.y, arrays.timestamp)
+
+    def get(self, robot_id: str) -> Optional[RobotHistory]:
+        """ロボットの履歴を取得"""
+        return self._robots.get(robot_id)
+
+    @property
+    def robot_ids(self) -> List[str]:
+        """履歴を保持しているロボットID一覧"""
+        return list(self._robots.keys())
+
+    def latest(self, robot_id: str, count: int) -> List[PositionFrame]:
+        """ロボットの最新 count 件を位置フレームとして取得（古い順）"""
+        history = self._robots.get(robot_id)
+        if history is None or count <= 0:
+            return []
+        return history.frames(max(0, history.size - count), history.size, robot_id)
+
+    def stats(self) -> Dict[str, int]:
+        """保持状況の概要"""
+        return {
+            "robots": len(self._robots),
+            "points": sum(history.size for history in self._robots.values()),
+            "capacity_per_robot": self.capacity,
+        }
+
+
+# グローバル位置履歴インスタンス
+position_history = PositionHistory()
@@ -0,0 +1,162 @@
+import logging
+import math
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple, Type
+
+from app.config import settings
+from app.schemas.frames import PositionFrame
+
+logger = logging.getLogger(__name__)
+
+
+class MotionModel:
+    """1台のロボットの運動モデルの基底クラス
+
+    観測した位置から速度（1秒あたりの移動量）を推定する。クライアントは最後に受信した
+    位置と速度から現在位置を予測するため、サーバーとクライアントの予測は同じ式で行う
+    （x + vx * 経過秒数）。カルマンフィルターなどのモデルはこのクラスを継承して追加する。
+    """
+
+    name = ""
+
+    __slots__ = ()
+
+    def update(self, x: float, y: float, timestamp: int) -> Tuple[float, float]:
+        """位置を観測し、推定した速度 (vx, vy) を返す"""
+        raise NotImplementedError
+
+
+class ConstantVelocityModel(MotionModel):
+    """等速度モデル（連続する2点から求めた速度を指数移動平均で平滑化）"""
+
+    name = "constant_velocity"
+
+    __slots__ = ("smoothing", "_last", "_velocity")
+
+    def __init__(self, smoothing: float):
+        self.smoothing = smoothing  # 新しい観測の重み（1 は平滑化しない）
+        self._last: Optional[Tuple[float, float, int]] = None
+        self._velocity = (0.0, 0.0)
+
+    def update(self, x: float, y: float, timestamp: int) -> Tuple[float, float]:
+        last = self._last
+        self._last = (x, y, timestamp)
+        if last is None:
+            return self._velocity
+        dt = (timestamp - last[2]) / settings.TIMESTAMP_UNITS_PER_SECOND
+        if dt <= 0:
+            return self._velocity
+        alpha = self.smoothing
+        vx, vy = self._velocity
+        self._velocity = (
+            alpha * (x - last[0]) / dt + (1 - alpha) * vx,
+            alpha * (y - last[1]) / dt + (1 - alpha) * vy,
+        )
+        return self._velocity
+
+
+# WS_MOTION_MODEL の値とモデルの対応
+MOTION_MODELS: Dict[str, Type[MotionModel]] = {
+    ConstantVelocityModel.name: ConstantVelocityModel,
+}
+
+
+class MotionTracker:
+    """ロボットごとの運動モデルを管理し、位置フレームに推定した速度を設定するクラス
+
+    保持するロボット数が max_robots（WS_MOTION_MAX_ROBOTS）を超えた場合は最も長く
+    更新されていないロボットの運動モデルを破棄する（再び受信した場合は速度 0 から推定し直す）。
+    """
+
+    def __init__(self, model: str, smoothing: float, max_robots: Optional[int] = None):
+        if model not in MOTION_MODELS:
+            raise ValueError(f"不明な運動モデルです: {model}")
+        self.model = model
+        self.smoothing = smoothing
+        self.max_robots = max_robots or settings.WS_MOTION_MAX_ROBOTS
+        self._models: "OrderedDict[str, MotionModel]" = OrderedDict()
+
+    @classmethod
+    def create(cls, model: str, smoothing: float, max_robots: Optional[int] = None) -> Optional["MotionTracker"]:
+        """model が none の場合は運動モデルを使用しないため None を返す"""
+        if model == "none":
+            return None
+        return cls(model, smoothing, max_robots)
+
+    def update(self, position: PositionFrame):
+        """位置を観測し、位置フレームの vx / vy に推定した速度を設定"""
+        model = self._models.get(position.robot_id)
+        if model is None:
+            model = MOTION_MODELS[self.model](self.smoothing)
+            self._models[position.robot_id] = model
+            if len(self._models) > self.max_robots:
+                evicted, _ = self._models.popitem(last=False)
+                logger.warning("保持するロボット数が上限に達したため運動モデルを破棄しました: %s", evicted)
+        else:
+            self._models.move_to_end(position.robot_id)
+        position.vx, position.vy = model.update(position.x, position.y, position.timestamp)
+
+    def remove(self, robot_id: str):
+        """ロボットの運動モデルを破棄"""
+        self._models.pop(robot_id, None)
+
+    def __len__(self) -> int:
+        return len(self._models)
+
+
+class DeadReckoningFilter:
+    """クライアントの予測位置から外れた位置更新のみを通すフィルター（デッドレコニング）
+
+    ロボットごとに最後に送信した位置・速度・タイムスタンプを保持し、クライアントと同じ
+    等速度の外挿で予測した位置との距離が tolerance を超えた場合か、前回の送信から
+    タイムスタンプで max_interval 以上経過した場合のみ送信する。
+
+    間引き条件（min_distance / min_interval）を指定した場合は、予測位置との誤差が
+    min_distance 未満の更新と、前回の送信から min_interval 未満の更新も送信しない。
+    予測位置との誤差で判定するため、停止したロボットのように予測から外れ続ける場合も必ず送信する。
+    """
+
+    __slots__ = (
+        "tolerance", "max_interval_ms", "max_interval", "min_distance", "min_interval", "_units_per_second",
+        "_seconds_per_unit", "_last_sent",
+    )
+
+    def __init__(self, tolerance: float, max_interval_ms: int, min_distance: float = 0.0, min_interval: float = 0.0):
+        units_per_second = settings.TIMESTAMP_UNITS_PER_SECOND
+        self.tolerance = tolerance
+        self.max_interval_ms = max_interval_ms
+        self.max_interval = max_interval_ms * units_per_second / 1000  # タイムスタンプの単位
+        self._units_per_second = units_per_second
+        self._seconds_per_unit = 1 / units_per_second
+        self._last_sent: Dict[str, Tuple[float, float, float, float, int]] = {}
+        self.min_distance = 0.0
+        self.min_interval = 0.0  # タイムスタンプの単位
+        self.set_dead_band(min_distance, min_interval)
+
+    def set_dead_band(self, min_distance: float, min_interval: float):
+        """間引き条件（最小誤差、最小送信間隔（秒））を変更（最後に送信した状態は維持する）"""
+        self.min_distance = min_distance
+        self.min_interval = min_interval * self._units_per_second
+
+    @property
+    def threshold(self) -> float:
+        """送信する予測位置との誤差（クライアントに表示される誤差の上限）"""
+        return max(self.tolerance, self.min_distance)
+
+    def accept(self, position: PositionFrame) -> bool:
+        """位置更新を送信するか判定し、送信する場合は最後に送信した状態として記録"""
+        last = self._last_sent.get(position.robot_id)
+        if last is not None:
+            x, y, vx, vy, timestamp = last
+            elapsed = position.timestamp - timestamp
+            if 0 <= elapsed < self.min_interval:
+                return False
+            if 0 <= elapsed < self.max_interval:
+                seconds = elapsed * self._seconds_per_unit
+                error = math.hypot(position.x - (x + vx * seconds), position.y - (y + vy * seconds))
+                if error <= self.threshold:
+                    return False
+        self._last_sent[position.robot_id] = (
+            position.x, position.y, position.vx or 0.0, position.vy or 0.0, position.timestamp
+        )
+        return True
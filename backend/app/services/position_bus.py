@@ -0,0 +1,146 @@
+import asyncio
+import logging
+from typing import Any, List, Optional
+
+from app.config import settings
+from app.core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """位置バスの購読者 - 自分専用のカーソルで独立して読み進める"""
+
+    def __init__(self, bus: "PositionBus", name: str):
+        self.name = name
+        self.cursor = bus.sequence  # 購読開始以降のデータのみ受信
+        self.missed = 0  # 読み遅れによって上書きされたデータ数
+        self.closed = False
+        self._bus = bus
+
+    @property
+    def lag(self) -> int:
+        """未読データ数"""
+        return self._bus.sequence - self.cursor
+
+    def poll(self, max_items: Optional[int] = None) -> List[Any]:
+        """未読データを待機せずに取得"""
+        bus = self._bus
+        end = bus.sequence
+        if end == self.cursor:
+            return []
+
+        # リングバッファを一周以上遅れた場合、上書きされた分を読み飛ばす
+        oldest = end - bus.capacity
+        if self.cursor < oldest:
+            skipped = oldest - self.cursor
+            self.missed += skipped
+            self.cursor = oldest
+            logger.warning("購読者 %s が読み遅れたため %d 件のデータを読み飛ばしました", self.name, skipped)
+
+        if max_items is not None:
+            end = min(end, self.cursor + max_items)
+        items = bus.read(self.cursor, end)
+        self.cursor = end
+        return items
+
+    async def get(self, max_items: Optional[int] = None) -> List[Any]:
+        """未読データを取得（未読がない場合は新しいデータが発行されるまで待機）"""
+        while not self.closed:
+            items = self.poll(max_items)
+            if items:
+                return items
+            await self._bus.wait_for_publish()
+        return []
+
+    def close(self):
+        """購読を終了"""
+        self.closed = True
+        self._bus.unsubscribe(self)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Any:
+        items = await self.get(max_items=1)
+        if not items:
+            raise StopAsyncIteration
+        return items[0]
+
+
+class PositionBus:
+    """gRPC受信とブロードキャストを分離するためのプロセス内pub/subバス
+
+    単一プロデューサーが固定長のリングバッファに書き込み、各購読者は
+    それぞれのカーソルで自分のペースで読み出す。発行は待機しないため、
+    遅い購読者がgRPCストリームの読み取りを遅らせることはない。
+    """
+
+    def __init__(self, capacity: Optional[int] = None):
+        self.capacity = capacity or settings.POSITION_BUS_CAPACITY
+        self.sequence = 0  # 次に書き込まれるデータのシーケンス番号
+        self._buffer: List[Any] = [None] * self.capacity
+        self._subscriptions: List[Subscription] = []
+        self._published: Optional[asyncio.Event] = None
+
+    def publish(self, item: Any):
+        """データを発行（待機しない）"""
+        self._buffer[self.sequence % self.capacity] = item
+        self.sequence += 1
+
+        # 待機中の購読者がいる場合のみ起こす
+        if self._published is not None:
+            self._published.set()
+            self._published = None
+
+    def read(self, start: int, end: int) -> List[Any]:
+        """シーケンス番号 [start, end) のデータを取得"""
+        capacity = self.capacity
+        first = start % capacity
+        last = first + (end - start)
+        if last <= capacity:
+            return self._buffer[first:last]
+        return self._buffer[first:] + self._buffer[:last - capacity]
+
+    async def wait_for_publish(self):
+        """次のデータが発行されるまで待機"""
+        if self._published is None:
+            self._published = asyncio.Event()
+        await self._published.wait()
+
+    def subscribe(self, name: str) -> Subscription:
+        """新しい購読者を登録"""
+        subscription = Subscription(self, name)
+        self._subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        """購読者の登録を解除"""
+        if subscription in self._subscriptions:
+            self._subscriptions.remove(subscription)
+        # 待機中の購読者を起こして終了させる
+        if self._published is not None:
+            self._published.set()
+            self._published = None
+
+    @property
+    def subscriptions(self) -> List[Subscription]:
+        """登録中の購読者一覧"""
+        return list(self._subscriptions)
+
+
+# グローバル位置バスインスタンス
+position_bus = PositionBus()
+
+registry.gauge_callback(
+    "robot_bus_subscriber_lag",
+    "位置バスの購読者ごとの未読データ数",
+    ("subscriber",),
+    lambda: [((subscription.name,), subscription.lag) for subscription in position_bus.subscriptions],
+)
+registry.gauge_callback(
+    "robot_bus_subscriber_missed",
+    "位置バスの購読者ごとの読み遅れで読み飛ばしたデータ数",
+    ("subscriber",),
+    lambda: [((subscription.name,), subscription.missed) for subscription in position_bus.subscriptions],
+)
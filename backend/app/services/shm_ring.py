@@ -0,0 +1,306 @@
+import logging
+import os
+import struct
+from multiprocessing import resource_tracker, shared_memory
+from typing import List, Optional, Tuple
+
+from app.schemas.frames import PositionFrame
+
+logger = logging.getLogger(__name__)
+
+# 共有メモリのレイアウト:
+#   ヘッダー(64バイト): マジック(4s) + バージョン(uint32) + 容量(uint32) + ワーカースロット数(uint32)
+#                       + 書き込み済みシーケンス番号(uint64, オフセット16)
+#                       + 書き込み済みイベントのシーケンス番号(uint64, オフセット24)
+#   位置スロット: 容量 × 64バイト
+#     スロットのシーケンス番号(uint64) + timestamp(int64) + x(float32) + y(float32)
+#     + ロボットIDの長さ(uint8) + ロボットID(UTF-8, 39バイト)
+#   ワーカースロット: ワーカースロット数 × 1024バイト（各ワーカーの状態のJSON）
+#     シーケンス番号(uint64, 書き込み中は奇数) + pid(int64) + 長さ(uint32) + JSON
+#   イベントスロット: EVENT_SLOTS × 512バイト（ロボットに関するイベントのJSON、位置スロットと同じリングバッファ）
+#     スロットのシーケンス番号(uint64) + 長さ(uint32) + JSON
+MAGIC = b"RPOS"
+VERSION = 2
+HEADER_SIZE = 64
+RECORD_SIZE = 64
+STATS_SLOT_SIZE = 1024
+EVENT_SLOTS = 64  # イベントは位置より桁違いに少ないため、固定の件数で足りる
+EVENT_SLOT_SIZE = 512
+MAX_ROBOT_ID_BYTES = 39
+
+_HEADER_STRUCT = struct.Struct("<4sIII")
+_SEQUENCE_STRUCT = struct.Struct("<Q")
+_SEQUENCE_OFFSET = 16
+_EVENT_SEQUENCE_OFFSET = 24
+_RECORD_STRUCT = struct.Struct(f"<qffB{MAX_ROBOT_ID_BYTES}s")
+_STATS_HEADER_STRUCT = struct.Struct("<QqI")
+_MAX_STATS_BYTES = STATS_SLOT_SIZE - _STATS_HEADER_STRUCT.size
+_EVENT_HEADER_STRUCT = struct.Struct("<QI")
+_MAX_EVENT_BYTES = EVENT_SLOT_SIZE - _EVENT_HEADER_STRUCT.size
+
+
+def _open_shared_memory(name: str, create: bool = False, size: int = 0) -> shared_memory.SharedMemory:
+    """resource_tracker に登録せずに共有メモリを開く
+
+    登録されているとプロセスの終了時に共有メモリが破棄され、他のワーカーが読めなくなるため。
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, create=create, size=size, track=False)
+    except TypeError:  # pragma: no cover - Python 3.12以前は track 引数がない
+        pass
+    register = resource_tracker.register
+    resource_tracker.register = lambda *args, **kwargs: None
+    try:
+        return shared_memory.SharedMemory(name=name, create=create, size=size)
+    finally:
+        resource_tracker.register = register
+
+
+def _unlink_shared_memory(shm: shared_memory.SharedMemory):
+    """resource_tracker を介さずに共有メモリを破棄（登録していないため）"""
+    unregister = resource_tracker.unregister
+    resource_tracker.unregister = lambda *args, **kwargs: None
+    try:
+        shm.unlink()
+    finally:
+        resource_tracker.unregister = unregister
+
+
+def _pid_alive(pid: int) -> bool:
+    """プロセスが存在するか"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class PositionRing:
+    """共有メモリ上の固定長位置レコードのリングバッファ
+
+    書き込みは1プロセス（ingester）のみで、ロックは使用しない。書き込み側はスロットの
+    シーケンス番号を0にしてからレコードを書き、最後にシーケンス番号を設定する。読み出し側は
+    レコードの前後でスロットのシーケンス番号を確認し、途中で上書きされたレコードを破棄する。
+    各プロセスは自分のカーソル（シーケンス番号）で独立して読み進める。
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory):
+        self.shm = shm
+        self.buffer = shm.buf
+        magic, version, capacity, worker_slots = _HEADER_STRUCT.unpack_from(self.buffer, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"共有メモリ {shm.name} は位置リングバッファではありません")
+        self.capacity = capacity
+        self.worker_slots = worker_slots
+        self._stats_offset = HEADER_SIZE + capacity * RECORD_SIZE
+        self._events_offset = self._stats_offset + worker_slots * STATS_SLOT_SIZE
+
+    @staticmethod
+    def size_for(capacity: int, worker_slots: int) -> int:
+        """共有メモリに必要なサイズ"""
+        return HEADER_SIZE + capacity * RECORD_SIZE + worker_slots * STATS_SLOT_SIZE + EVENT_SLOTS * EVENT_SLOT_SIZE
+
+    @classmethod
+    def create(cls, name: str, capacity: int, worker_slots: int) -> "PositionRing":
+        """リングバッファを作成（同じ構成のものが既にあればシーケンス番号を引き継いで使用）
+
+        フォロワーは既存の共有メモリに接続しているため、作り直すのは構成が変わった場合のみ。
+        """
+        try:
+            ring = cls.attach(name)
+            if ring.capacity == capacity and ring.worker_slots == worker_slots:
+                return ring
+            logger.warning(f"共有メモリ {name} の構成が異なるため作り直します")
+            ring.unlink()
+        except FileNotFoundError:
+            pass
+        except ValueError:
+            # 以前のバージョンのレイアウトなど、位置リングバッファとして読めない共有メモリは作り直す
+            logger.warning(f"共有メモリ {name} のレイアウトが異なるため作り直します")
+            shm = _open_shared_memory(name)
+            _unlink_shared_memory(shm)
+            shm.close()
+
+        shm = _open_shared_memory(name, create=True, size=cls.size_for(capacity, worker_slots))
+        _HEADER_STRUCT.pack_into(shm.buf, 0, MAGIC, VERSION, capacity, worker_slots)
+        _SEQUENCE_STRUCT.pack_into(shm.buf, _SEQUENCE_OFFSET, 0)
+        _SEQUENCE_STRUCT.pack_into(shm.buf, _EVENT_SEQUENCE_OFFSET, 0)
+        return cls(shm)
+
+    @classmethod
+    def attach(cls, name: str) -> "PositionRing":
+        """既存のリングバッファに接続（存在しない場合は FileNotFoundError）"""
+        shm = _open_shared_memory(name)
+        try:
+            return cls(shm)
+        except ValueError:
+            shm.close()
+            raise
+
+    def close(self):
+        """共有メモリとの接続を閉じる
+
+        共有メモリ自体は他のワーカーが読み続けられるよう残し、次に起動したリーダーが再利用する。
+        """
+        self.buffer = None
+        self.shm.close()
+
+    def unlink(self):
+        """共有メモリを破棄して接続を閉じる"""
+        _unlink_shared_memory(self.shm)
+        self.close()
+
+    @property
+    def sequence(self) -> int:
+        """次に書き込まれるレコードのシーケンス番号"""
+        return _SEQUENCE_STRUCT.unpack_from(self.buffer, _SEQUENCE_OFFSET)[0]
+
+    def write(self, position: PositionFrame) -> bool:
+        """位置レコードを書き込む（ロボットIDが長すぎる場合は書き込まない）"""
+        robot_id = position.robot_id.encode()
+        if len(robot_id) > MAX_ROBOT_ID_BYTES:
+            return False
+        buffer = self.buffer
+        sequence = self.sequence
+        offset = HEADER_SIZE + (sequence % self.capacity) * RECORD_SIZE
+        _SEQUENCE_STRUCT.pack_into(buffer, offset, 0)
+        _RECORD_STRUCT.pack_into(
+            buffer,
+            offset + _SEQUENCE_STRUCT.size,
+            position.timestamp,
+            position.x,
+            position.y,
+            len(robot_id),
+            robot_id,
+        )
+        _SEQUENCE_STRUCT.pack_into(buffer, offset, sequence + 1)
+        _SEQUENCE_STRUCT.pack_into(buffer, _SEQUENCE_OFFSET, sequence + 1)
+        return True
+
+    def read(self, cursor: int, max_items: Optional[int] = None) -> Tuple[List[PositionFrame], int, int]:
+        """cursor 以降のレコードを読み出す
+
+        (位置フレーム, 次のカーソル, 上書きされて読めなかった件数) を返す。
+        """
+        buffer = self.buffer
+        end = self.sequence
+        missed = 0
+        oldest = end - self.capacity
+        if cursor < oldest:
+            missed += oldest - cursor
+            cursor = oldest
+        if max_items is not None:
+            end = min(end, cursor + max_items)
+
+        positions = []
+        unpack_sequence = _SEQUENCE_STRUCT.unpack_from
+        unpack_record = _RECORD_STRUCT.unpack_from
+        for sequence in range(cursor, end):
+            offset = HEADER_SIZE + (sequence % self.capacity) * RECORD_SIZE
+            before = unpack_sequence(buffer, offset)[0]
+            timestamp, x, y, length, robot_id = unpack_record(buffer, offset + _SEQUENCE_STRUCT.size)
+            after = unpack_sequence(buffer, offset)[0]
+            if before != sequence + 1 or after != before:
+                missed += 1
+                continue
+            positions.append(PositionFrame(x, y, timestamp, robot_id[:length].decode()))
+        return positions, end, missed
+
+    @property
+    def event_sequence(self) -> int:
+        """次に書き込まれるイベントのシーケンス番号"""
+        return _SEQUENCE_STRUCT.unpack_from(self.buffer, _EVENT_SEQUENCE_OFFSET)[0]
+
+    def write_event(self, payload: bytes) -> bool:
+        """イベントを書き込む（大きすぎる場合は書き込まない）"""
+        if len(payload) > _MAX_EVENT_BYTES:
+            return False
+        buffer = self.buffer
+        sequence = self.event_sequence
+        offset = self._events_offset + (sequence % EVENT_SLOTS) * EVENT_SLOT_SIZE
+        _EVENT_HEADER_STRUCT.pack_into(buffer, offset, 0, len(payload))
+        start = offset + _EVENT_HEADER_STRUCT.size
+        buffer[start:start + len(payload)] = payload
+        _EVENT_HEADER_STRUCT.pack_into(buffer, offset, sequence + 1, len(payload))
+        _SEQUENCE_STRUCT.pack_into(buffer, _EVENT_SEQUENCE_OFFSET, sequence + 1)
+        return True
+
+    def read_events(self, cursor: int) -> Tuple[List[bytes], int, int]:
+        """cursor 以降のイベントを読み出す
+
+        (イベントのJSON, 次のカーソル, 上書きされて読めなかった件数) を返す。
+        """
+        buffer = self.buffer
+        end = self.event_sequence
+        missed = 0
+        oldest = end - EVENT_SLOTS
+        if cursor < oldest:
+            missed += oldest - cursor
+            cursor = oldest
+
+        events = []
+        for sequence in range(cursor, end):
+            offset = self._events_offset + (sequence % EVENT_SLOTS) * EVENT_SLOT_SIZE
+            before, length = _EVENT_HEADER_STRUCT.unpack_from(buffer, offset)
+            start = offset + _EVENT_HEADER_STRUCT.size
+            payload = bytes(buffer[start:start + length])
+            after = _SEQUENCE_STRUCT.unpack_from(buffer, offset)[0]
+            if before != sequence + 1 or after != before:
+                missed += 1
+                continue
+            events.append(payload)
+        return events, end, missed
+
+    def claim_worker_slot(self, pid: int) -> Optional[int]:
+        """ワーカースロットを確保（空きか、終了したプロセスのスロットを再利用）
+
+        複数のワーカーが同時に確保しないよう、呼び出し側でプロセス間のロックを取ること。
+        """
+        free = None
+        for slot in range(self.worker_slots):
+            offset = self._stats_offset + slot * STATS_SLOT_SIZE
+            _, owner, _ = _STATS_HEADER_STRUCT.unpack_from(self.buffer, offset)
+            if owner == pid:
+                return slot
+            if free is None and (owner == 0 or not _pid_alive(owner)):
+                free = slot
+        if free is not None:
+            offset = self._stats_offset + free * STATS_SLOT_SIZE
+            sequence, _, _ = _STATS_HEADER_STRUCT.unpack_from(self.buffer, offset)
+            _STATS_HEADER_STRUCT.pack_into(self.buffer, offset, sequence + 2 & ~1, pid, 0)
+        return free
+
+    def release_worker_slot(self, slot: int):
+        """ワーカースロットを解放"""
+        offset = self._stats_offset + slot * STATS_SLOT_SIZE
+        sequence, _, _ = _STATS_HEADER_STRUCT.unpack_from(self.buffer, offset)
+        _STATS_HEADER_STRUCT.pack_into(self.buffer, offset, sequence + 2 & ~1, 0, 0)
+
+    def write_stats(self, slot: int, pid: int, payload: bytes) -> bool:
+        """ワーカースロットに状態を書き込む（大きすぎる場合は書き込まない）"""
+        if len(payload) > _MAX_STATS_BYTES:
+            return False
+        buffer = self.buffer
+        offset = self._stats_offset + slot * STATS_SLOT_SIZE
+        sequence, _, _ = _STATS_HEADER_STRUCT.unpack_from(buffer, offset)
+        sequence = sequence + 2 & ~1
+        _STATS_HEADER_STRUCT.pack_into(buffer, offset, sequence - 1, pid, len(payload))
+        start = offset + _STATS_HEADER_STRUCT.size
+        buffer[start:start + len(payload)] = payload
+        _STATS_HEADER_STRUCT.pack_into(buffer, offset, sequence, pid, len(payload))
+        return True
+
+    def read_stats(self, slot: int) -> Optional[Tuple[int, bytes]]:
+        """ワーカースロットの (シーケンス番号, 状態) を取得（未使用か書き込み中の場合は None）"""
+        buffer = self.buffer
+        offset = self._stats_offset + slot * STATS_SLOT_SIZE
+        sequence, owner, length = _STATS_HEADER_STRUCT.unpack_from(buffer, offset)
+        if owner == 0 or length == 0 or sequence & 1:
+            return None
+        start = offset + _STATS_HEADER_STRUCT.size
+        payload = bytes(buffer[start:start + length])
+        if _STATS_HEADER_STRUCT.unpack_from(buffer, offset)[0] != sequence:
+            return None
+        return sequence, payload
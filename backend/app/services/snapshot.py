@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import zlib
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from app.config import settings
+from app.core.serialization import dumps
+from app.schemas.frames import PositionArrays, PositionFrame
+from app.services.position_bus import PositionBus, Subscription
+
+logger = logging.getLogger(__name__)
+
+
+class RobotSnapshot:
+    """1台のロボットの最新位置
+
+    レスポンスの本文と ETag は最初に要求された時に1回だけ作成し、次の更新まで使い回す。
+    ETag は本文から求めるため、同じ位置を配信している他のワーカーとも一致する。
+    """
+
+    __slots__ = ("position", "_body", "_etag", "_updated")
+
+    def __init__(self, position: PositionFrame):
+        self.position = position
+        self._body: Optional[str] = None
+        self._etag: Optional[str] = None
+        self._updated: Optional[asyncio.Event] = None
+
+    def update(self, position: PositionFrame):
+        """最新位置を更新し、更新を待っているリクエストを起こす"""
+        self.position = position
+        self._body = None
+        self._etag = None
+        self._wake()
+
+    def discard(self):
+        """破棄された最新位置の更新を待っているリクエストを起こす（待機したまま取り残さない）"""
+        self._wake()
+
+    def _wake(self):
+        if self._updated is not None:
+            self._updated.set()
+            self._updated = None
+
+    @property
+    def body(self) -> str:
+        """位置のJSON"""
+        if self._body is None:
+            self._body = dumps(self.position.to_dict())
+        return self._body
+
+    @property
+    def etag(self) -> str:
+        """本文に対応する ETag"""
+        if self._etag is None:
+            checksum = zlib.crc32(self.body.encode())
+            self._etag = f'"{self.position.timestamp:x}-{checksum:08x}"'
+        return self._etag
+
+    async def wait_for_update(self, timeout: float) -> bool:
+        """次の更新まで最大 timeout 秒待機し、更新された場合は True を返す"""
+        if self._updated is None:
+            self._updated = asyncio.Event()
+        try:
+            await asyncio.wait_for(self._updated.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+
+class PositionSnapshots:
+    """ロボットごとの最新位置のスナップショット
+
+    位置バスを購読して常に最新の位置を保持し、WebSocketを使えないクライアント向けの
+    HTTPエンドポイントから参照する。保持するロボット数が SNAPSHOT_MAX_ROBOTS を超えた場合は
+    最も長く更新されていないロボットを破棄する。
+    """
+
+    def __init__(self, max_robots: Optional[int] = None):
+        self.max_robots = max_robots or settings.SNAPSHOT_MAX_ROBOTS
+        self._robots: "OrderedDict[str, RobotSnapshot]" = OrderedDict()
+        self._subscription: Optional[Subscription] = None
+        self._consumer_task: Optional[asyncio.Task] = None
+
+    def start(self, bus: PositionBus):
+        """位置バスの購読を開始し、受信した位置で最新位置を更新する"""
+        if self._consumer_task is not None:
+            return
+        self._subscription = bus.subscribe("snapshot")
+        self._consumer_task = asyncio.create_task(self._consume())
+
+    async def stop(self):
+        """位置バスの購読を停止"""
+        if self._subscription:
+            self._subscription.close()
+            self._subscription = None
+        if self._consumer_task:
+            self._consumer_task.cancel()
+            try:
+                await self._consumer_task
+            except asyncio.CancelledError:
+                pass
+            self._consumer_task = None
+
+    async def _consume(self):
+        """位置バスから読み出した位置で最新位置を更新（まとめて受信した位置は最後の位置のみ使う）"""
+        subscription = self._subscription
+        while subscription and not subscription.closed:
+            for item in await subscription.get():
+                if isinstance(item, PositionArrays):
+                    if not len(item):
+                        continue
+                    item = item.last_frame()
+                self.update(item)
+
+    def update(self, position: PositionFrame):
+        """ロボットの最新位置を更新"""
+        snapshot = self._robots.get(position.robot_id)
+        if snapshot is None:
+            self._robots[position.robot_id] = RobotSnapshot(position)
+            if len(self._robots) > self.max_robots:
+                robot_id, evicted = self._robots.popitem(last=False)
+                evicted.discard()
+                logger.warning("保持するロボット数が上限に達したため最新位置を破棄しました: %s", robot_id)
+            return
+        self._robots.move_to_end(position.robot_id)
+        snapshot.update(position)
+
+    def get(self, robot_id: str) -> Optional[RobotSnapshot]:
+        """ロボットの最新位置を取得"""
+        return self._robots.get(robot_id)
+
+    @property
+    def robot_ids(self) -> List[str]:
+        """最新位置を保持しているロボットID一覧"""
+        return list(self._robots.keys())
+
+    def stats(self) -> Dict[str, int]:
+        """保持状況の概要"""
+        return {"robots": len(self._robots)}
+
+
+# グローバル最新位置インスタンス
+position_snapshots = PositionSnapshots()
@@ -0,0 +1,229 @@
+import logging
+import math
+from typing import Any, Dict, Generic, Hashable, Iterable, List, Optional, Set, Tuple, TypeVar
+
+from app.config import settings
+from app.core.metrics import geofence_suppressed_transitions
+from app.schemas.frames import PositionFrame
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T", bound=Hashable)
+
+BBox = Tuple[float, float, float, float]  # (min_x, min_y, max_x, max_y)
+
+
+class Region:
+    """矩形または多角形の領域
+
+    辞書形式は {"type": "rect", "min_x": 0, "min_y": 0, "max_x": 10, "max_y": 10} または
+    {"type": "polygon", "points": [[x, y], ...]}（3点以上、最後の点と最初の点を結ぶ）。
+    境界上の点は領域に含む（多角形の辺上の点は判定が揺れる場合がある）。
+    """
+
+    __slots__ = ("kind", "bbox", "points")
+
+    def __init__(self, kind: str, bbox: BBox, points: Optional[List[Tuple[float, float]]] = None):
+        self.kind = kind
+        self.bbox = bbox
+        self.points = points
+
+    @classmethod
+    def rect(cls, min_x: float, min_y: float, max_x: float, max_y: float) -> "Region":
+        if min_x > max_x or min_y > max_y:
+            raise ValueError("矩形の min は max 以下にしてください")
+        return cls("rect", (min_x, min_y, max_x, max_y))
+
+    @classmethod
+    def polygon(cls, points: Iterable[Iterable[float]]) -> "Region":
+        vertices = [(float(x), float(y)) for x, y in points]
+        if len(vertices) < 3:
+            raise ValueError("多角形は3点以上で指定してください")
+        xs = [x for x, _ in vertices]
+        ys = [y for _, y in vertices]
+        return cls("polygon", (min(xs), min(ys), max(xs), max(ys)), vertices)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Region":
+        """辞書から作成（形式が不正な場合は ValueError）"""
+        if not isinstance(data, dict):
+            raise ValueError("領域はオブジェクトで指定してください")
+        try:
+            kind = data.get("type", "rect")
+            if kind == "rect":
+                return cls.rect(
+                    float(data["min_x"]), float(data["min_y"]), float(data["max_x"]), float(data["max_y"])
+                )
+            if kind == "polygon":
+                return cls.polygon(data["points"])
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"領域の形式が不正です: {e}") from e
+        raise ValueError(f"不明な領域の種類: {kind}")
+
+    def to_dict(self) -> Dict[str, Any]:
+        if self.kind == "polygon":
+            return {"type": "polygon", "points": [list(point) for point in self.points]}
+        min_x, min_y, max_x, max_y = self.bbox
+        return {"type": "rect", "min_x": min_x, "min_y": min_y, "max_x": max_x, "max_y": max_y}
+
+    def contains(self, x: float, y: float) -> bool:
+        """点が領域に含まれるか（多角形は交差数判定）"""
+        min_x, min_y, max_x, max_y = self.bbox
+        if x < min_x or x > max_x or y < min_y or y > max_y:
+            return False
+        if self.points is None:
+            return True
+        inside = False
+        points = self.points
+        x1, y1 = points[-1]
+        for x2, y2 in points:
+            if (y1 > y) != (y2 > y) and x < (x2 - x1) * (y - y1) / (y2 - y1) + x1:
+                inside = not inside
+            x1, y1 = x2, y2
+        return inside
+
+
+class GridIndex(Generic[T]):
+    """領域を格子状のセルに登録し、点を含みうる要素を絞り込む空間インデックス
+
+    要素は外接矩形が重なるすべてのセルに登録する。アリーナの外の座標は端のセルに丸めるため、
+    アリーナの外にはみ出した領域や位置も扱える（最終的な判定は呼び出し側で Region.contains を使う）。
+    """
+
+    def __init__(
+        self,
+        min_x: float = settings.ARENA_MIN_X,
+        min_y: float = settings.ARENA_MIN_Y,
+        max_x: float = settings.ARENA_MAX_X,
+        max_y: float = settings.ARENA_MAX_Y,
+        cell_size: float = settings.SPATIAL_GRID_CELL_SIZE,
+    ):
+        self.min_x = min_x
+        self.min_y = min_y
+        self.cell_size = cell_size
+        self.columns = max(1, math.ceil((max_x - min_x) / cell_size))
+        self.rows = max(1, math.ceil((max_y - min_y) / cell_size))
+        self._cells: Dict[Tuple[int, int], Set[T]] = {}
+        self._item_cells: Dict[T, List[Tuple[int, int]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._item_cells)
+
+    def _cell(self, x: float, y: float) -> Tuple[int, int]:
+        column = min(max(int((x - self.min_x) // self.cell_size), 0), self.columns - 1)
+        row = min(max(int((y - self.min_y) // self.cell_size), 0), self.rows - 1)
+        return column, row
+
+    def insert(self, item: T, bbox: BBox):
+        """要素を登録（既に登録されている場合は置き換える）"""
+        self.remove(item)
+        min_column, min_row = self._cell(bbox[0], bbox[1])
+        max_column, max_row = self._cell(bbox[2], bbox[3])
+        cells = [
+            (column, row)
+            for column in range(min_column, max_column + 1)
+            for row in range(min_row, max_row + 1)
+        ]
+        for cell in cells:
+            self._cells.setdefault(cell, set()).add(item)
+        self._item_cells[item] = cells
+
+    def remove(self, item: T):
+        """要素の登録を解除"""
+        for cell in self._item_cells.pop(item, ()):
+            items = self._cells[cell]
+            items.discard(item)
+            if not items:
+                del self._cells[cell]
+
+    def query(self, x: float, y: float) -> Set[T]:
+        """点を含むセルに登録されている要素（点を含まない要素も含まれうる）"""
+        return self._cells.get(self._cell(x, y), set())
+
+
+class GeofenceRegistry:
+    """ジオフェンスを管理し、ロボットの出入りを判定するクラス
+
+    ロボットごとに現在内側にいるジオフェンスを保持し、位置更新ごとに差分を enter / exit として返す。
+    判定対象は空間インデックスで絞り込み、ジオフェンスの数に比例した走査は行わない。
+    内側にいるロボットが max_robots に達している間は、新たに内側に入ったロボットの enter を通知しない。
+    """
+
+    def __init__(self, max_robots: Optional[int] = None):
+        self.fences: Dict[str, Region] = {}
+        self.max_robots = max_robots or settings.GEOFENCE_MAX_ROBOTS
+        self.suppressed = 0  # 上限により通知しなかった enter の数
+        self._suppressing = False  # 上限に達しているか（警告は上限に達するたびに1回のみ出力）
+        self._index: GridIndex[str] = GridIndex()
+        self._inside: Dict[str, Set[str]] = {}  # ロボットID→内側にいるジオフェンスID
+
+    def add(self, fence_id: str, region: Region):
+        """ジオフェンスを追加（同じIDがあれば置き換え、以後の位置更新から判定し直す）"""
+        self.remove(fence_id)
+        self.fences[fence_id] = region
+        self._index.insert(fence_id, region.bbox)
+
+    def remove(self, fence_id: str) -> bool:
+        """ジオフェンスを削除（内側にいたロボットについて exit は通知しない）"""
+        if self.fences.pop(fence_id, None) is None:
+            return False
+        self._index.remove(fence_id)
+        for robot_id, inside in list(self._inside.items()):
+            inside.discard(fence_id)
+            if not inside:
+                del self._inside[robot_id]
+        return True
+
+    def load(self, fences: Iterable[Dict[str, Any]]):
+        """{"id": ..., "region": {...}} の一覧からジオフェンスを追加"""
+        for fence in fences:
+            self.add(str(fence["id"]), Region.from_dict(fence["region"]))
+
+    def list(self) -> List[Dict[str, Any]]:
+        return [{"id": fence_id, "region": region.to_dict()} for fence_id, region in self.fences.items()]
+
+    def update(self, position: PositionFrame) -> List[Tuple[str, str]]:
+        """位置更新で発生した (イベント名, ジオフェンスID) の一覧（enter / exit）"""
+        if not self.fences and not self._inside:
+            return []
+        x, y = position.x, position.y
+        current = {fence_id for fence_id in self._index.query(x, y) if self.fences[fence_id].contains(x, y)}
+        previous = self._inside.get(position.robot_id)
+        if previous is None:
+            if not current:
+                return []
+            if len(self._inside) >= self.max_robots:
+                self._suppress(position.robot_id, len(current))
+                return []
+            self._suppressing = False
+            previous = set()
+        if current == previous:
+            return []
+
+        transitions = [("exit", fence_id) for fence_id in sorted(previous - current)]
+        transitions += [("enter", fence_id) for fence_id in sorted(current - previous)]
+        if current:
+            self._inside[position.robot_id] = current
+        else:
+            del self._inside[position.robot_id]
+        return transitions
+
+    def _suppress(self, robot_id: str, count: int):
+        """上限により通知しなかった enter を記録"""
+        self.suppressed += count
+        geofence_suppressed_transitions.inc(count)
+        if not self._suppressing:
+            self._suppressing = True
+            logger.warning(
+                "ジオフェンスの内側にいるロボット数が上限（%d）に達したため enter を通知しません: %s",
+                self.max_robots,
+                robot_id,
+            )
+
+    def inside(self, robot_id: str) -> List[str]:
+        """ロボットが現在内側にいるジオフェンス"""
+        return sorted(self._inside.get(robot_id, ()))
+
+
+# グローバルジオフェンスレジストリ
+geofences = GeofenceRegistry()
@@ -0,0 +1,421 @@
+import asyncio
+import bisect
+import logging
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import quote, unquote
+
+import numpy as np
+
+from app.config import settings
+from app.core.metrics import trajectory_dropped
+from app.schemas.frames import BusItem, PositionArrays
+from app.services.position_bus import PositionBus, Subscription
+
+logger = logging.getLogger(__name__)
+
+# セグメントファイルのヘッダー: マジック(4バイト) + バージョン(uint16) + レコード長(uint16) + 予約(8バイト)
+SEGMENT_MAGIC = b"RTRJ"
+SEGMENT_VERSION = 1
+_HEADER_STRUCT = struct.Struct("<4sHH8x")
+HEADER_SIZE = _HEADER_STRUCT.size
+
+# 位置レコード: timestamp(int64) + x(float32) + y(float32)
+_RECORD_STRUCT = struct.Struct("<qff")
+RECORD_SIZE = _RECORD_STRUCT.size
+# 読み出し時にmmap上のレコードをそのまま参照する構造化配列の型（_RECORD_STRUCT と同じレイアウト）
+RECORD_DTYPE = np.dtype([("ts", "<i8"), ("x", "<f4"), ("y", "<f4")])
+
+# 疎なタイムスタンプインデックスのエントリ: timestamp(int64) + レコード番号(uint64)
+_INDEX_STRUCT = struct.Struct("<qQ")
+
+SEGMENT_SUFFIX = ".seg"
+INDEX_SUFFIX = ".idx"
+
+
+def _robot_dir_name(robot_id: str) -> str:
+    """ロボットIDをディレクトリ名に変換（空のIDやパス区切り文字も扱えるようにする）"""
+    return "r-" + quote(robot_id, safe="")
+
+
+def _robot_id_from_dir(name: str) -> Optional[str]:
+    """ディレクトリ名からロボットIDを復元"""
+    if not name.startswith("r-"):
+        return None
+    return unquote(name[2:])
+
+
+class Segment:
+    """1つのセグメントファイル（固定長レコードの追記専用ファイル）とその疎インデックス"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.index_path = path.with_suffix(INDEX_SUFFIX)
+        # ファイル名の先頭はセグメント内の最初のタイムスタンプ
+        self.first_timestamp = int(path.stem.split("-")[0])
+
+    def record_count(self) -> int:
+        """書き込み済みの完全なレコード数（書き込み途中のレコードは含まない）"""
+        try:
+            size = self.path.stat().st_size
+        except FileNotFoundError:
+            return 0
+        return max(0, size - HEADER_SIZE) // RECORD_SIZE
+
+    def load_index(self) -> Tuple[List[int], List[int]]:
+        """疎インデックス（タイムスタンプ、レコード番号）を読み込む"""
+        timestamps: List[int] = []
+        records: List[int] = []
+        try:
+            data = self.index_path.read_bytes()
+        except FileNotFoundError:
+            return timestamps, records
+        usable = len(data) - len(data) % _INDEX_STRUCT.size
+        for timestamp, record in _INDEX_STRUCT.iter_unpack(data[:usable]):
+            timestamps.append(timestamp)
+            records.append(record)
+        return timestamps, records
+
+    def records(self) -> np.ndarray:
+        """書き込み済みのレコードをmmap上の構造化配列として参照（コピーしない）
+
+        返した配列（とそのビュー）がmmapを参照している間はマッピングが維持され、
+        参照がなくなると解放される。
+        """
+        count = self.record_count()
+        if count == 0:
+            return np.empty(0, RECORD_DTYPE)
+        with open(self.path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), HEADER_SIZE + count * RECORD_SIZE, access=mmap.ACCESS_READ)
+        return np.frombuffer(mm, dtype=RECORD_DTYPE, count=count, offset=HEADER_SIZE)
+
+    def read_range(self, since: Optional[int], until: Optional[int]) -> np.ndarray:
+        """時間範囲内のレコード（mmap上のビュー、必要な範囲のみがページインされる）"""
+        records = self.records()
+        if len(records) == 0 or (since is None and until is None):
+            return records
+        index = self.load_index()
+        lo = 0 if since is None else self._bound(records, index, since, "left")
+        hi = len(records) if until is None else self._bound(records, index, until, "right")
+        return records[lo:max(lo, hi)]
+
+    @staticmethod
+    def _bound(records: np.ndarray, index: Tuple[List[int], List[int]], value: int, side: str) -> int:
+        """np.searchsorted と同じ位置を求める（side="left": ts >= value の最初、"right": ts > value の最初）
+
+        構造化配列の ts 列は連続していないため、searchsorted に渡すと列全体がコピーされる。
+        疎インデックスで範囲を index_interval 件程度に絞り込み、その範囲の ts だけを探索する。
+        """
+        count = len(records)
+        lo, hi = 0, count
+        index_timestamps, index_records = index
+        if index_timestamps:
+            search = bisect.bisect_left if side == "left" else bisect.bisect_right
+            i = search(index_timestamps, value)
+            if i > 0:
+                lo = min(index_records[i - 1] + 1, count)
+            if i < len(index_timestamps):
+                hi = min(index_records[i], count)
+        if lo >= hi:
+            return lo
+        return lo + int(np.searchsorted(records["ts"][lo:hi], value, side))
+
+
+class _SegmentWriter:
+    """書き込み中のセグメント（バックグラウンドスレッドからのみ使用）"""
+
+    def __init__(self, path: Path, index_interval: int):
+        self.path = path
+        self.created_at = time.monotonic()
+        self.records = 0
+        self.last_timestamp: Optional[int] = None
+        self.index_interval = index_interval
+        # Pythonのバッファを経由せずに書き込み、mmapでの読み出しから即座に見えるようにする
+        self._fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        self._index_fd = os.open(path.with_suffix(INDEX_SUFFIX), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        os.write(self._fd, _HEADER_STRUCT.pack(SEGMENT_MAGIC, SEGMENT_VERSION, RECORD_SIZE))
+
+    @property
+    def size(self) -> int:
+        return HEADER_SIZE + self.records * RECORD_SIZE
+
+    def write(self, records: List[Tuple[int, float, float]]):
+        """レコードをまとめて追記し、必要に応じて疎インデックスに追加"""
+        pack = _RECORD_STRUCT.pack
+        index_entries = []
+        for offset, (timestamp, _, _) in enumerate(records):
+            record = self.records + offset
+            if record % self.index_interval == 0:
+                index_entries.append(_INDEX_STRUCT.pack(timestamp, record))
+        os.write(self._fd, b"".join(pack(*record) for record in records))
+        if index_entries:
+            os.write(self._index_fd, b"".join(index_entries))
+        self.records += len(records)
+        self.last_timestamp = records[-1][0]
+
+    def sync(self):
+        """ディスクへ確実に書き込む"""
+        os.fsync(self._fd)
+        os.fsync(self._index_fd)
+
+    def close(self):
+        self.sync()
+        os.close(self._fd)
+        os.close(self._index_fd)
+
+
+class TrajectoryStore:
+    """追記専用のセグメントファイルによるロボット軌跡の永続化ストア
+
+    書き込みはバックグラウンドスレッドで行い、asyncioのイベントループはキューに
+    追加するだけでブロックしない。セグメントはサイズまたは経過時間でローテーションし、
+    fsyncは一定件数または一定時間ごとにまとめて行う。ディスクが遅い場合もメモリ使用量が増え続けないよう
+    書き込みキューには上限を設け、溢れた位置は破棄して数える。読み出しはmmap経由で行い、
+    疎なタイムスタンプインデックスと二分探索で必要な範囲のみを参照する。
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = Path(directory or settings.TRAJECTORY_DIR)
+        self.segment_max_bytes = settings.TRAJECTORY_SEGMENT_MAX_BYTES
+        self.segment_max_age = settings.TRAJECTORY_SEGMENT_MAX_AGE_S
+        self.fsync_interval = settings.TRAJECTORY_FSYNC_INTERVAL_S
+        self.fsync_batch = settings.TRAJECTORY_FSYNC_BATCH
+        self.index_interval = settings.TRAJECTORY_INDEX_INTERVAL
+        self.written = 0  # 書き込んだレコード数
+        self.dropped = 0  # 順序の逆転により書き込まなかったレコード数
+        self.overflowed = 0  # 書き込みキューが溢れて破棄したレコード数（イベントループ側で数える）
+        self._queue: "queue.Queue[Optional[BusItem]]" = queue.Queue(maxsize=settings.TRAJECTORY_QUEUE_SIZE)
+        self._overflowing = False  # キューが溢れている間は警告を繰り返さない
+        self._writers: Dict[str, _SegmentWriter] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._subscription: Optional[Subscription] = None
+        self._consumer_task: Optional[asyncio.Task] = None
+
+    def start(self, bus: PositionBus):
+        """書き込みスレッドを起動し、位置バスの購読を開始する"""
+        if self._thread is not None:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._thread = threading.Thread(target=self._run_writer, name="trajectory-writer", daemon=True)
+        self._thread.start()
+        self._subscription = bus.subscribe("trajectory_store")
+        self._consumer_task = asyncio.create_task(self._consume())
+        logger.info(f"軌跡ストアを開始しました: {self.directory}")
+
+    async def stop(self):
+        """位置バスの購読を停止し、未書き込みのデータを書き出してスレッドを終了する"""
+        if self._subscription:
+            self._subscription.close()
+            self._subscription = None
+        if self._consumer_task:
+            self._consumer_task.cancel()
+            try:
+                await self._consumer_task
+            except asyncio.CancelledError:
+                pass
+            self._consumer_task = None
+        if self._thread:
+            # キューの空き待ちとスレッドの終了待ちでイベントループをブロックしない
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self._queue.put, None)
+            await loop.run_in_executor(None, self._thread.join)
+            self._thread = None
+
+    async def _consume(self):
+        """位置バスから読み出した位置を書き込みキューに追加"""
+        subscription = self._subscription
+        while subscription and not subscription.closed:
+            for position in await subscription.get():
+                self.append(position)
+
+    def append(self, position: BusItem):
+        """位置（またはまとめて受信した位置の配列）を書き込みキューに追加（待機しない）
+
+        レコードへの変換は書き込みスレッドで行い、イベントループでは位置ごとの処理をしない。
+        キューが満杯の場合は書き込まずに破棄する。
+        """
+        try:
+            self._queue.put_nowait(position)
+        except queue.Full:
+            count = len(position) if isinstance(position, PositionArrays) else 1
+            self.overflowed += count
+            trajectory_dropped.inc(count)
+            if not self._overflowing:
+                self._overflowing = True
+                logger.warning("軌跡ストアの書き込みキューが溢れたため位置を破棄しています")
+            return
+        self._overflowing = False
+
+    def _run_writer(self):
+        """書き込みスレッド: キューからまとめて取り出して書き込み、一定間隔でfsyncする
+
+        予期しない例外でもスレッドは終了させず、ログに記録して書き込みを続ける
+        （終了すると書き込みキューに追加され続けるだけになるため）。
+        """
+        unsynced = 0
+        last_sync = time.monotonic()
+        running = True
+        while running:
+            batch: Dict[str, List[Tuple[int, float, float]]] = {}
+            try:
+                item = self._queue.get(timeout=self.fsync_interval)
+                # 溜まっている分をまとめて取り出す（負荷が続いても書き込みとfsyncが進むよう fsync_batch 件まで）
+                drained = 0
+                while True:
+                    if item is None:
+                        running = False
+                        break
+                    self._add_records(batch, item)
+                    drained += 1
+                    if drained >= self.fsync_batch:
+                        break
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                pass
+
+            try:
+                for robot_id, records in batch.items():
+                    unsynced += self._write(robot_id, records)
+                now = time.monotonic()
+                if unsynced and (unsynced >= self.fsync_batch or now - last_sync >= self.fsync_interval or not running):
+                    for writer in self._writers.values():
+                        writer.sync()
+                    unsynced = 0
+                    last_sync = now
+            except OSError as e:
+                logger.error(f"軌跡ストアへの書き込み中にエラーが発生: {e}")
+            except Exception:
+                logger.exception("軌跡ストアへの書き込み中に予期しないエラーが発生")
+
+        for writer in self._writers.values():
+            writer.close()
+        self._writers = {}
+
+    @staticmethod
+    def _add_records(batch: Dict[str, List[Tuple[int, float, float]]], item: BusItem):
+        """キューから取り出した位置をロボットごとのレコードに変換（変換できない位置はログに記録して破棄）"""
+        try:
+            if isinstance(item, PositionArrays):
+                records = list(zip(item.timestamp.tolist(), item.x.tolist(), item.y.tolist()))
+            else:
+                records = [(item.timestamp, item.x, item.y)]
+        except Exception:
+            logger.exception("軌跡ストアに書き込めない位置を破棄しました: %s", getattr(item, "robot_id", None))
+            return
+        batch.setdefault(item.robot_id, []).extend(records)
+
+    def _write(self, robot_id: str, records: List[Tuple[int, float, float]]) -> int:
+        """1台のロボットのレコードを書き込み（必要に応じてセグメントをローテーション）"""
+        writer = self._writers.get(robot_id)
+        if writer is not None and writer.last_timestamp is not None:
+            # 順序が逆転したレコードは二分探索の前提を崩すため書き込まない
+            last = writer.last_timestamp
+            ordered = []
+            for record in records:
+                if record[0] >= last:
+                    ordered.append(record)
+                    last = record[0]
+            self.dropped += len(records) - len(ordered)
+            records = ordered
+        if not records:
+            return 0
+
+        if writer is None or self._should_rotate(writer):
+            if writer is not None:
+                writer.close()
+            writer = self._open_segment(robot_id, records[0][0])
+            self._writers[robot_id] = writer
+
+        writer.write(records)
+        self.written += len(records)
+        return len(records)
+
+    def _should_rotate(self, writer: _SegmentWriter) -> bool:
+        """セグメントのサイズまたは経過時間が上限に達したか"""
+        return (
+            writer.size >= self.segment_max_bytes
+            or time.monotonic() - writer.created_at >= self.segment_max_age
+        )
+
+    def _open_segment(self, robot_id: str, first_timestamp: int) -> _SegmentWriter:
+        """新しいセグメントを作成（同じタイムスタンプで始まるセグメントには連番を付ける）"""
+        robot_dir = self.directory / _robot_dir_name(robot_id)
+        robot_dir.mkdir(parents=True, exist_ok=True)
+        serial = 0
+        while True:
+            path = robot_dir / f"{first_timestamp:020d}-{serial:04d}{SEGMENT_SUFFIX}"
+            if not path.exists():
+                break
+            serial += 1
+        logger.info(f"新しい軌跡セグメントを作成: {path}")
+        return _SegmentWriter(path, self.index_interval)
+
+    def robot_ids(self) -> List[str]:
+        """軌跡が保存されているロボットID一覧"""
+        if not self.directory.exists():
+            return []
+        robot_ids = []
+        for entry in sorted(self.directory.iterdir()):
+            robot_id = _robot_id_from_dir(entry.name)
+            if robot_id is not None and entry.is_dir():
+                robot_ids.append(robot_id)
+        return robot_ids
+
+    def segments(self, robot_id: str) -> List[Segment]:
+        """ロボットのセグメント一覧（古い順）"""
+        robot_dir = self.directory / _robot_dir_name(robot_id)
+        if not robot_dir.exists():
+            return []
+        return [Segment(path) for path in sorted(robot_dir.glob(f"*{SEGMENT_SUFFIX}"))]
+
+    def _overlapping_segments(self, robot_id: str, since: Optional[int], until: Optional[int]) -> Iterator[Segment]:
+        """時間範囲と重なる可能性のあるセグメントを列挙"""
+        segments = self.segments(robot_id)
+        for i, segment in enumerate(segments):
+            if until is not None and segment.first_timestamp > until:
+                break
+            # 次のセグメントの開始がsinceより前なら、このセグメントは範囲外
+            if since is not None and i + 1 < len(segments) and segments[i + 1].first_timestamp < since:
+                continue
+            yield segment
+
+    def query(
+        self,
+        robot_id: str,
+        since: Optional[int] = None,
+        until: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """時間範囲内の軌跡を (x, y, timestamp) の列で取得（limit を指定した場合は古い方から limit 件）
+
+        1つのセグメントに収まる場合はmmap上のビューをそのまま返し、複数のセグメントに
+        またがる場合のみ連結する（コピーは1回）。
+        """
+        parts: List[np.ndarray] = []
+        total = 0
+        for segment in self._overlapping_segments(robot_id, since, until):
+            part = segment.read_range(since, until)
+            if limit is not None:
+                part = part[:limit - total]
+            if len(part):
+                parts.append(part)
+                total += len(part)
+            if limit is not None and total >= limit:
+                break
+        if not parts:
+            records = np.empty(0, RECORD_DTYPE)
+        elif len(parts) == 1:
+            records = parts[0]
+        else:
+            records = np.concatenate(parts)
+        return records["x"], records["y"], records["ts"]
+
+
+# グローバル軌跡ストアインスタンス
+trajectory_store = TrajectoryStore()
@@ -0,0 +1,99 @@
+import asyncio
+import logging
+from typing import Any, Callable, Dict, Optional, Set
+
+from app.schemas.frames import MAX_ROBOT_ID_BYTES, BusItem, robot_id_encodable
+
+logger = logging.getLogger(__name__)
+
+
+class PositionSource:
+    """位置の受信元の基底クラス
+
+    受信した位置（PositionFrame、またはまとめて受信した PositionArrays）は set_position_callback で
+    設定したコールバック（位置バスへの発行）に渡すため、ブロードキャスト・履歴・メトリクスなど
+    以降の処理は受信元によらず同じ経路で行われる。
+    既定の start_tracking / stop_tracking は _run を1つのタスクで実行する。
+    バイナリ形式の位置レコードに格納できない長さのロボットIDの位置は、配信時にエンコードできないため
+    ここで破棄する。
+    """
+
+    name = ""
+
+    def __init__(self):
+        self.position_callback: Optional[Callable[[BusItem], Any]] = None
+        # ストリームの欠落・再同期を通知するコールバック（ロボットID, イベント名, データ）
+        self.event_callback: Optional[Callable[[str, str, Dict[str, Any]], Any]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._rejected: Set[str] = set()  # ロボットIDが長すぎるため破棄したロボットID
+
+    def set_position_callback(self, callback: Callable[[BusItem], Any]):
+        """位置更新のコールバック関数を設定"""
+        self.position_callback = callback
+
+    def set_event_callback(self, callback: Callable[[str, str, Dict[str, Any]], Any]):
+        """ストリームの欠落（gap）・再同期（resync）を通知するコールバック関数を設定"""
+        self.event_callback = callback
+
+    async def _notify_event(self, robot_id: str, event: str, data: Dict[str, Any]):
+        """イベントコールバックを呼び出す"""
+        if self.event_callback is None:
+            return
+        try:
+            result = self.event_callback(robot_id, event, data)
+            if asyncio.iscoroutine(result):
+                await result
+        except Exception as e:
+            logger.error("イベントコールバックエラー: %s", e, extra={"robot_id": robot_id})
+
+    async def _deliver(self, robot_id: str, position: BusItem):
+        """位置更新のコールバック関数を呼び出す"""
+        if not self.position_callback:
+            return
+        if not robot_id_encodable(position.robot_id):
+            if position.robot_id not in self._rejected:
+                self._rejected.add(position.robot_id)
+                logger.warning(
+                    "ロボットIDが%dバイトを超えるため位置を破棄します: %s",
+                    MAX_ROBOT_ID_BYTES,
+                    position.robot_id[:64],
+                    extra={"robot_id": robot_id},
+                )
+            return
+        try:
+            # コールバックがコルーチンまたは呼び出し可能オブジェクトであることを確認
+            if asyncio.iscoroutinefunction(self.position_callback):
+                await self.position_callback(position)
+            else:
+                self.position_callback(position)
+        except Exception as e:
+            logger.error("位置更新コールバックエラー: %s", e, extra={"robot_id": robot_id})
+
+    async def connect(self):
+        """受信元に接続（接続の必要がない受信元では何もしない）"""
+
+    async def start_tracking(self):
+        """位置の受信を開始"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info("位置の受信を開始しました: %s", self.name)
+
+    async def stop_tracking(self):
+        """位置の受信を停止"""
+        task, self._task = self._task, None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        logger.info("位置の受信を停止しました: %s", self.name)
+
+    async def _run(self):
+        """位置を受信してコールバックに渡す（サブクラスで実装）"""
+        raise NotImplementedError
+
+    def status(self) -> Dict[str, Any]:
+        """受信元の状態"""
+        return {"type": self.name}
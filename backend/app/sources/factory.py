@@ -0,0 +1,18 @@
+from app.config import settings
+from app.grpc_client.robot_client import client as robot_client
+from app.sources.base import PositionSource
+from app.sources.replay import ReplaySource
+from app.sources.synthetic import SyntheticSource
+
+
+def create_position_source(source: str) -> PositionSource:
+    """POSITION_SOURCE に対応する受信元を作成"""
+    if source == "replay":
+        return ReplaySource(settings.REPLAY_PATH)
+    if source == "synthetic":
+        return SyntheticSource()
+    return robot_client
+
+
+# グローバル受信元インスタンス
+position_source = create_position_source(settings.POSITION_SOURCE)
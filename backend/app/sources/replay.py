@@ -0,0 +1,141 @@
+import asyncio
+import heapq
+import json
+import logging
+import time
+from itertools import repeat
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.config import settings
+from app.core.metrics import positions_received
+from app.schemas.frames import PositionFrame
+from app.services.trajectory_store import TrajectoryStore
+from app.sources.base import PositionSource
+
+logger = logging.getLogger(__name__)
+
+# 待機せずに再生する場合に、この件数ごとにイベントループに制御を戻す
+_YIELD_EVERY = 256
+
+# 再生する位置: (timestamp, robot_id, x, y)
+Record = Tuple[int, str, float, float]
+
+
+def read_trajectory_store(directory: Path) -> Iterator[Record]:
+    """軌跡ストアのディレクトリに記録された全ロボットの位置をタイムスタンプ順に列挙"""
+    store = TrajectoryStore(str(directory))
+    streams = []
+    for robot_id in store.robot_ids():
+        xs, ys, timestamps = store.query(robot_id)
+        streams.append(zip(timestamps.tolist(), repeat(robot_id), xs.tolist(), ys.tolist()))
+    return heapq.merge(*streams)
+
+
+def read_ndjson(path: Path) -> List[Record]:
+    """1行に1つの位置のJSONを記録したファイルを読み込み、タイムスタンプ順に並べる"""
+    records: List[Record] = []
+    skipped = 0
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                data = json.loads(line)
+                records.append((int(data["timestamp"]), str(data["robot_id"]), float(data["x"]), float(data["y"])))
+            except (ValueError, KeyError, TypeError):
+                skipped += 1
+    if skipped:
+        logger.warning("不正な行を %d 行読み飛ばしました: %s", skipped, path)
+    # 同じタイムスタンプの位置は記録された順に再生する
+    records.sort(key=lambda record: record[0])
+    return records
+
+
+class ReplaySource(PositionSource):
+    """記録した軌跡を再生する受信元
+
+    タイムスタンプの間隔を speed 倍に縮めて再生し（0 は待機しない）、位置は gRPC で
+    受信した場合と同じく位置バスに発行する。robot-trackerなしで障害の再現や負荷試験を行うため。
+    """
+
+    name = "replay"
+
+    def __init__(
+        self,
+        path: str,
+        speed: Optional[float] = None,
+        loop: Optional[bool] = None,
+        rebase_timestamps: Optional[bool] = None,
+    ):
+        super().__init__()
+        self.path = Path(path)
+        self.speed = settings.REPLAY_SPEED if speed is None else speed
+        self.loop = settings.REPLAY_LOOP if loop is None else loop
+        self.rebase_timestamps = settings.REPLAY_REBASE_TIMESTAMPS if rebase_timestamps is None else rebase_timestamps
+        self.replayed = 0  # 再生した位置の数
+        self.passes = 0  # 最後まで再生した回数
+        self._last_timestamp: Optional[int] = None  # 最後に発行したタイムスタンプ（ずらした後）
+
+    def _records(self) -> Iterator[Record]:
+        """再生する位置をタイムスタンプ順に列挙"""
+        if self.path.is_dir():
+            return read_trajectory_store(self.path)
+        return iter(read_ndjson(self.path))
+
+    async def _run(self):
+        if not self.path.exists():
+            logger.error("再生する軌跡が見つかりません: %s", self.path)
+            return
+        logger.info("軌跡の再生を開始: %s (%s倍速)", self.path, self.speed or "最大")
+        # ファイルの読み込みでイベントループをブロックしない（繰り返す場合も読み込みは1回）
+        records = await asyncio.to_thread(lambda: list(self._records()))
+        if not records:
+            logger.warning("再生する位置がありません: %s", self.path)
+            return
+        while True:
+            await self._replay(records)
+            self.passes += 1
+            if not self.loop:
+                logger.info("軌跡の再生が終了しました: %s (%d 件)", self.path, self.replayed)
+                return
+
+    async def _replay(self, records: List[Record]):
+        """位置を記録された間隔で再生"""
+        loop = asyncio.get_running_loop()
+        units_per_second = settings.TIMESTAMP_UNITS_PER_SECOND
+        first_timestamp = records[0][0]
+        offset = 0
+        if self.rebase_timestamps:
+            offset = int(time.time() * units_per_second) - first_timestamp
+            if self._last_timestamp is not None:
+                # 繰り返し再生してもタイムスタンプが戻らないようにする
+                offset = max(offset, self._last_timestamp + 1 - first_timestamp)
+        counters: Dict[str, Any] = {}
+        started = loop.time()
+        for i, (timestamp, robot_id, x, y) in enumerate(records):
+            delay = 0.0
+            if self.speed > 0:
+                delay = started + (timestamp - first_timestamp) / units_per_second / self.speed - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            elif i % _YIELD_EVERY == 0:
+                await asyncio.sleep(0)
+
+            received = counters.get(robot_id)
+            if received is None:
+                received = counters[robot_id] = positions_received.labels(robot_id)
+            received.inc()
+            self.replayed += 1
+            await self._deliver(robot_id, PositionFrame(x, y, timestamp + offset, robot_id))
+        self._last_timestamp = records[-1][0] + offset
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "type": self.name,
+            "path": str(self.path),
+            "speed": self.speed,
+            "loop": self.loop,
+            "replayed": self.replayed,
+            "passes": self.passes,
+        }
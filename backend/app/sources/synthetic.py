@@ -0,0 +1,80 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+from app.core.metrics import positions_received
+from app.schemas.frames import PositionFrame
+from app.sources.base import PositionSource
+
+logger = logging.getLogger(__name__)
+
+
+class SyntheticSource(PositionSource):
+    """ランダムな位置を生成する受信元（robot-trackerの RandomGenerator と同等）
+
+    各ロボットの位置は範囲内の一様乱数で、タイムスタンプは生成時の時刻。1つのタスクで
+    全ロボット分を時刻をずらして生成し、起床が遅れた場合は待機せずに続けて生成して遅れを取り戻すため、
+    robot-trackerでは出せない頻度でも指定した件数を生成する（追いつけない場合は可能な限り速く生成する）。
+    """
+
+    name = "synthetic"
+
+    def __init__(
+        self,
+        robot_ids: Optional[List[str]] = None,
+        rate: Optional[float] = None,
+        seed: Optional[int] = None,
+    ):
+        super().__init__()
+        if robot_ids is None:
+            count = settings.SYNTHETIC_ROBOT_COUNT
+            robot_ids = [f"robot-{i + 1}" for i in range(count)] if count > 0 else list(settings.ROBOT_IDS)
+        self.robot_ids = robot_ids
+        self.rate = settings.SYNTHETIC_RATE_HZ if rate is None else rate  # ロボットごとの1秒あたりの生成数
+        self.min_x, self.max_x = settings.SYNTHETIC_MIN_X, settings.SYNTHETIC_MAX_X
+        self.min_y, self.max_y = settings.SYNTHETIC_MIN_Y, settings.SYNTHETIC_MAX_Y
+        self.generated = 0  # 生成した位置の数
+        self._random = random.Random(settings.SYNTHETIC_SEED if seed is None else seed)
+
+    async def _run(self):
+        if not self.robot_ids or self.rate <= 0:
+            logger.warning("生成するロボットまたは頻度が指定されていません")
+            return
+        loop = asyncio.get_running_loop()
+        units_per_second = settings.TIMESTAMP_UNITS_PER_SECOND
+        robots = len(self.robot_ids)
+        counters = [positions_received.labels(robot_id) for robot_id in self.robot_ids]
+        uniform = self._random.uniform
+        # ロボットごとの周期の中で各ロボットの生成時刻をずらし、全ロボットが同時に更新されないようにする
+        total_rate = self.rate * robots
+        started = loop.time()
+        count = 0  # 生成した位置の数（次に生成するロボットは count % robots）
+        while True:
+            owed = int((loop.time() - started) * total_rate) + 1 - count
+            if owed <= 0:
+                await asyncio.sleep(started + count / total_rate - loop.time())
+                continue
+            timestamp = int(time.time() * units_per_second)
+            # 遅れている場合も位置バスの購読者やHTTPリクエストの処理が進むよう最大 robots 件ごとに制御を戻す
+            for _ in range(min(owed, robots)):
+                index = count % robots
+                robot_id = self.robot_ids[index]
+                position = PositionFrame(
+                    uniform(self.min_x, self.max_x), uniform(self.min_y, self.max_y), timestamp, robot_id
+                )
+                counters[index].inc()
+                count += 1
+                self.generated = count
+                await self._deliver(robot_id, position)
+            await asyncio.sleep(0)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "type": self.name,
+            "robots": len(self.robot_ids),
+            "rate_hz": self.rate,
+            "generated": self.generated,
+        }
@@ -0,0 +1,188 @@
+import asyncio
+import logging
+import time
+from enum import Enum
+from typing import Callable, Optional, Set, Union
+from fastapi import WebSocket, status
+from app.config import settings
+from app.core.metrics import (
+    end_to_end_seconds,
+    server_latency_seconds,
+    ws_dropped_frames,
+    ws_evictions,
+    ws_slow_disconnects,
+)
+from app.schemas.delta import FRAME_TYPE_DELTA, FRAME_TYPE_DELTA_HISTORY, DeltaEncoder
+from app.schemas.frames import BatchFrame, PositionFrame
+from app.services.downsampling import DeadBandFilter
+from app.services.motion import DeadReckoningFilter
+from app.services.spatial import Region
+from app.websockets.protocol import DeliveryMode, FrameFormat
+
+logger = logging.getLogger(__name__)
+
+
+class OverflowPolicy(str, Enum):
+    """送信キューが満杯になった時の処理方針"""
+    DROP_OLDEST = "drop_oldest"  # 最も古いメッセージを破棄
+    LATEST_ONLY = "latest_only"  # キューを空にして最新のメッセージのみ保持
+    DISCONNECT = "disconnect"    # 遅いクライアントを切断
+
+
+class ClientConnection:
+    """1つのWebSocketクライアントの送信キューと送信タスクを管理するクラス"""
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        queue_size: int,
+        overflow_policy: OverflowPolicy,
+        on_close: Optional[Callable[["ClientConnection"], None]] = None,
+        frame_format: FrameFormat = FrameFormat.JSON,
+        delivery_mode: DeliveryMode = DeliveryMode.STREAM,
+        live_filter: Optional[Union[DeadBandFilter, DeadReckoningFilter]] = None,
+        region: Optional[Region] = None,
+        delta_encoder: Optional[DeltaEncoder] = None,
+        dead_reckoning: bool = False,
+        heartbeat: bool = False,
+    ):
+        self.websocket = websocket
+        peer = websocket.client
+        self.name = f"{peer.host}:{peer.port}" if peer else hex(id(self))  # ログ用
+        self.ip = peer.host if peer else "unknown"  # 接続数の上限の判定用
+        self.frame_format = frame_format
+        self.delivery_mode = delivery_mode
+        self.robot_ids: Optional[Set[str]] = None  # 購読するロボットID（None はすべて）
+        self.live_filter = live_filter  # ライブ配信の間引き（None は間引かない）
+        self.region = region  # この領域内の位置更新のみ受信（None はすべて）
+        self.delta_encoder = delta_encoder  # デルタ形式のクライアントのエンコーダー（送信順にエンコードする）
+        self.dead_reckoning = dead_reckoning  # 推定した速度を含むJSONフレームを受信するか
+        self.overflow_policy = overflow_policy
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0  # キュー溢れで破棄したメッセージ数
+        self.last_seen = time.monotonic()  # 最後にクライアントからメッセージを受信した時刻
+        self.heartbeat = heartbeat  # ping イベントを受信するか（接続時に要求したか、pong を返したことがある場合）
+        self.answers_pings = False  # ping に pong を返したことがあるか（ハートビートのタイムアウトの対象）
+        self.send_started = 0.0  # 送信中のメッセージの送信開始時刻（送信中でない場合は0）
+        self.closed = False
+        self._on_close = on_close
+        self._writer_task: Optional[asyncio.Task] = None
+        self._close_task: Optional[asyncio.Task] = None  # abort で開始したソケットを閉じるタスク（GCで破棄されないよう保持）
+
+    def start(self):
+        """送信タスクを開始"""
+        if self._writer_task is None:
+            self._writer_task = asyncio.create_task(self._writer())
+
+    def encode(self, frame: Union[PositionFrame, BatchFrame]) -> Union[str, bytes, PositionFrame, BatchFrame]:
+        """フレームをこのクライアントの形式で取得
+
+        デルタ形式は直前に送信した位置との差分のため、キューから取り出して送信する時に
+        エンコードする（キュー溢れで破棄したフレームとの差分にならないように）。
+        """
+        if self.delta_encoder is not None:
+            return frame
+        return frame.encode(self.frame_format)
+
+    def enqueue(
+        self,
+        message: Union[str, bytes, PositionFrame, BatchFrame],
+        origin: Optional[PositionFrame] = None,
+    ) -> bool:
+        """メッセージを送信キューに追加（待機しない）
+
+        origin はメッセージに含まれる位置（バッチの場合は最新の位置）で、送信時のレイテンシの計測に使用する。
+        """
+        if self.closed:
+            return False
+
+        if self.queue.full():
+            if self.overflow_policy == OverflowPolicy.DISCONNECT:
+                logger.warning("送信キューが満杯のため、遅いクライアントを切断します")
+                ws_slow_disconnects.inc()
+                self.abort(status.WS_1013_TRY_AGAIN_LATER)
+                return False
+            if self.overflow_policy == OverflowPolicy.LATEST_ONLY:
+                dropped = self.queue.qsize()
+                self._clear_queue()
+            else:
+                self.queue.get_nowait()
+                dropped = 1
+            self.dropped += dropped
+            ws_dropped_frames.inc(dropped)
+
+        self.queue.put_nowait((message, origin))
+        return True
+
+    def touch(self):
+        """クライアントからメッセージを受信したことを記録"""
+        self.last_seen = time.monotonic()
+
+    def evict(self, reason: str, code: int = status.WS_1011_INTERNAL_ERROR):
+        """応答しないクライアントを切断"""
+        if self.closed:
+            return
+        logger.info("クライアントを切断します（%s）: %s", reason, self.name)
+        ws_evictions.labels(reason).inc()
+        self.abort(code)
+
+    def abort(self, code: int = status.WS_1000_NORMAL_CLOSURE):
+        """送信タスクを停止し、ソケットを非同期で閉じる"""
+        if self.closed:
+            return
+        self.stop()
+        self._close_task = asyncio.create_task(self._close_socket(code))
+
+    def stop(self):
+        """送信タスクを停止し、キューを破棄"""
+        if self.closed:
+            return
+        self.closed = True
+        if self._writer_task:
+            self._writer_task.cancel()
+            self._writer_task = None
+        self._clear_queue()
+        if self._on_close:
+            self._on_close(self)
+
+    def _clear_queue(self):
+        """キュー内の未送信メッセージをすべて破棄"""
+        while not self.queue.empty():
+            self.queue.get_nowait()
+
+    async def _close_socket(self, code: int):
+        """WebSocketを閉じる（既に閉じられている場合は無視）"""
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass
+
+    async def _writer(self):
+        """キューからメッセージを取り出してクライアントに送信"""
+        units_per_second = settings.TIMESTAMP_UNITS_PER_SECOND
+        try:
+            while True:
+                message, origin = await self.queue.get()
+                if isinstance(message, PositionFrame):
+                    message = self.delta_encoder.encode((message,))
+                elif isinstance(message, BatchFrame):
+                    frame_type = FRAME_TYPE_DELTA_HISTORY if message.event == "position_history" else FRAME_TYPE_DELTA
+                    message = self.delta_encoder.encode(message.positions, frame_type)
+                # 送信が終わらないまま止まっている接続はハートビートの確認で切断する
+                self.send_started = time.monotonic()
+                if isinstance(message, bytes):
+                    await self.websocket.send_bytes(message)
+                else:
+                    await self.websocket.send_text(message)
+                self.send_started = 0.0
+                if origin is not None:
+                    server_latency_seconds.observe(time.perf_counter() - origin.received_at)
+                    end_to_end_seconds.observe(time.time() - origin.timestamp / units_per_second)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # 送信に失敗した接続は以後使用できないため登録を解除
+            logger.info("WebSocketへの送信に失敗したため接続を解除します: %s", e)
+            ws_evictions.labels("send_failed").inc()
+            self._writer_task = None
+            self.stop()
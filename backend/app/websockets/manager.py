@@ -1,49 +1,611 @@
+import asyncio
 import json
-from typing import Dict, List, Any
-from fastapi import WebSocket
-from app.schemas.robot import RobotPosition, WebSocketMessage
+import logging
+import time
+from typing import Dict, Any, Iterable, List, Optional, Set, Tuple
+from fastapi import WebSocket, status
+from app.config import settings
+from app.core.metrics import broadcast_seconds, registry, ws_rejected_connections
+from app.core.serialization import encode_event
+from app.schemas.delta import DeltaEncoder
+from app.schemas.frames import MAX_BATCH_POSITIONS, BatchFrame, PositionFrame, iter_positions
+from app.services.downsampling import DeadBandFilter
+from app.services.history import PositionHistory
+from app.services.motion import DeadReckoningFilter, MotionTracker
+from app.services.position_bus import PositionBus, Subscription
+from app.services.spatial import GeofenceRegistry, GridIndex, Region
+from app.websockets.connection import ClientConnection, OverflowPolicy
+from app.websockets.protocol import (
+    DeliveryMode,
+    FrameFormat,
+    negotiate_dead_band,
+    negotiate_dead_reckoning,
+    negotiate_delta_precision,
+    negotiate_format,
+    negotiate_heartbeat,
+    negotiate_mode,
+    negotiate_region,
+    negotiate_replay,
+    negotiate_robot_ids,
+)
+from app.websockets.registry import ConnectionRegistry
+
+logger = logging.getLogger(__name__)
 
 
 class ConnectionManager:
     """WebSocket接続を管理するクラス"""
     
     def __init__(self):
-        # アクティブなWebSocket接続のリスト
-        self.active_connections: List[WebSocket] = []
+        # アクティブなWebSocket接続とその送信キューの対応
+        self.active_connections = ConnectionRegistry(settings.WS_MAX_CONNECTIONS, settings.WS_MAX_CONNECTIONS_PER_IP)
+        # 購読インデックス: すべてのロボットを購読するクライアントと、ロボットID→購読クライアント
+        self._all_robots_subscribers: Set[ClientConnection] = set()
+        self._robot_subscribers: Dict[str, Set[ClientConnection]] = {}
+        # 領域を指定したクライアントは上の購読インデックスではなく空間インデックスに登録する
+        self._region_clients: Set[ClientConnection] = set()
+        self._region_index: GridIndex[ClientConnection] = GridIndex()
+        self.queue_size = settings.WS_SEND_QUEUE_SIZE
+        self.overflow_policy = OverflowPolicy(settings.WS_OVERFLOW_POLICY)
+        self.default_delivery_mode = DeliveryMode(settings.WS_DELIVERY_MODE)
+        self.batch_interval = settings.WS_BATCH_INTERVAL_MS / 1000
+        # 1フレームの件数はバイナリ形式のバッチフレームに格納できる件数まで
+        self.batch_max_size = min(settings.WS_BATCH_MAX_SIZE, MAX_BATCH_POSITIONS)
+        self.replay_points = settings.WS_REPLAY_POINTS
+        self.min_distance = settings.WS_MIN_DISTANCE
+        self.min_interval_ms = settings.WS_MIN_INTERVAL_MS
+        self.heartbeat_interval = settings.WS_HEARTBEAT_INTERVAL_S
+        self.heartbeat_timeout = settings.WS_HEARTBEAT_TIMEOUT_S
+        self.send_timeout = settings.WS_SEND_TIMEOUT_S
+        # ロボットごとの運動モデル（None はデッドレコニングを使用しない）
+        self.motion = MotionTracker.create(settings.WS_MOTION_MODEL, settings.WS_MOTION_SMOOTHING)
+        self.history: Optional[PositionHistory] = None
+        self.geofences: Optional[GeofenceRegistry] = None
+        # batch / latest モードのクライアントに送信待ちの位置更新
+        self._pending: List[PositionFrame] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._subscription: Optional[Subscription] = None
+        self._consumer_task: Optional[asyncio.Task] = None
+        self._heartbeat_task: Optional[asyncio.Task] = None
+    
+    def start(
+        self,
+        bus: PositionBus,
+        history: Optional[PositionHistory] = None,
+        geofences: Optional[GeofenceRegistry] = None,
+    ):
+        """位置バスの購読を開始し、受信した位置をブロードキャストする
+
+        history を指定した場合、新しいクライアントの接続時に直近の履歴を再送する。
+        geofences を指定した場合、位置更新ごとにジオフェンスの出入りを判定して enter / exit を通知する。
+        """
+        if self._consumer_task is not None:
+            return
+        self.history = history
+        self.geofences = geofences
+        self._subscription = bus.subscribe("websocket")
+        self._consumer_task = asyncio.create_task(self._consume())
+        if self.heartbeat_interval > 0:
+            self._heartbeat_task = asyncio.create_task(self._heartbeat())
+    
+    async def stop(self):
+        """位置バスの購読を停止"""
+        if self._subscription:
+            self._subscription.close()
+            self._subscription = None
+        for task in (self._consumer_task, self._heartbeat_task):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._consumer_task = None
+        self._heartbeat_task = None
+        if self._flush_handle:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        self._pending = []
+    
+    async def _consume(self):
+        """位置バスから読み出した位置を順にブロードキャスト（まとめて受信した位置はここで位置フレームにする）"""
+        subscription = self._subscription
+        while subscription and not subscription.closed:
+            positions = await subscription.get()
+            for position in iter_positions(positions):
+                try:
+                    await self.broadcast_position(position)
+                except Exception as e:
+                    logger.error("位置のブロードキャスト中にエラーが発生: %s", e)
+    
+    async def _heartbeat(self):
+        """一定間隔で接続を確認"""
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            self.check_connections()
+    
+    def check_connections(self):
+        """送信が止まったクライアントと ping に応答しなくなったクライアントを切断し、残りに ping を送信
+
+        ping イベントは接続時に heartbeat=1 を指定したか、一度でも pong（{"action": "pong"}）を返した
+        クライアントにだけ送信し、pong を返したクライアントだけを応答のタイムアウトの対象にする。
+        それ以外のクライアントの生存確認はWebSocketプロトコルの ping（uvicorn の ws_ping_interval）に任せる。
+        """
+        now = time.monotonic()
+        ping = encode_event("ping", {"server_time": int(time.time() * 1000)})
+        for client in list(self.active_connections):
+            if client.send_started and now - client.send_started > self.send_timeout:
+                client.evict("send_timeout")
+            elif client.answers_pings and now - client.last_seen > self.heartbeat_timeout:
+                client.evict("heartbeat_timeout", status.WS_1001_GOING_AWAY)
+            elif client.heartbeat:
+                client.enqueue(ping)
     
-    async def connect(self, websocket: WebSocket):
-        """新しいWebSocket接続を処理"""
-        await websocket.accept()
-        self.active_connections.append(websocket)
+    async def connect(self, websocket: WebSocket) -> bool:
+        """新しいWebSocket接続を処理（接続数の上限により拒否した場合は False を返す）
+
+        上限の判定と同時に接続の枠を予約し、ハンドシェイクの完了を待つ間に同時に接続した
+        クライアントが上限を超えて受け付けられないようにする。
+        """
+        rejected = self.active_connections.admit(websocket)
+        if rejected is not None:
+            ws_rejected_connections.labels(rejected).inc()
+            logger.warning("接続数の上限に達したため接続を拒否します（%s）", rejected)
+            await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+            return False
+        try:
+            # フレーム形式をネゴシエーション（指定がない場合は従来どおりJSON）
+            frame_format, subprotocol = negotiate_format(websocket)
+            delivery_mode = negotiate_mode(websocket, self.default_delivery_mode)
+            robot_ids = negotiate_robot_ids(websocket)
+            replay = negotiate_replay(websocket, self.replay_points, settings.HISTORY_CAPACITY)
+            min_distance, min_interval = negotiate_dead_band(websocket, self.min_distance, self.min_interval_ms)
+            live_filter = DeadBandFilter.create(min_distance, min_interval)
+            dead_reckoning = None
+            if self.motion is not None and frame_format == FrameFormat.JSON and delivery_mode == DeliveryMode.STREAM:
+                # 速度は JSON 形式のストリーム配信のフレームにのみ含めるため、それ以外では使用しない
+                tolerance, max_interval_ms = negotiate_dead_reckoning(
+                    websocket, settings.WS_DR_TOLERANCE, settings.WS_DR_MAX_INTERVAL_MS
+                )
+                if tolerance > 0:
+                    # 間引き条件は予測位置との誤差に対して適用する（表示される誤差の上限を保つため）
+                    dead_reckoning = DeadReckoningFilter(tolerance, max_interval_ms, min_distance, min_interval)
+                    live_filter = dead_reckoning
+            delta_encoder = None
+            if frame_format == FrameFormat.DELTA:
+                precision = negotiate_delta_precision(websocket, settings.WS_DELTA_PRECISION)
+                delta_encoder = DeltaEncoder(precision, settings.WS_DELTA_KEYFRAME_INTERVAL)
+            await websocket.accept(subprotocol=subprotocol)
+            client = ClientConnection(
+                websocket,
+                queue_size=self.queue_size,
+                overflow_policy=self.overflow_policy,
+                on_close=self._remove_client,
+                frame_format=frame_format,
+                delivery_mode=delivery_mode,
+                live_filter=live_filter,
+                region=negotiate_region(websocket),
+                delta_encoder=delta_encoder,
+                dead_reckoning=dead_reckoning is not None,
+                heartbeat=negotiate_heartbeat(websocket),
+            )
+            self.active_connections.add(client)
+        finally:
+            # 登録する前に失敗した場合は予約した枠を解放（登録済みの場合は何もしない）
+            self.active_connections.release(websocket)
+        self._index(client, robot_ids)
+        client.start()
         await self.send_event(websocket, "connected", {"message": "ロボットトラッカーに接続されました"})
+        if delta_encoder is not None:
+            # デコードに必要なパラメータを位置更新より先に通知
+            await self.send_event(
+                websocket,
+                "encoding",
+                {
+                    "format": FrameFormat.DELTA.value,
+                    "scale": delta_encoder.scale,
+                    "keyframe_interval": delta_encoder.keyframe_interval,
+                },
+            )
+        if dead_reckoning is not None:
+            await self._send_motion_model(websocket, dead_reckoning)
+        self._replay(client, replay)
+        return True
+    
+    async def _send_motion_model(self, websocket: WebSocket, dead_reckoning: DeadReckoningFilter):
+        """デッドレコニングの条件を motion_model イベントで通知
+
+        クライアントは最後に受信した位置と速度から等速度で外挿して位置を予測する。
+        tolerance は間引き条件を含めた、予測位置との誤差の上限。
+        """
+        await self.send_event(
+            websocket,
+            "motion_model",
+            {
+                "model": self.motion.model,
+                "tolerance": dead_reckoning.threshold,
+                "max_interval_ms": dead_reckoning.max_interval_ms,
+                "min_interval_ms": int(dead_reckoning.min_interval * 1000 / settings.TIMESTAMP_UNITS_PER_SECOND),
+                "timestamp_units_per_second": settings.TIMESTAMP_UNITS_PER_SECOND,
+            },
+        )
+    
+    def _replay(self, client: ClientConnection, count: int):
+        """購読対象のロボットごとに直近 count 件の履歴を position_history イベントで送信"""
+        if self.history is None or count <= 0:
+            return
+        robot_ids = self.history.robot_ids if client.robot_ids is None else sorted(client.robot_ids)
+        for robot_id in robot_ids:
+            positions = self.history.latest(robot_id, count)
+            # バイナリ形式のバッチフレームに格納できる件数ごとに分けて送信
+            for start in range(0, len(positions), MAX_BATCH_POSITIONS):
+                chunk = positions[start:start + MAX_BATCH_POSITIONS]
+                client.enqueue(client.encode(BatchFrame(chunk, "position_history")))
     
     def disconnect(self, websocket: WebSocket):
         """WebSocket接続を切断"""
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
+        client = self.active_connections.remove(websocket)
+        if client:
+            self._unindex(client)
+            client.stop()
+    
+    def _remove_client(self, client: ClientConnection):
+        """送信タスクが終了したクライアントを登録から外す"""
+        if self.active_connections.get(client.websocket) is client:
+            self.active_connections.remove(client.websocket)
+            self._unindex(client)
+    
+    def _index(self, client: ClientConnection, robot_ids: Optional[Iterable[str]]):
+        """クライアントの購読対象を設定し、購読インデックス（領域を指定した場合は空間インデックス）に登録"""
+        self._unindex(client)
+        client.robot_ids = None if robot_ids is None else set(robot_ids)
+        if client.region is not None:
+            self._region_clients.add(client)
+            self._region_index.insert(client, client.region.bbox)
+        elif client.robot_ids is None:
+            self._all_robots_subscribers.add(client)
+        else:
+            for robot_id in client.robot_ids:
+                self._robot_subscribers.setdefault(robot_id, set()).add(client)
+    
+    def _unindex(self, client: ClientConnection):
+        """クライアントを購読インデックスから削除"""
+        self._all_robots_subscribers.discard(client)
+        if client in self._region_clients:
+            self._region_clients.discard(client)
+            self._region_index.remove(client)
+        for robot_id in client.robot_ids or ():
+            subscribers = self._robot_subscribers.get(robot_id)
+            if subscribers is not None:
+                subscribers.discard(client)
+                if not subscribers:
+                    del self._robot_subscribers[robot_id]
+    
+    def subscribe(self, websocket: WebSocket, robot_ids: Optional[Iterable[str]]):
+        """購読するロボットを追加（None の場合はすべてのロボットを購読）"""
+        client = self.active_connections.get(websocket)
+        if client is None:
+            return
+        if robot_ids is None or client.robot_ids is None:
+            self._index(client, None if robot_ids is None else robot_ids)
+        else:
+            self._index(client, client.robot_ids | set(robot_ids))
+    
+    def set_region(self, websocket: WebSocket, region: Optional[Region]):
+        """受信する領域を変更（None の場合はすべての位置を受信）"""
+        client = self.active_connections.get(websocket)
+        if client is None:
+            return
+        client.region = region
+        self._index(client, client.robot_ids)
+    
+    def unsubscribe(self, websocket: WebSocket, robot_ids: Optional[Iterable[str]]):
+        """購読するロボットを削除（None の場合はすべての購読を解除）"""
+        client = self.active_connections.get(websocket)
+        if client is None:
+            return
+        if robot_ids is None:
+            self._index(client, [])
+        elif client.robot_ids is not None:
+            self._index(client, client.robot_ids - set(robot_ids))
+    
+    async def handle_message(self, websocket: WebSocket, text: str):
+        """クライアントから受信したメッセージを処理
+
+        {"action": "subscribe" | "unsubscribe", "robot_ids": [...]} の形式で購読を変更する。
+        robot_ids を省略するか null の場合はすべてのロボットが対象になる。
+        {"action": "filter", "min_distance": 1.0, "min_interval_ms": 200} の形式で
+        ライブ配信の間引き条件を変更する（0 または省略で間引かない。デッドレコニングを使用する
+        クライアントでは予測位置との誤差に適用し、motion_model イベントを再送する）。
+        {"action": "region", "region": {"type": "rect" | "polygon", ...}} の形式で受信する領域を
+        変更する（null で解除）。
+        {"action": "pong"} は ping イベントへの応答（受信したメッセージはすべて生存確認として扱う）。
+        """
+        client = self.active_connections.get(websocket)
+        if client is not None:
+            client.touch()
+        try:
+            message = json.loads(text)
+            action = message.get("action")
+            robot_ids = message.get("robot_ids")
+            if robot_ids is not None and not isinstance(robot_ids, list):
+                raise ValueError("robot_ids はリストで指定してください")
+        except (ValueError, AttributeError) as e:
+            await self.send_event(websocket, "error", {"message": f"不正なメッセージ: {e}"})
+            return
+        
+        if action == "pong":
+            if client is not None:
+                client.answers_pings = True
+                client.heartbeat = True
+            return
+        if action == "filter":
+            await self._set_filter(websocket, message)
+            return
+        if action == "region":
+            await self._set_region(websocket, message)
+            return
+        if action == "subscribe":
+            self.subscribe(websocket, robot_ids)
+        elif action == "unsubscribe":
+            self.unsubscribe(websocket, robot_ids)
+        else:
+            await self.send_event(websocket, "error", {"message": f"不明なアクション: {action}"})
+            return
+        
+        client = self.active_connections.get(websocket)
+        if client is not None:
+            subscribed = None if client.robot_ids is None else sorted(client.robot_ids)
+            await self.send_event(websocket, "subscribed", {"robot_ids": subscribed})
+    
+    async def _set_filter(self, websocket: WebSocket, message: Dict[str, Any]):
+        """クライアントのライブ配信の間引き条件を変更"""
+        client = self.active_connections.get(websocket)
+        if client is None:
+            return
+        try:
+            min_distance = max(0.0, float(message.get("min_distance") or 0))
+            min_interval = max(0, int(message.get("min_interval_ms") or 0)) / 1000
+        except (TypeError, ValueError) as e:
+            await self.send_event(websocket, "error", {"message": f"不正なメッセージ: {e}"})
+            return
+        dead_reckoning = client.live_filter if client.dead_reckoning else None
+        if isinstance(dead_reckoning, DeadReckoningFilter):
+            # デッドレコニングは維持し、間引き条件を予測位置との誤差に対して適用する
+            dead_reckoning.set_dead_band(min_distance, min_interval)
+        else:
+            client.live_filter = DeadBandFilter.create(min_distance, min_interval)
+        await self.send_event(
+            websocket,
+            "filter",
+            {"min_distance": min_distance, "min_interval_ms": int(min_interval * 1000)},
+        )
+        if isinstance(dead_reckoning, DeadReckoningFilter):
+            await self._send_motion_model(websocket, dead_reckoning)
+    
+    async def _set_region(self, websocket: WebSocket, message: Dict[str, Any]):
+        """クライアントの受信する領域を変更"""
+        try:
+            data = message.get("region")
+            region = None if data is None else Region.from_dict(data)
+        except ValueError as e:
+            await self.send_event(websocket, "error", {"message": f"不正なメッセージ: {e}"})
+            return
+        self.set_region(websocket, region)
+        await self.send_event(websocket, "region", {"region": None if region is None else region.to_dict()})
+    
+    def _subscribers(self, robot_id: str, position: Optional[PositionFrame] = None) -> List[ClientConnection]:
+        """指定したロボットの位置を受信するクライアント一覧
+
+        position を指定した場合、領域を指定したクライアントは空間インデックスで絞り込み、
+        その位置を領域内に含むクライアントのみを返す（省略した場合は領域によらずすべて）。
+        """
+        subscribers = list(self._all_robots_subscribers)
+        robot_subscribers = self._robot_subscribers.get(robot_id)
+        if robot_subscribers:
+            subscribers.extend(robot_subscribers)
+        if self._region_clients:
+            if position is None:
+                candidates: Iterable[ClientConnection] = self._region_clients
+            else:
+                candidates = [
+                    client for client in self._region_index.query(position.x, position.y)
+                    if client.region.contains(position.x, position.y)
+                ]
+            subscribers.extend(
+                client for client in candidates if client.robot_ids is None or robot_id in client.robot_ids
+            )
+        return subscribers
+    
+    @property
+    def robot_subscriber_counts(self) -> Dict[str, int]:
+        """ロボットごとの購読クライアント数（すべてを購読するクライアントは含まない）"""
+        return {robot_id: len(clients) for robot_id, clients in self._robot_subscribers.items()}
+    
+    def queue_depths(self) -> Dict[str, Tuple[int, int]]:
+        """配信モードごとの送信キューの長さの (最大値, 合計)（メトリクス用）
+
+        クライアントごとに系列を作ると接続のたびに系列が増え続けるため、配信モード単位で集計する。
+        """
+        depths: Dict[str, Tuple[int, int]] = {mode.value: (0, 0) for mode in DeliveryMode}
+        for client in self.active_connections.values():
+            depth = client.queue.qsize()
+            longest, total = depths[client.delivery_mode.value]
+            depths[client.delivery_mode.value] = (max(longest, depth), total + depth)
+        return depths
+    
+    def stats(self) -> Dict[str, Any]:
+        """このワーカーの接続数と購読状況"""
+        return {
+            "connections": len(self.active_connections),
+            "subscriptions": self.robot_subscriber_counts,
+            "region_subscribers": len(self._region_clients),
+            "client_ips": self.active_connections.ip_count(),
+            **self.active_connections.breakdown(),
+        }
     
     async def send_event(self, websocket: WebSocket, event: str, data: Any = None):
         """特定のWebSocket接続にイベントを送信"""
-        message = WebSocketMessage(event=event, data=data)
-        await websocket.send_text(json.dumps(message.dict()))
+        client = self.active_connections.get(websocket)
+        if client is None:
+            return
+        client.enqueue(encode_event(event, data))
+    
+    def broadcast_event(self, robot_id: str, event: str, data: Any = None):
+        """ロボットに関するイベントをそのロボットを購読しているクライアントに送信（エンコードは1回のみ）
+
+        送信キューに追加するだけで待機しないため、受信タスクやワーカー間の中継から直接呼び出せる。
+        """
+        self._send_event_to_subscribers(robot_id, event, data)
+    
+    def _send_event_to_subscribers(self, robot_id: str, event: str, data: Any = None):
+        """イベントを1回だけエンコードし、ロボットを購読しているクライアントの送信キューに追加"""
+        if not self.active_connections:
+            return
+        message = encode_event(event, data)
+        for client in self._subscribers(robot_id):
+            client.enqueue(message)
     
-    async def broadcast_position(self, position: RobotPosition):
-        """ロボットの位置をすべての接続クライアントにブロードキャスト"""
+    async def broadcast_position(self, position: PositionFrame):
+        """ロボットの位置をそのロボットを購読しているクライアントにブロードキャスト"""
+        # ジオフェンスの状態は接続がなくても更新しておく
+        if self.geofences is not None:
+            for event, fence_id in self.geofences.update(position):
+                self._send_event_to_subscribers(
+                    position.robot_id, event, {"fence_id": fence_id, **position.to_dict()}
+                )
+        
+        if self.motion is not None:
+            self.motion.update(position)
+        
         if not self.active_connections:
             return
-            
-        message = WebSocketMessage(event="position_update", data=position)
-        message_json = json.dumps(message.dict())
         
-        # メッセージをすべての接続クライアントにブロードキャスト
-        for connection in self.active_connections:
-            try:
-                await connection.send_text(message_json)
-            except Exception:
-                # 送信に失敗した場合、この接続を閉じる必要があるかもしれません
-                # ここではエラーを無視して、他の接続に影響を与えないようにします
-                pass
+        start = time.perf_counter()
+        # エンコードは形式ごとに1回だけ行い、同じフレームをすべてのクライアントで共有
+        # 各クライアントの送信キューに追加するだけで、送信自体は各クライアントの
+        # 送信タスクが並行して行うため、遅いクライアントが他をブロックしない
+        coalesce = False
+        for client in self._subscribers(position.robot_id, position):
+            if client.delivery_mode != DeliveryMode.STREAM:
+                coalesce = True
+            elif client.live_filter is not None and not client.live_filter.accept(position):
+                continue
+            elif client.dead_reckoning:
+                client.enqueue(position.motion_json_frame, position)
+            elif client.frame_format == FrameFormat.JSON:
+                client.enqueue(position.json_frame, position)
+            else:
+                client.enqueue(client.encode(position), position)
+        
+        if coalesce:
+            self._coalesce(position)
+        broadcast_seconds.observe(time.perf_counter() - start)
+    
+    def _coalesce(self, position: PositionFrame):
+        """batch / latest モード向けに位置更新を蓄積し、期間満了か上限到達で送信"""
+        self._pending.append(position)
+        if len(self._pending) >= self.batch_max_size:
+            self._flush()
+        elif self._flush_handle is None:
+            loop = asyncio.get_running_loop()
+            self._flush_handle = loop.call_later(self.batch_interval, self._flush)
+    
+    def _flush(self):
+        """蓄積した位置更新を batch / latest モードのクライアントに送信"""
+        if self._flush_handle:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._pending:
+            return
+        
+        pending = self._pending
+        self._pending = []
+        
+        # ロボットごとにまとめる（フレームはロボット単位で共有）
+        by_robot: Dict[str, List[PositionFrame]] = {}
+        for position in pending:
+            by_robot.setdefault(position.robot_id, []).append(position)
+        latest = {robot_id: positions[-1] for robot_id, positions in by_robot.items()}
+        
+        # すべてのロボットを購読するクライアントには全件を1フレームで送信
+        if self._all_robots_subscribers:
+            batch = BatchFrame(pending)
+            for client in list(self._all_robots_subscribers):
+                if client.delivery_mode == DeliveryMode.BATCH:
+                    self._send_batch(client, batch)
+                elif client.delivery_mode == DeliveryMode.LATEST:
+                    for position in latest.values():
+                        self._send_latest(client, position)
+        
+        # 特定のロボットを購読するクライアントにはロボットごとのフレームを送信
+        for robot_id, positions in by_robot.items():
+            subscribers = self._robot_subscribers.get(robot_id)
+            if not subscribers:
+                continue
+            batch = BatchFrame(positions)
+            for client in list(subscribers):
+                if client.delivery_mode == DeliveryMode.BATCH:
+                    self._send_batch(client, batch)
+                elif client.delivery_mode == DeliveryMode.LATEST:
+                    self._send_latest(client, latest[robot_id])
+        
+        # 領域を指定したクライアントには領域内の位置だけでそのクライアント専用のフレームを作成
+        if self._region_clients:
+            self._flush_regions(pending)
+    
+    def _flush_regions(self, pending: List[PositionFrame]):
+        """batch / latest モードで領域を指定したクライアントに、領域内の位置更新を送信"""
+        by_client: Dict[ClientConnection, List[PositionFrame]] = {}
+        for position in pending:
+            x, y = position.x, position.y
+            for client in self._region_index.query(x, y):
+                if client.delivery_mode == DeliveryMode.STREAM or not client.region.contains(x, y):
+                    continue
+                if client.robot_ids is None or position.robot_id in client.robot_ids:
+                    by_client.setdefault(client, []).append(position)
+        for client, positions in by_client.items():
+            if client.delivery_mode == DeliveryMode.BATCH:
+                self._send_batch(client, BatchFrame(positions))
+            else:
+                latest = {position.robot_id: position for position in positions}
+                for position in latest.values():
+                    self._send_latest(client, position)
+    
+    @staticmethod
+    def _send_batch(client: ClientConnection, batch: BatchFrame):
+        """バッチフレームを送信（間引きを行うクライアントにはそのクライアント専用のフレームを作成）"""
+        if client.live_filter is not None:
+            positions = [position for position in batch.positions if client.live_filter.accept(position)]
+            if not positions:
+                return
+            if len(positions) < len(batch.positions):
+                batch = BatchFrame(positions)
+        client.enqueue(client.encode(batch), batch.positions[-1])
+    
+    @staticmethod
+    def _send_latest(client: ClientConnection, position: PositionFrame):
+        """最新の位置を送信（間引き条件を満たさない場合は送信しない）"""
+        if client.live_filter is not None and not client.live_filter.accept(position):
+            return
+        client.enqueue(client.encode(position), position)
 
 
 # グローバル接続マネージャーインスタンス
-manager = ConnectionManager()
\ No newline at end of file
+manager = ConnectionManager()
+
+registry.gauge_callback(
+    "robot_ws_connections", "WebSocketの接続数", (), lambda: [((), len(manager.active_connections))]
+)
+registry.gauge_callback(
+    "robot_ws_queue_depth_max",
+    "配信モードごとの送信キューの長さの最大値",
+    ("mode",),
+    lambda: [((mode,), longest) for mode, (longest, _) in manager.queue_depths().items()],
+)
+registry.gauge_callback(
+    "robot_ws_queue_depth_sum",
+    "配信モードごとの送信キューの長さの合計",
+    ("mode",),
+    lambda: [((mode,), total) for mode, (_, total) in manager.queue_depths().items()],
+)
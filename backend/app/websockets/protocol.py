@@ -0,0 +1,162 @@
+from enum import Enum
+from typing import List, Optional, Tuple
+from fastapi import WebSocket
+from app.services.spatial import Region
+
+
+class FrameFormat(str, Enum):
+    """位置更新のフレーム形式
+
+    - json: {"event": "position_update", "data": {...}} のテキストフレーム（デフォルト）
+    - binary: 種別1バイト + 位置レコードのリトルエンディアンのバイナリフレーム。位置レコードは
+      ロボットIDの長さ(uint8) + ロボットID(UTF-8) + x(float32) + y(float32) + timestamp(int64)。
+      position_batch（種別2）と position_history（種別3）は種別1バイト + 件数(uint16) の後に
+      位置レコードが続く
+    - protobuf: robot.Position メッセージをシリアライズしたバイナリフレーム。position_batch と
+      position_history はvarintの長さプレフィックス付きメッセージを連結したもの
+    - delta: 座標を固定小数点に丸め、クライアントに直前に送信した位置との差分をvarintで詰めた
+      バイナリフレーム（形式は app.schemas.delta.DeltaEncoder）。接続時に encoding イベントで
+      精度とキーフレームの間隔を通知する
+
+    バイナリ形式でも、位置更新以外のイベント（connected など）はJSONテキストフレームで送信する。
+    """
+    JSON = "json"
+    BINARY = "binary"
+    PROTOBUF = "protobuf"
+    DELTA = "delta"
+
+
+class DeliveryMode(str, Enum):
+    """位置更新の配信モード
+
+    - stream: 位置更新を受信するたびに1フレーム送信（デフォルト）
+    - batch: 一定期間（または一定件数）の位置更新を1つの position_batch イベントにまとめて送信
+    - latest: 一定期間ごとに最新の位置更新のみを送信
+    """
+    STREAM = "stream"
+    BATCH = "batch"
+    LATEST = "latest"
+
+
+# サブプロトコル名とフレーム形式の対応
+SUBPROTOCOLS = {
+    "robot.json.v1": FrameFormat.JSON,
+    "robot.binary.v1": FrameFormat.BINARY,
+    "robot.protobuf.v1": FrameFormat.PROTOBUF,
+    "robot.delta.v1": FrameFormat.DELTA,
+}
+
+
+def negotiate_format(websocket: WebSocket) -> Tuple[FrameFormat, Optional[str]]:
+    """サブプロトコルまたはクエリパラメータ format からフレーム形式を決定
+
+    クライアントが要求したサブプロトコルのうち最初に対応しているものを優先し、
+    選択したサブプロトコル名も返す（ハンドシェイクの応答に含める必要があるため）。
+    """
+    for subprotocol in websocket.scope.get("subprotocols", []):
+        frame_format = SUBPROTOCOLS.get(subprotocol)
+        if frame_format is not None:
+            return frame_format, subprotocol
+
+    try:
+        return FrameFormat(websocket.query_params.get("format", FrameFormat.JSON.value)), None
+    except ValueError:
+        return FrameFormat.JSON, None
+
+
+def negotiate_mode(websocket: WebSocket, default: DeliveryMode) -> DeliveryMode:
+    """クエリパラメータ mode から配信モードを決定"""
+    try:
+        return DeliveryMode(websocket.query_params.get("mode", default.value))
+    except ValueError:
+        return default
+
+
+def negotiate_robot_ids(websocket: WebSocket) -> Optional[List[str]]:
+    """クエリパラメータ robots（カンマ区切り）から購読するロボットIDを決定
+
+    指定がない場合は None（すべてのロボットを購読）を返す。
+    """
+    robots = websocket.query_params.get("robots")
+    if not robots:
+        return None
+    return [robot_id for robot_id in robots.split(",") if robot_id]
+
+
+def negotiate_replay(websocket: WebSocket, default: int, maximum: int) -> int:
+    """クエリパラメータ replay から接続時に再送する履歴の件数を決定"""
+    try:
+        replay = int(websocket.query_params.get("replay", default))
+    except ValueError:
+        return default
+    return max(0, min(replay, maximum))
+
+
+def negotiate_dead_band(
+    websocket: WebSocket, default_distance: float, default_interval_ms: int
+) -> Tuple[float, float]:
+    """クエリパラメータ min_distance / min_interval_ms からライブ配信の間引き条件を決定
+
+    (最小移動距離, 最小送信間隔（秒）) を返す。
+    """
+    try:
+        min_distance = float(websocket.query_params.get("min_distance", default_distance))
+    except ValueError:
+        min_distance = default_distance
+    try:
+        min_interval_ms = int(websocket.query_params.get("min_interval_ms", default_interval_ms))
+    except ValueError:
+        min_interval_ms = default_interval_ms
+    return max(0.0, min_distance), max(0, min_interval_ms) / 1000
+
+
+def negotiate_dead_reckoning(
+    websocket: WebSocket, default_tolerance: float, default_max_interval_ms: int
+) -> Tuple[float, int]:
+    """クエリパラメータ dr_tolerance / dr_max_interval_ms からデッドレコニングの条件を決定
+
+    (予測位置との許容誤差, 最大送信間隔（ミリ秒）) を返す。許容誤差が0の場合は使用しない。
+    """
+    try:
+        tolerance = float(websocket.query_params.get("dr_tolerance", default_tolerance))
+    except ValueError:
+        tolerance = default_tolerance
+    try:
+        max_interval_ms = int(websocket.query_params.get("dr_max_interval_ms", default_max_interval_ms))
+    except ValueError:
+        max_interval_ms = default_max_interval_ms
+    return max(0.0, tolerance), max(0, max_interval_ms)
+
+
+def negotiate_region(websocket: WebSocket) -> Optional[Region]:
+    """クエリパラメータ bbox（min_x,min_y,max_x,max_y）から受信する領域を決定
+
+    指定がないか不正な場合は None（すべての位置を受信）を返す。多角形は接続後に
+    {"action": "region"} メッセージで指定する。
+    """
+    bbox = websocket.query_params.get("bbox")
+    if not bbox:
+        return None
+    try:
+        min_x, min_y, max_x, max_y = (float(value) for value in bbox.split(","))
+        return Region.rect(min_x, min_y, max_x, max_y)
+    except ValueError:
+        return None
+
+
+def negotiate_heartbeat(websocket: WebSocket) -> bool:
+    """クエリパラメータ heartbeat からアプリケーションレベルの ping イベントを受信するかを決定
+
+    ping イベントは {"action": "pong"} を返すクライアント向けで、指定しない場合は送信しない
+    （位置更新以外のフレームを想定していないクライアントの生存確認はWebSocketプロトコルの ping で行う）。
+    """
+    return websocket.query_params.get("heartbeat", "").lower() in ("1", "true")
+
+
+def negotiate_delta_precision(websocket: WebSocket, default: int) -> int:
+    """クエリパラメータ precision からデルタ形式の座標の小数点以下の桁数を決定（0〜6）"""
+    try:
+        precision = int(websocket.query_params.get("precision", default))
+    except ValueError:
+        return default
+    return max(0, min(precision, 6))
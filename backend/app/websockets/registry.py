@@ -0,0 +1,99 @@
+from collections import Counter
+from typing import Dict, Iterator, Optional
+
+from fastapi import WebSocket
+
+from app.websockets.connection import ClientConnection
+
+
+class ConnectionRegistry:
+    """WebSocket接続の登録簿
+
+    接続の追加・削除はどちらも O(1) で、IPアドレスごとの接続数とフレーム形式・配信モード
+    ごとの内訳を追加・削除のたびに更新するため、状態の取得時に全接続を走査しない。
+    max_connections / max_connections_per_ip が0の場合は上限を設けない。
+    """
+
+    def __init__(self, max_connections: int = 0, max_connections_per_ip: int = 0):
+        self.max_connections = max_connections
+        self.max_connections_per_ip = max_connections_per_ip
+        self._clients: Dict[WebSocket, ClientConnection] = {}
+        self._reserved: Dict[WebSocket, str] = {}  # 受け付けたがまだ登録していない接続→IPアドレス
+        self._per_ip: Counter = Counter()  # 予約中の接続を含む
+        self._formats: Counter = Counter()
+        self._modes: Counter = Counter()
+
+    @staticmethod
+    def client_ip(websocket: WebSocket) -> str:
+        """接続元のIPアドレス（取得できない場合は unknown）"""
+        peer = websocket.client
+        return peer.host if peer else "unknown"
+
+    def admit(self, websocket: WebSocket) -> Optional[str]:
+        """新しい接続を受け付けられるか判定して枠を予約し、受け付けられない場合はその理由を返す
+
+        判定と予約の間で待機しないため、同時に接続しても上限を超えない。予約した枠は
+        add で登録するか release で解放すること。
+        """
+        if self.max_connections > 0 and len(self._clients) + len(self._reserved) >= self.max_connections:
+            return "max_connections"
+        ip = self.client_ip(websocket)
+        if self.max_connections_per_ip > 0 and self._per_ip[ip] >= self.max_connections_per_ip:
+            return "max_connections_per_ip"
+        self._reserved[websocket] = ip
+        self._per_ip[ip] += 1
+        return None
+
+    def release(self, websocket: WebSocket):
+        """admit で予約した枠を解放（予約していない場合は何もしない）"""
+        ip = self._reserved.pop(websocket, None)
+        if ip is not None:
+            self._decrement(self._per_ip, ip)
+
+    def add(self, client: ClientConnection):
+        """接続を登録（同じソケットが登録済みの場合は置き換え、予約した枠は登録に置き換える）"""
+        self.remove(client.websocket)
+        self.release(client.websocket)
+        self._clients[client.websocket] = client
+        self._per_ip[client.ip] += 1
+        self._formats[client.frame_format.value] += 1
+        self._modes[client.delivery_mode.value] += 1
+
+    def remove(self, websocket: WebSocket) -> Optional[ClientConnection]:
+        """接続の登録を解除し、登録されていたクライアントを返す"""
+        client = self._clients.pop(websocket, None)
+        if client is None:
+            return None
+        self._decrement(self._per_ip, client.ip)
+        self._decrement(self._formats, client.frame_format.value)
+        self._decrement(self._modes, client.delivery_mode.value)
+        return client
+
+    @staticmethod
+    def _decrement(counter: Counter, key: str):
+        counter[key] -= 1
+        if counter[key] <= 0:
+            del counter[key]
+
+    def get(self, websocket: WebSocket) -> Optional[ClientConnection]:
+        return self._clients.get(websocket)
+
+    def values(self):
+        return self._clients.values()
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    def __iter__(self) -> Iterator[ClientConnection]:
+        return iter(self._clients.values())
+
+    def __contains__(self, websocket: WebSocket) -> bool:
+        return websocket in self._clients
+
+    def breakdown(self) -> Dict[str, Dict[str, int]]:
+        """フレーム形式・配信モードごとの接続数"""
+        return {"formats": dict(self._formats), "modes": dict(self._modes)}
+
+    def ip_count(self) -> int:
+        """接続元のIPアドレスの数"""
+        return len(self._per_ip)
@@ -0,0 +1,10 @@
+"""バックエンドの負荷試験・ベンチマーク
+
+偽の robot-tracker gRPCサーバーと WebSocket クライアント群を使って、別プロセスで起動した
+バックエンドのスループット・レイテンシ・CPU・メモリを計測する。
+
+    cd backend
+    python -m benchmarks list
+    python -m benchmarks run baseline --output benchmarks/results/baseline.json
+    python -m benchmarks run baseline --baseline benchmarks/results/baseline.json
+"""
@@ -0,0 +1,77 @@
+import argparse
+import asyncio
+import logging
+import sys
+
+from benchmarks.micro import STAGES, compare_stages, format_stages, run_stages
+from benchmarks.report import compare, format_report, load, save
+from benchmarks.runner import run_scenario
+from benchmarks.scenarios import SCENARIOS
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="バックエンドの負荷試験")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("list", help="シナリオの一覧を表示")
+
+    run = subparsers.add_parser("run", help="シナリオを実行")
+    run.add_argument("scenario", choices=sorted(SCENARIOS))
+    run.add_argument("--duration", type=float, default=10.0, help="計測時間（秒）")
+    run.add_argument("--warmup", type=float, default=2.0, help="計測前のウォームアップ時間（秒）")
+    run.add_argument("--robots", type=int, help="ロボット数")
+    run.add_argument("--rate", type=float, help="ロボットごとの1秒あたりの位置更新数")
+    run.add_argument("--clients", type=int, help="クライアント数")
+    run.add_argument("--slow-clients", type=int, help="遅いクライアント数")
+    run.add_argument("--output", help="結果を保存するJSONファイル")
+    run.add_argument("--baseline", help="比較するベースラインの結果（JSONファイル）")
+
+    micro = subparsers.add_parser("micro", help="位置の処理経路のステージごとのマイクロベンチマーク")
+    micro.add_argument("stages", nargs="*", help=f"実行するステージ（省略時はすべて）: {', '.join(STAGES)}")
+    micro.add_argument("--number", type=int, default=10000, help="1回の計測の処理回数")
+    micro.add_argument("--repeat", type=int, default=5, help="計測の繰り返し回数")
+    micro.add_argument("--clients", type=int, default=100, help="broadcast のクライアント数")
+    micro.add_argument("--output", help="結果を保存するJSONファイル")
+    micro.add_argument("--baseline", help="比較するベースラインの結果（JSONファイル）")
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        for name, scenario in SCENARIOS.items():
+            print(f"{name:<14} {scenario.description}")
+            print(
+                f"{'':<14} ロボット {scenario.robots} 台 × {scenario.rate}Hz, "
+                f"クライアント {scenario.clients} + 遅いクライアント {scenario.slow_clients}, "
+                f"query={scenario.query} env={scenario.env}"
+            )
+        return 0
+
+    if args.command == "micro":
+        unknown = [name for name in args.stages if name not in STAGES]
+        if unknown:
+            parser.error(f"不明なステージ: {', '.join(unknown)}")
+        result = run_stages(args.stages or None, args.number, args.repeat, args.clients)
+        changes = compare_stages(result, load(args.baseline)) if args.baseline else None
+        if changes is not None:
+            result["comparison"] = changes
+        print(format_stages(result, changes))
+        if args.output:
+            save(result, args.output)
+        return 0
+
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    scenario = SCENARIOS[args.scenario].with_overrides(
+        robots=args.robots, rate=args.rate, clients=args.clients, slow_clients=args.slow_clients
+    )
+    result = asyncio.run(run_scenario(scenario, args.duration, args.warmup))
+
+    comparison = None
+    if args.baseline:
+        comparison = compare(result, load(args.baseline))
+        result["comparison"] = comparison
+    print(format_report(result, comparison))
+    if args.output:
+        save(result, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
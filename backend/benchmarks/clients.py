@@ -0,0 +1,160 @@
+import asyncio
+import json
+import logging
+import struct
+import time
+from array import array
+from typing import Dict, List, Optional
+from urllib.parse import urlencode
+
+import websockets
+
+from app.config import settings
+from app.schemas.delta import FRAME_TYPE_DELTA, DeltaDecoder
+from app.schemas.frames import FRAME_TYPE_BATCH, FRAME_TYPE_HISTORY, FRAME_TYPE_POSITION
+from benchmarks.fake_tracker import TIMESTAMP_UNITS_PER_SECOND
+
+logger = logging.getLogger(__name__)
+
+_BATCH_HEADER_STRUCT = struct.Struct("<BH")
+_POSITION_STRUCT = struct.Struct("<ffq")
+
+
+def _binary_timestamps(frame: bytes) -> List[int]:
+    """バイナリフレームに含まれる位置のタイムスタンプ（履歴の再送は除く）"""
+    frame_type = frame[0]
+    if frame_type == FRAME_TYPE_POSITION:
+        offset, count = 1, 1
+    elif frame_type == FRAME_TYPE_BATCH:
+        offset = _BATCH_HEADER_STRUCT.size
+        count = _BATCH_HEADER_STRUCT.unpack_from(frame)[1]
+    else:
+        return []
+    timestamps = []
+    for _ in range(count):
+        length = frame[offset]
+        offset += 1 + length
+        timestamps.append(_POSITION_STRUCT.unpack_from(frame, offset)[2])
+        offset += _POSITION_STRUCT.size
+    return timestamps
+
+
+def _json_timestamps(frame: str) -> List[int]:
+    """JSONフレームに含まれる位置のタイムスタンプ（履歴の再送やその他のイベントは除く）"""
+    message = json.loads(frame)
+    event = message.get("event")
+    if event == "position_update":
+        return [message["data"]["timestamp"]]
+    if event == "position_batch":
+        return [position["timestamp"] for position in message["data"]]
+    return []
+
+
+def _delta_timestamps(decoder: DeltaDecoder):
+    """delta 形式のフレームに含まれる位置のタイムスタンプを取得する関数（クライアントごとに作成）
+
+    差分は直前の位置を基準にするため、計測期間外のフレームも含めてすべてデコードする必要がある。
+    """
+    def decode(frame) -> List[int]:
+        if isinstance(frame, str):
+            return _json_timestamps(frame)
+        frame_type, positions = decoder.decode(frame)
+        if frame_type != FRAME_TYPE_DELTA:
+            return []
+        return [timestamp for _, _, _, timestamp in positions]
+    return decode
+
+
+class ClientStats:
+    """1つのクライアントの受信結果"""
+
+    __slots__ = ("slow", "received", "latencies", "connected", "closed_by_server", "error")
+
+    def __init__(self, slow: bool):
+        self.slow = slow
+        self.received = 0  # 計測期間中に受信した位置の数
+        self.latencies = array("d")  # 位置ごとのエンドツーエンドのレイテンシ（秒）
+        self.connected = False
+        self.closed_by_server = False
+        self.error: Optional[str] = None
+
+
+class ClientSwarm:
+    """WebSocket クライアント群
+
+    通常のクライアントは受信したフレームをすぐに処理し、遅いクライアントはフレームごとに
+    slow_delay 秒待機して、送信キューが溢れる状況を再現する。
+    """
+
+    def __init__(
+        self,
+        url: str,
+        clients: int,
+        slow_clients: int = 0,
+        slow_delay: float = 0.05,
+        query: Optional[Dict[str, str]] = None,
+        connect_concurrency: int = 50,
+    ):
+        query = {"replay": "0", **(query or {})}
+        self.url = f"{url}?{urlencode(query)}"
+        self.frame_format = query.get("format", "json")
+        self.precision = query.get("precision", settings.WS_DELTA_PRECISION)
+        self.slow_delay = slow_delay
+        self.stats = [ClientStats(slow=False) for _ in range(clients)]
+        self.stats += [ClientStats(slow=True) for _ in range(slow_clients)]
+        self.measuring = False  # ウォームアップ中は記録しない
+        self._connect_limit = asyncio.Semaphore(connect_concurrency)
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        """すべてのクライアントを接続（接続が完了するまで待機）"""
+        connected = [asyncio.Event() for _ in self.stats]
+        self._tasks = [
+            asyncio.create_task(self._run(stats, event)) for stats, event in zip(self.stats, connected)
+        ]
+        await asyncio.gather(*(event.wait() for event in connected))
+
+    async def stop(self):
+        """すべてのクライアントを切断"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _run(self, stats: ClientStats, connected: asyncio.Event):
+        if self.frame_format == "delta":
+            decode = _delta_timestamps(DeltaDecoder(int(self.precision)))
+        elif self.frame_format == "binary":
+            decode = _binary_timestamps
+        else:
+            decode = _json_timestamps
+        try:
+            async with self._connect_limit:
+                # 遅いクライアントは受信バッファを小さくし、TCPの背圧をサーバーに伝える
+                websocket = await websockets.connect(self.url, max_queue=1 if stats.slow else None)
+            stats.connected = True
+        except Exception as e:
+            stats.error = str(e)
+            return
+        finally:
+            connected.set()
+
+        try:
+            async for frame in websocket:
+                if not self.measuring:
+                    if self.frame_format == "delta":
+                        decode(frame)
+                    continue
+                now = time.time() * TIMESTAMP_UNITS_PER_SECOND
+                for timestamp in decode(frame):
+                    stats.latencies.append((now - timestamp) / TIMESTAMP_UNITS_PER_SECOND)
+                    stats.received += 1
+                if stats.slow:
+                    await asyncio.sleep(self.slow_delay)
+            stats.closed_by_server = True
+        except websockets.ConnectionClosed:
+            stats.closed_by_server = True
+        except Exception as e:
+            stats.error = str(e)
+        finally:
+            await websocket.close()
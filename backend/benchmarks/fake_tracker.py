@@ -0,0 +1,94 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Dict, Optional
+
+import grpc.aio
+
+from app.protos.robot import robot_pb2
+from app.protos.robot import robot_pb2_grpc
+
+logger = logging.getLogger(__name__)
+
+# タイムスタンプの1秒あたりの値（レイテンシを計測するためマイクロ秒で送信する）
+TIMESTAMP_UNITS_PER_SECOND = 1_000_000
+
+
+class FakeRobotTracker(robot_pb2_grpc.RobotTrackerServicer):
+    """指定した頻度で位置を送信する robot-tracker の代わりの gRPC サーバー
+
+    位置はロボットごとのランダムウォークで、timestamp には送信時刻（Unix時刻のマイクロ秒）を
+    設定する。シーケンス番号はロボットごとに1から増やし、resume_after は無視する。
+    """
+
+    def __init__(self, rate: float, arena_size: float = 100.0, seed: int = 0):
+        self.rate = rate  # ロボットごとの1秒あたりの送信数
+        self.arena_size = arena_size
+        self.sent = 0  # 送信した位置の数
+        self._random = random.Random(seed)
+        self._sequences: Dict[str, int] = {}
+        self._server: Optional[grpc.aio.Server] = None
+        self.port: Optional[int] = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        """サーバーを起動し、待ち受けているポート番号を返す（port=0 は空いているポート）"""
+        self._server = grpc.aio.server()
+        robot_pb2_grpc.add_RobotTrackerServicer_to_server(self, self._server)
+        self.port = self._server.add_insecure_port(f"{host}:{port}")
+        await self._server.start()
+        logger.info(f"偽の robot-tracker を起動しました: {host}:{self.port} ({self.rate}Hz)")
+        return self.port
+
+    async def stop(self):
+        """サーバーを停止"""
+        if self._server is not None:
+            await self._server.stop(0)
+            self._server = None
+
+    async def _walk(self, robot_id: str):
+        """一定間隔で (x, y, timestamp, sequence) を生成（遅れが出ても送信間隔がずれないよう、予定時刻を基準に待機）"""
+        interval = 1.0 / self.rate
+        x = self._random.uniform(0, self.arena_size)
+        y = self._random.uniform(0, self.arena_size)
+        next_time = time.monotonic()
+        while True:
+            x = min(max(x + self._random.uniform(-1, 1), 0), self.arena_size)
+            y = min(max(y + self._random.uniform(-1, 1), 0), self.arena_size)
+            sequence = self._sequences.get(robot_id, 0) + 1
+            self._sequences[robot_id] = sequence
+            yield x, y, int(time.time() * TIMESTAMP_UNITS_PER_SECOND), sequence
+            next_time += interval
+            delay = next_time - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                # 送信が追いつかない場合は予定時刻をリセットして一度だけ制御を返す
+                next_time = time.monotonic()
+                await asyncio.sleep(0)
+
+    async def TrackRobot(self, request, context):
+        """位置を1件ずつ送信"""
+        robot_id = request.robot_id
+        async for x, y, timestamp, sequence in self._walk(robot_id):
+            yield robot_pb2.Position(robot_id=robot_id, x=x, y=y, timestamp=timestamp, sequence=sequence)
+            self.sent += 1
+
+    async def TrackRobotBatch(self, request, context):
+        """位置を window_ms（デフォルト100ミリ秒）ごとにまとめて送信"""
+        robot_id = request.robot_id
+        window = (request.window_ms or 100) / 1000
+        max_positions = request.max_positions or 1000
+        batch = robot_pb2.PositionBatch(robot_id=robot_id)
+        deadline = time.monotonic() + window
+        async for x, y, timestamp, sequence in self._walk(robot_id):
+            if not batch.x:
+                batch.first_sequence = sequence
+            batch.x.append(x)
+            batch.y.append(y)
+            batch.timestamp.append(timestamp)
+            if len(batch.x) >= max_positions or time.monotonic() >= deadline:
+                yield batch
+                self.sent += len(batch.x)
+                batch = robot_pb2.PositionBatch(robot_id=robot_id)
+                deadline = time.monotonic() + window
@@ -0,0 +1,180 @@
+import asyncio
+import statistics
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from app.grpc_client.batch import decode_position_batch
+from app.protos.robot import robot_pb2
+from app.schemas.frames import PositionFrame
+from app.schemas.robot import RobotPosition, WebSocketMessage
+from app.websockets.connection import ClientConnection, OverflowPolicy
+from app.websockets.manager import ConnectionManager
+
+# ステージ名 → (説明, 計測関数)
+# 計測関数は (回数, クライアント数) を受け取り、準備を除いた処理時間（秒）を返す
+Stage = Callable[[int, int], float]
+STAGES: Dict[str, "tuple[str, Stage]"] = {}
+
+
+def stage(name: str, description: str):
+    """マイクロベンチマークのステージを登録するデコレーター"""
+    def register(func: Stage) -> Stage:
+        STAGES[name] = (description, func)
+        return func
+    return register
+
+
+def _messages(number: int) -> List[Any]:
+    return [
+        robot_pb2.Position(robot_id="robot-1", x=i * 0.01, y=i * 0.02, timestamp=1_700_000_000 + i, sequence=i + 1)
+        for i in range(number)
+    ]
+
+
+@stage("proto_decode", "robot_pb2.Position のデコード")
+def bench_proto_decode(number: int, clients: int) -> float:
+    payloads = [message.SerializeToString() for message in _messages(number)]
+    decode = robot_pb2.Position.FromString
+    start = time.perf_counter()
+    for payload in payloads:
+        decode(payload)
+    return time.perf_counter() - start
+
+
+@stage("position_frame", "gRPCメッセージから PositionFrame を作成")
+def bench_position_frame(number: int, clients: int) -> float:
+    messages = _messages(number)
+    from_proto = PositionFrame.from_proto
+    start = time.perf_counter()
+    for message in messages:
+        from_proto(message)
+    return time.perf_counter() - start
+
+
+@stage("batch_decode", "robot_pb2.PositionBatch（100件ずつ）の配列へのデコードと PositionFrame の作成")
+def bench_batch_decode(number: int, clients: int) -> float:
+    payloads = []
+    for first in range(0, number, 100):
+        count = min(100, number - first)
+        payloads.append(robot_pb2.PositionBatch(
+            robot_id="robot-1",
+            first_sequence=first + 1,
+            x=[i * 0.01 for i in range(first, first + count)],
+            y=[i * 0.02 for i in range(first, first + count)],
+            timestamp=[1_700_000_000 + i for i in range(first, first + count)],
+        ).SerializeToString())
+    start = time.perf_counter()
+    for payload in payloads:
+        for _ in decode_position_batch(payload).frames():
+            pass
+    return time.perf_counter() - start
+
+
+@stage("robot_position", "RobotPosition の作成（Pydanticの検証あり）")
+def bench_robot_position(number: int, clients: int) -> float:
+    messages = _messages(number)
+    start = time.perf_counter()
+    for m in messages:
+        RobotPosition(robot_id=m.robot_id, x=m.x, y=m.y, timestamp=m.timestamp)
+    return time.perf_counter() - start
+
+
+@stage("websocket_message", "WebSocketMessage の作成とJSONシリアライズ（Pydantic）")
+def bench_websocket_message(number: int, clients: int) -> float:
+    messages = _messages(number)
+    start = time.perf_counter()
+    for m in messages:
+        position = RobotPosition(robot_id=m.robot_id, x=m.x, y=m.y, timestamp=m.timestamp)
+        WebSocketMessage(event="position_update", data=position).model_dump_json()
+    return time.perf_counter() - start
+
+
+def _frame_stage(frame_format: str) -> Stage:
+    def bench(number: int, clients: int) -> float:
+        frames = [PositionFrame.from_proto(message) for message in _messages(number)]
+        start = time.perf_counter()
+        for frame in frames:
+            frame.encode(frame_format)
+        return time.perf_counter() - start
+    return bench
+
+
+for _format in ("json", "binary", "protobuf"):
+    stage(f"frame_{_format}", f"PositionFrame の {_format} フレームのエンコード")(_frame_stage(_format))
+
+
+class _MockWebSocket:
+    """送信しない WebSocket の代わり（ClientConnection の作成に必要な属性のみ）"""
+
+    client = None
+
+
+@stage("broadcast", "broadcast_position（クライアント数は --clients、送信キューへの追加まで）")
+def bench_broadcast(number: int, clients: int) -> float:
+    async def run() -> float:
+        manager = ConnectionManager()
+        connections = []
+        for _ in range(clients):
+            websocket = _MockWebSocket()
+            # 送信タスクは開始せず、キューが溢れないよう計測回数分の長さにする
+            client = ClientConnection(websocket, queue_size=number + 1, overflow_policy=OverflowPolicy.DROP_OLDEST)
+            manager.active_connections.add(client)
+            manager._index(client, None)
+            connections.append(client)
+        frames = [PositionFrame.from_proto(message) for message in _messages(number)]
+        start = time.perf_counter()
+        for frame in frames:
+            await manager.broadcast_position(frame)
+        return time.perf_counter() - start
+
+    return asyncio.run(run())
+
+
+def run_stages(
+    names: Optional[List[str]] = None, number: int = 10000, repeat: int = 5, clients: int = 100
+) -> Dict[str, Any]:
+    """ステージごとに number 回の処理を repeat 回計測し、1回あたりの時間を返す
+
+    最小値はノイズの影響が最も小さい値、中央値は典型的な値として扱う。
+    """
+    results = {}
+    for name in names or list(STAGES):
+        description, bench = STAGES[name]
+        # broadcast は1回あたりのクライアント数が多いため回数を減らす
+        count = max(1, number // max(1, clients // 10)) if name == "broadcast" else number
+        timings = [bench(count, clients) / count for _ in range(repeat)]
+        results[name] = {
+            "description": description,
+            "number": count,
+            "ns_per_op_min": round(min(timings) * 1e9, 1),
+            "ns_per_op_median": round(statistics.median(timings) * 1e9, 1),
+            "ops_per_s": round(1 / statistics.median(timings), 1),
+        }
+    return {"kind": "micro", "config": {"number": number, "repeat": repeat, "clients": clients}, "stages": results}
+
+
+def compare_stages(result: Dict[str, Any], baseline: Dict[str, Any]) -> Dict[str, Optional[float]]:
+    """ステージごとのベースラインからの変化率（中央値、正が改善）"""
+    changes = {}
+    for name, stats in result["stages"].items():
+        previous = baseline.get("stages", {}).get(name)
+        if previous and previous["ns_per_op_median"]:
+            changes[name] = round(
+                (previous["ns_per_op_median"] - stats["ns_per_op_median"]) / previous["ns_per_op_median"] * 100, 1
+            )
+        else:
+            changes[name] = None
+    return changes
+
+
+def format_stages(result: Dict[str, Any], changes: Optional[Dict[str, Optional[float]]] = None) -> str:
+    """結果を表示用のテキストに整形"""
+    config = result["config"]
+    lines = [f"マイクロベンチマーク（{config['repeat']} 回の計測、broadcast のクライアント数 {config['clients']}）"]
+    for name, stats in result["stages"].items():
+        line = f"  {name:<18} {stats['ns_per_op_median']:>12,.1f} ns/op (min {stats['ns_per_op_min']:,.1f})"
+        if changes is not None:
+            change = changes.get(name)
+            line += "  -" if change is None else f"  {change:+.1f}%"
+        lines.append(f"{line}  {stats['description']}")
+    return "\n".join(lines)
@@ -0,0 +1,251 @@
+import asyncio
+import json
+import os
+import re
+import urllib.request
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from benchmarks.clients import ClientStats
+
+# ベースラインとの比較に使う指標: (パス, 表示名, 値が大きいほど良いか)
+COMPARED_METRICS: Tuple[Tuple[str, str, bool], ...] = (
+    ("throughput.delivered_per_s", "配信スループット (件/秒)", True),
+    ("latency_ms.p50", "レイテンシ p50 (ms)", False),
+    ("latency_ms.p99", "レイテンシ p99 (ms)", False),
+    ("server.cpu_percent", "CPU使用率 (%)", False),
+    ("server.rss_mb_max", "最大RSS (MB)", False),
+)
+
+_CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+class ProcessSampler:
+    """プロセスのCPU時間とRSSを一定間隔で記録するクラス（Linuxの /proc を使用）"""
+
+    def __init__(self, pid: int, interval: float = 0.5):
+        self.pid = pid
+        self.interval = interval
+        self.rss_samples: List[float] = []
+        self._cpu_start: Optional[float] = None
+        self._cpu_end: Optional[float] = None
+        self._wall_start = 0.0
+        self._wall_end = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def available(self) -> bool:
+        return os.path.exists(f"/proc/{self.pid}/stat")
+
+    def _cpu_seconds(self) -> float:
+        """ユーザー時間とシステム時間の合計（秒）"""
+        with open(f"/proc/{self.pid}/stat") as f:
+            # コマンド名に空白が含まれる場合があるため、括弧の後から数える
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / _CLOCK_TICKS
+
+    def _rss_mb(self) -> float:
+        with open(f"/proc/{self.pid}/status") as f:
+            match = re.search(r"VmRSS:\s+(\d+) kB", f.read())
+        return int(match.group(1)) / 1024 if match else 0.0
+
+    def start(self):
+        if not self.available:
+            return
+        loop = asyncio.get_running_loop()
+        self._cpu_start = self._cpu_seconds()
+        self._wall_start = loop.time()
+        self._task = asyncio.create_task(self._sample())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._cpu_end = self._cpu_seconds()
+        self._wall_end = asyncio.get_running_loop().time()
+        self.rss_samples.append(self._rss_mb())
+
+    async def _sample(self):
+        while True:
+            self.rss_samples.append(self._rss_mb())
+            await asyncio.sleep(self.interval)
+
+    def summary(self) -> Dict[str, Optional[float]]:
+        """計測期間中のCPU使用率（1コア=100%）とRSS"""
+        if self._cpu_start is None or self._cpu_end is None:
+            return {"cpu_percent": None, "rss_mb_max": None, "rss_mb_end": None}
+        wall = max(self._wall_end - self._wall_start, 1e-9)
+        return {
+            "cpu_percent": round((self._cpu_end - self._cpu_start) / wall * 100, 1),
+            "rss_mb_max": round(max(self.rss_samples), 1),
+            "rss_mb_end": round(self.rss_samples[-1], 1),
+        }
+
+
+class LoopLagMonitor:
+    """イベントループの遅れを計測するクラス（負荷生成側の受信処理が遅れていないかの確認用）"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.lags: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._measure())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _measure(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.lags.append(loop.time() - start - self.interval)
+
+    def summary(self) -> Dict[str, Optional[float]]:
+        """遅れの p99 と最大値（ミリ秒）"""
+        if not self.lags:
+            return {"loop_lag_ms_p99": None, "loop_lag_ms_max": None}
+        lags = np.asarray(self.lags) * 1000
+        return {
+            "loop_lag_ms_p99": round(float(np.percentile(lags, 99)), 3),
+            "loop_lag_ms_max": round(float(lags.max()), 3),
+        }
+
+
+def scrape_metrics(base_url: str, names: Iterable[str]) -> Dict[str, float]:
+    """バックエンドの /api/metrics から指定したメトリクスの値（ラベルごとの合計）を取得"""
+    with urllib.request.urlopen(f"{base_url}/api/metrics", timeout=5) as response:
+        text = response.read().decode()
+    values = {name: 0.0 for name in names}
+    for line in text.splitlines():
+        if line.startswith("#"):
+            continue
+        name, _, value = line.rpartition(" ")
+        name = name.split("{", 1)[0]
+        if name in values:
+            values[name] += float(value)
+    return values
+
+
+def latency_summary(latencies: np.ndarray) -> Dict[str, Optional[float]]:
+    """レイテンシのパーセンタイル（ミリ秒）"""
+    if latencies.size == 0:
+        return {"count": 0, "p50": None, "p90": None, "p99": None, "max": None}
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99]) * 1000
+    return {
+        "count": int(latencies.size),
+        "p50": round(float(p50), 3),
+        "p90": round(float(p90), 3),
+        "p99": round(float(p99), 3),
+        "max": round(float(latencies.max() * 1000), 3),
+    }
+
+
+def client_summary(stats: List[ClientStats], duration: float) -> Dict[str, Any]:
+    """クライアント群の受信数とレイテンシ"""
+    received = [s.received for s in stats]
+    latencies = np.concatenate([np.frombuffer(s.latencies, dtype=np.float64) for s in stats]) if stats else np.empty(0)
+    return {
+        "clients": len(stats),
+        "connect_errors": sum(1 for s in stats if not s.connected),
+        "closed_by_server": sum(1 for s in stats if s.closed_by_server),
+        "received": int(sum(received)),
+        "received_per_client_per_s": round(float(np.mean(received)) / duration, 2) if stats else 0.0,
+        "latency_ms": latency_summary(latencies),
+    }
+
+
+def _lookup(result: Dict[str, Any], path: str) -> Optional[float]:
+    value: Any = result
+    for key in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+def compare(result: Dict[str, Any], baseline: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """ベースラインとの比較（change_percent は正が改善、負が悪化）"""
+    rows = []
+    for path, label, higher_is_better in COMPARED_METRICS:
+        current, previous = _lookup(result, path), _lookup(baseline, path)
+        change = None
+        if current is not None and previous:
+            change = (current - previous) / abs(previous) * 100
+            if not higher_is_better:
+                change = -change
+            change = round(change, 1)
+        rows.append(
+            {"metric": path, "label": label, "baseline": previous, "current": current, "change_percent": change}
+        )
+    return rows
+
+
+def format_report(result: Dict[str, Any], comparison: Optional[List[Dict[str, Any]]] = None) -> str:
+    """結果を表示用のテキストに整形"""
+    lines = [f"シナリオ: {result['scenario']} ({result['duration_s']}秒)"]
+    config = result["config"]
+    lines.append(
+        "  ロボット {robots} 台 × {rate}Hz / クライアント {clients} + 遅いクライアント {slow_clients}".format(**config)
+    )
+    throughput = result["throughput"]
+    lines.append(
+        f"  受信 {throughput['received_per_s']} 件/秒 → 配信 {throughput['delivered_per_s']} 件/秒"
+    )
+    for name, key in (("クライアント", "clients"), ("遅いクライアント", "slow_clients")):
+        summary = result[key]
+        if not summary["clients"]:
+            continue
+        latency = summary["latency_ms"]
+        lines.append(
+            f"  {name}: {summary['received_per_client_per_s']} 件/秒/クライアント, "
+            f"p50 {latency['p50']}ms, p90 {latency['p90']}ms, p99 {latency['p99']}ms, max {latency['max']}ms, "
+            f"サーバーによる切断 {summary['closed_by_server']}, 接続失敗 {summary['connect_errors']}"
+        )
+    server = result["server"]
+    lines.append(
+        f"  サーバー: CPU {server['cpu_percent']}%, 最大RSS {server['rss_mb_max']}MB, "
+        f"破棄したフレーム {server.get('ws_dropped_frames')}, 遅いクライアントの切断 {server.get('ws_slow_disconnects')}"
+    )
+    generator = result.get("load_generator", {})
+    if generator.get("cpu_percent") is not None:
+        # 負荷生成側が1コアを使い切っている場合、レイテンシには負荷生成側の遅れも含まれる
+        note = "（飽和しているため結果は参考値）" if generator["cpu_percent"] >= 90 else ""
+        lines.append(
+            f"  負荷生成プロセス: CPU {generator['cpu_percent']}%, イベントループの遅れ "
+            f"p99 {generator.get('loop_lag_ms_p99')}ms, max {generator.get('loop_lag_ms_max')}ms{note}"
+        )
+    if comparison:
+        lines.append("ベースラインとの比較（正が改善）:")
+        for row in comparison:
+            change = "-" if row["change_percent"] is None else f"{row['change_percent']:+.1f}%"
+            lines.append(f"  {row['label']:<28} {row['baseline']!s:>10} → {row['current']!s:>10}  {change}")
+    return "\n".join(lines)
+
+
+def save(result: Dict[str, Any], path: str):
+    """結果をJSONファイルに保存"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+def load(path: str) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
@@ -0,0 +1,172 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from typing import Any, Dict
+
+from benchmarks.clients import ClientSwarm
+from benchmarks.fake_tracker import TIMESTAMP_UNITS_PER_SECOND, FakeRobotTracker
+from benchmarks.report import LoopLagMonitor, ProcessSampler, client_summary, scrape_metrics
+from benchmarks.scenarios import Scenario
+
+logger = logging.getLogger(__name__)
+
+# backend ディレクトリ（バックエンドを起動する作業ディレクトリ）
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 計測後に取得するバックエンドのメトリクス
+_SERVER_METRICS = {
+    "robot_ws_dropped_frames_total": "ws_dropped_frames",
+    "robot_ws_slow_disconnects_total": "ws_slow_disconnects",
+    "robot_positions_received_total": "positions_received",
+}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class BackendProcess:
+    """計測対象のバックエンド（uvicorn）を別プロセスで起動するクラス"""
+
+    def __init__(self, tracker_port: int, robot_ids, env: Dict[str, str]):
+        self.port = _free_port()
+        self.base_url = f"http://127.0.0.1:{self.port}"
+        self.ws_url = f"ws://127.0.0.1:{self.port}/api/ws/robot"
+        self.env = {
+            **os.environ,
+            "ROBOT_TRACKER_HOST": "127.0.0.1",
+            "ROBOT_TRACKER_PORT": str(tracker_port),
+            "ROBOT_TRACKER_ENDPOINTS": "[]",
+            "ROBOT_IDS": json.dumps(list(robot_ids)),
+            "TIMESTAMP_UNITS_PER_SECOND": str(TIMESTAMP_UNITS_PER_SECOND),
+            "LOG_LEVEL": "WARNING",
+            "DEBUG": "false",
+            **env,
+        }
+        self.process: subprocess.Popen = None
+
+    def start(self):
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+             "--port", str(self.port), "--log-level", "warning"],
+            cwd=BACKEND_DIR,
+            env=self.env,
+        )
+
+    async def wait_ready(self, timeout: float = 30.0):
+        """robot-trackerへの接続が完了するまで待機（バックエンド自身が位置を生成する場合は起動まで）"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"バックエンドが終了しました (exit code {self.process.returncode})")
+            try:
+                status = await asyncio.to_thread(self._status)
+                if status.get("source", {}).get("type", "grpc") != "grpc":
+                    return
+                trackers = status.get("trackers") or []
+                if any(tracker["state"] == "READY" for tracker in trackers):
+                    return
+            except OSError:
+                pass
+            await asyncio.sleep(0.2)
+        raise TimeoutError("バックエンドの起動がタイムアウトしました")
+
+    def _status(self) -> Dict[str, Any]:
+        with urllib.request.urlopen(f"{self.base_url}/api/status", timeout=2) as response:
+            return json.loads(response.read())
+
+    def stop(self):
+        if self.process is None or self.process.poll() is not None:
+            return
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+
+async def run_scenario(scenario: Scenario, duration: float, warmup: float = 2.0) -> Dict[str, Any]:
+    """シナリオを実行して結果を返す
+
+    偽の robot-tracker とクライアント群はこのプロセスで動かし、バックエンドは別プロセスで
+    起動して、そのCPU時間とRSSだけを計測する。ウォームアップ中の受信は記録しない。
+    """
+    tracker = FakeRobotTracker(scenario.rate)
+    tracker_port = await tracker.start()
+    robot_ids = [f"robot-{i + 1}" for i in range(scenario.robots)]
+    # POSITION_SOURCE=synthetic の場合もロボット数・頻度はシナリオの値で生成する
+    backend = BackendProcess(tracker_port, robot_ids, {"SYNTHETIC_RATE_HZ": str(scenario.rate), **scenario.env})
+    backend.start()
+    swarm = ClientSwarm(
+        backend.ws_url,
+        clients=scenario.clients,
+        slow_clients=scenario.slow_clients,
+        slow_delay=scenario.slow_delay,
+        query=scenario.query,
+    )
+    try:
+        await backend.wait_ready()
+        await swarm.start()
+        await asyncio.sleep(warmup)
+
+        sampler = ProcessSampler(backend.process.pid)
+        # 負荷を生成するこのプロセスが飽和していないかも確認する
+        generator_sampler = ProcessSampler(os.getpid())
+        loop_lag = LoopLagMonitor()
+        sent_start = tracker.sent
+        # バックエンド自身が位置を生成するシナリオでは、受信数をバックエンドのメトリクスから求める
+        internal_source = scenario.env.get("POSITION_SOURCE", "grpc") != "grpc"
+        if internal_source:
+            received_start = (await asyncio.to_thread(scrape_metrics, backend.base_url, _SERVER_METRICS))[
+                "robot_positions_received_total"
+            ]
+        started = time.monotonic()
+        swarm.measuring = True
+        sampler.start()
+        generator_sampler.start()
+        loop_lag.start()
+        await asyncio.sleep(duration)
+        swarm.measuring = False
+        await sampler.stop()
+        await generator_sampler.stop()
+        await loop_lag.stop()
+        elapsed = time.monotonic() - started
+        sent = tracker.sent - sent_start
+
+        server_metrics = await asyncio.to_thread(scrape_metrics, backend.base_url, _SERVER_METRICS)
+        if internal_source:
+            sent = server_metrics["robot_positions_received_total"] - received_start
+    finally:
+        await swarm.stop()
+        backend.stop()
+        await tracker.stop()
+
+    normal = [stats for stats in swarm.stats if not stats.slow]
+    slow = [stats for stats in swarm.stats if stats.slow]
+    delivered = sum(stats.received for stats in swarm.stats)
+    return {
+        "scenario": scenario.name,
+        "config": scenario.config(),
+        "duration_s": round(elapsed, 2),
+        "throughput": {
+            "received_per_s": round(sent / elapsed, 1),
+            "delivered_per_s": round(delivered / elapsed, 1),
+        },
+        "latency_ms": client_summary(normal, elapsed)["latency_ms"],
+        "clients": client_summary(normal, elapsed),
+        "slow_clients": client_summary(slow, elapsed),
+        "server": {
+            **sampler.summary(),
+            **{key: server_metrics[name] for name, key in _SERVER_METRICS.items()},
+        },
+        "load_generator": {"cpu_percent": generator_sampler.summary()["cpu_percent"], **loop_lag.summary()},
+    }
@@ -0,0 +1,90 @@
+from typing import Dict, Optional
+
+
+class Scenario:
+    """負荷試験のシナリオ
+
+    env はバックエンドに渡す設定（環境変数）、query は WebSocket 接続のクエリパラメータ。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        robots: int = 10,
+        rate: float = 10.0,
+        clients: int = 50,
+        slow_clients: int = 0,
+        slow_delay: float = 0.1,
+        query: Optional[Dict[str, str]] = None,
+        env: Optional[Dict[str, str]] = None,
+    ):
+        self.name = name
+        self.description = description
+        self.robots = robots
+        self.rate = rate
+        self.clients = clients
+        self.slow_clients = slow_clients
+        self.slow_delay = slow_delay
+        self.query = query or {}
+        self.env = env or {}
+
+    def with_overrides(self, **overrides) -> "Scenario":
+        """一部の値を変更したシナリオ（None の値は変更しない）"""
+        values = {key: value for key, value in vars(self).items()}
+        values.update({key: value for key, value in overrides.items() if value is not None})
+        return Scenario(**values)
+
+    def config(self) -> Dict[str, object]:
+        """結果に記録する設定"""
+        return {
+            "robots": self.robots,
+            "rate": self.rate,
+            "clients": self.clients,
+            "slow_clients": self.slow_clients,
+            "slow_delay": self.slow_delay,
+            "query": self.query,
+            "env": self.env,
+        }
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    scenario.name: scenario
+    for scenario in (
+        Scenario("baseline", "標準的な負荷（JSON、stream モード）"),
+        Scenario("binary", "baseline をバイナリ形式で配信", query={"format": "binary"}),
+        Scenario("delta", "baseline を差分形式（固定小数点・varint）で配信", query={"format": "delta"}),
+        Scenario("batch", "baseline を batch モードで配信", query={"mode": "batch"}),
+        Scenario(
+            "dead_reckoning",
+            "baseline を等速度モデルのデッドレコニングで間引いて配信",
+            query={"dr_tolerance": "1.0"},
+            env={"WS_MOTION_MODEL": "constant_velocity"},
+        ),
+        Scenario(
+            "slow_clients",
+            "処理の遅いクライアントが混在する場合（送信キューの溢れと他のクライアントへの影響）",
+            rate=20.0,
+            slow_clients=10,
+        ),
+        Scenario("many_robots", "多数のロボットからの受信", robots=200, rate=10.0, clients=20),
+        Scenario("many_clients", "多数のクライアントへの配信", robots=5, rate=5.0, clients=1000),
+        Scenario("high_rate", "高頻度の位置更新", robots=20, rate=100.0, clients=20),
+        Scenario(
+            "high_rate_batch",
+            "high_rate を TrackRobotBatch でまとめて受信",
+            robots=20,
+            rate=100.0,
+            clients=20,
+            env={"GRPC_BATCH_ENABLED": "true"},
+        ),
+        Scenario(
+            "synthetic",
+            "robot-trackerを使わずバックエンド内で生成した高頻度の位置更新",
+            robots=100,
+            rate=100.0,
+            clients=20,
+            env={"POSITION_SOURCE": "synthetic"},
+        ),
+    )
+}
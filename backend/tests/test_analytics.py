@@ -0,0 +1,90 @@
+import random
+
+import numpy as np
+import pytest
+
+from app.schemas.frames import PositionFrame
+from app.services.analytics import TrajectoryAnalytics, WindowAnalytics
+from app.services.history import PositionHistory
+
+
+def _add(history, robot_id, points):
+    for x, y, ts in points:
+        history.add(PositionFrame(x, y, ts, robot_id))
+
+
+def _walk(count, start=0, seed=0):
+    rng = random.Random(seed)
+    points = []
+    x = y = 50.0
+    ts = start
+    for _ in range(count):
+        x = min(100.0, max(0.0, x + rng.uniform(-3, 3)))
+        y = min(100.0, max(0.0, y + rng.uniform(-3, 3)))
+        ts += rng.choice((0, 1, 1, 2))  # 同じタイムスタンプの点も含める
+        points.append((x, y, ts))
+    return points
+
+
+def _recomputed(history, robot_id, since, until, bins):
+    """キャッシュを使わずに集計した結果"""
+    return TrajectoryAnalytics(history).window(robot_id, since, until, bins)
+
+
+def _assert_same(actual: WindowAnalytics, expected: WindowAnalytics):
+    assert actual.count == expected.count
+    assert actual.first_abs == expected.first_abs
+    assert actual.first_timestamp == expected.first_timestamp
+    assert actual.last_timestamp == expected.last_timestamp
+    assert actual.distance == pytest.approx(expected.distance, rel=1e-9, abs=1e-6)
+    assert (actual.min_x, actual.max_x, actual.min_y, actual.max_y) == (
+        expected.min_x, expected.max_x, expected.min_y, expected.max_y
+    )
+    np.testing.assert_allclose(actual.speeds, expected.speeds)
+    np.testing.assert_allclose(actual.speed_timestamps, expected.speed_timestamps)
+    np.testing.assert_allclose(actual.accelerations, expected.accelerations)
+    np.testing.assert_array_equal(actual.heatmap, expected.heatmap)
+
+
+@pytest.mark.parametrize("since,until", [(None, None), (40, None), (None, 150), (40, 150)])
+def test_incremental_window_matches_recompute_after_eviction(since, until):
+    history = PositionHistory(capacity=64)
+    analytics = TrajectoryAnalytics(history)
+    points = _walk(400)
+    bins = (5, 5)
+
+    for i in range(0, len(points), 7):
+        _add(history, "r1", points[i:i + 7])
+        entry = analytics.window("r1", since, until, bins)
+        _assert_same(entry, _recomputed(history, "r1", since, until, bins))
+
+
+def test_steady_state_with_full_ring_does_not_recompute():
+    history = PositionHistory(capacity=32)
+    analytics = TrajectoryAnalytics(history)
+    points = _walk(200)
+    _add(history, "r1", points[:100])
+    entry = analytics.window("r1")
+
+    for i in range(100, 200, 5):
+        _add(history, "r1", points[i:i + 5])
+        # リングバッファが満杯でも同じ集計結果を更新し続ける
+        assert analytics.window("r1") is entry
+        assert entry.count == 32
+        _assert_same(entry, _recomputed(history, "r1", None, None, None))
+
+
+@pytest.mark.parametrize("recreated", [3, 12])
+def test_window_is_recomputed_when_history_is_recreated(recreated):
+    history = PositionHistory(capacity=16)
+    analytics = TrajectoryAnalytics(history)
+    _add(history, "r1", _walk(10))
+    entry = analytics.window("r1")
+
+    history._robots.pop("r1")
+    # 作り直した履歴のバージョンが古い履歴を超えた場合も古い集計を使わない
+    _add(history, "r1", _walk(recreated, seed=1))
+
+    assert analytics.window("r1") is not entry
+    assert analytics.window("r1").count == recreated
+    _assert_same(analytics.window("r1"), _recomputed(history, "r1", None, None, None))
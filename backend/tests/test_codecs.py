@@ -0,0 +1,215 @@
+import json
+import struct
+
+import numpy as np
+import pytest
+
+from app.grpc_client.batch import decode_position_batch
+from app.protos.robot import robot_pb2
+from app.schemas.delta import FRAME_TYPE_DELTA, FRAME_TYPE_DELTA_HISTORY, DeltaDecoder, DeltaEncoder
+from app.schemas.frames import (
+    FRAME_TYPE_BATCH,
+    FRAME_TYPE_HISTORY,
+    FRAME_TYPE_POSITION,
+    MAX_BATCH_POSITIONS,
+    MAX_ROBOT_ID_BYTES,
+    BatchFrame,
+    PositionFrame,
+    decode_varint,
+    encode_varint,
+    iter_positions,
+    robot_id_encodable,
+)
+
+
+def _positions():
+    return [
+        PositionFrame(1.25, -2.5, 1_700_000_000, "robot-1"),
+        PositionFrame(3.0, 4.0, 1_700_000_001, "ロボット2"),
+        PositionFrame(0.0, 0.0, 0, ""),
+    ]
+
+
+@pytest.mark.parametrize("value", [0, 1, 127, 128, 300, 2**32, 2**63 - 1])
+def test_varint_round_trip(value):
+    data = encode_varint(value)
+    assert decode_varint(b"\xff" + data, 1) == (value, len(data) + 1)
+
+
+def test_position_json_frame():
+    position = PositionFrame(1.25, -2.5, 10, "robot-1")
+    assert json.loads(position.json_frame) == {
+        "event": "position_update",
+        "data": {"robot_id": "robot-1", "x": 1.25, "y": -2.5, "timestamp": 10},
+    }
+
+
+@pytest.mark.parametrize("position", _positions())
+def test_binary_record_round_trip(position):
+    frame = position.binary_frame
+    assert frame[0] == FRAME_TYPE_POSITION
+
+    decoded, end = PositionFrame.from_binary_record(frame, 1)
+
+    assert end == len(frame)
+    assert (decoded.robot_id, decoded.x, decoded.y, decoded.timestamp) == (
+        position.robot_id, position.x, position.y, position.timestamp
+    )
+    # 受信したレコードはそのまま再送に使う
+    assert decoded.binary_record == position.binary_record
+
+
+def test_robot_id_length_limit():
+    assert robot_id_encodable("r" * MAX_ROBOT_ID_BYTES)
+    assert robot_id_encodable("ロ" * (MAX_ROBOT_ID_BYTES // 3))
+    assert not robot_id_encodable("r" * (MAX_ROBOT_ID_BYTES + 1))
+    assert not robot_id_encodable("ロ" * (MAX_ROBOT_ID_BYTES // 3 + 1))
+
+    position = PositionFrame(0.0, 0.0, 1, "r" * MAX_ROBOT_ID_BYTES)
+    decoded, _ = PositionFrame.from_binary_record(position.binary_record)
+    assert decoded.robot_id == position.robot_id
+    # エンコードできない場合も struct.error ではなく ValueError
+    with pytest.raises(ValueError):
+        PositionFrame(0.0, 0.0, 1, "r" * 300).binary_frame
+
+
+def test_batch_binary_frame_rejects_too_many_positions():
+    position = PositionFrame(0.0, 0.0, 1, "r")
+    assert len(BatchFrame([position] * MAX_BATCH_POSITIONS).binary_frame) > MAX_BATCH_POSITIONS
+    with pytest.raises(ValueError):
+        BatchFrame([position] * (MAX_BATCH_POSITIONS + 1)).binary_frame
+
+
+def test_protobuf_frame_round_trip():
+    position = PositionFrame(1.25, -2.5, 10, "robot-1")
+    message = robot_pb2.Position.FromString(position.protobuf_frame)
+    assert (message.robot_id, message.x, message.y, message.timestamp) == ("robot-1", 1.25, -2.5, 10)
+
+
+@pytest.mark.parametrize("event,frame_type", [("position_batch", FRAME_TYPE_BATCH), ("position_history", FRAME_TYPE_HISTORY)])
+def test_batch_binary_frame(event, frame_type):
+    positions = _positions()
+    frame = BatchFrame(positions, event).binary_frame
+
+    assert struct.unpack_from("<BH", frame) == (frame_type, len(positions))
+    offset = 3
+    decoded = []
+    while offset < len(frame):
+        position, offset = PositionFrame.from_binary_record(frame, offset)
+        decoded.append(position)
+    assert [p.to_dict() for p in decoded] == [p.to_dict() for p in positions]
+
+
+def test_batch_protobuf_frame_is_length_prefixed():
+    positions = _positions()
+    frame = BatchFrame(positions).protobuf_frame
+
+    offset = 0
+    decoded = []
+    while offset < len(frame):
+        length, offset = decode_varint(frame, offset)
+        decoded.append(robot_pb2.Position.FromString(frame[offset:offset + length]))
+        offset += length
+    assert [m.robot_id for m in decoded] == [p.robot_id for p in positions]
+
+
+def test_batch_json_frame():
+    positions = _positions()
+    assert json.loads(BatchFrame(positions, "position_history").json_frame) == {
+        "event": "position_history",
+        "data": [p.to_dict() for p in positions],
+    }
+
+
+def test_delta_round_trip_with_keyframes():
+    encoder = DeltaEncoder(precision=2, keyframe_interval=3)
+    decoder = DeltaDecoder(precision=2)
+    frames = [
+        [PositionFrame(10.0 + i, 20.0 - i * 0.5, 1000 + i, "robot-1"), PositionFrame(-i * 0.25, i, 2000 - i, "robot-2")]
+        for i in range(10)
+    ]
+
+    for positions in frames:
+        frame_type, decoded = decoder.decode(encoder.encode(positions))
+        assert frame_type == FRAME_TYPE_DELTA
+        assert decoded == [(p.robot_id, p.x, p.y, p.timestamp) for p in positions]
+
+
+def test_delta_skips_unencodable_robot_id():
+    encoder = DeltaEncoder(precision=2, keyframe_interval=3)
+    decoder = DeltaDecoder(precision=2)
+    positions = [
+        PositionFrame(1.0, 2.0, 10, "r" * (MAX_ROBOT_ID_BYTES + 1)),
+        PositionFrame(3.0, 4.0, 11, "robot-1"),
+    ]
+
+    _, decoded = decoder.decode(encoder.encode(positions))
+
+    assert decoded == [("robot-1", 3.0, 4.0, 11)]
+
+
+def test_delta_rounds_to_precision_without_accumulating_error():
+    encoder = DeltaEncoder(precision=1, keyframe_interval=1000)
+    decoder = DeltaDecoder(precision=1)
+    x = 0.0
+    for i in range(100):
+        x += 0.04
+        _, [(_, decoded_x, _, _)] = decoder.decode(encoder.encode([PositionFrame(x, 0.0, i, "r")]))
+        assert decoded_x == pytest.approx(round(x, 1))
+
+
+def test_delta_keyframe_is_sent_at_interval():
+    encoder = DeltaEncoder(precision=2, keyframe_interval=2)
+    sizes = [len(encoder.encode([PositionFrame(1.0, 1.0, i, "robot-with-a-long-id")])) for i in range(4)]
+    # キーフレームはロボットIDを含むため差分より長い
+    assert sizes[0] > sizes[1] and sizes[2] > sizes[3]
+
+
+def test_delta_history_frame_type():
+    data = DeltaEncoder(2, 10).encode(_positions(), FRAME_TYPE_DELTA_HISTORY)
+    assert DeltaDecoder(2).decode(data)[0] == FRAME_TYPE_DELTA_HISTORY
+
+
+def test_decode_position_batch_packed_arrays():
+    message = robot_pb2.PositionBatch(
+        robot_id="robot-1", first_sequence=42, x=[1.0, 2.0, 3.0], y=[-1.0, -2.0, -3.0], timestamp=[10, 11, 12]
+    )
+
+    batch = decode_position_batch(message.SerializeToString())
+
+    assert (batch.robot_id, batch.first_sequence, batch.last_sequence, len(batch)) == ("robot-1", 42, 44, 3)
+    np.testing.assert_array_equal(batch.x, [1.0, 2.0, 3.0])
+    np.testing.assert_array_equal(batch.y, [-1.0, -2.0, -3.0])
+    np.testing.assert_array_equal(batch.timestamp, [10, 11, 12])
+    assert [p.to_dict() for p in batch.frames(1)] == [
+        {"robot_id": "robot-1", "x": 2.0, "y": -2.0, "timestamp": 11},
+        {"robot_id": "robot-1", "x": 3.0, "y": -3.0, "timestamp": 12},
+    ]
+
+
+def test_decode_position_batch_empty():
+    batch = decode_position_batch(robot_pb2.PositionBatch(robot_id="robot-1").SerializeToString())
+    assert len(batch) == 0
+    assert batch.robot_id == "robot-1"
+
+
+def test_decode_position_batch_rejects_mismatched_arrays():
+    message = robot_pb2.PositionBatch(robot_id="robot-1", x=[1.0], y=[], timestamp=[1])
+    with pytest.raises(ValueError):
+        decode_position_batch(message.SerializeToString())
+
+
+def test_position_arrays_tail_and_iter_positions():
+    batch = decode_position_batch(robot_pb2.PositionBatch(
+        robot_id="robot-1", first_sequence=10, x=[1.0, 2.0, 3.0], y=[0.0, 0.0, 0.0], timestamp=[1, 2, 3]
+    ).SerializeToString())
+    tail = batch.tail(1)
+    single = PositionFrame(0.0, 0.0, 4, "robot-2")
+
+    assert (tail.first_sequence, tail.last_sequence, len(tail)) == (11, 12, 2)
+    assert batch.tail(0) is batch
+    frames = list(iter_positions([tail, single]))
+    assert [(p.robot_id, p.timestamp) for p in frames] == [("robot-1", 2), ("robot-1", 3), ("robot-2", 4)]
+    # 展開した位置フレームは配列を受信した時刻を引き継ぐ（レイテンシの計測用）
+    assert frames[0].received_at == batch.received_at
+    assert batch.last_frame().timestamp == 3
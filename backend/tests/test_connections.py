@@ -0,0 +1,320 @@
+import asyncio
+import json
+import struct
+from types import SimpleNamespace
+
+from app.schemas.frames import PositionFrame
+from app.websockets.connection import ClientConnection, OverflowPolicy
+from app.websockets.manager import ConnectionManager
+from app.websockets.protocol import DeliveryMode
+from app.websockets.registry import ConnectionRegistry
+
+
+def _client(websocket, **kwargs):
+    return ClientConnection(websocket, queue_size=16, overflow_policy=OverflowPolicy.DROP_OLDEST, **kwargs)
+
+
+class _FakeWebSocket:
+    """ハンドシェイクの完了を任意のタイミングまで待たせられるWebSocketの代わり"""
+
+    def __init__(self, host="10.0.0.1", port=1000, query=None):
+        self.client = SimpleNamespace(host=host, port=port)
+        self.query_params = query or {}
+        self.scope = {}
+        self.accepted = asyncio.Event()
+        self.release_accept = asyncio.Event()
+        self.release_accept.set()
+        self.closed_with = None
+        self.sent = []
+
+    async def accept(self, subprotocol=None):
+        await self.release_accept.wait()
+        self.accepted.set()
+
+    async def close(self, code=1000):
+        self.closed_with = code
+
+    async def send_text(self, text):
+        self.sent.append(text)
+
+    async def send_bytes(self, data):
+        self.sent.append(data)
+
+
+def test_admit_reserves_slot_until_added_or_released():
+    registry = ConnectionRegistry(max_connections=2, max_connections_per_ip=0)
+    first, second, third = _FakeWebSocket(port=1), _FakeWebSocket(port=2), _FakeWebSocket(port=3)
+
+    assert registry.admit(first) is None
+    assert registry.admit(second) is None
+    # 登録前でも予約した枠は上限に数える
+    assert registry.admit(third) == "max_connections"
+
+    registry.release(second)
+    assert registry.admit(third) is None
+
+    registry.add(_client(first))
+    registry.release(first)  # 登録済みの場合は何もしない
+    assert len(registry) == 1
+    assert registry.admit(_FakeWebSocket(port=4)) == "max_connections"
+
+
+def test_admit_reserves_per_ip_slot():
+    registry = ConnectionRegistry(max_connections=0, max_connections_per_ip=1)
+    first = _FakeWebSocket(host="10.0.0.1", port=1)
+
+    assert registry.admit(first) is None
+    assert registry.admit(_FakeWebSocket(host="10.0.0.1", port=2)) == "max_connections_per_ip"
+    assert registry.admit(_FakeWebSocket(host="10.0.0.2", port=3)) is None
+
+    registry.add(_client(first))
+    assert registry.ip_count() == 2
+    registry.remove(first)
+    assert registry.admit(_FakeWebSocket(host="10.0.0.1", port=4)) is None
+
+
+async def test_concurrent_connects_do_not_exceed_limit():
+    manager = ConnectionManager()
+    manager.active_connections = ConnectionRegistry(max_connections=2)
+    websockets = [_FakeWebSocket(port=i) for i in range(3)]
+    for websocket in websockets:
+        websocket.release_accept.clear()
+
+    # 3つの接続がすべてハンドシェイクの途中にある状態で上限を判定させる
+    tasks = [asyncio.create_task(manager.connect(websocket)) for websocket in websockets]
+    await asyncio.sleep(0)
+    for websocket in websockets:
+        websocket.release_accept.set()
+    results = await asyncio.gather(*tasks)
+
+    assert results == [True, True, False]
+    assert len(manager.active_connections) == 2
+    assert websockets[2].closed_with is not None
+    for websocket in websockets[:2]:
+        manager.disconnect(websocket)
+
+
+async def test_failed_handshake_releases_reserved_slot():
+    manager = ConnectionManager()
+    manager.active_connections = ConnectionRegistry(max_connections=1)
+    broken = _FakeWebSocket(port=1)
+
+    async def fail(subprotocol=None):
+        raise RuntimeError("disconnected")
+
+    broken.accept = fail
+    try:
+        await manager.connect(broken)
+    except RuntimeError:
+        pass
+
+    websocket = _FakeWebSocket(port=2)
+    assert await manager.connect(websocket)
+    manager.disconnect(websocket)
+
+
+def _queued_events(client):
+    events = []
+    while not client.queue.empty():
+        message, _ = client.queue.get_nowait()
+        events.append(json.loads(message)["event"])
+    return events
+
+
+async def test_ping_is_sent_only_to_clients_that_opted_in():
+    manager = ConnectionManager()
+    plain = _client(_FakeWebSocket(port=1))
+    requested = _client(_FakeWebSocket(port=2), heartbeat=True)
+    answering = _client(_FakeWebSocket(port=3))
+    for client in (plain, requested, answering):
+        manager.active_connections.add(client)
+    await manager.handle_message(answering.websocket, json.dumps({"action": "pong"}))
+
+    manager.check_connections()
+
+    assert _queued_events(plain) == []
+    assert _queued_events(requested) == ["ping"]
+    assert _queued_events(answering) == ["ping"]
+    assert answering.answers_pings and not requested.answers_pings
+
+
+async def test_history_replay_is_split_into_encodable_batches(monkeypatch):
+    from app.services.history import PositionHistory
+    from app.websockets import manager as manager_module
+    from app.websockets.protocol import FrameFormat
+
+    monkeypatch.setattr(manager_module, "MAX_BATCH_POSITIONS", 2)
+    manager = ConnectionManager()
+    manager.history = PositionHistory(capacity=16)
+    for t in range(5):
+        manager.history.add(PositionFrame(float(t), 0.0, t, "r1"))
+    client = _client(_FakeWebSocket(), frame_format=FrameFormat.BINARY)
+
+    manager._replay(client, 5)
+
+    frames = [client.queue.get_nowait()[0] for _ in range(client.queue.qsize())]
+    assert [struct.unpack_from("<BH", frame)[1] for frame in frames] == [2, 2, 1]
+
+
+async def test_abort_keeps_close_task_until_socket_is_closed():
+    websocket = _FakeWebSocket()
+    client = _client(websocket)
+
+    client.abort(code=1011)
+
+    assert client.closed
+    assert client._close_task is not None
+    await client._close_task
+    assert websocket.closed_with == 1011
+
+
+def _queued_messages(client):
+    return [message for message, _ in list(client.queue._queue)]
+
+
+async def test_drop_oldest_keeps_newest_messages():
+    client = ClientConnection(_FakeWebSocket(), queue_size=3, overflow_policy=OverflowPolicy.DROP_OLDEST)
+
+    for i in range(5):
+        assert client.enqueue(f"m{i}")
+
+    assert _queued_messages(client) == ["m2", "m3", "m4"]
+    assert client.dropped == 2
+    assert not client.closed
+
+
+async def test_latest_only_clears_queue_on_overflow():
+    client = ClientConnection(_FakeWebSocket(), queue_size=3, overflow_policy=OverflowPolicy.LATEST_ONLY)
+
+    for i in range(4):
+        assert client.enqueue(f"m{i}")
+
+    assert _queued_messages(client) == ["m3"]
+    assert client.dropped == 3
+
+
+async def test_disconnect_policy_closes_slow_client():
+    websocket = _FakeWebSocket()
+    closed = []
+    client = ClientConnection(
+        websocket, queue_size=2, overflow_policy=OverflowPolicy.DISCONNECT, on_close=closed.append
+    )
+
+    assert client.enqueue("m0") and client.enqueue("m1")
+    assert not client.enqueue("m2")
+
+    assert client.closed and closed == [client]
+    assert client.queue.empty()
+    assert not client.enqueue("m3")
+    await client._close_task
+    assert websocket.closed_with == 1013
+
+
+def _subscribed_client(manager, robot_ids=None, **kwargs):
+    client = _client(_FakeWebSocket(port=len(manager.active_connections) + 1), **kwargs)
+    manager.active_connections.add(client)
+    manager._index(client, robot_ids)
+    return client
+
+
+async def test_batch_mode_sends_pending_positions_in_one_frame():
+    manager = ConnectionManager()
+    client = _subscribed_client(manager, delivery_mode=DeliveryMode.BATCH)
+    for t in range(3):
+        await manager.broadcast_position(PositionFrame(float(t), 0.0, t, "r1"))
+    assert client.queue.empty()  # 期間満了まで送信しない
+
+    manager._flush()
+
+    frames = _queued_messages(client)
+    assert len(frames) == 1
+    message = json.loads(frames[0])
+    assert message["event"] == "position_batch"
+    assert [position["timestamp"] for position in message["data"]] == [0, 1, 2]
+
+
+async def test_latest_mode_sends_only_latest_position_per_robot():
+    manager = ConnectionManager()
+    client = _subscribed_client(manager, delivery_mode=DeliveryMode.LATEST)
+    for t in range(3):
+        await manager.broadcast_position(PositionFrame(float(t), 0.0, t, "r1"))
+        await manager.broadcast_position(PositionFrame(float(t), 1.0, t, "r2"))
+
+    manager._flush()
+
+    messages = [json.loads(frame) for frame in _queued_messages(client)]
+    assert sorted((m["data"]["robot_id"], m["data"]["timestamp"]) for m in messages) == [("r1", 2), ("r2", 2)]
+
+
+async def test_batch_is_flushed_when_max_size_is_reached():
+    manager = ConnectionManager()
+    manager.batch_max_size = 2
+    client = _subscribed_client(manager, delivery_mode=DeliveryMode.BATCH)
+
+    for t in range(3):
+        await manager.broadcast_position(PositionFrame(float(t), 0.0, t, "r1"))
+
+    assert len(_queued_messages(client)) == 1
+    assert manager._pending and manager._pending[0].timestamp == 2
+    manager._flush()
+
+
+async def test_positions_are_sent_only_to_subscribers_of_the_robot():
+    manager = ConnectionManager()
+    everyone = _subscribed_client(manager)
+    r1_only = _subscribed_client(manager, robot_ids=["r1"])
+
+    await manager.broadcast_position(PositionFrame(1.0, 2.0, 1, "r1"))
+    await manager.broadcast_position(PositionFrame(3.0, 4.0, 1, "r2"))
+
+    assert [json.loads(m)["data"]["robot_id"] for m in _queued_messages(everyone)] == ["r1", "r2"]
+    assert [json.loads(m)["data"]["robot_id"] for m in _queued_messages(r1_only)] == ["r1"]
+    assert manager.robot_subscriber_counts == {"r1": 1}
+
+
+async def test_subscribe_and_unsubscribe_messages_update_index():
+    manager = ConnectionManager()
+    client = _subscribed_client(manager, robot_ids=["r1"])
+    websocket = client.websocket
+
+    await manager.handle_message(websocket, json.dumps({"action": "subscribe", "robot_ids": ["r2"]}))
+    assert client.robot_ids == {"r1", "r2"}
+    assert manager.robot_subscriber_counts == {"r1": 1, "r2": 1}
+
+    await manager.handle_message(websocket, json.dumps({"action": "unsubscribe", "robot_ids": ["r1"]}))
+    assert client.robot_ids == {"r2"}
+    assert manager.robot_subscriber_counts == {"r2": 1}
+
+    await manager.handle_message(websocket, json.dumps({"action": "subscribe"}))
+    assert client.robot_ids is None
+    assert manager.robot_subscriber_counts == {}
+    assert manager._subscribers("r9") == [client]
+
+    await manager.handle_message(websocket, json.dumps({"action": "unsubscribe"}))
+    assert client.robot_ids == set()
+    assert manager._subscribers("r2") == []
+
+    events = [json.loads(m) for m in _queued_messages(client)]
+    assert [e["data"]["robot_ids"] for e in events if e["event"] == "subscribed"] == [
+        ["r1", "r2"], ["r2"], None, [],
+    ]
+
+
+async def test_invalid_subscribe_message_is_rejected():
+    manager = ConnectionManager()
+    client = _subscribed_client(manager, robot_ids=["r1"])
+
+    await manager.handle_message(client.websocket, json.dumps({"action": "subscribe", "robot_ids": "r2"}))
+
+    assert client.robot_ids == {"r1"}
+    assert json.loads(_queued_messages(client)[-1])["event"] == "error"
+
+
+async def test_disconnect_removes_client_from_subscriptions():
+    manager = ConnectionManager()
+    client = _subscribed_client(manager, robot_ids=["r1"])
+
+    manager.disconnect(client.websocket)
+
+    assert manager.robot_subscriber_counts == {}
+    assert manager._subscribers("r1") == []
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from app.services.downsampling import DownsampleMethod, downsample, lttb_indices, minmax_indices
+
+
+def _zigzag(n):
+    t = np.arange(n, dtype=np.float64)
+    return t, np.sin(t / 3.0) * 10 + (t % 7)
+
+
+@pytest.mark.parametrize("method", list(DownsampleMethod))
+@pytest.mark.parametrize("max_points", [1, 2, 3, 4, 5, 6, 7, 10, 50, 99])
+def test_result_has_at_most_max_points(method, max_points):
+    xs, ys = _zigzag(100)
+    timestamps = np.arange(100)
+
+    out_x, out_y, out_t = downsample(xs, ys, timestamps, max_points, method)
+
+    assert 0 < len(out_t) <= max_points
+    assert len(out_x) == len(out_y) == len(out_t)
+    # 点の順序を保つ
+    assert np.all(np.diff(out_t) > 0)
+
+
+@pytest.mark.parametrize("indices", [lttb_indices, minmax_indices])
+@pytest.mark.parametrize("max_points", [2, 3, 5, 8, 40])
+def test_first_and_last_points_are_kept(indices, max_points):
+    xs, ys = _zigzag(100)
+    selected = indices(xs, ys, max_points)
+    assert selected[0] == 0 and selected[-1] == 99
+
+
+def test_minmax_keeps_extremes():
+    xs, ys = _zigzag(1000)
+    ys[437] = 1000.0
+    ys[612] = -1000.0
+
+    selected = minmax_indices(xs, ys, 22)
+
+    assert len(selected) <= 22
+    assert 437 in selected and 612 in selected
+
+
+@pytest.mark.parametrize("indices", [lttb_indices, minmax_indices])
+def test_short_input_is_returned_unchanged(indices):
+    xs, ys = _zigzag(5)
+    assert indices(xs, ys, 10).tolist() == [0, 1, 2, 3, 4]
@@ -0,0 +1,238 @@
+import asyncio
+import os
+import tempfile
+import uuid
+
+import pytest
+
+from app.schemas.frames import PositionFrame
+from app.services.fanout import (
+    FanoutCoordinator,
+    LocalHub,
+    LocalTransport,
+    SharedMemoryTransport,
+    UnixSocketTransport,
+)
+from app.services.position_bus import PositionBus
+from app.services.shm_ring import PositionRing
+
+
+class _Worker:
+    """LocalHub に接続したワーカー1つ分（位置バスとコーディネーター）"""
+
+    def __init__(self, hub: LocalHub, worker_id: str, connections: int = 0):
+        self.bus = PositionBus(capacity=64)
+        self.coordinator = FanoutCoordinator(LocalTransport(hub), self.bus, worker_id)
+        self.coordinator.election_interval = 0.01
+        self.coordinator.stats_interval = 0.01
+        self.connections = connections
+        self.elected = asyncio.Event()
+        self.events = []  # ingesterから中継されたイベント
+
+    async def start(self):
+        async def on_elected():
+            self.elected.set()
+
+        await self.coordinator.start(
+            on_elected,
+            lambda: {"connections": self.connections},
+            event_handler=lambda *event: self.events.append(event),
+        )
+
+
+@pytest.fixture
+async def workers():
+    hub = LocalHub()
+    started = []
+
+    async def start(worker_id: str, connections: int = 0) -> _Worker:
+        worker = _Worker(hub, worker_id, connections)
+        await worker.start()
+        started.append(worker)
+        return worker
+
+    yield start
+    for worker in started:
+        await worker.coordinator.stop()
+
+
+async def _next(subscription, timeout: float = 1.0):
+    return await asyncio.wait_for(subscription.get(), timeout)
+
+
+async def test_first_worker_becomes_ingester(workers):
+    leader = await workers("w1")
+    follower = await workers("w2")
+
+    assert leader.coordinator.is_ingester
+    assert leader.elected.is_set()
+    assert follower.coordinator.role == "follower"
+    assert not follower.elected.is_set()
+
+
+async def test_ingester_forwards_positions_to_follower_subscribers(workers):
+    leader = await workers("w1")
+    follower = await workers("w2")
+    leader_subscription = leader.bus.subscribe("websocket")
+    follower_subscription = follower.bus.subscribe("websocket")
+
+    position = PositionFrame(1.5, 2.5, 100, "robot-1")
+    leader.bus.publish(position)
+
+    # ingester自身の購読者と、followerの位置バスの購読者の両方に届く
+    assert await _next(leader_subscription) == [position]
+    assert await _next(follower_subscription) == [position]
+
+
+async def test_follower_does_not_forward_back(workers):
+    leader = await workers("w1")
+    follower = await workers("w2")
+    leader_subscription = leader.bus.subscribe("websocket")
+
+    follower.bus.publish(PositionFrame(0.0, 0.0, 1, "robot-1"))
+    await asyncio.sleep(0.05)
+
+    assert leader_subscription.poll() == []
+
+
+async def test_follower_takes_over_when_ingester_stops(workers):
+    leader = await workers("w1")
+    follower = await workers("w2")
+    third = await workers("w3")
+
+    await leader.coordinator.stop()
+    for _ in range(100):
+        if follower.elected.is_set() or third.elected.is_set():
+            break
+        await asyncio.sleep(0.01)
+    assert follower.elected.is_set() != third.elected.is_set()  # 引き継ぐのは1ワーカーのみ
+    new_leader, remaining = (follower, third) if follower.elected.is_set() else (third, follower)
+    assert new_leader.coordinator.is_ingester
+    assert remaining.coordinator.role == "follower"
+
+    # 引き継いだingesterから残りのfollowerに配布される
+    subscription = remaining.bus.subscribe("websocket")
+    position = PositionFrame(3.0, 4.0, 200, "robot-2")
+    new_leader.bus.publish(position)
+    assert await _next(subscription) == [position]
+
+
+async def test_cluster_status_aggregates_worker_stats(workers):
+    leader = await workers("w1", connections=3)
+    await workers("w2", connections=5)
+    await asyncio.sleep(0.05)
+
+    status = leader.coordinator.cluster_status()
+
+    assert [stats["worker"] for stats in status["workers"]] == ["w1", "w2"]
+    assert [stats["role"] for stats in status["workers"]] == ["ingester", "follower"]
+    assert status["connections"] == 8
+
+
+async def test_ingester_relays_events_to_followers(workers):
+    leader = await workers("w1")
+    follower = await workers("w2")
+    third = await workers("w3")
+
+    leader.coordinator.publish_event("robot-1", "gap", {"robot_id": "robot-1", "missed": 3})
+    # followerから中継することはない
+    follower.coordinator.publish_event("robot-2", "resync", {"robot_id": "robot-2"})
+
+    expected = [("robot-1", "gap", {"robot_id": "robot-1", "missed": 3})]
+    assert follower.events == expected
+    assert third.events == expected
+    assert leader.events == []
+
+
+async def _wait_until(condition, timeout: float = 1.0):
+    for _ in range(int(timeout / 0.01)):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    assert condition()
+
+
+async def test_unix_socket_transport_relays_events():
+    path = os.path.join(tempfile.mkdtemp(), "fanout.sock")
+    leader, follower = UnixSocketTransport(path), UnixSocketTransport(path)
+    follower.reconnect_delay = 0.01
+    events = []
+    follower.on_event = lambda *event: events.append(event)
+    try:
+        assert leader.try_acquire_leadership()
+        await leader.promote()
+        await follower.start()
+        await _wait_until(lambda: leader._peers)
+
+        leader.publish_event("robot-1", "resync", {"robot_id": "robot-1", "sequence": 42})
+
+        await _wait_until(lambda: events)
+        assert events == [("robot-1", "resync", {"robot_id": "robot-1", "sequence": 42})]
+    finally:
+        await follower.stop()
+        await leader.stop()
+
+
+async def test_shared_memory_transport_relays_events():
+    name = f"test-fanout-{uuid.uuid4().hex[:8]}"
+    leader, follower = SharedMemoryTransport(name), SharedMemoryTransport(name)
+    follower.poll_interval = 0.01
+    events = []
+    follower.on_event = lambda *event: events.append(event)
+    try:
+        assert leader.try_acquire_leadership()
+        await leader.promote()
+        await follower.start()
+        await _wait_until(lambda: follower.ring is not None)
+        await asyncio.sleep(0.02)
+
+        leader.publish_event("robot-1", "gap", {"robot_id": "robot-1", "missed": 1})
+
+        await _wait_until(lambda: events)
+        assert events == [("robot-1", "gap", {"robot_id": "robot-1", "missed": 1})]
+    finally:
+        await follower.stop()
+        await leader.stop()
+        PositionRing.attach(name).unlink()
+
+
+async def test_forward_continues_after_publish_error(workers):
+    leader = await workers("w1")
+    follower = await workers("w2")
+    subscription = follower.bus.subscribe("websocket")
+    publish = leader.coordinator.transport.publish
+
+    def failing_publish(position):
+        if position.robot_id == "broken":
+            raise ValueError("broken")
+        publish(position)
+
+    leader.coordinator.transport.publish = failing_publish
+    position = PositionFrame(1.0, 1.0, 2, "robot-1")
+    leader.bus.publish(PositionFrame(0.0, 0.0, 1, "broken"))
+    leader.bus.publish(position)
+
+    assert await _next(subscription) == [position]
+
+
+async def test_unix_socket_transport_skips_unencodable_robot_id():
+    path = os.path.join(tempfile.mkdtemp(), "fanout.sock")
+    leader, follower = UnixSocketTransport(path), UnixSocketTransport(path)
+    follower.reconnect_delay = 0.01
+    positions = []
+    follower.on_position = positions.append
+    try:
+        assert leader.try_acquire_leadership()
+        await leader.promote()
+        await follower.start()
+        await _wait_until(lambda: leader._peers)
+
+        # 位置レコードにエンコードできないロボットIDは読み飛ばし、例外を送出しない
+        leader.publish(PositionFrame(0.0, 0.0, 1, "r" * 300))
+        leader.publish(PositionFrame(1.0, 2.0, 3, "robot-1"))
+
+        await _wait_until(lambda: positions)
+        assert [p.robot_id for p in positions] == ["robot-1"]
+    finally:
+        await follower.stop()
+        await leader.stop()
@@ -0,0 +1,117 @@
+import asyncio
+import random
+
+import numpy as np
+import pytest
+
+from app.schemas.frames import PositionArrays, PositionFrame
+from app.services.history import PositionHistory, RobotHistory
+from app.services.position_bus import PositionBus
+
+
+def _filled(capacity, count):
+    history = RobotHistory(capacity)
+    for i in range(count):
+        history.append(float(i), float(-i), i * 10)
+    return history
+
+
+def test_ring_keeps_latest_points_in_order():
+    history = _filled(capacity=5, count=12)
+
+    xs, ys, timestamps = history.query()
+
+    assert list(timestamps) == [70, 80, 90, 100, 110]
+    assert list(xs) == [7.0, 8.0, 9.0, 10.0, 11.0]
+    assert list(ys) == [-7.0, -8.0, -9.0, -10.0, -11.0]
+    assert (history.size, history.version, history.last_timestamp) == (5, 12, 110)
+
+
+def test_query_range_and_limit_across_wrap():
+    history = _filled(capacity=8, count=13)  # 50〜120 を保持
+
+    assert list(history.query(since=65, until=100)[2]) == [70, 80, 90, 100]
+    assert list(history.query(since=65, until=100, limit=2)[2]) == [90, 100]
+    assert list(history.query(until=40)[2]) == []
+    assert list(history.query(since=200)[2]) == []
+    assert history.index_range(80, 80) == (3, 4)
+
+
+def test_out_of_order_points_are_rejected():
+    history = _filled(capacity=4, count=3)
+
+    assert not history.append(0.0, 0.0, 5)
+    assert history.append(0.0, 0.0, 20)  # 同じタイムスタンプは受け入れる
+    assert list(history.query()[2]) == [0, 10, 20, 20]
+
+
+def test_frames_returns_position_frames():
+    history = _filled(capacity=4, count=6)
+    frames = history.frames(1, 3, "robot-1")
+    assert [(f.robot_id, f.x, f.timestamp) for f in frames] == [("robot-1", 3.0, 30), ("robot-1", 4.0, 40)]
+
+
+def test_least_recently_updated_robot_is_evicted():
+    history = PositionHistory(capacity=4, max_robots=2)
+    history.add(PositionFrame(0.0, 0.0, 1, "r1"))
+    history.add(PositionFrame(0.0, 0.0, 1, "r2"))
+    history.add(PositionFrame(0.0, 0.0, 2, "r1"))
+    history.add(PositionFrame(0.0, 0.0, 1, "r3"))
+
+    assert sorted(history.robot_ids) == ["r1", "r3"]
+    assert [f.timestamp for f in history.latest("r1", 10)] == [1, 2]
+    assert history.stats() == {"robots": 2, "points": 3, "capacity_per_robot": 4}
+
+
+async def test_history_consumes_position_bus():
+    bus = PositionBus(capacity=16)
+    history = PositionHistory(capacity=4, max_robots=4)
+    history.start(bus)
+    try:
+        for i in range(3):
+            bus.publish(PositionFrame(float(i), 0.0, i, "r1"))
+        for _ in range(10):
+            await asyncio.sleep(0)
+        assert history.get("r1").size == 3
+    finally:
+        await history.stop()
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_extend_matches_sequential_append(seed):
+    rng = random.Random(seed)
+    capacity = rng.randint(1, 12)
+    expected, actual = RobotHistory(capacity), RobotHistory(capacity)
+    timestamp = 0
+    for _ in range(6):
+        # 容量を超える件数や、順序が逆転した位置も含める
+        timestamps = [timestamp + rng.randint(-3, 4) for _ in range(rng.randint(0, 30))]
+        timestamp = max(timestamps, default=timestamp)
+        xs = [rng.uniform(0, 100) for _ in timestamps]
+        for x, ts in zip(xs, timestamps):
+            expected.append(x, -x, ts)
+        xs = np.array(xs, dtype=np.float32)
+        actual.extend(xs, -xs, np.array(timestamps, dtype=np.int64))
+
+        assert (actual.start, actual.size, actual.version) == (expected.start, expected.size, expected.version)
+        assert [list(column) for column in actual.query()] == [list(column) for column in expected.query()]
+
+
+def _arrays(robot_id, timestamps):
+    xs = np.arange(len(timestamps), dtype=np.float32)
+    return PositionArrays(robot_id, 1, xs, -xs, np.array(timestamps, dtype=np.int64))
+
+
+async def test_history_appends_position_arrays_from_bus():
+    bus = PositionBus(capacity=16)
+    history = PositionHistory(capacity=4, max_robots=4)
+    history.start(bus)
+    try:
+        bus.publish(_arrays("r1", [1, 2, 3, 4, 5, 6]))
+        bus.publish(PositionFrame(9.0, 9.0, 7, "r1"))
+        for _ in range(10):
+            await asyncio.sleep(0)
+        assert list(history.get("r1").query()[2]) == [4, 5, 6, 7]
+        assert history.get("r1").version == 7
+    finally:
+        await history.stop()
@@ -0,0 +1,72 @@
+import json
+import logging
+
+import pytest
+
+from app.core import logging_config
+from app.core.logging_config import JsonFormatter, RateLimitFilter, TextFormatter
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(logging_config.time, "monotonic", lambda: now[0])
+    return now
+
+
+def _record(msg="位置を受信しました: %s", level=logging.INFO, name="app.test", **extra):
+    return logging.makeLogRecord({"name": name, "msg": msg, "args": ("r1",), "levelno": level, **extra})
+
+
+def test_rate_limit_allows_burst_then_refills(clock):
+    log_filter = RateLimitFilter(rate=1.0, burst=2)
+
+    assert [log_filter.filter(_record()) for _ in range(4)] == [True, True, False, False]
+
+    clock[0] += 1.0
+    record = _record()
+    assert log_filter.filter(record)
+    assert record.suppressed == 2  # 抑制した件数を次に出力するログに付ける
+    assert not log_filter.filter(_record())
+
+
+def test_rate_limit_is_per_message_and_skips_warnings(clock):
+    log_filter = RateLimitFilter(rate=1.0, burst=1)
+
+    assert log_filter.filter(_record())
+    assert not log_filter.filter(_record())
+    assert log_filter.filter(_record("別のログ"))
+    assert log_filter.filter(_record(name="app.other"))
+    assert all(log_filter.filter(_record(level=logging.WARNING)) for _ in range(3))
+
+
+def test_sample_every_outputs_one_in_n(clock):
+    log_filter = RateLimitFilter(rate=0, burst=1)
+
+    results = [log_filter.filter(_record(level=logging.WARNING, sample_every=3)) for _ in range(7)]
+
+    assert results == [True, False, False, True, False, False, True]
+
+
+def test_disabled_rate_limit_passes_everything(clock):
+    log_filter = RateLimitFilter(rate=0, burst=1)
+
+    assert all(log_filter.filter(_record()) for _ in range(10))
+
+
+def test_keys_are_bounded(clock):
+    log_filter = RateLimitFilter(rate=1.0, burst=1, max_keys=2)
+
+    for i in range(3):
+        log_filter.filter(_record(f"ログ{i}"))
+
+    assert len(log_filter._buckets) == 2
+
+
+def test_formatters_include_suppressed_count_and_extra():
+    record = _record(suppressed=3, robot_id="r1")
+
+    assert TextFormatter("%(message)s").format(record) == "位置を受信しました: r1 (同じログを 3 件抑制)"
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["message"] == "位置を受信しました: r1"
+    assert entry["suppressed"] == 3 and entry["robot_id"] == "r1"
@@ -0,0 +1,69 @@
+import pytest
+
+from app.core.metrics import MetricsRegistry
+
+
+def test_counter_with_labels_renders_one_series_per_label_value():
+    registry = MetricsRegistry()
+    counter = registry.counter("test_total", "テスト", ("robot_id",))
+
+    counter.labels("r1").inc()
+    counter.labels("r1").inc(2)
+    counter.labels('a"b').inc()
+
+    assert counter.labels("r1") is counter.labels("r1")
+    assert registry.render().splitlines() == [
+        "# HELP test_total テスト",
+        "# TYPE test_total counter",
+        'test_total{robot_id="r1"} 3',
+        'test_total{robot_id="a\\"b"} 1',
+    ]
+
+    counter.remove("r1")
+    assert 'test_total{robot_id="r1"} 3' not in registry.render()
+
+
+def test_labels_must_match_label_names():
+    counter = MetricsRegistry().counter("test_total", "テスト", ("reason",))
+
+    with pytest.raises(ValueError):
+        counter.labels("a", "b")
+
+
+def test_gauge_without_labels():
+    registry = MetricsRegistry()
+    gauge = registry.gauge("test_gauge", "テスト")
+
+    gauge.set(5)
+    gauge.inc(2)
+    gauge.dec()
+
+    assert registry.render().splitlines()[-1] == "test_gauge 6"
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("test_seconds", "テスト", buckets=(0.1, 1.0))
+
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value)
+
+    assert registry.render().splitlines()[2:] == [
+        'test_seconds_bucket{le="0.1"} 2',
+        'test_seconds_bucket{le="1.0"} 3',
+        'test_seconds_bucket{le="+Inf"} 4',
+        "test_seconds_sum 2.65",
+        "test_seconds_count 4",
+    ]
+
+
+def test_gauge_callback_is_collected_at_render_time():
+    registry = MetricsRegistry()
+    depths = {"stream": 1}
+    registry.gauge_callback(
+        "test_depth", "テスト", ("mode",), lambda: [((mode,), depth) for mode, depth in depths.items()]
+    )
+
+    depths["batch"] = 4
+
+    assert registry.render().splitlines()[2:] == ['test_depth{mode="stream"} 1', 'test_depth{mode="batch"} 4']
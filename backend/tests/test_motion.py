@@ -0,0 +1,158 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app.schemas.frames import PositionFrame
+from app.services.motion import ConstantVelocityModel, DeadReckoningFilter, MotionModel, MotionTracker
+from app.websockets.manager import ConnectionManager
+
+
+class _FakeWebSocket:
+    def __init__(self, query=None):
+        self.client = SimpleNamespace(host="10.0.0.1", port=1000)
+        self.query_params = query or {}
+        self.scope = {}
+        self.sent = []
+
+    async def accept(self, subprotocol=None):
+        pass
+
+    async def close(self, code=1000):
+        pass
+
+    async def send_text(self, text):
+        self.sent.append(text)
+
+    async def send_bytes(self, data):
+        pass
+
+
+def _position(x, y, timestamp, robot_id="r1", vx=0.0, vy=0.0):
+    position = PositionFrame(x, y, timestamp, robot_id)
+    position.vx, position.vy = vx, vy
+    return position
+
+
+def test_models_do_not_have_instance_dict():
+    assert MotionModel.__slots__ == ()
+    assert not hasattr(ConstantVelocityModel(0.5), "__dict__")
+
+
+def test_constant_velocity_model_smooths_velocity():
+    model = ConstantVelocityModel(smoothing=0.5)
+    assert model.update(0.0, 0.0, 0) == (0.0, 0.0)
+    assert model.update(2.0, 0.0, 1) == (1.0, 0.0)
+    # 同じタイムスタンプの点は速度を変えない
+    assert model.update(5.0, 0.0, 1) == (1.0, 0.0)
+    assert model.update(7.0, 4.0, 2) == (1.5, 2.0)
+
+
+def test_motion_tracker_sets_velocity_and_removes_models():
+    tracker = MotionTracker("constant_velocity", smoothing=1.0)
+    tracker.update(_position(0.0, 0.0, 0))
+    position = _position(3.0, 4.0, 1)
+    tracker.update(position)
+    assert (position.vx, position.vy) == (3.0, 4.0)
+
+    tracker.remove("r1")
+    position = _position(10.0, 10.0, 2)
+    tracker.update(position)
+    assert (position.vx, position.vy) == (0.0, 0.0)
+
+    with pytest.raises(ValueError):
+        MotionTracker("kalman", 0.5)
+    assert MotionTracker.create("none", 0.5) is None
+
+
+def test_motion_tracker_evicts_least_recently_updated_robot():
+    tracker = MotionTracker("constant_velocity", smoothing=1.0, max_robots=2)
+    for robot_id in ("r1", "r2"):
+        tracker.update(_position(0.0, 0.0, 0, robot_id))
+    tracker.update(_position(1.0, 0.0, 1, "r1"))
+    tracker.update(_position(0.0, 0.0, 0, "r3"))
+
+    assert len(tracker) == 2
+    # 最も長く更新されていない r2 を破棄し、r1 の推定は維持する
+    position = _position(2.0, 0.0, 2, "r1")
+    tracker.update(position)
+    assert position.vx == 1.0
+    position = _position(5.0, 0.0, 1, "r2")
+    tracker.update(position)
+    assert position.vx == 0.0
+
+
+def test_dead_reckoning_sends_only_when_prediction_deviates():
+    dead_reckoning = DeadReckoningFilter(tolerance=1.0, max_interval_ms=10_000)
+    assert dead_reckoning.accept(_position(0.0, 0.0, 0, vx=1.0))
+    # 予測どおり（x = t）に動いている間は送信しない
+    assert not dead_reckoning.accept(_position(2.0, 0.0, 2))
+    assert not dead_reckoning.accept(_position(3.5, 0.0, 3))
+    assert dead_reckoning.accept(_position(4.0, 2.0, 4))
+    # 予測から外れ続ける停止したロボットも誤差が許容値を超えれば送信する
+    dead_reckoning.accept(_position(0.0, 0.0, 10, "r2", vx=1.0))
+    assert dead_reckoning.accept(_position(0.0, 0.0, 12, "r2"))
+
+
+def test_dead_reckoning_sends_after_max_interval():
+    dead_reckoning = DeadReckoningFilter(tolerance=1.0, max_interval_ms=2000)
+    assert dead_reckoning.accept(_position(0.0, 0.0, 0))
+    assert not dead_reckoning.accept(_position(0.0, 0.0, 1))
+    assert dead_reckoning.accept(_position(0.0, 0.0, 2))
+
+
+def test_dead_band_is_applied_to_prediction_error():
+    dead_reckoning = DeadReckoningFilter(tolerance=1.0, max_interval_ms=10_000, min_distance=3.0, min_interval=2.0)
+    assert dead_reckoning.threshold == 3.0
+    assert dead_reckoning.accept(_position(0.0, 0.0, 0, vx=1.0))
+    # 最小送信間隔の間は誤差によらず送信しない
+    assert not dead_reckoning.accept(_position(10.0, 0.0, 1))
+    assert not dead_reckoning.accept(_position(4.0, 0.0, 2))
+    # 停止していても予測位置（x = 5）との誤差が min_distance を超えれば送信する
+    assert dead_reckoning.accept(_position(0.0, 0.0, 5))
+
+
+async def _events(websocket):
+    """送信タスクが送信したイベント（確認後は送信済みの記録を空にする）"""
+    for _ in range(10):
+        await asyncio.sleep(0)
+    events = [json.loads(text) for text in websocket.sent]
+    websocket.sent.clear()
+    return {event["event"]: event.get("data") for event in events if "event" in event}
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    manager = ConnectionManager()
+    manager.motion = MotionTracker("constant_velocity", smoothing=1.0)
+    yield manager
+    for client in list(manager.active_connections):
+        manager.disconnect(client.websocket)
+
+
+async def test_filter_action_keeps_dead_reckoning(manager):
+    websocket = _FakeWebSocket({"dr_tolerance": "1.5", "dr_max_interval_ms": "5000", "min_distance": "0"})
+    assert await manager.connect(websocket)
+    client = manager.active_connections.get(websocket)
+    dead_reckoning = client.live_filter
+    assert isinstance(dead_reckoning, DeadReckoningFilter) and client.dead_reckoning
+    motion_model = (await _events(websocket))["motion_model"]
+    assert motion_model["tolerance"] == 1.5 and motion_model["max_interval_ms"] == 5000
+
+    await manager.handle_message(websocket, json.dumps({"action": "filter", "min_distance": 4, "min_interval_ms": 500}))
+
+    assert client.live_filter is dead_reckoning
+    events = await _events(websocket)
+    assert events["filter"] == {"min_distance": 4.0, "min_interval_ms": 500}
+    assert events["motion_model"]["tolerance"] == 4.0
+    assert events["motion_model"]["min_interval_ms"] == 500
+
+
+async def test_dead_band_query_is_applied_with_dead_reckoning(manager):
+    websocket = _FakeWebSocket({"dr_tolerance": "1", "min_distance": "2", "min_interval_ms": "1000"})
+    assert await manager.connect(websocket)
+    client = manager.active_connections.get(websocket)
+
+    assert client.live_filter.threshold == 2.0
+    assert client.live_filter.min_interval == 1.0
@@ -0,0 +1,78 @@
+import asyncio
+
+from app.services.position_bus import PositionBus
+
+
+def test_subscribers_read_independently():
+    bus = PositionBus(capacity=8)
+    first = bus.subscribe("first")
+    bus.publish(1)
+    second = bus.subscribe("second")  # 購読開始以降のデータのみ受信
+    bus.publish(2)
+    bus.publish(3)
+
+    assert first.poll(max_items=2) == [1, 2]
+    assert second.poll() == [2, 3]
+    assert first.lag == 1
+    assert first.poll() == [3]
+    assert first.poll() == [] and second.poll() == []
+
+
+def test_read_wraps_around_ring():
+    bus = PositionBus(capacity=4)
+    subscription = bus.subscribe("s")
+    for i in range(3):
+        bus.publish(i)
+    assert subscription.poll() == [0, 1, 2]
+    for i in range(3, 6):
+        bus.publish(i)
+    assert subscription.poll() == [3, 4, 5]
+
+
+def test_slow_subscriber_skips_overwritten_items():
+    bus = PositionBus(capacity=4)
+    subscription = bus.subscribe("slow")
+    for i in range(10):
+        bus.publish(i)
+
+    assert subscription.poll() == [6, 7, 8, 9]
+    assert subscription.missed == 6
+    assert subscription.lag == 0
+
+
+async def test_get_waits_for_publish():
+    bus = PositionBus(capacity=4)
+    subscription = bus.subscribe("s")
+    task = asyncio.create_task(subscription.get())
+    await asyncio.sleep(0)
+    assert not task.done()
+
+    bus.publish("item")
+
+    assert await asyncio.wait_for(task, 1.0) == ["item"]
+
+
+async def test_close_wakes_waiting_subscriber():
+    bus = PositionBus(capacity=4)
+    subscription = bus.subscribe("s")
+    task = asyncio.create_task(subscription.get())
+    await asyncio.sleep(0)
+
+    subscription.close()
+
+    assert await asyncio.wait_for(task, 1.0) == []
+    assert bus.subscriptions == []
+
+
+async def test_async_iteration():
+    bus = PositionBus(capacity=4)
+    subscription = bus.subscribe("s")
+    for i in range(3):
+        bus.publish(i)
+
+    received = []
+    async for item in subscription:
+        received.append(item)
+        if len(received) == 3:
+            subscription.close()
+    assert received == [0, 1, 2]
@@ -0,0 +1,229 @@
+import asyncio
+
+import grpc
+import numpy as np
+import pytest
+
+from app.config import settings
+from app.grpc_client.robot_client import RobotTrackerClient, TrackerEndpoint
+from app.protos.robot import robot_pb2
+from app.schemas.frames import PositionArrays
+
+_sleep = asyncio.sleep  # テスト側の待機（asyncio.sleep を置き換えるテストでも実際に待機する）
+
+
+class _FakeCall:
+    """TrackRobot の呼び出し結果の代わり（用意した位置を順に返し、その後は待機し続ける）"""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.cancelled = False
+
+    async def read(self):
+        if self.responses:
+            response = self.responses.pop(0)
+            if isinstance(response, Exception):
+                raise response
+            return response
+        await asyncio.Event().wait()
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class _FakeStub:
+    def __init__(self, scripts):
+        self.scripts = list(scripts)  # 呼び出しごとに返す位置のシーケンス番号
+        self.requests = []
+        self.calls = []
+
+    def TrackRobot(self, request):
+        self.requests.append(request)
+        sequences = self.scripts.pop(0) if self.scripts else []
+        call = _FakeCall(
+            seq if isinstance(seq, Exception) else
+            robot_pb2.Position(x=float(seq), y=0.0, timestamp=seq, robot_id=request.robot_id, sequence=seq)
+            for seq in sequences
+        )
+        self.calls.append(call)
+        return call
+
+
+def _endpoint(stub=None, target="fake:50051"):
+    endpoint = TrackerEndpoint(target)
+    endpoint._set_state(grpc.ChannelConnectivity.READY)
+    endpoint.stub = stub
+    return endpoint
+
+
+@pytest.fixture
+def tracker():
+    client = RobotTrackerClient()
+    client.batch_enabled = False
+    positions, events = [], []
+    client.set_position_callback(positions.append)
+    client.set_event_callback(lambda robot_id, event, data: events.append((event, data)))
+    return client, positions, events
+
+
+async def _track(client, stub, until):
+    client.endpoints = [_endpoint(stub)]
+    client._running = True
+    task = asyncio.create_task(client._track_robot("robot-1"))
+    try:
+        for _ in range(200):
+            if until():
+                break
+            await _sleep(0.005)
+    finally:
+        client._running = False
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+
+async def test_gap_in_stream_resumes_from_last_sequence(tracker):
+    client, positions, events = tracker
+    stub = _FakeStub([[1, 2, 4], [3, 4, 5]])
+
+    await _track(client, stub, lambda: len(positions) == 5)
+
+    assert [p.timestamp for p in positions] == [1, 2, 3, 4, 5]
+    assert [r.resume_after for r in stub.requests] == [0, 2]
+    assert stub.calls[0].cancelled
+    assert events == []
+
+
+async def test_gap_not_replayed_after_resume_is_reported(tracker):
+    client, positions, events = tracker
+    # トラッカーが欠落した位置を保持していない場合
+    stub = _FakeStub([[1, 2, 5], [5, 6]])
+
+    await _track(client, stub, lambda: len(positions) == 4)
+
+    assert [p.timestamp for p in positions] == [1, 2, 5, 6]
+    assert [r.resume_after for r in stub.requests] == [0, 2]
+    assert events == [("gap", {"robot_id": "robot-1", "from": 3, "to": 4, "missed": 2})]
+
+
+async def test_stream_is_cancelled_when_read_fails(tracker):
+    client, positions, _ = tracker
+    stub = _FakeStub([[1, RuntimeError("broken")], [2]])
+
+    await _track(client, stub, lambda: len(positions) == 2)
+
+    assert [p.timestamp for p in positions] == [1, 2]
+    assert stub.calls[0].cancelled
+
+
+async def test_stream_is_cancelled_when_read_times_out(tracker, monkeypatch):
+    client, _, _ = tracker
+    monkeypatch.setattr(settings, "GRPC_STREAM_IDLE_TIMEOUT_S", 0.01)
+    stub = _FakeStub([[]])
+    client.endpoints = [_endpoint(stub)]
+
+    async def disconnect():
+        await asyncio.sleep(0.02)
+        client.endpoints[0]._set_state(grpc.ChannelConnectivity.CONNECTING)
+
+    asyncio.create_task(disconnect())
+    client._running = True
+    task = asyncio.create_task(client._track_robot("robot-1"))
+    for _ in range(100):
+        if stub.calls and stub.calls[0].cancelled:
+            break
+        await asyncio.sleep(0.005)
+    client._running = False
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+    assert stub.calls[0].cancelled
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """asyncio.sleep で待機した時間を記録（実際には待機しない）"""
+    recorded = []
+    original = asyncio.sleep
+
+    async def sleep(delay, *args, **kwargs):
+        recorded.append(delay)
+        await original(0)
+
+    monkeypatch.setattr(asyncio, "sleep", sleep)
+    return recorded
+
+
+async def test_healthy_alternate_shortens_backoff_but_does_not_skip_it(tracker, sleeps):
+    client, _, _ = tracker
+    client._backoff = lambda delay: delay
+    failed, alternate = _endpoint(target="a:1"), _endpoint(target="b:1")
+    client.endpoints = [failed, alternate]
+
+    await client._wait_before_retry(failed, {"a:1": 8.0})
+    await client._wait_before_retry(failed, {"a:1": 8.0, "b:1": 4.0})
+    await client._wait_before_retry(failed, {"a:1": 2.0, "b:1": 4.0})
+
+    assert sleeps == [client._reconnect_delay, 4.0, 2.0]
+
+
+async def test_backoff_applies_when_failed_endpoint_is_the_only_one(tracker, sleeps):
+    client, _, _ = tracker
+    client._backoff = lambda delay: delay
+    failed = _endpoint(target="a:1")
+    client.endpoints = [failed]
+
+    await client._wait_before_retry(failed, {"a:1": 8.0})
+
+    assert sleeps == [8.0]
+
+
+async def test_backoff_grows_per_endpoint(tracker, sleeps):
+    client, _, _ = tracker
+    client._backoff = lambda delay: delay
+    stub = _FakeStub([[RuntimeError("broken")]] * 4)
+
+    await _track(client, stub, lambda: len(sleeps) >= 4)
+
+    initial = client._reconnect_delay
+    assert sleeps[:4] == [initial, initial * 2, initial * 4, initial * 8]
+
+
+async def test_batch_is_published_as_one_item_without_received_positions(tracker):
+    client, positions, _ = tracker
+    client.batch_enabled = True
+    batches = [
+        PositionArrays("robot-1", 1, np.arange(3, dtype=np.float32), np.zeros(3, np.float32), np.arange(1, 4)),
+        PositionArrays("robot-1", 2, np.arange(4, dtype=np.float32), np.zeros(4, np.float32), np.arange(2, 6)),
+    ]
+    endpoint = _endpoint()
+    calls = []
+
+    def track_batch(request):
+        calls.append(_FakeCall(batches))
+        return calls[-1]
+
+    endpoint.track_batch = track_batch
+    client.endpoints = [endpoint]
+    client._running = True
+    task = asyncio.create_task(client._track_robot("robot-1"))
+    for _ in range(100):
+        if len(positions) == 2:
+            break
+        await _sleep(0.005)
+    client._running = False
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+    # 受信済みの位置（シーケンス番号 2, 3）を除いた残りを配列のまま発行する
+    assert all(isinstance(item, PositionArrays) for item in positions)
+    assert positions[0] is batches[0]
+    assert (positions[1].first_sequence, positions[1].timestamp.tolist()) == (4, [4, 5])
@@ -0,0 +1,175 @@
+import os
+import uuid
+
+import pytest
+
+from app.schemas.frames import PositionFrame
+from app.services.shm_ring import (
+    EVENT_SLOTS,
+    EVENT_SLOT_SIZE,
+    HEADER_SIZE,
+    MAX_ROBOT_ID_BYTES,
+    RECORD_SIZE,
+    STATS_SLOT_SIZE,
+    PositionRing,
+)
+
+
+@pytest.fixture
+def ring():
+    ring = PositionRing.create(f"test-ring-{uuid.uuid4().hex[:8]}", capacity=8, worker_slots=2)
+    yield ring
+    ring.unlink()
+
+
+def _positions(count, start=0):
+    return [PositionFrame(float(i), float(-i), 1000 + i, f"robot-{i % 3}") for i in range(start, start + count)]
+
+
+def _assert_positions(actual, expected):
+    assert [(p.robot_id, p.x, p.y, p.timestamp) for p in actual] == [
+        (p.robot_id, p.x, p.y, p.timestamp) for p in expected
+    ]
+
+
+def test_write_and_read(ring):
+    positions = _positions(5)
+    for position in positions:
+        assert ring.write(position)
+
+    read, cursor, missed = ring.read(0)
+
+    _assert_positions(read, positions)
+    assert (cursor, missed) == (5, 0)
+    assert ring.read(cursor) == ([], 5, 0)
+
+
+def test_read_with_max_items(ring):
+    for position in _positions(5):
+        ring.write(position)
+
+    read, cursor, _ = ring.read(1, max_items=2)
+
+    assert [p.timestamp for p in read] == [1001, 1002]
+    assert cursor == 3
+
+
+def test_reader_behind_by_more_than_capacity_skips_overwritten(ring):
+    positions = _positions(20)
+    for position in positions:
+        ring.write(position)
+
+    read, cursor, missed = ring.read(0)
+
+    _assert_positions(read, positions[-8:])
+    assert (cursor, missed) == (20, 12)
+
+
+def test_attached_ring_shares_records(ring):
+    other = PositionRing.attach(ring.shm.name)
+    try:
+        ring.write(PositionFrame(1.0, 2.0, 3, "robot-1"))
+        read, _, _ = other.read(0)
+        _assert_positions(read, [PositionFrame(1.0, 2.0, 3, "robot-1")])
+    finally:
+        other.close()
+
+
+def test_torn_record_is_discarded(ring):
+    for position in _positions(3):
+        ring.write(position)
+    # 書き込み途中（スロットのシーケンス番号が0）のレコードを再現
+    offset = HEADER_SIZE + 1 * RECORD_SIZE
+    ring.buffer[offset:offset + 8] = bytes(8)
+
+    read, cursor, missed = ring.read(0)
+
+    assert [p.timestamp for p in read] == [1000, 1002]
+    assert (cursor, missed) == (3, 1)
+
+
+def test_too_long_robot_id_is_rejected(ring):
+    assert not ring.write(PositionFrame(0.0, 0.0, 0, "r" * (MAX_ROBOT_ID_BYTES + 1)))
+    assert ring.write(PositionFrame(0.0, 0.0, 0, "r" * MAX_ROBOT_ID_BYTES))
+    assert ring.sequence == 1
+
+
+def test_create_reuses_existing_ring_and_sequence(ring):
+    for position in _positions(3):
+        ring.write(position)
+
+    reused = PositionRing.create(ring.shm.name, capacity=8, worker_slots=2)
+    try:
+        assert reused.sequence == 3
+    finally:
+        reused.close()
+
+
+def test_worker_slots_and_stats(ring):
+    pid = os.getpid()
+    slot = ring.claim_worker_slot(pid)
+    assert slot == 0
+    assert ring.claim_worker_slot(pid) == slot
+    assert ring.read_stats(slot) is None  # 状態を書き込むまでは未使用として扱う
+
+    assert ring.write_stats(slot, pid, b'{"connections": 1}')
+    sequence, payload = ring.read_stats(slot)
+    assert payload == b'{"connections": 1}'
+    assert sequence % 2 == 0
+
+    assert ring.write_stats(slot, pid, b'{"connections": 2}')
+    next_sequence, payload = ring.read_stats(slot)
+    assert next_sequence > sequence
+    assert payload == b'{"connections": 2}'
+
+    ring.release_worker_slot(slot)
+    assert ring.read_stats(slot) is None
+
+
+def test_stats_being_written_are_not_read(ring):
+    pid = os.getpid()
+    slot = ring.claim_worker_slot(pid)
+    ring.write_stats(slot, pid, b"{}")
+    # 書き込み途中（シーケンス番号が奇数）の状態を再現
+    offset = HEADER_SIZE + ring.capacity * RECORD_SIZE + slot * STATS_SLOT_SIZE
+    sequence = int.from_bytes(ring.buffer[offset:offset + 8], "little")
+    ring.buffer[offset:offset + 8] = (sequence + 1).to_bytes(8, "little")
+
+    assert ring.read_stats(slot) is None
+
+
+def test_oversized_stats_are_rejected(ring):
+    slot = ring.claim_worker_slot(os.getpid())
+    assert not ring.write_stats(slot, os.getpid(), b"x" * STATS_SLOT_SIZE)
+
+
+def test_write_and_read_events(ring):
+    assert ring.event_sequence == 0
+    payloads = [f'{{"event": "gap", "n": {i}}}'.encode() for i in range(3)]
+    for payload in payloads:
+        assert ring.write_event(payload)
+
+    assert ring.read_events(0) == (payloads, 3, 0)
+    assert ring.read_events(3) == ([], 3, 0)
+    assert not ring.write_event(b"x" * EVENT_SLOT_SIZE)
+
+
+def test_event_overrun_reports_missed(ring):
+    for i in range(EVENT_SLOTS + 5):
+        ring.write_event(str(i).encode())
+
+    events, cursor, missed = ring.read_events(0)
+
+    assert (cursor, missed) == (EVENT_SLOTS + 5, 5)
+    assert events == [str(i).encode() for i in range(5, EVENT_SLOTS + 5)]
+
+
+def test_create_replaces_incompatible_layout(ring):
+    # 以前のバージョンのレイアウトの共有メモリは作り直す
+    ring.buffer[4:8] = (1).to_bytes(4, "little")
+    replaced = PositionRing.create(ring.shm.name, capacity=8, worker_slots=2)
+    try:
+        assert replaced.event_sequence == 0
+        assert replaced.write_event(b"{}")
+    finally:
+        replaced.close()
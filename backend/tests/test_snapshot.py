@@ -0,0 +1,63 @@
+import asyncio
+
+import numpy as np
+
+from app.schemas.frames import PositionArrays, PositionFrame
+from app.services.position_bus import PositionBus
+from app.services.snapshot import PositionSnapshots
+
+
+async def _drain():
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+async def test_snapshot_keeps_last_position_of_arrays():
+    bus = PositionBus(capacity=16)
+    snapshots = PositionSnapshots(max_robots=4)
+    snapshots.start(bus)
+    try:
+        bus.publish(PositionFrame(0.0, 0.0, 1, "r1"))
+        xs = np.array([1.0, 2.0], dtype=np.float32)
+        bus.publish(PositionArrays("r1", 2, xs, -xs, np.array([2, 3])))
+        bus.publish(PositionArrays("r2", 1, xs[:0], xs[:0], np.array([], dtype=np.int64)))
+        await _drain()
+
+        assert snapshots.get("r1").position.to_dict() == {"robot_id": "r1", "x": 2.0, "y": -2.0, "timestamp": 3}
+        assert snapshots.get("r2") is None
+    finally:
+        await snapshots.stop()
+
+
+async def test_eviction_wakes_long_poll_waiters():
+    snapshots = PositionSnapshots(max_robots=1)
+    snapshots.update(PositionFrame(0.0, 0.0, 1, "r1"))
+    snapshot = snapshots.get("r1")
+    waiter = asyncio.create_task(snapshot.wait_for_update(5))
+    await _drain()
+
+    # 別のロボットの受信で r1 が破棄されたら、タイムアウトを待たずに戻る
+    snapshots.update(PositionFrame(1.0, 1.0, 2, "r2"))
+    assert await asyncio.wait_for(waiter, 1)
+    assert snapshots.get("r1") is None
+
+
+async def test_sse_subscribes_only_while_stream_runs(monkeypatch):
+    from app.api.endpoints import positions
+
+    bus = PositionBus(capacity=16)
+    monkeypatch.setattr(positions, "position_bus", bus)
+
+    # 送信が始まる前に破棄されたストリームは購読しない
+    positions._event_stream("sse:test", None)
+    assert bus.subscriptions == []
+
+    stream = positions._event_stream("sse:test", {"r1"})
+    pending = asyncio.ensure_future(stream.__anext__())
+    await _drain()
+    assert [s.name for s in bus.subscriptions] == ["sse:test"]
+
+    bus.publish(PositionFrame(1.0, 2.0, 3, "r1"))
+    assert (await asyncio.wait_for(pending, 1)).startswith("data: ")
+    await stream.aclose()
+    assert bus.subscriptions == []
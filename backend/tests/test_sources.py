@@ -0,0 +1,106 @@
+import asyncio
+import json
+
+import numpy as np
+
+from app.schemas.frames import MAX_ROBOT_ID_BYTES, PositionArrays, PositionFrame
+from app.sources.base import PositionSource
+from app.sources.replay import ReplaySource, read_ndjson
+from app.sources.synthetic import SyntheticSource
+
+
+async def test_positions_with_unencodable_robot_id_are_dropped():
+    source = PositionSource()
+    delivered = []
+    source.set_position_callback(delivered.append)
+    long_id = "r" * (MAX_ROBOT_ID_BYTES + 1)
+    xs = np.zeros(2, dtype=np.float32)
+
+    await source._deliver(long_id, PositionFrame(0.0, 0.0, 1, long_id))
+    await source._deliver(long_id, PositionArrays(long_id, 1, xs, xs, np.arange(2)))
+    await source._deliver("robot-1", PositionFrame(1.0, 2.0, 3, "robot-1"))
+
+    assert [item.robot_id for item in delivered] == ["robot-1"]
+
+
+def _write_ndjson(path, lines):
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return path
+
+
+def test_read_ndjson_sorts_by_timestamp_and_skips_invalid_lines(tmp_path):
+    path = _write_ndjson(
+        tmp_path / "trace.ndjson",
+        [
+            json.dumps({"robot_id": "r1", "x": 1, "y": 2, "timestamp": 20}),
+            "not json",
+            json.dumps({"robot_id": "r2", "x": 3, "y": 4}),
+            "",
+            json.dumps({"robot_id": "r2", "x": 5, "y": 6, "timestamp": 10}),
+            json.dumps({"robot_id": "r1", "x": 7, "y": 8, "timestamp": 10}),
+        ],
+    )
+
+    assert read_ndjson(path) == [(10, "r2", 5.0, 6.0), (10, "r1", 7.0, 8.0), (20, "r1", 1.0, 2.0)]
+
+
+async def test_replay_source_delivers_records_in_order(tmp_path):
+    path = _write_ndjson(
+        tmp_path / "trace.ndjson",
+        [json.dumps({"robot_id": f"r{t % 2}", "x": t, "y": 0, "timestamp": t}) for t in range(5)],
+    )
+    source = ReplaySource(str(path), speed=0, loop=False, rebase_timestamps=False)
+    delivered = []
+    source.set_position_callback(delivered.append)
+
+    await source._run()
+
+    assert [(p.robot_id, p.timestamp) for p in delivered] == [(f"r{t % 2}", t) for t in range(5)]
+    assert source.replayed == 5 and source.passes == 1
+
+
+async def test_replay_rebased_timestamps_do_not_go_back_between_passes():
+    source = ReplaySource("unused", speed=0, rebase_timestamps=True)
+    delivered = []
+    source.set_position_callback(delivered.append)
+    records = [(100, "r1", 0.0, 0.0), (101, "r1", 1.0, 0.0)]
+
+    await source._replay(records)
+    await source._replay(records)
+
+    timestamps = [p.timestamp for p in delivered]
+    assert timestamps == sorted(timestamps) and len(set(timestamps)) == 4
+    assert timestamps[1] - timestamps[0] == 1
+
+
+async def test_replay_source_with_missing_path_stops(tmp_path):
+    source = ReplaySource(str(tmp_path / "missing.ndjson"), speed=0, loop=True)
+    source.set_position_callback(lambda position: None)
+
+    await asyncio.wait_for(source._run(), timeout=1)
+
+    assert source.replayed == 0
+
+
+async def test_synthetic_source_generates_positions_within_bounds():
+    source = SyntheticSource(robot_ids=["a", "b"], rate=1000, seed=1)
+    delivered = []
+    source.set_position_callback(delivered.append)
+
+    await source.start_tracking()
+    while len(delivered) < 10:
+        await asyncio.sleep(0.01)
+    await source.stop_tracking()
+
+    assert [p.robot_id for p in delivered[:4]] == ["a", "b", "a", "b"]
+    assert all(source.min_x <= p.x <= source.max_x and source.min_y <= p.y <= source.max_y for p in delivered)
+    assert source.status()["generated"] == len(delivered)
+
+
+def test_factory_selects_source_by_name():
+    from app.grpc_client.robot_client import client as robot_client
+    from app.sources.factory import create_position_source
+
+    assert isinstance(create_position_source("replay"), ReplaySource)
+    assert isinstance(create_position_source("synthetic"), SyntheticSource)
+    assert create_position_source("grpc") is robot_client
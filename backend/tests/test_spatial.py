@@ -0,0 +1,131 @@
+import pytest
+
+from app.config import settings
+from app.schemas.frames import PositionFrame
+from app.services.spatial import GeofenceRegistry, GridIndex, Region
+
+
+def test_rect_contains_boundary():
+    region = Region.rect(0.0, 0.0, 10.0, 5.0)
+
+    assert region.contains(0.0, 0.0)
+    assert region.contains(10.0, 5.0)
+    assert region.contains(3.0, 2.0)
+    assert not region.contains(10.1, 2.0)
+    assert not region.contains(3.0, -0.1)
+
+
+def test_polygon_contains():
+    # L字型の多角形（右上の角が欠けている）
+    region = Region.polygon([[0, 0], [10, 0], [10, 5], [5, 5], [5, 10], [0, 10]])
+
+    assert region.bbox == (0.0, 0.0, 10.0, 10.0)
+    assert region.contains(2.0, 8.0)
+    assert region.contains(8.0, 2.0)
+    assert not region.contains(8.0, 8.0)  # 外接矩形の内側だが多角形の外側
+    assert not region.contains(11.0, 2.0)
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        {"type": "rect", "min_x": 0, "min_y": 0, "max_x": 10, "max_y": 10},
+        {"type": "polygon", "points": [[0.0, 0.0], [4.0, 0.0], [0.0, 3.0]]},
+    ],
+)
+def test_region_dict_round_trip(data):
+    region = Region.from_dict(data)
+
+    assert Region.from_dict(region.to_dict()).to_dict() == region.to_dict()
+    assert region.to_dict()["type"] == data["type"]
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        [0, 0, 1, 1],
+        {"type": "rect", "min_x": 0, "min_y": 0, "max_x": 10},
+        {"type": "rect", "min_x": 5, "min_y": 0, "max_x": 1, "max_y": 10},
+        {"type": "polygon", "points": [[0, 0], [1, 1]]},
+        {"type": "circle", "x": 0, "y": 0},
+    ],
+)
+def test_region_from_invalid_dict(data):
+    with pytest.raises(ValueError):
+        Region.from_dict(data)
+
+
+def test_grid_index_query_and_remove():
+    index = GridIndex(0.0, 0.0, 100.0, 100.0, cell_size=10.0)
+    index.insert("small", (1.0, 1.0, 2.0, 2.0))
+    index.insert("wide", (0.0, 0.0, 35.0, 5.0))
+
+    assert index.query(1.5, 1.5) == {"small", "wide"}
+    assert index.query(31.0, 1.0) == {"wide"}
+    assert index.query(50.0, 50.0) == set()
+
+    index.insert("small", (50.0, 50.0, 51.0, 51.0))  # 置き換え
+    assert index.query(1.5, 1.5) == {"wide"}
+    assert index.query(50.5, 50.5) == {"small"}
+
+    index.remove("wide")
+    assert index.query(31.0, 1.0) == set()
+    assert len(index) == 1
+
+
+def test_grid_index_clamps_points_outside_arena():
+    index = GridIndex(0.0, 0.0, 100.0, 100.0, cell_size=10.0)
+    index.insert("edge", (95.0, 95.0, 200.0, 200.0))
+
+    assert index.query(150.0, 150.0) == {"edge"}
+    assert index.query(-50.0, -50.0) == set()
+
+
+def test_geofence_enter_and_exit():
+    registry = GeofenceRegistry()
+    registry.add("dock", Region.rect(0.0, 0.0, 10.0, 10.0))
+    registry.add("lane", Region.rect(5.0, 0.0, 20.0, 10.0))
+
+    assert registry.update(PositionFrame(-5.0, 5.0, 1, "r1")) == []
+    assert registry.update(PositionFrame(2.0, 5.0, 2, "r1")) == [("enter", "dock")]
+    assert registry.update(PositionFrame(3.0, 5.0, 3, "r1")) == []
+    assert registry.update(PositionFrame(7.0, 5.0, 4, "r1")) == [("enter", "lane")]
+    assert registry.inside("r1") == ["dock", "lane"]
+    assert registry.update(PositionFrame(15.0, 5.0, 5, "r1")) == [("exit", "dock")]
+    assert registry.update(PositionFrame(50.0, 5.0, 6, "r1")) == [("exit", "lane")]
+    assert registry.inside("r1") == []
+
+
+def test_geofence_remove_forgets_robots_inside():
+    registry = GeofenceRegistry()
+    registry.load([{"id": "dock", "region": {"type": "rect", "min_x": 0, "min_y": 0, "max_x": 10, "max_y": 10}}])
+    registry.update(PositionFrame(2.0, 2.0, 1, "r1"))
+
+    assert registry.remove("dock")
+    assert not registry.remove("dock")
+    assert registry.inside("r1") == []
+    assert registry.update(PositionFrame(50.0, 50.0, 2, "r1")) == []
+
+
+def test_geofence_max_robots_is_read_from_settings(monkeypatch):
+    monkeypatch.setattr(settings, "GEOFENCE_MAX_ROBOTS", 7)
+
+    assert GeofenceRegistry().max_robots == 7
+    assert GeofenceRegistry(max_robots=3).max_robots == 3
+
+
+def test_geofence_enters_past_max_robots_are_counted(caplog):
+    registry = GeofenceRegistry(max_robots=1)
+    registry.add("dock", Region.rect(0.0, 0.0, 10.0, 10.0))
+
+    assert registry.update(PositionFrame(1.0, 1.0, 1, "r1")) == [("enter", "dock")]
+    with caplog.at_level("WARNING", logger="app.services.spatial"):
+        assert registry.update(PositionFrame(1.0, 1.0, 1, "r2")) == []
+        assert registry.update(PositionFrame(2.0, 1.0, 2, "r3")) == []
+
+    assert registry.suppressed == 2
+    assert len([r for r in caplog.records if "上限" in r.getMessage()]) == 1
+
+    # 上限を下回れば再び通知する
+    assert registry.update(PositionFrame(50.0, 50.0, 2, "r1")) == [("exit", "dock")]
+    assert registry.update(PositionFrame(1.0, 1.0, 3, "r2")) == [("enter", "dock")]
@@ -0,0 +1,130 @@
+import queue
+
+import numpy as np
+import pytest
+
+from app.schemas.frames import PositionArrays, PositionFrame
+from app.services.trajectory_store import TrajectoryStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = TrajectoryStore(str(tmp_path))
+    store.index_interval = 4
+    yield store
+    for writer in store._writers.values():
+        writer.close()
+
+
+def _write(store, robot_id, timestamps):
+    store._write(robot_id, [(ts, float(ts), float(-ts)) for ts in timestamps])
+    store._writers[robot_id].sync()
+
+
+def test_query_returns_columns_in_range(store):
+    # 同じタイムスタンプが続く場合も含めて、範囲の両端を含む
+    timestamps = [t // 2 for t in range(100)]
+    _write(store, "r1", timestamps)
+
+    xs, ys, ts = store.query("r1", since=10, until=20)
+
+    expected = [t for t in timestamps if 10 <= t <= 20]
+    assert ts.tolist() == expected
+    assert xs.tolist() == [float(t) for t in expected]
+    assert ys.tolist() == [float(-t) for t in expected]
+
+
+@pytest.mark.parametrize("since,until", [(None, None), (None, 7), (45, None), (-5, 3), (60, 80), (49, 49)])
+def test_query_matches_linear_scan(store, since, until):
+    timestamps = [t // 3 for t in range(150)]
+    _write(store, "r1", timestamps)
+
+    _, _, ts = store.query("r1", since=since, until=until)
+
+    lo = -np.inf if since is None else since
+    hi = np.inf if until is None else until
+    assert ts.tolist() == [t for t in timestamps if lo <= t <= hi]
+
+
+def test_single_segment_query_is_a_view_of_the_mapping(store):
+    _write(store, "r1", range(50))
+
+    xs, _, ts = store.query("r1", since=10, until=19)
+
+    # mmap上のレコードを参照しており、読み出しでコピーしていない
+    assert not ts.flags.owndata and not ts.flags.writeable
+    assert not xs.flags.owndata
+    assert ts.tolist() == list(range(10, 20))
+
+
+def test_query_across_segments_applies_limit(store):
+    _write(store, "r1", range(0, 30))
+    store._writers.pop("r1").close()  # 次の書き込みで新しいセグメントを作成
+    _write(store, "r1", range(30, 60))
+
+    assert len(store.segments("r1")) == 2
+    _, _, ts = store.query("r1", since=20, until=50, limit=15)
+    assert ts.tolist() == list(range(20, 35))
+
+
+def test_query_unknown_robot_is_empty(store):
+    xs, ys, ts = store.query("missing")
+    assert len(xs) == len(ys) == len(ts) == 0
+
+
+def _run_writer(store, items):
+    """キューに積んだ位置を書き込みスレッドの処理で書き込む（最後に終了を指示する）"""
+    for item in items:
+        store._queue.put(item)
+    store._queue.put(None)
+    store._run_writer()
+
+
+def test_full_queue_drops_and_counts(store):
+    store._queue = queue.Queue(maxsize=2)
+    store.append(PositionFrame(0.0, 0.0, 1, "r1"))
+    store.append(PositionFrame(0.0, 0.0, 2, "r1"))
+    xs = np.zeros(3, dtype=np.float32)
+    store.append(PositionArrays("r1", 1, xs, xs, np.arange(3, 6)))
+    store.append(PositionFrame(0.0, 0.0, 6, "r1"))
+
+    assert store._queue.qsize() == 2
+    assert store.overflowed == 4
+
+
+def test_writer_drains_at_most_fsync_batch_items(store, monkeypatch):
+    store.fsync_batch = 3
+    written = []
+    write = store._write
+
+    def record(robot_id, records):
+        written.append(len(records))
+        return write(robot_id, records)
+
+    monkeypatch.setattr(store, "_write", record)
+    _run_writer(store, [PositionFrame(float(t), 0.0, t, "r1") for t in range(10)])
+
+    # 負荷が続いても fsync_batch 件ごとに書き込む
+    assert max(written) <= 3
+    assert sum(written) == store.written == 10
+
+
+def test_writer_survives_malformed_items_and_errors(store, monkeypatch):
+    failures = [ValueError("broken")]
+    write = store._write
+
+    def flaky(robot_id, records):
+        if failures:
+            raise failures.pop()
+        return write(robot_id, records)
+
+    monkeypatch.setattr(store, "_write", flaky)
+    xs = np.zeros(2, dtype=np.float32)
+    malformed = PositionArrays("r1", 1, xs, xs, None)
+    store.fsync_batch = 1
+    _run_writer(store, [PositionFrame(0.0, 0.0, 1, "r1"), malformed, PositionFrame(2.0, -2.0, 2, "r1")])
+
+    # 予期しない例外の後も書き込みを続ける（最初の位置は例外で失われる）
+    assert store.written == 1
+    _, _, ts = store.query("r1")
+    assert ts.tolist() == [2]
@@ -16,6 +16,9 @@ export const useWebSocket = (url: string) => {
         setPosition(message.data as RobotPosition);
       } else if (message.event === 'connected') {
         console.log('WebSocket connected:', message.data);
+      } else if (message.event === 'ping') {
+        // 回應伺服器的心跳，長時間未回應的連接會被伺服器斷開
+        wsRef.current?.send(JSON.stringify({ action: 'pong' }));
       }
     } catch (err) {
       console.error('Error parsing WebSocket message:', err);
@@ -28,7 +31,10 @@ export const useWebSocket = (url: string) => {
     if (wsRef.current?.readyState === WebSocket.OPEN) return;
 
     try {
-      const ws = new WebSocket(url);
+      // 要求伺服器發送應用層的心跳（ping 事件），未指定時伺服器只使用 WebSocket 協定的 ping
+      const wsUrl = new URL(url);
+      wsUrl.searchParams.set('heartbeat', '1');
+      const ws = new WebSocket(wsUrl.toString());
       
       ws.onopen = () => {
         console.log('WebSocket connection established');
@@ -1,11 +1,25 @@
 // WebSocket消息類型定義
 export interface RobotPosition {
+    robot_id?: string;
     x: number;
     y: number;
     timestamp: number;
+    // 伺服器運動模型推估的速度（每秒，僅在啟用 dead reckoning 時提供）
+    vx?: number;
+    vy?: number;
+  }
+  
+  // 地理圍欄的進出事件（enter / exit）
+  export interface GeofenceEvent extends RobotPosition {
+    fence_id: string;
+  }
+  
+  // 伺服器的心跳（連接時指定 heartbeat=1 才會收到，收到後回傳 {"action": "pong"}）
+  export interface PingEvent {
+    server_time: number;
   }
   
   export interface WebSocketMessage {
     event: string;
-    data: RobotPosition | { message: string } | null;
+    data: RobotPosition | GeofenceEvent | PingEvent | { message: string } | null;
   }
\ No newline at end of file
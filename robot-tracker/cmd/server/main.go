@@ -6,8 +6,10 @@ import (
     "os"
     "os/signal"
     "syscall"
+    "time"
 
     "google.golang.org/grpc"
+    "google.golang.org/grpc/keepalive"
 
     "github.com/tetsufromtw/practice-robot/robot-tracker/internal/config"
     "github.com/tetsufromtw/practice-robot/robot-tracker/internal/position"
@@ -38,7 +40,14 @@ func main() {
     }
 
     // gRPCサーバーを作成
-    grpcServer := grpc.NewServer()
+    // バックエンドは短い間隔のkeepaliveで切断を検知するため、その間隔のpingを許可する
+    // （デフォルトの5分より短いpingは too_many_pings で切断される）
+    grpcServer := grpc.NewServer(
+        grpc.KeepaliveEnforcementPolicy(keepalive.EnforcementPolicy{
+            MinTime:             time.Duration(cfg.KeepaliveMinTime) * time.Millisecond,
+            PermitWithoutStream: true,
+        }),
+    )
 
     // サービスを登録
     proto.RegisterRobotTrackerServer(grpcServer, trackerService)
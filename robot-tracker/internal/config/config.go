@@ -2,22 +2,32 @@ package config
 
 // Config アプリケーション設定を保存する
 type Config struct {
-    Port            string
-    PositionMinX    float32
-    PositionMaxX    float32
-    PositionMinY    float32
-    PositionMaxY    float32
-    UpdateFrequency int // ミリ秒
+    Port              string
+    PositionMinX      float32
+    PositionMaxX      float32
+    PositionMinY      float32
+    PositionMaxY      float32
+    UpdateFrequency   int // ミリ秒
+    ReplayBufferSize  int // 再接続時に再送するためにロボットごとに保持する位置の数（0以下は再送しない）
+    FeedIdleTimeout   int // 購読者がいなくなってから位置の生成を停止するまでの時間（ミリ秒）
+    KeepaliveMinTime  int // クライアントのkeepalive pingとして許可する最小間隔（ミリ秒）
+    BatchWindow       int // TrackRobotBatch で位置をまとめる期間のデフォルト（ミリ秒）
+    BatchMaxPositions int // TrackRobotBatch の1メッセージに含める位置の最大数
 }
 
 // NewDefaultConfig デフォルト値を持つ設定を返す
 func NewDefaultConfig() *Config {
     return &Config{
-        Port:            "50051",
-        PositionMinX:    0,
-        PositionMaxX:    100,
-        PositionMinY:    0,
-        PositionMaxY:    100,
-        UpdateFrequency: 1000, // 1秒
+        Port:              "50051",
+        PositionMinX:      0,
+        PositionMaxX:      100,
+        PositionMinY:      0,
+        PositionMaxY:      100,
+        UpdateFrequency:   1000,  // 1秒
+        ReplayBufferSize:  300,   // 1秒間隔で5分
+        FeedIdleTimeout:   60000, // 1分
+        KeepaliveMinTime:  1000,  // 1秒
+        BatchWindow:       100,   // 100ミリ秒
+        BatchMaxPositions: 1000,
     }
-}
\ No newline at end of file
+}
@@ -0,0 +1,76 @@
+package service
+
+import (
+    "github.com/tetsufromtw/practice-robot/robot-tracker/proto"
+)
+
+// positionBatcher TrackRobotBatch で送信する位置をシーケンス番号の連続した範囲ごとにまとめる
+type positionBatcher struct {
+    batch        *proto.PositionBatch
+    maxPositions int
+    nextSequence uint64 // 次に追加できる位置のシーケンス番号
+}
+
+// newPositionBatcher 新しい positionBatcher を作成
+func newPositionBatcher(robotID string, maxPositions int) *positionBatcher {
+    return &positionBatcher{
+        batch: &proto.PositionBatch{
+            RobotId:   robotID,
+            X:         make([]float32, 0, maxPositions),
+            Y:         make([]float32, 0, maxPositions),
+            Timestamp: make([]int64, 0, maxPositions),
+        },
+        maxPositions: maxPositions,
+    }
+}
+
+// add 位置を追加する
+// シーケンス番号が連続していない場合は追加せずに false を返す（先に送信してから追加し直す）
+func (b *positionBatcher) add(position *proto.Position) bool {
+    if b.size() == 0 {
+        b.batch.FirstSequence = position.Sequence
+    } else if position.Sequence != b.nextSequence {
+        return false
+    }
+    b.batch.X = append(b.batch.X, position.X)
+    b.batch.Y = append(b.batch.Y, position.Y)
+    b.batch.Timestamp = append(b.batch.Timestamp, position.Timestamp)
+    b.nextSequence = position.Sequence + 1
+    return true
+}
+
+// size まとめている位置の数
+func (b *positionBatcher) size() int {
+    return len(b.batch.X)
+}
+
+// full 最大数に達したか
+func (b *positionBatcher) full() bool {
+    return b.size() >= b.maxPositions
+}
+
+// flush まとめた位置を送信して空にする（送信済みのメッセージは直列化済みのため再利用する）
+func (b *positionBatcher) flush(stream proto.RobotTracker_TrackRobotBatchServer) error {
+    if b.size() == 0 {
+        return nil
+    }
+    err := stream.Send(b.batch)
+    b.batch.X = b.batch.X[:0]
+    b.batch.Y = b.batch.Y[:0]
+    b.batch.Timestamp = b.batch.Timestamp[:0]
+    return err
+}
+
+// push 位置を追加し、連続しない場合や最大数に達した場合は送信する
+func (b *positionBatcher) push(position *proto.Position, stream proto.RobotTracker_TrackRobotBatchServer) error {
+    if !b.add(position) {
+        if err := b.flush(stream); err != nil {
+            return err
+        }
+        b.add(position)
+    }
+    if b.full() {
+        return b.flush(stream)
+    }
+    return nil
+}
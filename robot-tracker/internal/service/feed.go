@@ -0,0 +1,138 @@
+package service
+
+import (
+    "sync"
+    "time"
+
+    "github.com/tetsufromtw/practice-robot/robot-tracker/internal/config"
+    "github.com/tetsufromtw/practice-robot/robot-tracker/internal/position"
+    "github.com/tetsufromtw/practice-robot/robot-tracker/proto"
+)
+
+// subscriberBufferSize 購読者ごとの未送信の位置の最大数（溢れた分は破棄し、クライアントはシーケンス番号の欠落から再接続する）
+const subscriberBufferSize = 64
+
+// robotFeed 1台のロボットの位置をストリームとは独立して生成し、直近の位置を再送用に保持する
+type robotFeed struct {
+    mu          sync.Mutex
+    robotID     string
+    buffer      []*proto.Position // シーケンス番号 % 容量 の位置に保持するリングバッファ（再送しない場合は空）
+    sequence    uint64            // 最後に生成した位置のシーケンス番号
+    subscribers map[chan *proto.Position]struct{}
+    idleSince   time.Time // 購読者がいなくなった時刻
+}
+
+// feedHub ロボットIDごとの robotFeed を管理する
+type feedHub struct {
+    mu        sync.Mutex
+    feeds     map[string]*robotFeed
+    config    *config.Config
+    generator position.Generator
+}
+
+// newFeedHub 新しい feedHub を作成
+func newFeedHub(config *config.Config, generator position.Generator) *feedHub {
+    return &feedHub{
+        feeds:     make(map[string]*robotFeed),
+        config:    config,
+        generator: generator,
+    }
+}
+
+// subscribe ロボットの位置を購読する
+// resumeAfter より後の位置のうち保持しているものを再送用に返し、以降の位置はチャネルで受け取る。
+// resumeAfter が0の場合と、再送用に位置を保持しない（ReplayBufferSize が0以下）場合は再送しない。
+func (h *feedHub) subscribe(robotID string, resumeAfter uint64) ([]*proto.Position, chan *proto.Position, func()) {
+    h.mu.Lock()
+    defer h.mu.Unlock()
+
+    feed, ok := h.feeds[robotID]
+    if !ok {
+        var buffer []*proto.Position
+        if h.config.ReplayBufferSize > 0 {
+            buffer = make([]*proto.Position, h.config.ReplayBufferSize)
+        }
+        feed = &robotFeed{
+            robotID:     robotID,
+            buffer:      buffer,
+            subscribers: make(map[chan *proto.Position]struct{}),
+        }
+        h.feeds[robotID] = feed
+        go h.run(feed)
+    }
+
+    updates := make(chan *proto.Position, subscriberBufferSize)
+    feed.mu.Lock()
+    defer feed.mu.Unlock()
+    feed.subscribers[updates] = struct{}{}
+
+    var replay []*proto.Position
+    if capacity := uint64(len(feed.buffer)); capacity > 0 && resumeAfter > 0 && resumeAfter < feed.sequence {
+        oldest := uint64(1)
+        if feed.sequence > capacity {
+            oldest = feed.sequence - capacity + 1
+        }
+        start := resumeAfter + 1
+        if start < oldest {
+            start = oldest
+        }
+        for seq := start; seq <= feed.sequence; seq++ {
+            replay = append(replay, feed.buffer[seq%capacity])
+        }
+    }
+
+    cancel := func() {
+        feed.mu.Lock()
+        defer feed.mu.Unlock()
+        delete(feed.subscribers, updates)
+        if len(feed.subscribers) == 0 {
+            feed.idleSince = time.Now()
+        }
+    }
+    return replay, updates, cancel
+}
+
+// run 位置を一定間隔で生成して購読者に配信する（購読者がいない状態が続いたら停止）
+func (h *feedHub) run(feed *robotFeed) {
+    ticker := time.NewTicker(time.Duration(h.config.UpdateFrequency) * time.Millisecond)
+    defer ticker.Stop()
+    idleTimeout := time.Duration(h.config.FeedIdleTimeout) * time.Millisecond
+
+    for range ticker.C {
+        if h.stopIfIdle(feed, idleTimeout) {
+            return
+        }
+
+        position := h.generator.Generate()
+        position.RobotId = feed.robotID
+
+        feed.mu.Lock()
+        feed.sequence++
+        position.Sequence = feed.sequence
+        if capacity := uint64(len(feed.buffer)); capacity > 0 {
+            feed.buffer[feed.sequence%capacity] = position
+        }
+        for updates := range feed.subscribers {
+            select {
+            case updates <- position:
+            default:
+                // 遅い購読者の分は破棄する（クライアントは欠落を検知して再送を要求する）
+            }
+        }
+        feed.mu.Unlock()
+    }
+}
+
+// stopIfIdle 購読者がいない状態が idleTimeout 以上続いていれば feed を破棄する
+func (h *feedHub) stopIfIdle(feed *robotFeed, idleTimeout time.Duration) bool {
+    h.mu.Lock()
+    defer h.mu.Unlock()
+    feed.mu.Lock()
+    defer feed.mu.Unlock()
+
+    if len(feed.subscribers) > 0 || feed.idleSince.IsZero() || time.Since(feed.idleSince) < idleTimeout {
+        return false
+    }
+    delete(h.feeds, feed.robotID)
+    return true
+}
@@ -12,9 +12,9 @@ import (
 // RobotTrackerService gRPCサービスを実装
 type RobotTrackerService struct {
     proto.UnimplementedRobotTrackerServer
-    config    *config.Config
-    generator position.Generator
-    logger    logger.Logger
+    config *config.Config
+    feeds  *feedHub
+    logger logger.Logger
 }
 
 // NewRobotTrackerService 新しいトラッキングサービスインスタンスを作成
@@ -24,18 +24,32 @@ func NewRobotTrackerService(
     logger logger.Logger,
 ) *RobotTrackerService {
     return &RobotTrackerService{
-        config:    config,
-        generator: generator,
-        logger:    logger,
+        config: config,
+        feeds:  newFeedHub(config, generator),
+        logger: logger,
     }
 }
 
 // TrackRobot gRPCストリーミングサービスを実装し、定期的にロボットの位置を送信
+// resume_after を指定した場合は、それより後の位置のうち保持しているものを先に再送する
 func (s *RobotTrackerService) TrackRobot(req *proto.TrackRequest, stream proto.RobotTracker_TrackRobotServer) error {
-    s.logger.Info("ロボット位置の追跡を開始")
+    robotID := req.GetRobotId()
+    resumeAfter := req.GetResumeAfter()
+    s.logger.Info("ロボット位置の追跡を開始: robot_id=%s, resume_after=%d", robotID, resumeAfter)
 
-    ticker := time.NewTicker(time.Duration(s.config.UpdateFrequency) * time.Millisecond)
-    defer ticker.Stop()
+    // 位置はストリームとは独立してロボットごとに生成され、再接続の間も保持される
+    replay, updates, cancel := s.feeds.subscribe(robotID, resumeAfter)
+    defer cancel()
+
+    for _, position := range replay {
+        if err := stream.Send(position); err != nil {
+            s.logger.Error("位置の再送中にエラーが発生: %v", err)
+            return err
+        }
+    }
+    if len(replay) > 0 {
+        s.logger.Info("位置を再送しました: robot_id=%s, count=%d", robotID, len(replay))
+    }
 
     // 優雅なシャットダウン処理
     done := stream.Context().Done()
@@ -43,19 +57,73 @@ func (s *RobotTrackerService) TrackRobot(req *proto.TrackRequest, stream proto.R
     for {
         select {
         case <-done:
-            s.logger.Info("クライアント接続が閉じられました")
+            s.logger.Info("クライアント接続が閉じられました: robot_id=%s", robotID)
             return nil
-        case <-ticker.C:
-            // 新しい位置を生成
-            position := s.generator.Generate()
-
+        case position := <-updates:
             // 位置情報を送信
             if err := stream.Send(position); err != nil {
                 s.logger.Error("位置送信中にエラーが発生: %v", err)
                 return err
             }
 
-            s.logger.Debug("位置を送信: x=%v, y=%v, timestamp=%v", position.X, position.Y, position.Timestamp)
+            s.logger.Debug("位置を送信: robot_id=%s, seq=%d, x=%v, y=%v, timestamp=%v", robotID, position.Sequence, position.X, position.Y, position.Timestamp)
+        }
+    }
+}
+
+// TrackRobotBatch 位置を一定期間（window_ms）ごとにまとめて PositionBatch として送信
+// 位置ごとにメッセージを送らないため、更新頻度が高い場合の送受信の負荷を抑えられる。
+// 期間の満了、最大数への到達、シーケンス番号の欠落のいずれかでバッチを送信する。
+func (s *RobotTrackerService) TrackRobotBatch(req *proto.TrackBatchRequest, stream proto.RobotTracker_TrackRobotBatchServer) error {
+    robotID := req.GetRobotId()
+    resumeAfter := req.GetResumeAfter()
+    window := time.Duration(s.config.BatchWindow) * time.Millisecond
+    if req.GetWindowMs() > 0 {
+        window = time.Duration(req.GetWindowMs()) * time.Millisecond
+    }
+    maxPositions := s.config.BatchMaxPositions
+    if requested := int(req.GetMaxPositions()); requested > 0 && requested < maxPositions {
+        maxPositions = requested
+    }
+    s.logger.Info("ロボット位置のバッチ追跡を開始: robot_id=%s, resume_after=%d, window=%v, max_positions=%d", robotID, resumeAfter, window, maxPositions)
+
+    replay, updates, cancel := s.feeds.subscribe(robotID, resumeAfter)
+    defer cancel()
+
+    batcher := newPositionBatcher(robotID, maxPositions)
+    for _, position := range replay {
+        if err := batcher.push(position, stream); err != nil {
+            s.logger.Error("位置の再送中にエラーが発生: %v", err)
+            return err
+        }
+    }
+    if err := batcher.flush(stream); err != nil {
+        s.logger.Error("位置の再送中にエラーが発生: %v", err)
+        return err
+    }
+    if len(replay) > 0 {
+        s.logger.Info("位置を再送しました: robot_id=%s, count=%d", robotID, len(replay))
+    }
+
+    ticker := time.NewTicker(window)
+    defer ticker.Stop()
+    done := stream.Context().Done()
+
+    for {
+        select {
+        case <-done:
+            s.logger.Info("クライアント接続が閉じられました: robot_id=%s", robotID)
+            return nil
+        case position := <-updates:
+            if err := batcher.push(position, stream); err != nil {
+                s.logger.Error("位置送信中にエラーが発生: %v", err)
+                return err
+            }
+        case <-ticker.C:
+            if err := batcher.flush(stream); err != nil {
+                s.logger.Error("位置送信中にエラーが発生: %v", err)
+                return err
+            }
         }
     }
 }
\ No newline at end of file
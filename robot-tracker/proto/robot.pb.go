@@ -22,7 +22,11 @@ const (
 )
 
 type TrackRequest struct {
-	state         protoimpl.MessageState `protogen:"open.v1"`
+	state protoimpl.MessageState `protogen:"open.v1"`
+	// 追跡するロボットのID
+	RobotId string `protobuf:"bytes,1,opt,name=robot_id,json=robotId,proto3" json:"robot_id,omitempty"`
+	// 再接続時に受信済みの最後のシーケンス番号（これより後の位置から送信、0 は最新の位置から）
+	ResumeAfter   uint64 `protobuf:"varint,2,opt,name=resume_after,json=resumeAfter,proto3" json:"resume_after,omitempty"`
 	unknownFields protoimpl.UnknownFields
 	sizeCache     protoimpl.SizeCache
 }
@@ -57,11 +61,29 @@ func (*TrackRequest) Descriptor() ([]byte, []int) {
 	return file_proto_robot_proto_rawDescGZIP(), []int{0}
 }
 
+func (x *TrackRequest) GetRobotId() string {
+	if x != nil {
+		return x.RobotId
+	}
+	return ""
+}
+
+func (x *TrackRequest) GetResumeAfter() uint64 {
+	if x != nil {
+		return x.ResumeAfter
+	}
+	return 0
+}
+
 type Position struct {
-	state         protoimpl.MessageState `protogen:"open.v1"`
-	X             float32                `protobuf:"fixed32,1,opt,name=x,proto3" json:"x,omitempty"`
-	Y             float32                `protobuf:"fixed32,2,opt,name=y,proto3" json:"y,omitempty"`
-	Timestamp     int64                  `protobuf:"varint,3,opt,name=timestamp,proto3" json:"timestamp,omitempty"`
+	state     protoimpl.MessageState `protogen:"open.v1"`
+	X         float32                `protobuf:"fixed32,1,opt,name=x,proto3" json:"x,omitempty"`
+	Y         float32                `protobuf:"fixed32,2,opt,name=y,proto3" json:"y,omitempty"`
+	Timestamp int64                  `protobuf:"varint,3,opt,name=timestamp,proto3" json:"timestamp,omitempty"`
+	// 位置を送信したロボットのID
+	RobotId string `protobuf:"bytes,4,opt,name=robot_id,json=robotId,proto3" json:"robot_id,omitempty"`
+	// ロボットごとに1から単調増加するシーケンス番号（トラッカーの再起動でリセットされる）
+	Sequence      uint64 `protobuf:"varint,5,opt,name=sequence,proto3" json:"sequence,omitempty"`
 	unknownFields protoimpl.UnknownFields
 	sizeCache     protoimpl.SizeCache
 }
@@ -117,19 +139,201 @@ func (x *Position) GetTimestamp() int64 {
 	return 0
 }
 
+func (x *Position) GetRobotId() string {
+	if x != nil {
+		return x.RobotId
+	}
+	return ""
+}
+
+func (x *Position) GetSequence() uint64 {
+	if x != nil {
+		return x.Sequence
+	}
+	return 0
+}
+
+type TrackBatchRequest struct {
+	state protoimpl.MessageState `protogen:"open.v1"`
+	// 追跡するロボットのID
+	RobotId string `protobuf:"bytes,1,opt,name=robot_id,json=robotId,proto3" json:"robot_id,omitempty"`
+	// 再接続時に受信済みの最後のシーケンス番号（TrackRequest と同じ）
+	ResumeAfter uint64 `protobuf:"varint,2,opt,name=resume_after,json=resumeAfter,proto3" json:"resume_after,omitempty"`
+	// 位置をまとめる期間（ミリ秒、0 はトラッカーのデフォルト）
+	WindowMs uint32 `protobuf:"varint,3,opt,name=window_ms,json=windowMs,proto3" json:"window_ms,omitempty"`
+	// 1メッセージに含める位置の最大数（0 はトラッカーのデフォルト）
+	MaxPositions  uint32 `protobuf:"varint,4,opt,name=max_positions,json=maxPositions,proto3" json:"max_positions,omitempty"`
+	unknownFields protoimpl.UnknownFields
+	sizeCache     protoimpl.SizeCache
+}
+
+func (x *TrackBatchRequest) Reset() {
+	*x = TrackBatchRequest{}
+	mi := &file_proto_robot_proto_msgTypes[2]
+	ms := protoimpl.X.MessageStateOf(protoimpl.Pointer(x))
+	ms.StoreMessageInfo(mi)
+}
+
+func (x *TrackBatchRequest) String() string {
+	return protoimpl.X.MessageStringOf(x)
+}
+
+func (*TrackBatchRequest) ProtoMessage() {}
+
+func (x *TrackBatchRequest) ProtoReflect() protoreflect.Message {
+	mi := &file_proto_robot_proto_msgTypes[2]
+	if x != nil {
+		ms := protoimpl.X.MessageStateOf(protoimpl.Pointer(x))
+		if ms.LoadMessageInfo() == nil {
+			ms.StoreMessageInfo(mi)
+		}
+		return ms
+	}
+	return mi.MessageOf(x)
+}
+
+// Deprecated: Use TrackBatchRequest.ProtoReflect.Descriptor instead.
+func (*TrackBatchRequest) Descriptor() ([]byte, []int) {
+	return file_proto_robot_proto_rawDescGZIP(), []int{2}
+}
+
+func (x *TrackBatchRequest) GetRobotId() string {
+	if x != nil {
+		return x.RobotId
+	}
+	return ""
+}
+
+func (x *TrackBatchRequest) GetResumeAfter() uint64 {
+	if x != nil {
+		return x.ResumeAfter
+	}
+	return 0
+}
+
+func (x *TrackBatchRequest) GetWindowMs() uint32 {
+	if x != nil {
+		return x.WindowMs
+	}
+	return 0
+}
+
+func (x *TrackBatchRequest) GetMaxPositions() uint32 {
+	if x != nil {
+		return x.MaxPositions
+	}
+	return 0
+}
+
+type PositionBatch struct {
+	state protoimpl.MessageState `protogen:"open.v1"`
+	// 位置を送信したロボットのID
+	RobotId string `protobuf:"bytes,1,opt,name=robot_id,json=robotId,proto3" json:"robot_id,omitempty"`
+	// 最初の位置のシーケンス番号（バッチ内の位置は連続した番号で、欠落がある場合はバッチを分ける）
+	FirstSequence uint64 `protobuf:"varint,2,opt,name=first_sequence,json=firstSequence,proto3" json:"first_sequence,omitempty"`
+	// 位置ごとの値を要素数の同じ配列で保持（packed エンコード）
+	// timestamp は固定長にし、受信側が値ごとにデコードせず配列として読めるようにする
+	X             []float32 `protobuf:"fixed32,3,rep,packed,name=x,proto3" json:"x,omitempty"`
+	Y             []float32 `protobuf:"fixed32,4,rep,packed,name=y,proto3" json:"y,omitempty"`
+	Timestamp     []int64   `protobuf:"fixed64,5,rep,packed,name=timestamp,proto3" json:"timestamp,omitempty"`
+	unknownFields protoimpl.UnknownFields
+	sizeCache     protoimpl.SizeCache
+}
+
+func (x *PositionBatch) Reset() {
+	*x = PositionBatch{}
+	mi := &file_proto_robot_proto_msgTypes[3]
+	ms := protoimpl.X.MessageStateOf(protoimpl.Pointer(x))
+	ms.StoreMessageInfo(mi)
+}
+
+func (x *PositionBatch) String() string {
+	return protoimpl.X.MessageStringOf(x)
+}
+
+func (*PositionBatch) ProtoMessage() {}
+
+func (x *PositionBatch) ProtoReflect() protoreflect.Message {
+	mi := &file_proto_robot_proto_msgTypes[3]
+	if x != nil {
+		ms := protoimpl.X.MessageStateOf(protoimpl.Pointer(x))
+		if ms.LoadMessageInfo() == nil {
+			ms.StoreMessageInfo(mi)
+		}
+		return ms
+	}
+	return mi.MessageOf(x)
+}
+
+// Deprecated: Use PositionBatch.ProtoReflect.Descriptor instead.
+func (*PositionBatch) Descriptor() ([]byte, []int) {
+	return file_proto_robot_proto_rawDescGZIP(), []int{3}
+}
+
+func (x *PositionBatch) GetRobotId() string {
+	if x != nil {
+		return x.RobotId
+	}
+	return ""
+}
+
+func (x *PositionBatch) GetFirstSequence() uint64 {
+	if x != nil {
+		return x.FirstSequence
+	}
+	return 0
+}
+
+func (x *PositionBatch) GetX() []float32 {
+	if x != nil {
+		return x.X
+	}
+	return nil
+}
+
+func (x *PositionBatch) GetY() []float32 {
+	if x != nil {
+		return x.Y
+	}
+	return nil
+}
+
+func (x *PositionBatch) GetTimestamp() []int64 {
+	if x != nil {
+		return x.Timestamp
+	}
+	return nil
+}
+
 var File_proto_robot_proto protoreflect.FileDescriptor
 
 const file_proto_robot_proto_rawDesc = "" +
 	"\n" +
-	"\x11proto/robot.proto\x12\x05robot\"\x0e\n" +
-	"\fTrackRequest\"D\n" +
+	"\x11proto/robot.proto\x12\x05robot\"L\n" +
+	"\fTrackRequest\x12\x19\n" +
+	"\brobot_id\x18\x01 \x01(\tR\arobotId\x12!\n" +
+	"\fresume_after\x18\x02 \x01(\x04R\vresumeAfter\"{\n" +
 	"\bPosition\x12\f\n" +
 	"\x01x\x18\x01 \x01(\x02R\x01x\x12\f\n" +
 	"\x01y\x18\x02 \x01(\x02R\x01y\x12\x1c\n" +
-	"\ttimestamp\x18\x03 \x01(\x03R\ttimestamp2F\n" +
+	"\ttimestamp\x18\x03 \x01(\x03R\ttimestamp\x12\x19\n" +
+	"\brobot_id\x18\x04 \x01(\tR\arobotId\x12\x1a\n" +
+	"\bsequence\x18\x05 \x01(\x04R\bsequence\"\x93\x01\n" +
+	"\x11TrackBatchRequest\x12\x19\n" +
+	"\brobot_id\x18\x01 \x01(\tR\arobotId\x12!\n" +
+	"\fresume_after\x18\x02 \x01(\x04R\vresumeAfter\x12\x1b\n" +
+	"\twindow_ms\x18\x03 \x01(\rR\bwindowMs\x12#\n" +
+	"\rmax_positions\x18\x04 \x01(\rR\fmaxPositions\"\x8b\x01\n" +
+	"\rPositionBatch\x12\x19\n" +
+	"\brobot_id\x18\x01 \x01(\tR\arobotId\x12%\n" +
+	"\x0efirst_sequence\x18\x02 \x01(\x04R\rfirstSequence\x12\f\n" +
+	"\x01x\x18\x03 \x03(\x02R\x01x\x12\f\n" +
+	"\x01y\x18\x04 \x03(\x02R\x01y\x12\x1c\n" +
+	"\ttimestamp\x18\x05 \x03(\x10R\ttimestamp2\x8d\x01\n" +
 	"\fRobotTracker\x126\n" +
 	"\n" +
-	"TrackRobot\x12\x13.robot.TrackRequest\x1a\x0f.robot.Position\"\x000\x01B;Z9github.com/tetsufromtw/practice-robot/robot-tracker/protob\x06proto3"
+	"TrackRobot\x12\x13.robot.TrackRequest\x1a\x0f.robot.Position\"\x000\x01\x12E\n" +
+	"\x0fTrackRobotBatch\x12\x18.robot.TrackBatchRequest\x1a\x14.robot.PositionBatch\"\x000\x01B;Z9github.com/tetsufromtw/practice-robot/robot-tracker/protob\x06proto3"
 
 var (
 	file_proto_robot_proto_rawDescOnce sync.Once
@@ -143,16 +347,20 @@ func file_proto_robot_proto_rawDescGZIP() []byte {
 	return file_proto_robot_proto_rawDescData
 }
 
-var file_proto_robot_proto_msgTypes = make([]protoimpl.MessageInfo, 2)
+var file_proto_robot_proto_msgTypes = make([]protoimpl.MessageInfo, 4)
 var file_proto_robot_proto_goTypes = []any{
-	(*TrackRequest)(nil), // 0: robot.TrackRequest
-	(*Position)(nil),     // 1: robot.Position
+	(*TrackRequest)(nil),      // 0: robot.TrackRequest
+	(*Position)(nil),          // 1: robot.Position
+	(*TrackBatchRequest)(nil), // 2: robot.TrackBatchRequest
+	(*PositionBatch)(nil),     // 3: robot.PositionBatch
 }
 var file_proto_robot_proto_depIdxs = []int32{
 	0, // 0: robot.RobotTracker.TrackRobot:input_type -> robot.TrackRequest
-	1, // 1: robot.RobotTracker.TrackRobot:output_type -> robot.Position
-	1, // [1:2] is the sub-list for method output_type
-	0, // [0:1] is the sub-list for method input_type
+	2, // 1: robot.RobotTracker.TrackRobotBatch:input_type -> robot.TrackBatchRequest
+	1, // 2: robot.RobotTracker.TrackRobot:output_type -> robot.Position
+	3, // 3: robot.RobotTracker.TrackRobotBatch:output_type -> robot.PositionBatch
+	2, // [2:4] is the sub-list for method output_type
+	0, // [0:2] is the sub-list for method input_type
 	0, // [0:0] is the sub-list for extension type_name
 	0, // [0:0] is the sub-list for extension extendee
 	0, // [0:0] is the sub-list for field type_name
@@ -169,7 +377,7 @@ func file_proto_robot_proto_init() {
 			GoPackagePath: reflect.TypeOf(x{}).PkgPath(),
 			RawDescriptor: unsafe.Slice(unsafe.StringData(file_proto_robot_proto_rawDesc), len(file_proto_robot_proto_rawDesc)),
 			NumEnums:      0,
-			NumMessages:   2,
+			NumMessages:   4,
 			NumExtensions: 0,
 			NumServices:   1,
 		},
@@ -19,15 +19,18 @@ import (
 const _ = grpc.SupportPackageIsVersion9
 
 const (
-	RobotTracker_TrackRobot_FullMethodName = "/robot.RobotTracker/TrackRobot"
+	RobotTracker_TrackRobot_FullMethodName      = "/robot.RobotTracker/TrackRobot"
+	RobotTracker_TrackRobotBatch_FullMethodName = "/robot.RobotTracker/TrackRobotBatch"
 )
 
 // RobotTrackerClient is the client API for RobotTracker service.
 //
 // For semantics around ctx use and closing/ending streaming RPCs, please refer to https://pkg.go.dev/google.golang.org/grpc/?tab=doc#ClientConn.NewStream.
 type RobotTrackerClient interface {
-	// 用於發送機器人位置的流式 RPC
+	// ロボットの位置を送信するためのストリーミングRPC
 	TrackRobot(ctx context.Context, in *TrackRequest, opts ...grpc.CallOption) (grpc.ServerStreamingClient[Position], error)
+	// 位置を一定期間ごとにまとめて送信するストリーミングRPC（高頻度の更新向け）
+	TrackRobotBatch(ctx context.Context, in *TrackBatchRequest, opts ...grpc.CallOption) (grpc.ServerStreamingClient[PositionBatch], error)
 }
 
 type robotTrackerClient struct {
@@ -57,12 +60,33 @@ func (c *robotTrackerClient) TrackRobot(ctx context.Context, in *TrackRequest, o
 // This type alias is provided for backwards compatibility with existing code that references the prior non-generic stream type by name.
 type RobotTracker_TrackRobotClient = grpc.ServerStreamingClient[Position]
 
+func (c *robotTrackerClient) TrackRobotBatch(ctx context.Context, in *TrackBatchRequest, opts ...grpc.CallOption) (grpc.ServerStreamingClient[PositionBatch], error) {
+	cOpts := append([]grpc.CallOption{grpc.StaticMethod()}, opts...)
+	stream, err := c.cc.NewStream(ctx, &RobotTracker_ServiceDesc.Streams[1], RobotTracker_TrackRobotBatch_FullMethodName, cOpts...)
+	if err != nil {
+		return nil, err
+	}
+	x := &grpc.GenericClientStream[TrackBatchRequest, PositionBatch]{ClientStream: stream}
+	if err := x.ClientStream.SendMsg(in); err != nil {
+		return nil, err
+	}
+	if err := x.ClientStream.CloseSend(); err != nil {
+		return nil, err
+	}
+	return x, nil
+}
+
+// This type alias is provided for backwards compatibility with existing code that references the prior non-generic stream type by name.
+type RobotTracker_TrackRobotBatchClient = grpc.ServerStreamingClient[PositionBatch]
+
 // RobotTrackerServer is the server API for RobotTracker service.
 // All implementations must embed UnimplementedRobotTrackerServer
 // for forward compatibility.
 type RobotTrackerServer interface {
-	// 用於發送機器人位置的流式 RPC
+	// ロボットの位置を送信するためのストリーミングRPC
 	TrackRobot(*TrackRequest, grpc.ServerStreamingServer[Position]) error
+	// 位置を一定期間ごとにまとめて送信するストリーミングRPC（高頻度の更新向け）
+	TrackRobotBatch(*TrackBatchRequest, grpc.ServerStreamingServer[PositionBatch]) error
 	mustEmbedUnimplementedRobotTrackerServer()
 }
 
@@ -76,6 +100,9 @@ type UnimplementedRobotTrackerServer struct{}
 func (UnimplementedRobotTrackerServer) TrackRobot(*TrackRequest, grpc.ServerStreamingServer[Position]) error {
 	return status.Errorf(codes.Unimplemented, "method TrackRobot not implemented")
 }
+func (UnimplementedRobotTrackerServer) TrackRobotBatch(*TrackBatchRequest, grpc.ServerStreamingServer[PositionBatch]) error {
+	return status.Errorf(codes.Unimplemented, "method TrackRobotBatch not implemented")
+}
 func (UnimplementedRobotTrackerServer) mustEmbedUnimplementedRobotTrackerServer() {}
 func (UnimplementedRobotTrackerServer) testEmbeddedByValue()                      {}
 
@@ -108,6 +135,17 @@ func _RobotTracker_TrackRobot_Handler(srv interface{}, stream grpc.ServerStream)
 // This type alias is provided for backwards compatibility with existing code that references the prior non-generic stream type by name.
 type RobotTracker_TrackRobotServer = grpc.ServerStreamingServer[Position]
 
+func _RobotTracker_TrackRobotBatch_Handler(srv interface{}, stream grpc.ServerStream) error {
+	m := new(TrackBatchRequest)
+	if err := stream.RecvMsg(m); err != nil {
+		return err
+	}
+	return srv.(RobotTrackerServer).TrackRobotBatch(m, &grpc.GenericServerStream[TrackBatchRequest, PositionBatch]{ServerStream: stream})
+}
+
+// This type alias is provided for backwards compatibility with existing code that references the prior non-generic stream type by name.
+type RobotTracker_TrackRobotBatchServer = grpc.ServerStreamingServer[PositionBatch]
+
 // RobotTracker_ServiceDesc is the grpc.ServiceDesc for RobotTracker service.
 // It's only intended for direct use with grpc.RegisterService,
 // and not to be introspected or modified (even as a copy)
@@ -121,6 +159,11 @@ var RobotTracker_ServiceDesc = grpc.ServiceDesc{
 			Handler:       _RobotTracker_TrackRobot_Handler,
 			ServerStreams: true,
 		},
+		{
+			StreamName:    "TrackRobotBatch",
+			Handler:       _RobotTracker_TrackRobotBatch_Handler,
+			ServerStreams: true,
+		},
 	},
 	Metadata: "proto/robot.proto",
 }